@@ -9,75 +9,52 @@ import base64
 from datetime import datetime, timedelta, date
 from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect, Query, Request
 from pydantic import BaseModel
-from typing import Optional, List, Set
-from sqlalchemy import func, and_, extract, case
+from typing import Optional, Set
+from sqlalchemy import func, case
 from database import SessionLocal
 from models.user import User, TierLevel
 from models.drop_event import DropEvent
 from models.bet import UserBet
+from utils import pnl_aggregates
 from models.referral import Referral, ReferralSettings
 from core.referrals import ReferralManager
+from utils.ws_fanout import WebSocketFanout
 
 router = APIRouter(prefix="/api/web", tags=["web"])
 
-# WebSocket connections manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-        print(f"🔌 WebSocket connected. Total: {len(self.active_connections)}")
-
-    def disconnect(self, websocket: WebSocket):
-        if websocket in self.active_connections:
-            self.active_connections.remove(websocket)
-        print(f"🔌 WebSocket disconnected. Total: {len(self.active_connections)}")
-
-    async def broadcast(self, message: dict):
-        """Send message to all connected clients"""
-        disconnected = []
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception:
-                disconnected.append(connection)
-        
-        # Clean up disconnected
-        for conn in disconnected:
-            self.disconnect(conn)
-
-manager = ConnectionManager()
+# WebSocket connections manager (per-client send queues, filtered subscriptions)
+manager = WebSocketFanout()
 
 # Function to notify all connected clients of a new call
 async def notify_new_call(call_data: dict):
     """Call this when a new drop is received to notify web clients instantly"""
-    await manager.broadcast({
-        "type": "new_call",
-        "data": call_data
-    })
+    # Lite version (no payload) for list-only and lagging clients
+    lite_data = {k: v for k, v in call_data.items() if k != "payload"}
+    manager.publish(
+        {"type": "new_call", "data": call_data},
+        bet_type=call_data.get("betType"),
+        percentage=call_data.get("arbPercentage"),
+        lite={"type": "new_call", "data": lite_data, "lite": True},
+    )
 
 # Function to notify all connected clients of new confirmations
 async def notify_new_confirmation(user_id: int, count: int):
     """Call this when a bet needs confirmation to notify web clients instantly"""
-    await manager.broadcast({
+    manager.publish({
         "type": "new_confirmation",
         "user_id": user_id,
         "count": count
-    })
+    }, user_id=user_id)
 
 @router.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket for real-time updates"""
-    await manager.connect(websocket)
+    """WebSocket for real-time updates (?betTypes=arbitrage,middle&minPercentage=2&userId=...&lite=1)"""
+    await manager.connect(websocket, dict(websocket.query_params))
     try:
         while True:
-            # Keep connection alive, wait for messages
+            # Keep connection alive: "ping" or {"type": "subscribe", ...}
             data = await websocket.receive_text()
-            # Echo back or handle commands
-            if data == "ping":
-                await websocket.send_json({"type": "pong"})
+            manager.handle_text(websocket, data)
     except WebSocketDisconnect:
         manager.disconnect(websocket)
     except Exception:
@@ -1052,22 +1029,15 @@ async def get_calendar_data(
         target_year = year if year else now.year
         target_month = month if month else now.month
         
-        # Get all bets for this user in the target month (any status)
-        bets = db.query(UserBet).filter(
-            and_(
-                UserBet.user_id == telegram_id,
-                extract('year', UserBet.bet_date) == target_year,
-                extract('month', UserBet.bet_date) == target_month
-            )
-        ).all()
+        # Daily aggregates for the month (bet_date range -> uses the index)
+        month_start = date(target_year, target_month, 1)
+        next_month = date(target_year + 1, 1, 1) if target_month == 12 else date(target_year, target_month + 1, 1)
+        rows = pnl_aggregates.daily_rows(db, telegram_id, month_start, next_month - timedelta(days=1))
         
-        # Group bets by day
+        # Group aggregate rows by day
         days_data = {}
-        for bet in bets:
-            if not bet.bet_date:
-                continue
-                
-            day = bet.bet_date.day
+        for row in rows:
+            day = row.day.day
             if day not in days_data:
                 days_data[day] = {
                     'date': day,
@@ -1092,37 +1062,31 @@ async def get_calendar_data(
                 }
             
             # Add P&L and REAL stake
-            profit = bet.actual_profit if bet.actual_profit is not None else (bet.expected_profit or 0)
-            days_data[day]['pnl'] += profit
-            days_data[day]['bets'] += 1
-            days_data[day]['stake'] += bet.total_stake or 0  # Add REAL stake
+            days_data[day]['pnl'] += row.profit
+            days_data[day]['bets'] += row.bets
+            days_data[day]['stake'] += row.stake
             
-            # Track wins/losses
-            if profit > 0:
-                days_data[day]['wins'] += 1
-            elif profit < 0:
-                days_data[day]['losses'] += 1
+            # Wins/losses = bets with positive / negative profit
+            days_data[day]['wins'] += row.positive
+            days_data[day]['losses'] += row.negative
             
             # Track by strategy (profit, bet count, AND wins)
-            bet_type = bet.bet_type or 'arbitrage'
-            if bet_type == 'arbitrage':
-                days_data[day]['strategies']['arb'] += profit
-                days_data[day]['strategies']['arbBets'] += 1
-                if profit > 0:
-                    days_data[day]['strategies']['arbWins'] += 1
-            elif bet_type == 'middle':
-                days_data[day]['strategies']['mid'] += profit
-                days_data[day]['strategies']['midBets'] += 1
-                if profit > 0:
-                    days_data[day]['strategies']['midWins'] += 1
-            elif bet_type == 'good_ev':
-                days_data[day]['strategies']['ev'] += profit
-                days_data[day]['strategies']['evBets'] += 1
-                if profit > 0:
-                    days_data[day]['strategies']['evWins'] += 1
-            elif bet_type == 'parlay':
-                days_data[day]['strategies']['parlays'] += profit
-                days_data[day]['strategies']['parlayBets'] += 1
+            strategies = days_data[day]['strategies']
+            if row.bet_type == 'arbitrage':
+                strategies['arb'] += row.profit
+                strategies['arbBets'] += row.bets
+                strategies['arbWins'] += row.positive
+            elif row.bet_type == 'middle':
+                strategies['mid'] += row.profit
+                strategies['midBets'] += row.bets
+                strategies['midWins'] += row.positive
+            elif row.bet_type == 'good_ev':
+                strategies['ev'] += row.profit
+                strategies['evBets'] += row.bets
+                strategies['evWins'] += row.positive
+            elif row.bet_type == 'parlay':
+                strategies['parlays'] += row.profit
+                strategies['parlayBets'] += row.bets
         
         # Calculate win rate per day
         for day_data in days_data.values():
@@ -1153,7 +1117,7 @@ import secrets
 import jwt
 from functools import wraps
 from datetime import datetime, timedelta
-from typing import Optional, List
+from typing import Optional
 from pydantic import BaseModel
 
 class AuthConfirm(BaseModel):
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-recipient alert formatting cost
+Full rebuild per user (legacy format_call_message + casino buttons with referral
+lookups and a log line per side, format_good_odds_message) vs templates
+rendered once per drop and language (CallMessageTemplate, GoodOddsTemplate)
+with only stake / profit slots filled per user.
+
+Each recipient has its own bankroll and language (~50/50 fr/en). The full
+rebuild uses frozen copies of the pre-template formatters
+(legacy_alert_formatters.py), so the output check compares the templates
+against the old messages rather than against themselves.
+
+Usage: python benchmarks/bench_alert_templates.py [n_recipients] [rounds]
+"""
+import logging
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.casinos import get_casino_logo, get_casino_referral_link
+from utils.call_processor import (
+    BettingCall,
+    CallMessageTemplate,
+    EventDatetime,
+    Side,
+    analyze_arbitrage_two_way,
+    project_call_for_bankrolls,
+)
+from utils.oddsjam_formatters import GoodOddsTemplate
+from legacy_alert_formatters import legacy_format_call_message, legacy_format_good_odds_message
+
+# Log lines are part of the legacy per-user cost; send them nowhere
+logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()])
+logger = logging.getLogger("bench_alert_templates")
+
+
+def make_call() -> BettingCall:
+    call = BettingCall(
+        call_id="bench", sport="basketball", league="NBA", team1="Lakers", team2="Celtics",
+        match="Lakers vs Celtics", market="Point Spread", call_type="arbitrage", expected_edge_pct=2.4,
+        sides=[
+            Side("betsson", "Betsson", "spreads", "Lakers +3.5", 2.10, 110, fallback_link="https://www.betsson.com"),
+            Side("coolbet", "Coolbet", "spreads", "Celtics -3.5", 2.02, 102, deep_link="https://www.coolbet.com/en/sports/match/1"),
+        ],
+        event_datetime=EventDatetime(display="Saturday, Nov 29 - 07:30 PM ET (starts in 5h 12min)"),
+    )
+    return analyze_arbitrage_two_way(call)
+
+
+GOOD_EV = {
+    "bookmaker": "Betsson", "ev_percent": "7.4", "odds": "+145", "team1": "Lakers", "team2": "Celtics",
+    "league": "NBA", "sport": "basketball", "market": "Player Points",
+    "selection": "LeBron James Over 24.5", "formatted_time": "Saturday, Nov 29 - 07:30 PM ET",
+}
+
+
+def legacy_casino_buttons(call):
+    """Former per-user loop in send_alert_to_user"""
+    buttons = []
+    for side in call.sides[:2]:
+        link = side.deep_link or None
+        if not link:
+            link = get_casino_referral_link(side.book_name)
+        if not link:
+            link = side.fallback_link
+        if not link:
+            link = f"https://{side.book_name.lower().replace(' ', '')}.com"
+        logger.info(f"🔗 Casino button for {side.book_name}: deep={side.deep_link}, referral={get_casino_referral_link(side.book_name)}, fallback={side.fallback_link}, final={link}")
+        buttons.append((f"{get_casino_logo(side.book_name)} {side.book_name}", link))
+    return buttons
+
+
+def timed(fn, rounds):
+    best = float("inf")
+    out = None
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rnd = random.Random(3)
+    langs = [rnd.choice(["fr", "en"]) for _ in range(n)]
+    bankrolls = [rnd.choice([100, 250, 500, 750, 1000, 2500]) + rnd.randint(0, 99) for _ in range(n)]
+
+    template_call = make_call()
+    calls = project_call_for_bankrolls(template_call, bankrolls)
+
+    def legacy_arb():
+        return [(legacy_format_call_message(c, lang=lang), legacy_casino_buttons(c)) for c, lang in zip(calls, langs)]
+
+    def templated_arb():
+        templates = {}
+        out = []
+        for c, lang in zip(calls, langs):
+            t = templates.get(lang)
+            if t is None:
+                t = templates[lang] = CallMessageTemplate(template_call, lang)
+            out.append((t.render(c), t.casino_buttons))
+        return out
+
+    def legacy_ev():
+        return [legacy_format_good_odds_message(GOOD_EV, float(b), lang) for b, lang in zip(bankrolls, langs)]
+
+    def templated_ev():
+        templates = {}
+        out = []
+        for b, lang in zip(bankrolls, langs):
+            t = templates.get(lang)
+            if t is None:
+                t = templates[lang] = GoodOddsTemplate(GOOD_EV, lang)
+            out.append(t.render(float(b)))
+        return out
+
+    print(f"{n} recipients, best of {rounds} rounds")
+    for name, legacy, templated in (("Arbitrage", legacy_arb, templated_arb), ("Good EV", legacy_ev, templated_ev)):
+        legacy_s, legacy_out = timed(legacy, rounds)
+        templated_s, templated_out = timed(templated, rounds)
+        same = legacy_out == templated_out
+        print(f"{name:10s} full rebuild: {legacy_s / n * 1e6:7.1f} µs/recipient ({legacy_s * 1000:6.1f} ms) | "
+              f"template: {templated_s / n * 1e6:6.1f} µs/recipient ({templated_s * 1000:6.1f} ms) | "
+              f"x{legacy_s / templated_s:.1f} | identical output: {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark: pricing calls for many bankrolls
+ArbitrageCalculator (one odds list / one bankroll per call, Python loop)
+vs BatchArbitrageCalculator (NumPy, one pass).
+
+Scenarios:
+- one drop priced for every user bankroll (alert fan-out)
+- a slate of N calls re-priced for one bankroll (odds move)
+- a slate of N calls x M bankrolls
+
+Results are checked against the scalar calculator (rounded to 2 decimals).
+
+Usage: python benchmarks/bench_batch_calculator.py [n_users] [n_calls]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.calculator import ArbitrageCalculator
+from core.batch_calculator import BatchArbitrageCalculator
+
+
+def make_odds(n: int, seed: int = 1):
+    rnd = random.Random(seed)
+    odds = []
+    for _ in range(n):
+        a = rnd.choice([-1, 1]) * rnd.randint(100, 400)
+        b = rnd.choice([-1, 1]) * rnd.randint(100, 400)
+        odds.append([a, b])
+    return odds
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - t0) * 1000
+
+
+def check(label, scalar, batch, keys):
+    for key in keys:
+        got = np.round(np.asarray(batch[key], dtype=np.float64), 2)
+        expected = np.asarray([r[key] for r in scalar], dtype=np.float64).reshape(got.shape)
+        if not np.allclose(got, expected, atol=0.011):
+            print(f"  ❌ {label}: '{key}' differs from ArbitrageCalculator")
+            return
+    print(f"  ✅ {label}: identical to ArbitrageCalculator ({', '.join(keys)})")
+
+
+def report(label, loop_ms, batch_ms, n):
+    print(f"  {label:<34} loop {loop_ms:8.1f} ms | batch {batch_ms:7.2f} ms | "
+          f"x{loop_ms / max(batch_ms, 1e-6):6.1f} | {n} results")
+
+
+def main(n_users: int, n_calls: int):
+    rnd = random.Random(2)
+    bankrolls = [rnd.choice([100, 250, 400, 500, 750, 1000, 2500]) for _ in range(n_users)]
+    drop = [110, -105]
+    slate = make_odds(n_calls)
+
+    print(f"One drop, {n_users} user bankrolls")
+    scalar, loop_ms = timed(lambda: [ArbitrageCalculator.calculate_safe_stakes(b, drop) for b in bankrolls])
+    batch, batch_ms = timed(BatchArbitrageCalculator.safe_stakes, drop, bankrolls)
+    report("SAFE", loop_ms, batch_ms, n_users)
+    check("SAFE", scalar, batch, ["stakes", "returns", "profit", "roi_percent"])
+
+    print(f"\nSlate of {n_calls} calls, one bankroll (odds move)")
+    scalar, loop_ms = timed(lambda: [ArbitrageCalculator.calculate_safe_stakes(500, o) for o in slate])
+    batch, batch_ms = timed(BatchArbitrageCalculator.safe_stakes, slate, 500)
+    report("SAFE", loop_ms, batch_ms, n_calls)
+    check("SAFE", scalar, batch, ["stakes", "profit", "arb_percentage"])
+
+    scalar, loop_ms = timed(lambda: [ArbitrageCalculator.calculate_optimal_risk(500, o, 5.0) for o in slate])
+    batch, batch_ms = timed(BatchArbitrageCalculator.optimal_risk, slate, 500, 5.0)
+    report("optimal RISKED", loop_ms, batch_ms, n_calls)
+    check("optimal RISKED", scalar, batch, ["stakes", "profits", "max_profit", "risk_reward_ratio"])
+
+    n_sub = min(n_calls, 200)
+    print(f"\nSlate of {n_sub} calls x {n_users} bankrolls")
+    odds = np.asarray(slate[:n_sub])[:, None, :]
+    _, loop_ms = timed(lambda: [ArbitrageCalculator.calculate_safe_stakes(b, o) for o in slate[:n_sub] for b in bankrolls])
+    _, batch_ms = timed(BatchArbitrageCalculator.safe_stakes, odds, bankrolls)
+    report("SAFE", loop_ms, batch_ms, n_sub * n_users)
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(args[0] if args else 5000, args[1] if len(args) > 1 else 2000)
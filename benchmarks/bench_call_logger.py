@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ML call logger (arbitrage_calls) under an alert burst
+Legacy worker (one item per SessionLocal / commit, 100 ms sleep, 1000-slot
+queue) vs batched CallLogger (micro-batches, executemany inserts, clicks
+coalesced per call_id).
+
+The legacy SQL is run through text() with the same statements: as written
+(raw strings, "?" params) it raises on SQLAlchemy 2 and nothing is stored.
+
+Burst: n calls logged at once, each followed by a few clicks, on a
+temporary SQLite database. Legacy is given the same wall-clock budget as
+the batched logger needs to drain everything (at least [legacy_seconds]).
+
+Usage: python benchmarks/bench_call_logger.py [n_calls] [clicks_per_call] [legacy_seconds]
+"""
+import asyncio
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_db_dir = tempfile.mkdtemp(prefix="bench_call_logger_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench.db"
+
+from sqlalchemy import text  # noqa: E402
+
+from database import SessionLocal, engine  # noqa: E402
+from utils.call_logger import CallLogger  # noqa: E402
+
+DDL = """
+CREATE TABLE IF NOT EXISTS arbitrage_calls (
+    call_id TEXT PRIMARY KEY, call_type TEXT NOT NULL, sport TEXT, team_a TEXT, team_b TEXT,
+    match_date TIMESTAMP, book_a TEXT NOT NULL, book_b TEXT NOT NULL, market TEXT,
+    odds_a REAL NOT NULL, odds_b REAL NOT NULL, roi_percent REAL NOT NULL,
+    stake_a REAL, stake_b REAL, profit_expected REAL,
+    sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, users_notified INTEGER DEFAULT 0,
+    users_clicked INTEGER DEFAULT 0, outcome TEXT, profit_actual REAL, clv_a REAL, clv_b REAL
+)
+"""
+
+
+class LegacyCallLogger(CallLogger):
+    """utils/call_logger.py avant les micro-batches (SQL passé par text())"""
+
+    def __init__(self):
+        super().__init__(queue_size=1000)
+
+    async def _process_queue(self):
+        while self.running:
+            try:
+                call_data = await asyncio.wait_for(self.queue.get(), timeout=5.0)
+                await self._save_to_db(call_data)
+                await asyncio.sleep(0.1)
+            except asyncio.TimeoutError:
+                continue
+            except asyncio.CancelledError:
+                break
+
+    async def _save_to_db(self, data):
+        db = SessionLocal()
+        try:
+            if data.get('action') == 'increment_click':
+                db.execute(text("UPDATE arbitrage_calls SET users_clicked = users_clicked + 1 WHERE call_id = :call_id"),
+                           {'call_id': data['call_id']})
+            elif data.get('action') == 'update_result':
+                db.execute(text("UPDATE arbitrage_calls SET outcome = :outcome, profit_actual = :profit_actual "
+                                "WHERE call_id = :call_id"), data)
+            else:
+                db.execute(text("""INSERT OR IGNORE INTO arbitrage_calls
+                    (call_id, call_type, sport, team_a, team_b, match_date, book_a, book_b, market, odds_a, odds_b,
+                     roi_percent, stake_a, stake_b, profit_expected, users_notified, sent_at)
+                    VALUES (:call_id, :call_type, :sport, :team_a, :team_b, :match_date, :book_a, :book_b, :market,
+                     :odds_a, :odds_b, :roi_percent, :stake_a, :stake_b, :profit_expected, :users_notified, :sent_at)"""),
+                           data)
+            db.commit()
+        except Exception:
+            db.rollback()
+        finally:
+            db.close()
+
+
+def reset_table():
+    with engine.begin() as conn:
+        conn.execute(text("DROP TABLE IF EXISTS arbitrage_calls"))
+        conn.execute(text(DDL))
+
+
+def table_counts():
+    with engine.connect() as conn:
+        rows, clicks = conn.execute(text("SELECT COUNT(*), COALESCE(SUM(users_clicked), 0) FROM arbitrage_calls")).one()
+    return rows, clicks
+
+
+async def burst(call_logger, n_calls, clicks_per_call):
+    rnd = random.Random(9)
+    for i in range(n_calls):
+        odds_a, odds_b = round(rnd.uniform(1.9, 2.3), 2), round(rnd.uniform(1.9, 2.3), 2)
+        await call_logger.log_call("arbitrage", "basketball_nba", f"Team {i}", f"Team {i + 1}", "Betsson", "Coolbet",
+                                   odds_a, odds_b, 2.4, 100, 104, users_notified=250)
+        call_id = call_logger._generate_call_id(f"Team {i}", f"Team {i + 1}", "Betsson", "Coolbet", odds_a, odds_b)
+        for _ in range(clicks_per_call):
+            await call_logger.increment_click(call_id)
+
+
+async def run(call_logger, n_calls, clicks_per_call, budget=None):
+    reset_table()
+    await call_logger.start()
+    t0 = time.perf_counter()
+    await burst(call_logger, n_calls, clicks_per_call)
+    enqueue_ms = (time.perf_counter() - t0) * 1000
+    if budget is None:
+        await call_logger.stop(timeout=600)
+    else:
+        await asyncio.sleep(max(0.0, budget - (time.perf_counter() - t0)))
+        call_logger.running = False
+        call_logger._worker_task.cancel()
+    elapsed = time.perf_counter() - t0
+    rows, clicks = table_counts()
+    return elapsed, enqueue_ms, rows, clicks
+
+
+def main():
+    # Les avertissements "queue full" du legacy noieraient le résultat
+    logging.getLogger("utils.call_logger").setLevel(logging.ERROR)
+    args = [float(a) for a in sys.argv[1:]]
+    n_calls = int(args[0]) if len(args) > 0 else 2000
+    clicks_per_call = int(args[1]) if len(args) > 1 else 3
+    legacy_seconds = args[2] if len(args) > 2 else 5.0
+    total_clicks = n_calls * clicks_per_call
+    print(f"Burst: {n_calls} calls + {total_clicks} clicks ({n_calls + total_clicks} queue items), SQLite")
+
+    batched = CallLogger()
+    elapsed, enqueue_ms, rows, clicks = asyncio.run(run(batched, n_calls, clicks_per_call))
+    stats = batched.get_stats()
+    print(f"batched  {elapsed:6.2f}s to drain | {rows}/{n_calls} calls, {clicks}/{total_clicks} clicks stored | "
+          f"{(rows + clicks) / elapsed:8.0f} items/s | {stats['batches']} batches (max {stats['max_batch']}) | "
+          f"dropped {stats['dropped_calls'] + stats['dropped_clicks']} | enqueue {enqueue_ms:.0f} ms")
+
+    legacy = LegacyCallLogger()
+    budget = max(legacy_seconds, elapsed)
+    elapsed, enqueue_ms, rows, clicks = asyncio.run(run(legacy, n_calls, clicks_per_call, budget))
+    dropped = legacy.get_stats()
+    print(f"legacy   {elapsed:6.2f}s budget   | {rows}/{n_calls} calls, {clicks}/{total_clicks} clicks stored | "
+          f"{(rows + clicks) / elapsed:8.0f} items/s | queue left {legacy.queue.qsize()} | "
+          f"dropped {dropped['dropped_calls'] + dropped['dropped_clicks']} | enqueue {enqueue_ms:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
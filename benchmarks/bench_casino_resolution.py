@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Benchmark: casino name resolution (normalize_casino_name / get_casino_logo /
+get_casino_referral_link)
+Legacy linear walk over CASINOS and every alias list per call vs the alias
+index built at import (exact + compact keys, OCR misspellings folded in,
+memoised per raw string).
+
+Corpus: casino strings as they appear in drop payloads (outcomes / legs /
+side_a / side_b), with the casing, "@ " prefixes and OCR misspellings the
+bridges produce. Each alert resolves every side several times (button
+label, logo, referral link), as send_alert_to_user did per user.
+
+With --db, the casino strings of all drop_events payloads from DATABASE_URL
+are used instead.
+
+Usage: python benchmarks/bench_casino_resolution.py [n_strings] [rounds] [--db]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.casinos import (
+    CASINOS,
+    OCR_ALIASES,
+    get_casino_logo,
+    get_casino_referral_link,
+    normalize_casino_name,
+    normalize_casino_names,
+)
+
+# Casinos absent de CASINOS (doivent rester non résolus)
+UNKNOWN = ["bet365", "FanDuel", "DraftKings", "Unknown", "PointsBet", "Bet Rivers"]
+
+
+# ---------- Ancienne implémentation (core/casinos.py avant l'index) ----------
+
+def legacy_normalize(name):
+    if not name:
+        return ""
+    cleaned = name.strip().replace("@", "").strip().lower()
+    for casino_key, casino_data in CASINOS.items():
+        if cleaned == casino_key.lower():
+            return casino_key
+        if cleaned == casino_data["name"].lower():
+            return casino_key
+        for alias in casino_data.get("aliases", []):
+            if cleaned == alias.lower():
+                return casino_key
+    return name
+
+
+def legacy_get_casino(name):
+    normalized = legacy_normalize(name)
+    if normalized in CASINOS:
+        return CASINOS[normalized]
+    for key, value in CASINOS.items():
+        if key.lower() == normalized.lower():
+            return value
+    return None
+
+
+def legacy_logo(name):
+    casino = legacy_get_casino(name)
+    return casino.get("logo", "🎰") if casino else "🎰"
+
+
+def legacy_referral(name):
+    casino = legacy_get_casino(name)
+    return casino.get("referral_link", "") if casino else ""
+
+
+# ---------- Corpus ----------
+
+def build_corpus(n):
+    rnd = random.Random(11)
+    variants = []
+    for key, data in CASINOS.items():
+        variants += [key, data["name"], *data.get("aliases", [])]
+    for aliases in OCR_ALIASES.values():
+        variants += aliases
+    variants += UNKNOWN
+    corpus = []
+    for _ in range(n):
+        s = rnd.choice(variants)
+        s = rnd.choice([s, s, s.upper(), s.lower(), f"@ {s}", f" {s} "])
+        corpus.append(s)
+    return corpus
+
+
+def db_corpus():
+    from database import SessionLocal
+    from models.drop_event import DropEvent
+    db = SessionLocal()
+    try:
+        rows = db.query(DropEvent.payload).filter(DropEvent.payload.isnot(None)).yield_per(1000)
+        corpus = []
+        for (payload,) in rows:
+            if not isinstance(payload, dict):
+                continue
+            sides = (payload.get("outcomes") or payload.get("legs")
+                     or [payload.get("side_a"), payload.get("side_b")])
+            corpus += [s["casino"] for s in sides if isinstance(s, dict) and s.get("casino")]
+    finally:
+        db.close()
+    return corpus
+
+
+def timed(fn, rounds):
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        out = fn()
+    return (time.perf_counter() - t0) / rounds, out
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    n = int(args[0]) if len(args) > 0 else 5000
+    rounds = int(args[1]) if len(args) > 1 else 20
+    corpus = db_corpus() if "--db" in sys.argv else build_corpus(n)
+    if not corpus:
+        print("No casino strings found")
+        return
+
+    def legacy():
+        return [(legacy_normalize(s), legacy_logo(s), legacy_referral(s)) for s in corpus]
+
+    def indexed():
+        return [(normalize_casino_name(s), get_casino_logo(s), get_casino_referral_link(s)) for s in corpus]
+
+    legacy_s, legacy_out = timed(legacy, rounds)
+    index_s, index_out = timed(indexed, rounds)
+    bulk_s, _ = timed(lambda: normalize_casino_names(corpus), rounds)
+
+    resolved_legacy = sum(1 for name, _, _ in legacy_out if name in CASINOS)
+    resolved_index = sum(1 for name, _, _ in index_out if name in CASINOS)
+    # Tout ce que l'ancienne version résolvait doit l'être à l'identique
+    regressions = sum(1 for a, b in zip(legacy_out, index_out) if a[0] in CASINOS and a != b)
+
+    print(f"{len(corpus)} casino strings ({len(set(corpus))} distinct), {rounds} rounds")
+    print(f"legacy scan  {legacy_s / len(corpus) * 1e6:6.2f} µs/string (name + logo + referral) | "
+          f"resolved {resolved_legacy}/{len(corpus)}")
+    print(f"alias index  {index_s / len(corpus) * 1e6:6.2f} µs/string (name + logo + referral) | "
+          f"resolved {resolved_index}/{len(corpus)} | regressions {regressions}")
+    print(f"bulk normalize_casino_names: {bulk_s / len(corpus) * 1e6:.2f} µs/string")
+    print(f"Speed-up: x{legacy_s / index_s:.1f}")
+
+
+if __name__ == "__main__":
+    main()
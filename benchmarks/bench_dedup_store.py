@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark: call deduplication
+Legacy SENT_CALLS_CACHE (dict swept linearly on every call) vs DedupStore
+(time buckets in memory, optionally backed by SQLite).
+
+The cache is pre-filled with N recent hashes, then M calls are checked
+(~25% duplicates).
+
+Usage: python benchmarks/bench_dedup_store.py [cache_size] [calls]
+"""
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.dedup_store import DedupStore
+
+TTL_SECONDS = 600
+
+
+def legacy_is_duplicate(cache: dict, call_hash: str) -> bool:
+    """Former main_new.is_duplicate_call"""
+    now = datetime.now()
+    expired = [k for k, ts in cache.items() if (now - ts).total_seconds() > TTL_SECONDS]
+    for k in expired:
+        del cache[k]
+    if call_hash in cache:
+        return True
+    cache[call_hash] = now
+    return False
+
+
+def make_calls(n: int, existing: list):
+    rnd = random.Random(7)
+    return [rnd.choice(existing) if rnd.random() < 0.25 else f"new-{i}" for i in range(n)]
+
+
+def run(label, fn, calls):
+    t0 = time.perf_counter()
+    dups = sum(1 for c in calls if fn(c))
+    elapsed = time.perf_counter() - t0
+    print(f"  {label:<22} {elapsed * 1e6 / len(calls):9.1f} µs/call | {dups} duplicates")
+
+
+def main(cache_size: int, n_calls: int):
+    existing = [f"old-{i}" for i in range(cache_size)]
+    calls = make_calls(n_calls, existing)
+    print(f"{cache_size} cached hashes, {n_calls} calls")
+
+    cache = {h: datetime.now() for h in existing}
+    run("legacy dict + sweep", lambda h: legacy_is_duplicate(cache, h), calls)
+
+    memory = DedupStore("bench", TTL_SECONDS, path=None)
+    for h in existing:
+        memory.mark_if_new(h)
+    run("DedupStore (memory)", lambda h: not memory.mark_if_new(h), calls)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        stored = DedupStore("bench", TTL_SECONDS, path=f"{tmp}/dedup.db")
+        for h in existing:
+            stored.mark_if_new(h)
+        run("DedupStore (SQLite)", lambda h: not stored.mark_if_new(h), calls)
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(args[0] if args else 5000, args[1] if len(args) > 1 else 2000)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /public/drop persistence (drops/second)
+Legacy path (duplicate SELECT, record_drop session with SELECT + commit +
+refresh, SELECT + UPDATE + commit, enrichment session with SELECT + UPDATE +
+commit) vs upsert_drop + update_drop_enrichment.
+
+Runs on a temporary SQLite file (DATABASE_URL can point to Postgres instead).
+~20% of the drops are duplicates, like bridge re-sends.
+
+Usage: python benchmarks/bench_drop_ingest.py [n_drops] [threads]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+_tmp = tempfile.TemporaryDirectory()
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp.name}/bench_drops.db")
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from database import SessionLocal, engine
+from models.drop_event import DropEvent
+from utils.drop_ingest import update_drop_enrichment, upsert_drop
+
+
+def make_drops(n: int, prefix: str):
+    rnd = random.Random(4)
+    drops = []
+    for i in range(n):
+        eid = f"{prefix}-{rnd.randrange(int(n * 0.8)) if rnd.random() < 0.2 and i else i}"
+        drops.append({
+            "event_id": eid,
+            "arb_percentage": round(rnd.uniform(0.5, 6.0), 2),
+            "match": f"Team {i} vs Team {i + 1}",
+            "league": "NBA",
+            "market": "Player Points",
+            "outcomes": [{"casino": "Betsson", "odds": 120}, {"casino": "Coolbet", "odds": -110}],
+        })
+    return drops
+
+
+def enriched_copy(drop):
+    return {**drop, "commence_time": "2026-01-01T00:00:00Z", "deep_links": {"Betsson": "https://example.com"}}
+
+
+def legacy_ingest(d):
+    """Round trips of the former receive_drop + record_drop + enrich_in_background"""
+    eid = d["event_id"]
+    db = SessionLocal()
+    try:
+        is_duplicate = db.query(DropEvent).filter(DropEvent.event_id == eid).first() is not None
+    finally:
+        db.close()
+
+    # record_drop
+    db = SessionLocal()
+    try:
+        ev = db.query(DropEvent).filter(DropEvent.event_id == eid).first()
+        if ev is None:
+            ev = DropEvent(event_id=eid, bet_type="arbitrage", arb_percentage=d["arb_percentage"],
+                           match=d["match"], league=d["league"], market=d["market"], payload=d)
+            ev.received_at = datetime.now()
+            db.add(ev)
+        else:
+            ev.payload = d
+            ev.received_at = datetime.now()
+        db.commit()
+        db.refresh(ev)
+        drop_id = ev.id
+    finally:
+        db.close()
+
+    # receive_drop persistence block
+    db = SessionLocal()
+    try:
+        ev = db.query(DropEvent).filter(DropEvent.event_id == eid).first()
+        ev.arb_percentage = d["arb_percentage"]
+        ev.payload = d
+        ev.received_at = datetime.now()
+        db.commit()
+        if not is_duplicate:
+            ev.match = d["match"]
+            ev.payload = d
+            db.commit()
+    finally:
+        db.close()
+
+    # enrich_in_background
+    if not is_duplicate:
+        db = SessionLocal()
+        try:
+            ev = db.query(DropEvent).filter(DropEvent.event_id == eid).first()
+            ev.payload = enriched_copy(d)
+            ev.match_time = datetime(2026, 1, 1)
+            db.commit()
+        finally:
+            db.close()
+    return drop_id
+
+
+def new_ingest(d):
+    drop_id, inserted = upsert_drop(d)
+    if inserted:
+        update_drop_enrichment(drop_id, enriched_copy(d))
+    return drop_id
+
+
+def run(label, fn, drops, threads):
+    t0 = time.perf_counter()
+    if threads > 1:
+        with ThreadPoolExecutor(threads) as pool:
+            ids = list(pool.map(fn, drops))
+    else:
+        ids = [fn(d) for d in drops]
+    elapsed = time.perf_counter() - t0
+    missing = sum(1 for i in ids if not i)
+    print(f"  {label:<8} {len(drops) / elapsed:8.0f} drops/s | {elapsed * 1000 / len(drops):6.2f} ms/drop"
+          + (f" | {missing} without id" if missing else ""))
+
+
+def main(n: int, threads: int):
+    DropEvent.__table__.create(engine, checkfirst=True)
+    print(f"{engine.dialect.name}: {n} drops (~20% duplicates)")
+    for t in sorted({1, threads}):
+        print(f" {t} thread(s)")
+        run("legacy", legacy_ingest, make_drops(n, f"legacy{t}"), t)
+        run("upsert", new_ingest, make_drops(n, f"upsert{t}"), t)
+
+    # Same rows in both tables
+    with SessionLocal() as db:
+        for t in sorted({1, threads}):
+            legacy = db.query(DropEvent).filter(DropEvent.event_id.like(f"legacy{t}-%")).count()
+            upsert = db.query(DropEvent).filter(DropEvent.event_id.like(f"upsert{t}-%")).count()
+            print(f"  rows ({t} thread(s)): legacy {legacy} / upsert {upsert}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(args[0] if args else 2000, args[1] if len(args) > 1 else 4)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark: hot-path latency tracer (utils.latency_tracer)
+- Overhead of a span / record compared to the untraced code
+- Histogram percentiles (log buckets, constant memory) vs exact percentiles
+  on the same samples (sorted list, utils.metrics.percentile)
+- drop_to_sent across a simulated fan-out: receipt time carried by the
+  ContextVar through asyncio.gather / to_thread, delayed sends excluded
+
+Usage: python benchmarks/bench_latency_tracer.py [samples] [recipients]
+"""
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.latency_tracer import LatencyTracer  # noqa: E402
+from utils.metrics import percentile  # noqa: E402
+
+
+def overhead(n):
+    tracer = LatencyTracer()
+    t0 = time.perf_counter()
+    for _ in range(n):
+        pass
+    baseline = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    for _ in range(n):
+        with tracer.span("format"):
+            pass
+    span_s = time.perf_counter() - t0 - baseline
+
+    t0 = time.perf_counter()
+    for i in range(n):
+        tracer.record("eligibility", i % 500 / 10)
+    record_s = time.perf_counter() - t0 - baseline
+    return span_s / n * 1e6, record_s / n * 1e6
+
+
+def accuracy(n):
+    rnd = random.Random(11)
+    tracer = LatencyTracer()
+    # Latences type pipeline: log-normal ~300 ms médiane + queue de distribution lente
+    samples = [rnd.lognormvariate(5.7, 0.6) + (rnd.random() < 0.02) * rnd.uniform(1500, 4000) for _ in range(n)]
+    for ms in samples:
+        tracer.record("drop_to_sent", ms)
+    exact = sorted(samples)
+    snap = tracer.summary()["stages"]["drop_to_sent"]
+    rows = []
+    for name, pct in (("p50", 50), ("p95", 95), ("p99", 99)):
+        ref = percentile(exact, pct)
+        rows.append((name, ref, snap[name], (snap[name] - ref) / ref * 100))
+    late = sum(1 for ms in samples if ms > tracer.target_ms)
+    return rows, late, snap["over_target"]
+
+
+async def fanout(recipients):
+    tracer = LatencyTracer()
+
+    async def send_alert(delayed=False):
+        if delayed:
+            tracer.clear_drop()
+            await asyncio.sleep(0.05)
+        with tracer.span("format"):
+            await asyncio.to_thread(time.sleep, 0.001)
+        with tracer.span("send"):
+            await asyncio.sleep(random.uniform(0.01, 0.03))
+        tracer.record_drop_to_sent()
+
+    async def receive_drop():
+        tracer.mark_drop_received()
+        with tracer.span("receive_drop"):
+            delayed = [asyncio.create_task(send_alert(delayed=True)) for _ in range(3)]
+            await asyncio.gather(*(send_alert() for _ in range(recipients)))
+        return delayed
+
+    # Une tâche par requête, comme FastAPI
+    delayed = await asyncio.create_task(receive_drop())
+    await asyncio.gather(*delayed)
+    # Envoi hors drop (commande, callback): pas de drop_to_sent
+    await send_alert()
+    return tracer.summary()
+
+
+def main():
+    args = [int(a) for a in sys.argv[1:]]
+    samples = args[0] if len(args) > 0 else 200_000
+    recipients = args[1] if len(args) > 1 else 200
+
+    span_us, record_us = overhead(samples)
+    print(f"overhead: span {span_us:.2f} µs | record {record_us:.2f} µs")
+
+    rows, late, over = accuracy(samples)
+    for name, ref, est, err in rows:
+        print(f"{name}: exact {ref:8.1f} ms | histogram {est:8.1f} ms | {err:+5.1f}%")
+    print(f"over 2s target: exact {late} | histogram {over}")
+
+    summary = asyncio.run(fanout(recipients))
+    stages = summary["stages"]
+    print(f"fan-out: {recipients} immediate + 3 delayed + 1 outside a drop -> drop_to_sent samples "
+          f"{stages['drop_to_sent']['count']} (expected {recipients}) | send samples {stages['send']['count']} | "
+          f"drop_to_sent p99 {stages['drop_to_sent']['p99']} ms <= receive_drop max {stages['receive_drop']['max']} ms")
+
+
+if __name__ == "__main__":
+    main()
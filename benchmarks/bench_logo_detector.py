@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Benchmark: LogoDetector.detect_logos
+Legacy exhaustive search (every template x every scale on the full screenshot)
+vs pyramid coarse-to-fine search with cached grayscale, with and without ROI.
+
+Images: every .png/.jpg/.jpeg in ocr_dumps/ (accuracy = agreement with legacy).
+If logos/ has no casino templates or ocr_dumps/ has no screenshots, synthetic
+templates and card screenshots with known ground truth are generated.
+
+Usage: python benchmarks/bench_logo_detector.py [n_synthetic_images]
+"""
+import contextlib
+import io
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from logo_detector import LogoDetector
+
+THRESHOLD = 0.75
+# Colonne gauche des cartes synthétiques (où sont posés les logos)
+CARD_LOGO_REGION = [(0.0, 0.0, 0.4, 1.0)]
+SYNTH_NAMES = ["BET99", "iBet", "Betsson", "Coolbet", "bet365", "Pinnacle", "TonyBet", "Stake"]
+
+
+def legacy_detect(detector: LogoDetector, image_bytes: bytes, threshold: float):
+    """Former detect_logos: full-resolution matchTemplate per template and scale"""
+    img = cv2.imdecode(np.frombuffer(image_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+    detected = []
+    for name, data in detector.templates.items():
+        best = None
+        for scale, scaled, _ in data["scales"]:
+            if scaled.shape[0] > img.shape[0] or scaled.shape[1] > img.shape[1]:
+                continue
+            _, max_val, _, max_loc = cv2.minMaxLoc(cv2.matchTemplate(img, scaled, cv2.TM_CCOEFF_NORMED))
+            if max_val > threshold and (best is None or max_val > best["confidence"]):
+                best = {"casino": name, "confidence": float(max_val), "location": max_loc, "scale": scale}
+        if best:
+            detected.append(best)
+    return detected
+
+
+def make_templates(directory: Path) -> Path:
+    rnd = random.Random(1)
+    casinos = []
+    for name in SYNTH_NAMES:
+        logo = np.full((44, 132, 3), rnd.randint(0, 80), np.uint8)
+        color = tuple(rnd.randint(120, 255) for _ in range(3))
+        # Motif propre à chaque logo pour des templates bien distincts
+        for _ in range(4):
+            center = (rnd.randint(0, 132), rnd.randint(0, 44))
+            cv2.circle(logo, center, rnd.randint(6, 18), tuple(rnd.randint(0, 255) for _ in range(3)), -1)
+        cv2.putText(logo, name, (8, 31), cv2.FONT_HERSHEY_SIMPLEX, 0.8, color, 2, cv2.LINE_AA)
+        cv2.imwrite(str(directory / f"{name}.png"), logo)
+        casinos.append({"name": name, "logo_file": f"{name}.png", "emoji": "🎰"})
+    config = directory / "casino_logos.json"
+    config.write_text(json.dumps({"casinos": casinos}))
+    return config
+
+
+def make_screenshots(logo_dir: Path, n: int):
+    """Cartes d'arbitrage synthétiques: 2 logos par carte dans la colonne gauche"""
+    rnd = random.Random(7)
+    logos = {name: cv2.imread(str(logo_dir / f"{name}.png")) for name in SYNTH_NAMES}
+    images = []
+    for _ in range(n):
+        img = np.full((1600, 1080, 3), 28, np.uint8)
+        truth = set()
+        for card in range(3):
+            top = 40 + card * 520
+            cv2.rectangle(img, (20, top), (1060, top + 480), (45, 45, 48), -1)
+            for row, name in enumerate(rnd.sample(SYNTH_NAMES, 2)):
+                scale = rnd.choice([0.75, 1.0, 1.25])
+                logo = cv2.resize(logos[name], None, fx=scale, fy=scale)
+                y = top + 60 + row * 200 + rnd.randint(0, 40)
+                x = 40 + rnd.randint(0, 120)
+                img[y:y + logo.shape[0], x:x + logo.shape[1]] = logo
+                truth.add(name)
+                cv2.putText(img, f"+{rnd.randint(100, 400)}  ${rnd.randint(20, 300)}.00", (460, y + 30),
+                            cv2.FONT_HERSHEY_SIMPLEX, 1.0, (230, 230, 230), 2)
+            cv2.putText(img, "Team A vs Team B - Player Points", (40, top + 440),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.9, (200, 200, 200), 2)
+        noise = np.random.default_rng(len(images)).integers(0, 12, img.shape, dtype=np.uint8)
+        ok, buf = cv2.imencode(".jpg", cv2.add(img, noise), [cv2.IMWRITE_JPEG_QUALITY, 85])
+        images.append((buf.tobytes(), truth))
+    return images
+
+
+def load_dump_screenshots():
+    paths = sorted(p for ext in ("*.png", "*.jpg", "*.jpeg") for p in (ROOT / "ocr_dumps").glob(ext))
+    return [(p.read_bytes(), None) for p in paths]
+
+
+def run(label, detect, images, legacy_results):
+    times, agree, exact = [], 0, 0
+    for (image_bytes, truth), legacy in zip(images, legacy_results):
+        t0 = time.perf_counter()
+        found = detect(image_bytes)
+        times.append((time.perf_counter() - t0) * 1000)
+        names = {d["casino"] for d in found}
+        agree += names == {d["casino"] for d in legacy}
+        exact += truth is not None and names == truth
+    times.sort()
+    with_truth = sum(1 for _, t in images if t is not None)
+    acc = f"{exact}/{with_truth} exact" if with_truth else "n/a"
+    print(f"  {label:<22} p50 {times[len(times) // 2]:7.1f} ms | max {times[-1]:7.1f} ms | "
+          f"agrees with legacy {agree}/{len(images)} | ground truth {acc}")
+
+
+def main(n_synth: int):
+    tmp = None
+    detector = LogoDetector()
+    images = load_dump_screenshots() if detector.templates else []
+    if not detector.templates or not images:
+        tmp = tempfile.TemporaryDirectory()
+        logo_dir = Path(tmp.name)
+        config = make_templates(logo_dir)
+        detector = LogoDetector(logo_dir=str(logo_dir), config_file=str(config))
+        images = make_screenshots(logo_dir, n_synth)
+        print(f"Synthetic set: {len(images)} screenshots, {len(detector.templates)} templates")
+    else:
+        print(f"ocr_dumps/: {len(images)} screenshots, {len(detector.templates)} templates")
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        legacy_results = [legacy_detect(detector, b, THRESHOLD) for b, _ in images]
+        # Vraies captures: zones de "search_regions" dans casino_logos.json (si définies)
+        roi_detector = None
+        if tmp:
+            roi_detector = LogoDetector(logo_dir=detector.logo_dir, config_file=str(config),
+                                        search_regions=CARD_LOGO_REGION)
+        elif detector.search_regions:
+            roi_detector = detector
+
+    def uncached(det):
+        def detect(image_bytes):
+            det._image_cache_key = None
+            with contextlib.redirect_stdout(io.StringIO()):
+                return det.detect_logos(image_bytes, threshold=THRESHOLD)
+        return detect
+
+    run("legacy exhaustive", lambda b: legacy_detect(detector, b, THRESHOLD), images, legacy_results)
+    if detector is not roi_detector:
+        run("pyramid", uncached(detector), images, legacy_results)
+    if roi_detector is not None:
+        run("pyramid + ROI", uncached(roi_detector), images, legacy_results)
+    if tmp:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 12)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ML event tracker on the click path
+Legacy MLEventTracker (SessionLocal + commit inside every track_* call,
+awaited by the handler) vs the write-behind buffer (in-memory append,
+batched flush in a thread).
+
+Simulated handlers: n users each start a session, take a few bet
+decisions (each also tracked as an event) and end the session, all
+concurrently on one event loop with a temporary SQLite database. Measured:
+time each handler awaits the tracker (p50 / p99), time until everything is
+in the DB, and that get_user_session_stats / get_decision_stats agree with
+the legacy tracker (read-through before the flush, DB after).
+
+Usage: python benchmarks/bench_ml_tracker.py [users] [decisions_per_user]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+_db_dir = tempfile.mkdtemp(prefix="bench_ml_tracker_")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/bench.db"
+
+from sqlalchemy import text  # noqa: E402
+
+from bot.ml_event_tracker import MLEventTracker  # noqa: E402
+from database import SessionLocal, engine  # noqa: E402
+
+# Colonnes utilisées par le tracker (pas de migration dans le repo pour ces tables)
+DDL = [
+    """CREATE TABLE system_events (event_id TEXT PRIMARY KEY, event_type TEXT, event_category TEXT,
+        user_id TEXT, session_id TEXT, event_data TEXT, importance_score INTEGER, tags TEXT, source TEXT)""",
+    """CREATE TABLE user_behavior_sessions (session_id TEXT PRIMARY KEY, user_id TEXT, device_type TEXT,
+        platform TEXT, started_at TIMESTAMP, ended_at TIMESTAMP, duration_seconds INTEGER,
+        messages_sent INTEGER DEFAULT 0, bets_clicked INTEGER DEFAULT 0)""",
+    """CREATE TABLE bet_decisions (decision_id TEXT PRIMARY KEY, user_id TEXT, parlay_data TEXT,
+        user_context TEXT, decision TEXT, decision_time_seconds REAL, actual_stake REAL,
+        presented_at TIMESTAMP, decided_at TIMESTAMP, bet_result TEXT, profit_loss REAL, roi REAL)""",
+]
+
+
+class LegacyMLEventTracker(MLEventTracker):
+    """Ancien comportement: SessionLocal + commit dans chaque appel track_*, attendu par le handler"""
+
+    def _buffer(self, statement, params):
+        db = SessionLocal()
+        try:
+            db.execute(statement, params)
+            db.commit()
+        except Exception:
+            db.rollback()
+        finally:
+            db.close()
+
+
+def reset_tables():
+    with engine.begin() as conn:
+        for table in ("system_events", "user_behavior_sessions", "bet_decisions"):
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}"))
+        for ddl in DDL:
+            conn.execute(text(ddl))
+
+
+def row_counts():
+    with engine.connect() as conn:
+        return tuple(conn.execute(text(f"SELECT COUNT(*) FROM {t}")).scalar()
+                     for t in ("system_events", "user_behavior_sessions", "bet_decisions"))
+
+
+async def user_flow(tracker, user_id, decisions, waits):
+    async def timed(coro):
+        t0 = time.perf_counter()
+        result = await coro
+        waits.append((time.perf_counter() - t0) * 1000)
+        return result
+
+    rnd = random.Random(user_id)
+    session_id = await timed(tracker.start_session(user_id))
+    for _ in range(decisions):
+        await asyncio.sleep(rnd.uniform(0, 0.01))
+        decision = rnd.choice(["bet", "skip", "save"])
+        await timed(tracker.track_bet_decision(
+            user_id, decision, {"odds": 3.2, "legs": 3}, {"bankroll": 500},
+            decision_time=round(rnd.uniform(1, 30), 2), stake=20 if decision == "bet" else None,
+        ))
+    await timed(tracker.end_session(session_id))
+
+
+async def user_stats(tracker, user_id):
+    stats = {**await tracker.get_decision_stats(user_id), **await tracker.get_user_session_stats(user_id)}
+    # AVG SQL vs somme Python: mêmes valeurs à l'arrondi près
+    return {k: round(v, 6) if isinstance(v, float) else v for k, v in stats.items()}
+
+
+async def run(tracker, users, decisions):
+    reset_tables()
+    waits = []
+    t0 = time.perf_counter()
+    await asyncio.gather(*(user_flow(tracker, f"u{i}", decisions, waits) for i in range(users)))
+    handlers_s = time.perf_counter() - t0
+    sample = [f"u{i}" for i in range(0, users, max(1, users // 20))]
+    before = [await user_stats(tracker, u) for u in sample]
+    await tracker.stop()
+    persisted_s = time.perf_counter() - t0
+    after = [await user_stats(tracker, u) for u in sample]
+    waits.sort()
+    return {
+        "handlers_s": handlers_s,
+        "persisted_s": persisted_s,
+        "p50": waits[len(waits) // 2],
+        "p99": waits[min(len(waits) - 1, int(len(waits) * 0.99))],
+        "rows": row_counts(),
+        "before": before,
+        "after": after,
+    }
+
+
+def main():
+    args = [int(a) for a in sys.argv[1:]]
+    users = args[0] if len(args) > 0 else 300
+    decisions = args[1] if len(args) > 1 else 10
+    print(f"{users} users x (session + {decisions} decisions), SQLite")
+
+    results = {}
+    for name, cls in (("legacy", LegacyMLEventTracker), ("buffered", MLEventTracker)):
+        r = results[name] = asyncio.run(run(cls(), users, decisions))
+        print(f"{name:9s} handler wait p50 {r['p50']:7.3f} ms p99 {r['p99']:7.3f} ms | handlers done {r['handlers_s']:5.2f}s | "
+              f"all rows in DB {r['persisted_s']:5.2f}s | rows (events, sessions, decisions) {r['rows']}")
+    buffered = results["buffered"]
+    print(f"read-through before flush == after flush: {buffered['before'] == buffered['after']}")
+    # Durées de session exclues: elles dépendent du temps que chaque mode a mis
+    same = all({k: v for k, v in a.items() if k != 'avg_duration'} == {k: v for k, v in b.items() if k != 'avg_duration'}
+               for a, b in zip(buffered['after'], results['legacy']['after']))
+    print(f"stats identical to legacy (excluding session durations): {same}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark: parlay generation for one casino
+Legacy generator (top 10 legs by edge, first 5 combinations per size)
+vs top_k_parlays branch-and-bound over every leg of the casino.
+
+For each CROSS_DAY strategy and pool size: time, number of parlays,
+best / mean EV of the returned parlays. Small pools are also checked
+against brute force (exact top-K by EV).
+
+Usage: python benchmarks/bench_parlay_search.py [n_legs ...]
+"""
+import itertools
+import math
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from smart_parlay_engine import COMBOS_PER_SIZE, CROSS_DAY_STRATEGIES
+from utils.parlay_search import top_k_parlays
+
+AMERICAN_ODDS = [-250, -200, -150, -120, -110, 100, 110, 125, 150, 200, 250, 300]
+
+
+def decimal(american: int) -> float:
+    return 1 + american / 100 if american > 0 else 1 + 100 / abs(american)
+
+
+def make_legs(n: int, seed: int = 1):
+    rnd = random.Random(seed)
+    n_matches = max(2, n // 3)
+    return [
+        {
+            "odds": decimal(rnd.choice(AMERICAN_ODDS)),
+            "edge": round(rnd.uniform(0.5, 10.0), 2),
+            "match": f"match-{rnd.randrange(n_matches)}",
+        }
+        for _ in range(n)
+    ]
+
+
+def ev(combo) -> float:
+    odds = math.prod(leg["odds"] for leg in combo)
+    prob = math.prod(0.5 + leg["edge"] / 100 * 0.3 for leg in combo)
+    return (odds * prob - 1) * 100
+
+
+def legacy(legs, max_legs, min_combined, max_combined):
+    """Former SmartParlayEngine._create_parlays for one casino"""
+    sorted_legs = sorted(legs, key=lambda x: x["edge"], reverse=True)
+    parlays = []
+    for num_legs in range(2, min(max_legs + 1, len(sorted_legs) + 1)):
+        for combo in list(itertools.combinations(sorted_legs[:10], num_legs))[:COMBOS_PER_SIZE]:
+            if len({leg["match"] for leg in combo}) < len(combo):
+                continue
+            combined = math.prod(leg["odds"] for leg in combo)
+            if min_combined <= combined <= max_combined:
+                parlays.append(combo)
+    return parlays
+
+
+def brute_force(legs, max_legs, min_combined, max_combined, k):
+    scores = []
+    for size in range(2, max_legs + 1):
+        for combo in itertools.combinations(legs, size):
+            if len({leg["match"] for leg in combo}) < size:
+                continue
+            if min_combined <= math.prod(leg["odds"] for leg in combo) <= max_combined:
+                scores.append(ev(combo))
+    return sorted(scores, reverse=True)[:k]
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - t0) * 1000
+
+
+def describe(parlays):
+    if not parlays:
+        return f"{0:>3} parlays | best     -   | mean     -  "
+    scores = [ev(c) for c in parlays]
+    return f"{len(parlays):>3} parlays | best {max(scores):6.1f}% | mean {sum(scores) / len(scores):6.1f}%"
+
+
+def check_exact(trials: int = 30):
+    rnd = random.Random(9)
+    for trial in range(trials):
+        legs = make_legs(rnd.randint(8, 16), seed=100 + trial)
+        for _, max_legs, lo, hi, _ in CROSS_DAY_STRATEGIES:
+            max_legs = min(max_legs, 4)
+            k = COMBOS_PER_SIZE * (max_legs - 1)
+            got = [ev(c) for _, c in top_k_parlays(legs, max_legs, lo, hi, k)]
+            expected = brute_force(legs, max_legs, lo, hi, k)
+            if len(got) != len(expected) or any(abs(a - b) > 1e-6 for a, b in zip(got, expected)):
+                print(f"  ❌ mismatch (trial {trial}, {lo}-{hi}x): {got[:3]} vs {expected[:3]}")
+                return
+    print(f"  ✅ top-K identical to brute force on {trials} small pools x {len(CROSS_DAY_STRATEGIES)} strategies")
+
+
+def main(sizes):
+    print("Exactness")
+    check_exact()
+    for n in sizes:
+        legs = make_legs(n)
+        print(f"\n{n} legs in one casino")
+        for strategy, max_legs, lo, hi, _ in CROSS_DAY_STRATEGIES:
+            k = COMBOS_PER_SIZE * (max_legs - 1)
+            old, old_ms = timed(legacy, legs, max_legs, lo, hi)
+            new, new_ms = timed(top_k_parlays, legs, max_legs, lo, hi, k)
+            print(f"  {strategy:<21} legacy {old_ms:8.1f} ms {describe(old)}")
+            print(f"  {'':<21} top-K  {new_ms:8.1f} ms {describe([c for _, c in new])}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [50, 500, 2000, 5000])
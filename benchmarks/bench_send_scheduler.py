@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: fan-out of alerts to N users against a fake Telegram Bot
+The fake bot enforces ~30 msg/s (sliding 1s window) and raises
+TelegramRetryAfter beyond it, like the real Bot API.
+
+Compares a naive asyncio.gather of bot.send_message with SendScheduler.
+
+Usage: python benchmarks/bench_send_scheduler.py [n_messages ...]
+"""
+import asyncio
+import random
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiogram.exceptions import TelegramRetryAfter
+
+from utils.send_scheduler import SendScheduler, LANE_ARBITRAGE, LANE_GOOD_EV, LANE_PARLAY
+
+
+class FakeBot:
+    """Local stand-in for aiogram.Bot: 30 msg/s limit, 20-60 ms per call"""
+
+    def __init__(self, limit_per_second: int = 30, retry_after: int = 1):
+        self.limit = limit_per_second
+        self.retry_after = retry_after
+        self.window = deque()
+        self.delivered = []
+        self.flood_errors = 0
+        self.banned_until = 0.0
+
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.sleep(random.uniform(0.02, 0.06))
+        now = time.monotonic()
+        while self.window and now - self.window[0] > 1.0:
+            self.window.popleft()
+        if now < self.banned_until or len(self.window) >= self.limit:
+            self.flood_errors += 1
+            self.banned_until = max(self.banned_until, now + self.retry_after)
+            raise TelegramRetryAfter(method=None, message="Too Many Requests", retry_after=self.retry_after)
+        self.window.append(now)
+        self.delivered.append((chat_id, text))
+        return {"chat_id": chat_id, "text": text}
+
+
+def make_jobs(n: int):
+    rnd = random.Random(3)
+    lanes = [LANE_ARBITRAGE, LANE_GOOD_EV, LANE_PARLAY]
+    return [(10_000 + i, f"alert {i}", rnd.choice(lanes), rnd.random() < 0.3) for i in range(n)]
+
+
+async def run_naive(jobs):
+    bot = FakeBot()
+    t0 = time.perf_counter()
+    results = await asyncio.gather(
+        *(bot.send_message(chat_id, text) for chat_id, text, _, _ in jobs),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - t0
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    print(f"  naive gather : {len(jobs) - failed:>5} delivered, {failed:>5} lost, "
+          f"{bot.flood_errors:>5} flood errors, {elapsed:6.2f}s")
+
+
+async def run_scheduler(jobs):
+    bot = FakeBot()
+    # Marge sous la limite pour absorber la gigue de latence
+    scheduler = SendScheduler(bot, global_rate=28, workers=8)
+    t0 = time.perf_counter()
+    futures = [
+        scheduler.submit(chat_id, text, lane=lane, premium=premium)
+        for chat_id, text, lane, premium in jobs
+    ]
+    results = await asyncio.gather(*futures, return_exceptions=True)
+    elapsed = time.perf_counter() - t0
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    m = scheduler.metrics()
+    await scheduler.stop()
+
+    premium_ids = {chat_id for chat_id, _, _, premium in jobs if premium}
+    order = [chat_id for chat_id, _ in bot.delivered]
+    last_premium = max((i for i, c in enumerate(order) if c in premium_ids), default=-1)
+    print(f"  scheduler    : {len(jobs) - failed:>5} delivered, {failed:>5} lost, "
+          f"{bot.flood_errors:>5} flood errors, {elapsed:6.2f}s "
+          f"({(len(jobs) - failed) / elapsed:5.1f} msg/s)")
+    print(f"                 latency p50 {m['latency_ms']['p50']:.0f} ms, p95 {m['latency_ms']['p95']:.0f} ms, "
+          f"p99 {m['latency_ms']['p99']:.0f} ms | max depth {m['max_queue_depth']} | "
+          f"last premium delivered at #{last_premium + 1} ({len(premium_ids)} premium)")
+
+
+async def main(sizes):
+    for n in sizes:
+        print(f"{n} messages")
+        jobs = make_jobs(n)
+        await run_naive(jobs)
+        await asyncio.sleep(1.1)
+        await run_scheduler(jobs)
+
+
+if __name__ == "__main__":
+    asyncio.run(main([int(a) for a in sys.argv[1:]] or [100, 300]))
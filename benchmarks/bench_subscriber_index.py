@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark: alert eligibility for an arbitrage drop
+Legacy per-user loop (JSON parsing + checks for every User) vs SubscriberIndex.
+
+Usage: python benchmarks/bench_subscriber_index.py [n_users ...]
+"""
+import importlib
+import json
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from core.tiers import TierManager, TierLevel as CoreTier
+from models.user import User, TierLevel
+from utils.subscriber_index import (
+    SubscriberIndex, user_passes_casino_filter, user_passes_sport_filter,
+)
+
+# UserBet.drop_event is declared by name: the mapper needs DropEvent registered
+importlib.import_module("models.drop_event")
+
+CASINOS = ["BET99", "Betway", "bet365", "Coolbet", "Pinnacle", "Sports Interaction",
+           "TonyBet", "Betsson", "LeoVegas", "Mise-o-jeu", "Proline", "Stake"]
+SPORTS = ["basketball", "football", "hockey", "soccer", "tennis", "baseball", "mma"]
+RANGES = [(0.5, 100.0), (1.0, 100.0), (2.0, 100.0), (0.5, 3.0), (1.5, 5.0)]
+
+
+def make_users(n: int, seed: int = 42) -> list:
+    rnd = random.Random(seed)
+    now = datetime.now()
+    users = []
+    for i in range(n):
+        premium = rnd.random() < 0.3
+        lo, hi = rnd.choice(RANGES)
+        users.append(User(
+            telegram_id=1_000_000 + i,
+            tier=TierLevel.PREMIUM if premium else TierLevel.FREE,
+            subscription_end=(now + timedelta(days=rnd.randint(-5, 30))) if premium and rnd.random() < 0.8 else None,
+            is_active=rnd.random() > 0.05,
+            is_banned=rnd.random() < 0.01,
+            notifications_enabled=None if rnd.random() < 0.2 else rnd.random() > 0.05,
+            min_arb_percent=lo,
+            max_arb_percent=hi,
+            selected_casinos=json.dumps(rnd.sample(CASINOS, rnd.randint(1, 6))) if rnd.random() < 0.5 else None,
+            selected_sports=json.dumps(rnd.sample(SPORTS, rnd.randint(1, 3))) if rnd.random() < 0.3 else None,
+            match_today_only=rnd.random() < 0.1,
+            alerts_today=rnd.randint(0, 6),
+            last_alert_date=date.today() if rnd.random() < 0.5 else None,
+            last_alert_at=(now - timedelta(minutes=rnd.randint(1, 600))) if rnd.random() < 0.7 else None,
+        ))
+    return users
+
+
+def legacy_eligibility(users, arb_pct, casinos, sport, commence_time):
+    """Decision logic of the former send_arbitrage_alert_to_users loop"""
+    immediate, delayed = set(), set()
+    now = datetime.now()
+    for user in users:
+        if not user.is_active or user.is_banned:
+            continue
+        tier = CoreTier.PREMIUM if user.tier.name.lower() == 'premium' else CoreTier.FREE
+        if tier != CoreTier.FREE and not user.subscription_active:
+            tier = CoreTier.FREE
+        if user.notifications_enabled is False:
+            continue
+        if not TierManager.can_view_alert(tier, arb_pct):
+            continue
+        if not ((user.min_arb_percent or 0.5) <= arb_pct <= (user.max_arb_percent or 100.0)):
+            continue
+        if casinos and not user_passes_casino_filter(user, casinos):
+            continue
+        if not user_passes_sport_filter(user, sport):
+            continue
+        if user.match_today_only and commence_time:
+            dt = datetime.fromisoformat(commence_time.replace('Z', '+00:00'))
+            if dt.date() != date.today():
+                continue
+        features = TierManager.get_features(tier)
+        if not user.can_receive_alert_today(features.get('max_alerts_per_day', 5)):
+            continue
+        if tier == CoreTier.FREE and user.last_alert_at:
+            if now - user.last_alert_at.replace(tzinfo=None) < timedelta(minutes=features.get('min_spacing_minutes', 120)):
+                continue
+        if tier == CoreTier.FREE and user.last_alert_at is None:
+            delayed.add(user.telegram_id)
+        else:
+            immediate.add(user.telegram_id)
+    return immediate, delayed
+
+
+def bench(n: int, drops: int = 20) -> None:
+    users = make_users(n)
+    index = SubscriberIndex(max_age=float("inf"))
+    t0 = time.perf_counter()
+    index.load(users)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    rnd = random.Random(7)
+    tomorrow = (datetime.now() + timedelta(days=1)).isoformat()
+    legacy_ms = index_ms = 0.0
+    for _ in range(drops):
+        arb = round(rnd.uniform(0.3, 6.0), 2)
+        casinos = rnd.sample(CASINOS, 2)
+        sport = rnd.choice(["NBA", "NHL", "Premier League", "ATP", "basketball", "Serie A"])
+        commence = rnd.choice([None, tomorrow])
+
+        t0 = time.perf_counter()
+        imm_legacy, del_legacy = legacy_eligibility(users, arb, casinos, sport, commence)
+        legacy_ms += (time.perf_counter() - t0) * 1000
+
+        t0 = time.perf_counter()
+        result = index.eligible_for_arbitrage(arb, casinos, sport, commence)
+        index_ms += (time.perf_counter() - t0) * 1000
+
+        assert {tid for tid, _ in result.immediate} == imm_legacy, "immediate recipients differ"
+        assert set(result.delayed) == del_legacy, "delayed recipients differ"
+
+    print(f"{n:>7} users | index build {build_ms:8.1f} ms | "
+          f"legacy {legacy_ms / drops:8.2f} ms/drop | index {index_ms / drops:7.2f} ms/drop | "
+          f"x{legacy_ms / max(index_ms, 1e-9):.1f}")
+
+
+if __name__ == "__main__":
+    sizes = [int(a) for a in sys.argv[1:]] or [10_000, 100_000]
+    for size in sizes:
+        bench(size)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Benchmark: resolving a drop's match string to an Odds API event
+Legacy linear substring scan (odds_enricher.find_event_by_teams) vs TeamIndex
+(normalised names, alias table, token / trigram lookup).
+
+Corpus: drop match strings as they arrive from the bridge / notifications,
+labelled with the Odds API event they belong to, plus matches that are not
+on the slate (must resolve to nothing). Each sport slate is padded with
+filler events to a realistic size.
+
+With --db, distinct drop_events.match strings from DATABASE_URL are resolved
+too (no labels: reports how often each matcher finds an event and how often
+both agree), against the labelled slates.
+
+Usage: python benchmarks/bench_team_index.py [slate_size] [rounds] [--db]
+"""
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils.team_index import TeamIndex, split_match
+
+# (sport_key, drop match string, Odds API home_team, Odds API away_team)
+LABELLED = [
+    ("basketball_nba", "LA Lakers vs Golden State Warriors", "Golden State Warriors", "Los Angeles Lakers"),
+    ("basketball_nba", "Memphis Grizzlies @ LA Clippers", "Los Angeles Clippers", "Memphis Grizzlies"),
+    ("basketball_nba", "Miami Heat vs Milwaukee Bucks", "Milwaukee Bucks", "Miami Heat"),
+    ("basketball_nba", "Orlando Magic vs New York Knicks", "New York Knicks", "Orlando Magic"),
+    ("basketball_nba", "Toronto Raptors vs Los Angeles Lakers", "Toronto Raptors", "Los Angeles Lakers"),
+    ("basketball_nba", "Utah Jazz vs Sacramento Kings", "Sacramento Kings", "Utah Jazz"),
+    ("basketball_nba", "Bucks vs Nets", "Brooklyn Nets", "Milwaukee Bucks"),
+    ("icehockey_nhl", "Boston Bruins vs New York Rangers", "New York Rangers", "Boston Bruins"),
+    ("icehockey_nhl", "Colorado Avalanche vs Vegas Golden Knights", "Vegas Golden Knights", "Colorado Avalanche"),
+    ("icehockey_nhl", "Edmonton Oilers vs Calgary Flames", "Calgary Flames", "Edmonton Oilers"),
+    ("icehockey_nhl", "Montreal Canadiens @ Vegas Golden Knights", "Vegas Golden Knights", "Montréal Canadiens"),
+    ("icehockey_nhl", "Tampa Bay Lightning vs Florida Panthers", "Florida Panthers", "Tampa Bay Lightning"),
+    ("icehockey_nhl", "Toronto Maple Leafs vs Montreal Canadiens", "Toronto Maple Leafs", "Montréal Canadiens"),
+    ("americanfootball_nfl", "Green Bay Packers @ Detroit Lions", "Detroit Lions", "Green Bay Packers"),
+    ("americanfootball_nfl", "Houston Texans vs Buffalo Bills", "Buffalo Bills", "Houston Texans"),
+    ("americanfootball_nfl", "New England Patriots vs Cincinnati Bengals", "Cincinnati Bengals", "New England Patriots"),
+    ("americanfootball_nfl", "Chiefs vs Raiders", "Las Vegas Raiders", "Kansas City Chiefs"),
+    ("baseball_mlb", "Chicago Cubs vs Milwaukee Brewers", "Milwaukee Brewers", "Chicago Cubs"),
+    ("basketball_ncaab", "Auburn vs St. John's", "St. John's Red Storm", "Auburn Tigers"),
+    ("basketball_ncaab", "Duke vs UNC", "North Carolina Tar Heels", "Duke Blue Devils"),
+    ("basketball_ncaab", "McNeese vs Murray State", "Murray State Racers", "McNeese Cowboys"),
+    ("basketball_ncaab", "Oral Roberts vs Rice", "Rice Owls", "Oral Roberts Golden Eagles"),
+    ("basketball_ncaab", "Syracuse vs Notre Dame", "Notre Dame Fighting Irish", "Syracuse Orange"),
+    ("basketball_ncaab", "Ole Miss vs Mississippi State", "Mississippi State Bulldogs", "Ole Miss Rebels"),
+    ("americanfootball_ncaaf", "Massachusetts vs Bowling Green", "Bowling Green Falcons", "Massachusetts Minutemen"),
+    ("americanfootball_ncaaf", "Coastal Carolina vs North Dakota", "Coastal Carolina Chanticleers", "North Dakota Fighting Hawks"),
+    ("americanfootball_ncaaf", "Buffalo vs Ohio", "Ohio Bobcats", "Buffalo Bulls"),
+    ("soccer_epl", "Leeds United FC vs Aston Villa FC", "Aston Villa", "Leeds United"),
+    ("soccer_italy_serie_a", "Hellas Verona FC vs Parma Calcio", "Hellas Verona FC", "Parma"),
+    ("soccer_italy_serie_a", "US Sassuolo Calcio vs Pisa Sporting Club", "Sassuolo", "Pisa"),
+    ("soccer_italy_serie_a", "Udinese Calcio vs Bologna FC", "Bologna", "Udinese"),
+    ("soccer_spain_la_liga", "CA Osasuna @ RCD Mallorca", "Mallorca", "CA Osasuna"),
+    ("soccer_spain_la_liga", "Villarreal CF vs Real Club Deportivo Mallorca", "Villarreal", "Mallorca"),
+    ("soccer_spain_la_liga", "Real Club Celta de Vigo vs Reial Club Deportiu Espanyol", "Celta Vigo", "Espanyol"),
+    ("soccer_spain_la_liga", "Real Madrid vs Barcelona", "Barcelona", "Real Madrid"),
+    ("soccer_france_ligue_one", "Paris FC vs Toulouse", "Toulouse", "Paris FC"),
+    ("soccer_france_ligue_one", "Paris FC vs Association Jeunesse Auxerroise", "Auxerre", "Paris FC"),
+    ("soccer_uefa_champs_league", "AFC Ajax vs SL Benfica", "Benfica", "Ajax"),
+    ("soccer_uefa_champs_league", "SSC Napoli vs Qaraba", "Qarabağ FK", "Napoli"),
+    ("soccer_brazil_campeonato", "CR Flamengo vs Red Bull Bragantino", "Red Bull Bragantino", "Flamengo"),
+]
+
+# Same slates, other games: share a city / word with the labelled teams
+DISTRACTORS = [
+    ("basketball_nba", "Los Angeles Clippers", "Sacramento Kings"),
+    ("basketball_nba", "New York Knicks", "Brooklyn Nets"),
+    ("icehockey_nhl", "New York Islanders", "New Jersey Devils"),
+    ("icehockey_nhl", "Los Angeles Kings", "Florida Panthers"),
+    ("americanfootball_nfl", "New York Giants", "New England Patriots"),
+    ("basketball_ncaab", "North Carolina State Wolfpack", "Duke Blue Devils"),
+    ("basketball_ncaab", "Mississippi Valley State Delta Devils", "Alabama State Hornets"),
+    ("americanfootball_ncaaf", "Ohio State Buckeyes", "Michigan Wolverines"),
+    ("soccer_spain_la_liga", "Real Sociedad", "Real Betis"),
+    ("soccer_spain_la_liga", "Atlético Madrid", "Sevilla"),
+    ("soccer_france_ligue_one", "Paris Saint Germain", "Lyon"),
+    ("soccer_italy_serie_a", "Inter Milan", "AC Milan"),
+]
+
+# Drops whose game is not on the slate: any event returned is a false positive
+UNLISTED = [
+    ("icehockey_nhl", "New York Rangers vs New Jersey Devils"),
+    ("basketball_nba", "Los Angeles Lakers vs Sacramento Kings"),
+    ("soccer_spain_la_liga", "Real Madrid vs Real Betis"),
+    ("soccer_france_ligue_one", "Paris Saint Germain vs Toulouse"),
+    ("basketball_ncaab", "Mississippi State vs Alabama State"),
+    ("americanfootball_ncaaf", "Ohio State vs Bowling Green"),
+]
+
+
+def legacy_find(events, team1, team2):
+    """Former odds_enricher.find_event_by_teams loop"""
+    t1_lower = team1.lower()
+    t2_lower = team2.lower()
+    for event in events:
+        home = event.get('home_team', '').lower()
+        away = event.get('away_team', '').lower()
+        if (t1_lower in home and t2_lower in away) or \
+           (t2_lower in home and t1_lower in away) or \
+           (home in t1_lower and away in t2_lower) or \
+           (away in t1_lower and home in t2_lower):
+            return event
+    return None
+
+
+def filler_name(rnd):
+    syllables = ["ka", "ro", "vel", "tor", "mi", "zan", "bur", "lo", "ste", "dra", "qui", "pen"]
+    city = "".join(rnd.choice(syllables) for _ in range(3)).title()
+    return f"{city} {rnd.choice(['Hawks', 'Rovers', 'Stars', 'United', 'Comets', 'Wolves'])}"
+
+
+def build_slates(slate_size: int):
+    rnd = random.Random(7)
+    slates = {}
+    for sport, _, home, away in LABELLED:
+        slates.setdefault(sport, []).append({"id": f"{sport}-{len(slates[sport])}", "home_team": home, "away_team": away})
+    for sport, home, away in DISTRACTORS:
+        slates[sport].append({"id": f"{sport}-d{len(slates[sport])}", "home_team": home, "away_team": away})
+    for sport, events in slates.items():
+        while len(events) < slate_size:
+            events.append({"id": f"{sport}-f{len(events)}", "home_team": filler_name(rnd), "away_team": filler_name(rnd)})
+        rnd.shuffle(events)
+    return slates
+
+
+def build_queries(slates):
+    """(sport, team1, team2, expected event or None)"""
+    queries = []
+    for sport, match, home, away in LABELLED:
+        expected = next(e for e in slates[sport] if e["home_team"] == home and e["away_team"] == away)
+        queries.append((sport, *split_match(match), expected))
+    for sport, match in UNLISTED:
+        queries.append((sport, *split_match(match), None))
+    return queries
+
+
+def score(results, queries):
+    labelled = sum(1 for q in queries if q[3] is not None)
+    returned = sum(1 for r in results if r is not None)
+    correct = sum(1 for r, q in zip(results, queries) if r is not None and r is q[3])
+    false_pos = sum(1 for r, q in zip(results, queries) if r is not None and r is not q[3])
+    precision = correct / returned if returned else 0.0
+    return correct, labelled, false_pos, precision
+
+
+def timed(fn, rounds):
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        out = fn()
+    return (time.perf_counter() - t0) / rounds, out
+
+
+def db_corpus():
+    from database import SessionLocal
+    from models.drop_event import DropEvent
+    db = SessionLocal()
+    try:
+        rows = db.query(DropEvent.match).filter(DropEvent.match.isnot(None)).distinct().limit(5000).all()
+    finally:
+        db.close()
+    return [r[0] for r in rows]
+
+
+def main():
+    args = [a for a in sys.argv[1:] if not a.startswith("--")]
+    slate_size = int(args[0]) if len(args) > 0 else 150
+    rounds = int(args[1]) if len(args) > 1 else 50
+
+    slates = build_slates(slate_size)
+    queries = build_queries(slates)
+    t0 = time.perf_counter()
+    indexes = {sport: TeamIndex(events) for sport, events in slates.items()}
+    build_ms = (time.perf_counter() - t0) * 1000 / len(slates)
+
+    legacy_s, legacy = timed(lambda: [legacy_find(slates[s], t1, t2) for s, t1, t2, _ in queries], rounds)
+    index_s, indexed = timed(lambda: [indexes[s].find(t1, t2) for s, t1, t2, _ in queries], rounds)
+
+    print(f"{len(queries)} lookups ({len(LABELLED)} labelled, {len(UNLISTED)} not on slate), "
+          f"{len(slates)} slates x {slate_size} events, {rounds} rounds")
+    print(f"Index build: {build_ms:.2f} ms per slate (once per events fetch)")
+    for name, secs, results in (("legacy scan", legacy_s, legacy), ("TeamIndex", index_s, indexed)):
+        correct, labelled, false_pos, precision = score(results, queries)
+        print(f"{name:12s} {secs / len(queries) * 1e6:8.1f} µs/lookup | "
+              f"found {correct}/{labelled} | false positives {false_pos} | precision {precision:.0%}")
+    print(f"Speed-up: x{legacy_s / index_s:.1f}")
+
+    misses = [q for q, r in zip(queries, indexed) if q[3] is not None and r is not q[3]]
+    for sport, t1, t2, _ in misses:
+        print(f"  TeamIndex miss: {t1} vs {t2} ({sport})")
+
+    if "--db" in sys.argv:
+        matches = db_corpus()
+        events = [e for slate in slates.values() for e in slate]
+        index = TeamIndex(events)
+        pairs = [split_match(m) for m in matches]
+        pairs = [p for p in pairs if p[0] and p[1]]
+        legacy_hits = [legacy_find(events, a, b) for a, b in pairs]
+        index_hits = [index.find(a, b) for a, b in pairs]
+        agree = sum(1 for x, y in zip(legacy_hits, index_hits) if x is y)
+        print(f"drop_events: {len(matches)} distinct matches, {len(pairs)} splittable | "
+              f"legacy found {sum(h is not None for h in legacy_hits)} | "
+              f"index found {sum(h is not None for h in index_hits)} | agree {agree}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Load test: dashboard WebSocket fan-out with thousands of local clients
+Legacy ConnectionManager.broadcast (send_json awaited on every socket in turn,
+one task per notify_new_call) vs utils.ws_fanout.WebSocketFanout (per-client
+bounded queue + writer task, JSON serialised once, filtered subscriptions).
+
+Real sockets on 127.0.0.1: an aiohttp server stands in for FastAPI (small
+adapter: send_text / send_json / close), clients are aiohttp WebSocket
+clients. Half of the clients subscribe to arbitrage >= 2% (legacy pushes
+everything to them and they filter locally). A few "stalled" clients
+complete the handshake and never read (tiny receive buffer), as a frozen
+browser tab would.
+
+Reported per mode: relevant messages delivered to live clients, delivery
+latency (publish -> client) p50 / p99 / max, bytes pushed.
+
+Usage: python benchmarks/bench_ws_fanout.py [clients] [messages] [stalled] [payload_bytes]
+"""
+import asyncio
+import json
+import random
+import socket
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from aiohttp import ClientSession, TCPConnector, WSMsgType, web
+
+from utils.ws_fanout import WebSocketFanout
+
+SUBSCRIBED_PARAMS = {"betTypes": "arbitrage", "minPercentage": "2"}
+PUBLISH_INTERVAL = 0.01
+DRAIN_TIMEOUT = 15.0
+# Petit tampon d'envoi côté serveur: un client qui ne lit pas bloque vite
+SERVER_SNDBUF = 32 * 1024
+
+
+class _AiohttpSocket:
+    """Interface Starlette WebSocket minimale au-dessus d'aiohttp"""
+
+    def __init__(self, ws: web.WebSocketResponse):
+        self.ws = ws
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        await self.ws.send_str(text)
+
+    async def send_json(self, data: dict):
+        # Starlette: json.dumps à chaque envoi
+        await self.ws.send_str(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+
+    async def close(self, code: int = 1000):
+        await self.ws.close(code=code)
+
+
+class LegacyConnectionManager:
+    """api/web_api.py avant le fan-out"""
+
+    def __init__(self):
+        self.active_connections = []
+
+    async def connect(self, websocket, params=None, accept=True):
+        self.active_connections.append(websocket)
+
+    def disconnect(self, websocket):
+        if websocket in self.active_connections:
+            self.active_connections.remove(websocket)
+
+    def handle_text(self, websocket, data):
+        pass
+
+    async def broadcast(self, message: dict):
+        disconnected = []
+        for connection in self.active_connections:
+            try:
+                await connection.send_json(message)
+            except Exception:
+                disconnected.append(connection)
+        for conn in disconnected:
+            self.disconnect(conn)
+
+
+def make_messages(n, payload_bytes):
+    rnd = random.Random(5)
+    messages = []
+    for i in range(n):
+        bet_type = rnd.choice(["arbitrage", "arbitrage", "middle", "good_ev"])
+        pct = round(rnd.uniform(0.5, 6.0), 2)
+        payload = {
+            "outcomes": [{"casino": "Betsson", "odds": 2.1}, {"casino": "Coolbet", "odds": 2.02}],
+            "notes": "x" * payload_bytes,
+        }
+        data = {"id": i, "betType": bet_type, "arbPercentage": pct, "match": f"Team {i} vs Team {i + 1}",
+                "league": "NBA", "market": "Moneyline", "payload": payload}
+        messages.append(data)
+    return messages
+
+
+def relevant(data, subscribed):
+    return not subscribed or (data["betType"] == "arbitrage" and data["arbPercentage"] >= 2)
+
+
+async def stalled_client(port):
+    """Handshake WebSocket puis plus aucune lecture"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    sock.setblocking(False)
+    loop = asyncio.get_running_loop()
+    await loop.sock_connect(sock, ("127.0.0.1", port))
+    await loop.sock_sendall(sock, (
+        f"GET /ws HTTP/1.1\r\nHost: 127.0.0.1:{port}\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+        f"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n"
+    ).encode())
+    response = b""
+    while b"\r\n\r\n" not in response:
+        response += await loop.sock_recv(sock, 1)
+    return sock
+
+
+async def live_client(session, port, subscribed, results, expected, done):
+    params = SUBSCRIBED_PARAMS if subscribed else {}
+    ws = await session.ws_connect(f"http://127.0.0.1:{port}/ws", params=params, max_msg_size=0)
+    stats = {"relevant": 0, "received": 0, "bytes": 0, "latencies": []}
+    results.append(stats)
+
+    async def read():
+        async for msg in ws:
+            if msg.type != WSMsgType.TEXT:
+                break
+            now = time.perf_counter()
+            stats["received"] += 1
+            stats["bytes"] += len(msg.data)
+            data = json.loads(msg.data).get("data") or {}
+            if "sentAt" in data and relevant(data, subscribed):
+                stats["relevant"] += 1
+                stats["latencies"].append((now - data["sentAt"]) * 1000)
+                if stats["relevant"] == expected[subscribed]:
+                    done()
+    return ws, asyncio.create_task(read())
+
+
+async def run(mode, n_clients, n_messages, n_stalled, payload_bytes):
+    manager = WebSocketFanout() if mode == "fanout" else LegacyConnectionManager()
+
+    async def handler(request):
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        sock = request.transport.get_extra_info("socket")
+        if sock is not None:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SERVER_SNDBUF)
+        adapter = _AiohttpSocket(ws)
+        await manager.connect(adapter, dict(request.query), accept=False)
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.TEXT:
+                    manager.handle_text(adapter, msg.data)
+        finally:
+            manager.disconnect(adapter)
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/ws", handler)
+    runner = web.AppRunner(app, shutdown_timeout=1)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    messages = make_messages(n_messages, payload_bytes)
+    expected = {False: n_messages, True: sum(relevant(m, True) for m in messages)}
+    all_done = asyncio.Event()
+    remaining = [n_clients]
+
+    def client_done():
+        remaining[0] -= 1
+        if remaining[0] == 0:
+            all_done.set()
+
+    results, clients, stalled = [], [], []
+    session = ClientSession(connector=TCPConnector(limit=0))
+    sem = asyncio.Semaphore(200)
+
+    async def connect(i):
+        async with sem:
+            clients.append(await live_client(session, port, i % 2 == 1, results, expected, client_done))
+
+    # Les clients bloqués en premier: broadcast séquentiel les rencontre tôt
+    for _ in range(n_stalled):
+        stalled.append(await stalled_client(port))
+    await asyncio.gather(*(connect(i) for i in range(n_clients)))
+    while len(manager.active_connections) < n_clients + n_stalled:
+        await asyncio.sleep(0.05)
+
+    tasks = []
+    t0 = time.perf_counter()
+    for data in messages:
+        data["sentAt"] = time.perf_counter()
+        message = {"type": "new_call", "data": data}
+        if mode == "fanout":
+            lite = {k: v for k, v in data.items() if k != "payload"}
+            manager.publish(message, bet_type=data["betType"], percentage=data["arbPercentage"],
+                            lite={"type": "new_call", "data": lite, "lite": True})
+        else:
+            tasks.append(asyncio.create_task(manager.broadcast(message)))
+        await asyncio.sleep(PUBLISH_INTERVAL)
+    try:
+        await asyncio.wait_for(all_done.wait(), DRAIN_TIMEOUT)
+    except asyncio.TimeoutError:
+        pass
+    elapsed = time.perf_counter() - t0
+
+    metrics = manager.metrics() if mode == "fanout" else None
+    for task in tasks:
+        task.cancel()
+    for ws, reader in clients:
+        reader.cancel()
+    for sock in stalled:
+        sock.close()
+    await session.close()
+    await runner.cleanup()
+
+    delivered = sum(r["relevant"] for r in results)
+    wanted = sum(expected[i % 2 == 1] for i in range(n_clients))
+    latencies = sorted(l for r in results for l in r["latencies"])
+    pct = lambda p: latencies[min(len(latencies) - 1, int(p / 100 * (len(latencies) - 1)))] if latencies else float("nan")
+    print(f"{mode:7s} delivered {delivered}/{wanted} relevant ({delivered / wanted:.0%}) in {elapsed:5.1f}s | "
+          f"latency p50 {pct(50):7.1f} ms p99 {pct(99):7.1f} ms max {latencies[-1] if latencies else float('nan'):7.1f} ms | "
+          f"{sum(r['bytes'] for r in results) / 1e6:6.1f} MB pushed")
+    if metrics:
+        print(f"        sent {metrics['sent']} | filtered {metrics['filtered']} | dropped {metrics['dropped']} | "
+              f"downgraded {metrics['downgraded']} | slow clients disconnected {metrics['disconnected_slow']}")
+
+
+def main():
+    args = [int(a) for a in sys.argv[1:]]
+    n_clients = args[0] if len(args) > 0 else 2000
+    n_messages = args[1] if len(args) > 1 else 100
+    n_stalled = args[2] if len(args) > 2 else 5
+    payload_bytes = args[3] if len(args) > 3 else 4096
+    print(f"{n_clients} live clients (half subscribed to arbitrage >= 2%), {n_stalled} stalled, "
+          f"{n_messages} calls of ~{payload_bytes // 1024} KB every {PUBLISH_INTERVAL * 1000:.0f} ms")
+    for mode in ("legacy", "fanout"):
+        asyncio.run(run(mode, n_clients, n_messages, n_stalled, payload_bytes))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,383 @@
+"""
+Frozen copies of the alert formatters as they were before the per-language
+templates (CallMessageTemplate, GoodOddsTemplate). format_call_message and
+format_good_odds_message now delegate to the templates, so the "identical
+output" check of bench_alert_templates.py compares against these instead.
+
+Do not update them along with the templates: they are the reference output.
+
+Usage:
+    from legacy_alert_formatters import legacy_format_call_message, legacy_format_good_odds_message
+"""
+import re
+from typing import Dict
+
+from core.casinos import get_casino_logo, get_casino_referral_link
+from utils.call_processor import BettingCall, format_odds_change
+from utils.good_odds_calculator import (
+    calculate_true_winrate,
+    calculate_good_odds_example,
+    calculate_kelly_bankroll,
+    get_ev_quality_tag
+)
+from utils.ev_quality import get_profile_warning
+from utils.odds_api_links import determine_market_type
+from utils.oddsjam_formatters import extract_player_name
+from utils.sport_emoji import get_sport_emoji
+
+
+def legacy_format_call_message(call: BettingCall, lang: str = "fr", verified: bool = False) -> str:
+    """
+    Génère le message formaté pour Telegram
+    
+    Args:
+        call: BettingCall enrichi
+        lang: Langue ("fr" ou "en")
+        verified: True si on affiche les cotes vérifiées
+    
+    Returns:
+        Message formaté
+    """
+    lines = []
+    
+    # === Header ===
+    # Utiliser le pourcentage d'arbitrage recalculé si disponible et valide
+    # Si les cotes actuelles ne sont pas disponibles, garder l'original
+    if (call.arb_analysis and 
+        call.sides[0].odds_current is not None and 
+        call.sides[1].odds_current is not None and 
+        call.arb_analysis.roi_min_pct > 0):
+        edge_str = f"{call.arb_analysis.roi_min_pct:.2f}%"
+    else:
+        edge_str = f"{call.expected_edge_pct:.2f}%"
+    
+    if call.arb_analysis:
+        status = call.arb_analysis.status
+        # Si edge positif annoncé et pas encore expiré → toujours "ALERTE ARBITRAGE"
+        if call.expected_edge_pct > 0 and status != "NO_ARB":
+            emoji = "🚨"
+            header = f"{emoji} ALERTE ARBITRAGE - {edge_str} {emoji}"
+        elif status == "NO_ARB" and verified:
+            emoji = "⚠️"
+            header = f"{emoji} ARBITRAGE EXPIRÉ - {edge_str} {emoji}"
+        elif status == "MIDDLE":
+            emoji = "🎯"
+            header = f"{emoji} MIDDLE OPPORTUNITY - {edge_str} {emoji}"
+        else:
+            emoji = "📊"
+            header = f"{emoji} SIGNAL - {edge_str} {emoji}"
+    else:
+        # Si pas d'analyse mais call_type arbitrage → ALERTE
+        if call.call_type == "arbitrage" and call.expected_edge_pct > 0:
+            emoji = "🚨"
+            header = f"{emoji} ALERTE ARBITRAGE - {edge_str} {emoji}"
+        else:
+            header = f"📊 {call.call_type.upper()} - {edge_str} 📊"
+    
+    lines.append(header)
+    
+    # Indicateur si vérifié
+    if verified and call.last_checked_at:
+        check_time = call.last_checked_at.strftime("%H:%M")
+        lines.append(f"🔍 Vérifié à {check_time}")
+    
+    lines.append("")
+    
+    # === Match Info ===
+    lines.append(f"🏟️ {call.match}")
+    
+    # Sport/League avec emoji
+    sport_emoji = "🏈" if "football" in call.sport.lower() else \
+                  "🏀" if "basketball" in call.sport.lower() else \
+                  "⚽" if "soccer" in call.sport.lower() else \
+                  "🏒" if "hockey" in call.sport.lower() else "🏅"
+    
+    lines.append(f"{sport_emoji} {call.league} - {call.market}")
+    
+    # Date/heure
+    if call.event_datetime:
+        lines.append(f"🕐 {call.event_datetime.display}")
+    else:
+        lines.append("🕐 Date à confirmer")
+    
+    lines.append("")
+    
+    # === Configuration ===
+    total_stake = sum(s.stake for s in call.sides)
+    lines.append(f"💰 CASHH: ${total_stake:.1f}")
+    
+    # === Analyse (toujours afficher profit si dispo) ===
+    if call.arb_analysis:
+        a = call.arb_analysis
+        lines.append(f"✅ Profit Garanti: ${a.min_profit:.2f} (ROI: {a.roi_min_pct:.2f}%)")
+        
+        if call.call_type == "middle" and abs(a.max_profit - a.min_profit) > 10:
+            lines.append(f"🎯 Profit Max (middle): ${a.max_profit:.2f}")
+    
+    lines.append("")
+    
+    # === Sides ===
+    for i, side in enumerate(call.sides):
+        # Emoji bookmaker
+        logo = get_casino_logo(side.book_name)
+        
+        # Lien (priorité: deep link > referral > fallback)
+        link = side.deep_link or None
+        if not link:
+            link = get_casino_referral_link(side.book_name)
+        if not link:
+            link = side.fallback_link
+        
+        lines.append(f"{logo} [{side.book_name}] {side.outcome_name}")
+        
+        # Cotes
+        if verified and side.odds_current_american:
+            odds_str = format_odds_change(
+                side.odds_initial, 
+                side.odds_current,
+                american_format=True
+            )
+            ret = side.stake * (side.odds_current or side.odds_initial)
+            lines.append(f"💵 Miser: ${side.stake:.2f} ({odds_str}) → Retour: ${ret:.2f}")
+        else:
+            am = side.odds_american
+            odds_str = f"{'+' if am > 0 else ''}{am}"
+            ret = side.stake * side.odds_initial
+            lines.append(f"💵 Miser: ${side.stake:.2f} ({odds_str}) → Retour: ${ret:.2f}")
+        
+        lines.append("")
+
+    # === Avertissement global sur les cotes ===
+    if lang == "fr":
+        lines.append("⚠️ Attention: les cotes peuvent changer - toujours vérifier avant de bet!")
+    else:
+        lines.append("⚠️ Odds can change - always verify before betting!")
+    
+    # === Section vérification des cotes (si vérifiées) ===
+    if verified and call.last_checked_at:
+        lines.append("")
+        lines.append("━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+        if lang == "fr":
+            lines.append("🔍 VÉRIFICATION DES COTES")
+        else:
+            lines.append("🔍 ODDS VERIFICATION")
+        lines.append("━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+        lines.append("")
+        
+        # Statut
+        if call.arb_analysis:
+            if call.arb_analysis.status == "ARB":
+                status_text = "✅ Arbitrage toujours valide" if lang == "fr" else "✅ Arbitrage still valid"
+            elif call.arb_analysis.status == "NO_ARB":
+                status_text = "❌ Arbitrage expiré" if lang == "fr" else "❌ Arbitrage expired"
+            elif call.arb_analysis.status == "BREAKEVEN":
+                status_text = "⚠️ Break-even (profit minimal)" if lang == "fr" else "⚠️ Break-even (minimal profit)"
+            else:
+                status_text = "📊 Vérification effectuée" if lang == "fr" else "📊 Verification completed"
+        else:
+            status_text = "📊 Vérification effectuée" if lang == "fr" else "📊 Verification completed"
+        
+        lines.append(f"• Statut: {status_text}")
+        
+        # Heure de vérification
+        check_time = call.last_checked_at.strftime("%H:%M:%S")
+        if lang == "fr":
+            lines.append(f"• Dernière vérification: {check_time}")
+        else:
+            lines.append(f"• Last check: {check_time}")
+        
+        # Changements de cotes
+        if call.odds_fetched:
+            # Si on n'a pas pu récupérer les cotes actuelles (ex: Player Props)
+            if call.sides[0].odds_current is None or call.sides[1].odds_current is None:
+                lines.append("")
+                
+                # Logique plus fine selon le marché et les bookmakers
+                market_type = determine_market_type(call.market)
+                is_player_prop = market_type.startswith('player_')
+                
+                if not is_player_prop:
+                    # Marché standard mais pas de cotes → problème technique
+                    if lang == "fr":
+                        lines.append("⚠️ Impossible de vérifier ces cotes (problème technique)")
+                    else:
+                        lines.append("⚠️ Cannot verify these odds (technical issue)")
+                elif len(call.api_supported_books) == 0:
+                    # Player prop mais aucun bookmaker dans l'API
+                    if lang == "fr":
+                        lines.append("⚠️ Vérification manuelle requise (bookmakers non couverts par l'API)")
+                    else:
+                        lines.append("⚠️ Manual verification required (bookmakers not covered by API)")
+                else:
+                    # Player prop supporté mais pas de match trouvé
+                    if lang == "fr":
+                        lines.append("⚠️ Impossible de vérifier ces cotes (marché non supporté par l'API)")
+                    else:
+                        lines.append("⚠️ Cannot verify these odds (market not supported by API)")
+            elif call.arb_analysis and call.arb_analysis.has_changed:
+                lines.append("")
+                if lang == "fr":
+                    lines.append("📊 Changements de cotes:")
+                else:
+                    lines.append("📊 Odds changes:")
+            else:
+                lines.append("")
+                if lang == "fr":
+                    lines.append("✅ Aucun changement de cotes détecté")
+                else:
+                    lines.append("✅ No odds changes detected")
+        else:
+            # Aucune donnée API récupérée
+            lines.append("")
+            if lang == "fr":
+                lines.append("⚠️ Vérification manuelle requise (sport/bookmakers non couverts)")
+            else:
+                lines.append("⚠️ Manual verification required (sport/bookmakers not covered)")
+    
+    return "\n".join(lines)
+
+# ============== Processing Pipeline ==============
+
+
+def legacy_format_good_odds_message(data: Dict, user_cash: float, lang: str = 'en', user_profile: str = 'beginner', total_bets: int = 0) -> str:
+    """
+    Format Good Odds (Positive EV) message with quality tags and detailed projections
+    
+    Args:
+        data: Parsed good odds data
+        user_cash: User's stake amount
+        lang: Language ('en' or 'fr')
+        user_profile: User's experience level
+        total_bets: Total good odds bets placed by user
+    """
+    
+    emoji = get_casino_logo(data['bookmaker'])
+    ev_percent = float(data['ev_percent'])
+    
+    # Parse odds
+    try:
+        odds_int = int(data['odds'].replace('+', ''))
+    except:
+        odds_int = 100
+    
+    # Get CORRECT quality tag
+    quality = get_ev_quality_tag(ev_percent, odds_int)
+    
+    # Calculate projections
+    avg_profit_per_bet = user_cash * (ev_percent / 100)
+    projection_100 = avg_profit_per_bet * 100
+    
+    # Calculate TRUE win rate (NOT implied!)
+    true_winrate = calculate_true_winrate(odds_int, ev_percent)
+    loss_rate = 1 - true_winrate
+    
+    # CORRECT example over 10 bets
+    example = calculate_good_odds_example(odds_int, user_cash, ev_percent, 10)
+    
+    # CORRECT recommended bankroll using Kelly
+    min_bankroll = calculate_kelly_bankroll(user_cash, ev_percent, odds_int, kelly_mult=0.25)
+    
+    # Get profile warning if applicable
+    profile_warning = get_profile_warning(ev_percent, user_profile, lang) if callable(get_profile_warning) else ""
+    
+    # Check if player field exists in data (from OddsJam parser)
+    player_name = data.get('player', '')
+    
+    # If no player field, try to extract from selection
+    if not player_name:
+        player_name = extract_player_name(data.get('selection', ''))
+    
+    # If still no player name found but it's a player prop, try to extract from market
+    # Market format examples: 
+    # - "Player Rebounds" or "Player Rebounds : Player Name Over 3.5"
+    # - "NBA - Player Rebounds"
+    if not player_name and 'Player' in data.get('market', ''):
+        market_str = data.get('market', '')
+        # Try to extract player name from market string after ":"
+        if ':' in market_str:
+            # Split on : and extract name from right side
+            after_colon = market_str.split(':', 1)[1].strip()
+            # Extract name before "Over" or "Under"
+            match = re.match(r'^(.+?)\s+(?:Over|Under)\s+[\d.]+', after_colon, re.IGNORECASE)
+            if match:
+                player_name = match.group(1).strip()
+    
+    # Get correct sport emoji
+    sport_emoji = get_sport_emoji(data.get('league', ''), data.get('sport', ''))
+    
+    # Build market display with player name if it's a player prop
+    is_player_prop = 'Player' in data.get('market', '')
+    
+    if is_player_prop:
+        # For player props, show player name prominently if we have it
+        if player_name:
+            market_display = f"{data['league']} - {data['market']}"
+            player_line = f"👤 <b>{player_name}</b>: {data['selection']}\n"
+        else:
+            # No player name extracted, show selection only
+            market_display = f"{data['league']} - {data['market']}"
+            player_line = f"📊 {data['selection']}\n"
+    else:
+        # Not a player prop
+        market_display = f"{data['league']} - {data['market']}"
+        player_line = f"📊 {data['selection']}\n"
+    
+    # Match time from API enrichment
+    time_line = ""
+    if data.get('formatted_time'):
+        time_line = f"🕐 {data['formatted_time']}\n"
+    elif data.get('commence_time'):
+        time_line = f"🕐 {data['commence_time']}\n"
+    
+    if lang == 'fr':
+        message = (
+            f"{quality['tag']}\n\n"
+            f"{quality['emoji']} <b>GOOD ODDS ALERT - {ev_percent}% EV</b>\n\n"
+            f"{sport_emoji} <b>{data['team1']} vs {data['team2']}</b>\n"
+            f"📊 {market_display}\n"
+            f"{time_line}"
+            f"{player_line}"
+            f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+            f"💎 <b>MEILLEURE COTE</b>\n"
+            f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+            f"{emoji} <b>[{data['bookmaker']}]</b> {data['selection']}\n"
+            f"Cote: <b>{data['odds']}</b>\n"
+            f"💵 Stake: <b>${user_cash:.2f}</b>\n\n"
+            f"💰 <b>CE PARI:</b>\n"
+            f"✅ <b>Si tu GAGNES:</b> +${example['profit_if_win']:.2f} profit (ROI: {example['profit_if_win']/user_cash*100:.1f}%)\n"
+            f"❌ <b>Si tu PERDS:</b> -{user_cash:.2f}$ (perte totale)\n\n"
+            f"📈 <b>VALUE:</b>\n"
+            f"• EV+: {ev_percent}%\n"
+            f"• Profit moyen/bet: ${avg_profit_per_bet:.2f}\n"
+            f"• Sur 100 bets: ~${projection_100:.0f}\n\n"
+            f"💡 <b>Recommandé pour:</b> {quality['recommended_for']}\n"
+            f"{quality['advice']}\n\n"
+            f"⚠️ <b>Attention: les cotes peuvent changer - toujours vérifier avant de bet!</b>"
+        )
+    else:
+        message = (
+            f"{quality['tag']}\n\n"
+            f"{quality['emoji']} <b>GOOD ODDS ALERT - {ev_percent}% EV</b>\n\n"
+            f"{sport_emoji} <b>{data['team1']} vs {data['team2']}</b>\n"
+            f"📊 {market_display}\n"
+            f"{time_line}"
+            f"{player_line}"
+            f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
+            f"💎 <b>BEST ODDS</b>\n"
+            f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+            f"{emoji} <b>[{data['bookmaker']}]</b> {data['selection']}\n"
+            f"Odds: <b>{data['odds']}</b>\n"
+            f"💵 Stake: <b>${user_cash:.2f}</b>\n\n"
+            f"💰 <b>THIS BET:</b>\n"
+            f"✅ <b>If you WIN:</b> +${example['profit_if_win']:.2f} profit (ROI: {example['profit_if_win']/user_cash*100:.1f}%)\n"
+            f"❌ <b>If you LOSE:</b> -${user_cash:.2f} (total loss)\n\n"
+            f"📈 <b>VALUE:</b>\n"
+            f"• EV+: {ev_percent}%\n"
+            f"• Avg profit/bet: ${avg_profit_per_bet:.2f}\n"
+            f"• Over 100 bets: ~${projection_100:.0f}\n\n"
+            f"💡 <b>Recommended for:</b> {quality['recommended_for']}\n"
+            f"{quality['advice']}\n\n"
+            f"⚠️ <b>Odds can change - always verify before betting!</b>"
+        )
+    
+    return message
@@ -226,6 +226,12 @@ async def approve_action(action_id: int, super_admin_id: int, bot = None) -> boo
             })
             db.commit()
             
+            # Raw UPDATE on users bypasses ORM events → reload alert filters
+            from utils.subscriber_index import subscriber_index
+            subscriber_index.mark_stale()
+            from utils.user_prefs import user_prefs
+            user_prefs.mark_stale()
+            
             # Notify admin who requested
             if bot:
                 admin_user = db.query(User).filter(User.telegram_id == admin_id).first()
@@ -0,0 +1,331 @@
+"""
+Book Health Batch Scoring
+Nightly scoring of every (user, casino) pair in one pass over bet_analytics
+
+- Streams bet_analytics ordered by (user_id, casino), only the columns the
+  factors need, for pairs with an active (not limited) profile
+- Groups are scored in blocks with NumPy (bincount per group); once the
+  stream is closed each block is written with one executemany in its own
+  transaction. A failed block is retried pair by pair, a failing pair is
+  logged and skipped
+- Optional sharding: contiguous user_id ranges scored in a spawn process
+  pool, started from a separate `python -m bot.book_health_batch` process
+  so the workers never re-import the bot's main script
+
+Same thresholds as BookHealthScoring (factors are built by its *_factor
+methods). The per-pair trend is not computed here (on-demand only).
+"""
+import logging
+import multiprocessing
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text as sql_text
+
+from database import SessionLocal, engine
+from bot.book_health_scoring import BookHealthScoring, STORE_SCORE_SQL
+
+logger = logging.getLogger(__name__)
+
+BOOK_HEALTH_SCORING_WORKERS = int(os.getenv("BOOK_HEALTH_SCORING_WORKERS", "1"))
+MIN_BETS = 10
+GROUPS_PER_BLOCK = 500
+_STREAM_BATCH = 5000
+
+_RANGE_FILTER = " AND {alias}.user_id >= :user_from AND {alias}.user_id <= :user_to"
+
+_PROFILES_SQL = """
+    SELECT * FROM user_casino_profiles p
+    WHERE p.is_limited = false
+"""
+
+_BETS_SQL = """
+    SELECT ba.user_id, ba.casino, ba.result, ba.clv, ba.sport, ba.market_type,
+           ba.seconds_after_post, ba.stake_amount, ba.bet_source_type
+    FROM bet_analytics ba
+    WHERE EXISTS (
+        SELECT 1 FROM user_casino_profiles p
+        WHERE p.user_id = ba.user_id AND p.casino = ba.casino AND p.is_limited = false
+    )
+"""
+
+_SOURCE_TYPES = ('plus_ev', 'arbitrage', 'middle', 'recreational')
+
+
+def _distinct_per_group(group: np.ndarray, values: List, n_groups: int) -> np.ndarray:
+    """Number of distinct truthy values per group"""
+    codes: Dict = {}
+    coded = np.fromiter((codes.setdefault(v, len(codes)) if v else -1 for v in values), dtype=np.int64, count=len(values))
+    keep = coded >= 0
+    if not keep.any():
+        return np.zeros(n_groups, dtype=np.int64)
+    pairs = np.unique(group[keep] * (len(codes) + 1) + coded[keep])
+    return np.bincount(pairs // (len(codes) + 1), minlength=n_groups)
+
+
+def group_stats(group: np.ndarray, rows: List, n_groups: int) -> Dict[str, np.ndarray]:
+    """
+    Per-group raw statistics for a block of bet_analytics rows
+
+    Args:
+        group: Group index (0..n_groups-1) of each row
+        rows: Rows with result, clv, sport, market_type, seconds_after_post,
+              stake_amount, bet_source_type
+        n_groups: Number of groups in the block
+
+    Returns:
+        Dictionary of arrays of shape (n_groups,)
+    """
+    def count(mask):
+        return np.bincount(group, weights=mask, minlength=n_groups).astype(np.int64)
+
+    def total(values, mask):
+        return np.bincount(group[mask], weights=values[mask], minlength=n_groups)
+
+    n = len(rows)
+    result = np.array([r.result for r in rows], dtype=object)
+    clv = np.fromiter((np.nan if r.clv is None else float(r.clv) for r in rows), dtype=np.float64, count=n)
+    delay = np.fromiter((np.nan if r.seconds_after_post is None else r.seconds_after_post for r in rows), dtype=np.float64, count=n)
+    # Same as "if b.stake_amount": None and 0 are ignored
+    stake = np.fromiter((float(r.stake_amount) if r.stake_amount else np.nan for r in rows), dtype=np.float64, count=n)
+    source = np.array([r.bet_source_type for r in rows], dtype=object)
+
+    won = result == 'won'
+    completed = won | (result == 'lost')
+    has_clv = ~np.isnan(clv)
+    has_delay = ~np.isnan(delay)
+    has_stake = ~np.isnan(stake)
+
+    stake_count = count(has_stake)
+    stake_sum = total(stake, has_stake)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_stake = np.where(stake_count > 0, stake_sum / stake_count, 0.0)
+        deviation = (stake - avg_stake[group]) ** 2
+        std_stake = np.sqrt(np.where(stake_count > 0, total(deviation, has_stake) / stake_count, 0.0))
+    rounded = has_stake & (np.mod(np.where(has_stake, stake, 1.0), 5) == 0)
+
+    stats = {
+        'bets': np.bincount(group, minlength=n_groups),
+        'wins': count(won),
+        'completed': count(completed),
+        'clv_sum': total(clv, has_clv),
+        'clv_count': count(has_clv),
+        'sports': _distinct_per_group(group, [r.sport for r in rows], n_groups),
+        'markets': _distinct_per_group(group, [r.market_type for r in rows], n_groups),
+        'delay_sum': total(delay, has_delay),
+        'delay_count': count(has_delay),
+        'stake_count': stake_count,
+        'stake_rounded': count(rounded),
+        'stake_avg': avg_stake,
+        'stake_std': std_stake,
+    }
+    for source_type in _SOURCE_TYPES:
+        stats[source_type] = count(source == source_type)
+    return stats
+
+
+class BookHealthBatchScorer:
+    """Scores all active (user, casino) pairs, streaming bet_analytics once"""
+
+    def __init__(self, groups_per_block: int = GROUPS_PER_BLOCK):
+        self.scorer = BookHealthScoring()
+        self.groups_per_block = groups_per_block
+
+    def _factors(self, stats: Dict[str, np.ndarray], i: int, profile) -> Dict:
+        s = self.scorer
+        return {
+            'win_rate': s.win_rate_factor(int(stats['wins'][i]), int(stats['completed'][i])),
+            'clv': s.clv_factor(float(stats['clv_sum'][i]), int(stats['clv_count'][i])),
+            'diversity': s.diversity_factor(int(stats['sports'][i]), int(stats['markets'][i])),
+            'timing': s.timing_factor(float(stats['delay_sum'][i]), int(stats['delay_count'][i])),
+            'stake_pattern': s.stake_pattern_factor(int(stats['stake_count'][i]), int(stats['stake_rounded'][i]),
+                                                    float(stats['stake_avg'][i]), float(stats['stake_std'][i])),
+            'bet_type': s.bet_type_factor(int(stats['bets'][i]), *(int(stats[t][i]) for t in _SOURCE_TYPES)),
+            'activity_change': s.activity_change_factor(int(stats['bets'][i]), profile),
+            'withdrawal': s._calculate_withdrawal_factor(None, None, None),
+        }
+
+    def _score_block(self, keys: List[Tuple[str, str]], group: List[int], rows: List,
+                     profiles: Dict) -> Tuple[List[Dict], List[Dict]]:
+        """Scores one block of complete groups: (score rows, alerts)"""
+        try:
+            stats = group_stats(np.asarray(group, dtype=np.int64), rows, len(keys))
+        except Exception as e:
+            logger.error(f"Error computing Book Health stats for {len(keys)} pairs ({keys[0]}..{keys[-1]}): {e}")
+            return [], []
+        score_rows = []
+        block_alerts = []
+        for i, (user_id, casino) in enumerate(keys):
+            total_bets = int(stats['bets'][i])
+            profile = profiles.get((user_id, casino))
+            if profile is None or total_bets < MIN_BETS:
+                continue
+            try:
+                factors = self._factors(stats, i, profile)
+                score_data = self.scorer.combine_factors(factors, profile, total_bets)
+                row = self.scorer.score_row(
+                    user_id, casino, factors, score_data['score'], score_data['risk_level'],
+                    score_data['estimated_months'], score_data['limit_probability'], total_bets
+                )
+            except Exception as e:
+                logger.error(f"Error calculating score for {user_id} @ {casino}: {e}")
+                continue
+            score_rows.append(row)
+            if score_data['risk_level'] in ['CRITICAL', 'HIGH_RISK']:
+                block_alerts.append({'user_id': user_id, 'casino': casino, 'score_data': score_data})
+        return score_rows, block_alerts
+
+    @staticmethod
+    def _store(score_rows: List[Dict]) -> set:
+        """
+        Writes a block in its own transaction; if it fails, pair by pair
+        Returns the (user_id, casino) pairs written
+        """
+        if not score_rows:
+            return set()
+        try:
+            with engine.begin() as conn:
+                conn.execute(STORE_SCORE_SQL, score_rows)
+            return {(r['user_id'], r['casino']) for r in score_rows}
+        except Exception as e:
+            if len(score_rows) == 1:
+                r = score_rows[0]
+                logger.error(f"Error storing score for {r['user_id']} @ {r['casino']}: {e}")
+                return set()
+            # One bad row must not cost the whole block: retry pair by pair
+            logger.warning(f"⚠️ Book Health block of {len(score_rows)} scores failed ({e}), retrying pair by pair")
+        written = set()
+        for row in score_rows:
+            written |= BookHealthBatchScorer._store([row])
+        return written
+
+    def score_range(self, user_from: Optional[str] = None, user_to: Optional[str] = None) -> Tuple[int, List[Dict]]:
+        """
+        Scores every active pair (optionally only user_id in [user_from, user_to])
+
+        Returns:
+            (number of scores written, alerts for CRITICAL / HIGH_RISK pairs)
+        """
+        params = {}
+        profiles_sql, bets_sql = _PROFILES_SQL, _BETS_SQL
+        if user_from is not None:
+            params = {'user_from': user_from, 'user_to': user_to}
+            profiles_sql += _RANGE_FILTER.format(alias='p')
+            bets_sql += _RANGE_FILTER.format(alias='ba')
+        bets_sql += " ORDER BY ba.user_id, ba.casino"
+
+        blocks: List[Tuple[List[Dict], List[Dict]]] = []
+        keys: List[Tuple[str, str]] = []
+        group: List[int] = []
+        rows: List = []
+        # Read-only streaming connection, closed before the blocks are written
+        with engine.connect() as conn:
+            profiles = {(p.user_id, p.casino): p for p in conn.execute(sql_text(profiles_sql), params)}
+
+            stream = conn.execution_options(yield_per=_STREAM_BATCH).execute(sql_text(bets_sql), params)
+            for row in stream:
+                key = (row.user_id, row.casino)
+                if not keys or keys[-1] != key:
+                    if len(keys) >= self.groups_per_block:
+                        # Block full: every group in it is complete
+                        blocks.append(self._score_block(keys, group, rows, profiles))
+                        keys, group, rows = [], [], []
+                    keys.append(key)
+                group.append(len(keys) - 1)
+                rows.append(row)
+            if keys:
+                blocks.append(self._score_block(keys, group, rows, profiles))
+
+        calculated = 0
+        alerts: List[Dict] = []
+        for score_rows, block_alerts in blocks:
+            written = self._store(score_rows)
+            calculated += len(written)
+            alerts.extend(a for a in block_alerts if (a['user_id'], a['casino']) in written)
+        return calculated, alerts
+
+
+def _user_ranges(shards: int) -> List[Tuple[str, str]]:
+    """Splits active user_ids into contiguous ranges of similar bet counts"""
+    db = SessionLocal()
+    try:
+        counts = db.execute(sql_text("""
+            SELECT ba.user_id, COUNT(*) AS n
+            FROM bet_analytics ba
+            GROUP BY ba.user_id
+            ORDER BY ba.user_id
+        """)).fetchall()
+    finally:
+        db.close()
+    if not counts:
+        return []
+    target = sum(c.n for c in counts) / shards
+    ranges, start, acc = [], counts[0].user_id, 0
+    for i, c in enumerate(counts):
+        acc += c.n
+        if acc >= target and len(ranges) < shards - 1 and i < len(counts) - 1:
+            ranges.append((start, c.user_id))
+            start, acc = counts[i + 1].user_id, 0
+    ranges.append((start, counts[-1].user_id))
+    return ranges
+
+
+def _score_shard(user_range: Tuple[str, str]) -> Tuple[int, List[Dict]]:
+    # Worker process: never reuse the parent's pooled connections
+    engine.dispose(close=False)
+    return BookHealthBatchScorer().score_range(*user_range)
+
+
+def _score_sharded(workers: int) -> Tuple[int, List[Dict]]:
+    """Shards scored in a spawn pool (fork in a threaded process can deadlock)"""
+    ranges = _user_ranges(workers)
+    calculated, alerts = 0, []
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=len(ranges) or 1, mp_context=ctx) as pool:
+        for shard_calculated, shard_alerts in pool.map(_score_shard, ranges):
+            calculated += shard_calculated
+            alerts.extend(shard_alerts)
+    return calculated, alerts
+
+
+def run_batch_scoring(workers: int = BOOK_HEALTH_SCORING_WORKERS) -> Tuple[int, List[Dict]]:
+    """
+    Nightly batch scoring (blocking - run it in a thread from async code)
+
+    Args:
+        workers: Process pool size (1 = in-process, single pass)
+
+    Returns:
+        (number of scores written, alerts for CRITICAL / HIGH_RISK pairs)
+    """
+    if workers <= 1:
+        return BookHealthBatchScorer().score_range()
+
+    # Spawn workers re-import the parent's __main__: run the pool from this
+    # module as a separate process rather than from the bot (main_new.py)
+    fd, output = tempfile.mkstemp(prefix="book_health_", suffix=".pkl")
+    os.close(fd)
+    try:
+        subprocess.run(
+            [sys.executable, "-m", "bot.book_health_batch", str(workers), output],
+            cwd=Path(__file__).resolve().parent.parent, check=True,
+        )
+        with open(output, "rb") as f:
+            return pickle.load(f)
+    finally:
+        os.unlink(output)
+
+
+if __name__ == "__main__":
+    # python -m bot.book_health_batch <workers> <output.pkl> (see run_batch_scoring)
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+    result = _score_sharded(int(sys.argv[1]))
+    with open(sys.argv[2], "wb") as f:
+        pickle.dump(result, f)
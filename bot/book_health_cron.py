@@ -9,6 +9,7 @@ from aiogram import Bot
 
 from database import SessionLocal
 from bot.book_health_scoring import BookHealthScoring
+from bot.book_health_batch import BOOK_HEALTH_SCORING_WORKERS, run_batch_scoring
 from bot.book_health_tracking import bet_tracker
 from sqlalchemy import text as sql_text
 
@@ -26,48 +27,22 @@ class BookHealthCronJobs:
         """Calculate scores for all active users (runs at 2 AM)"""
         logger.info("🏥 Running daily Book Health score calculation...")
         
-        db = SessionLocal()
+        # One streaming pass over bet_analytics (optionally sharded in a process pool)
         try:
-            # Get all active users with profiles
-            profiles = db.execute(sql_text("""
-                SELECT DISTINCT user_id, casino
-                FROM user_casino_profiles
-                WHERE is_limited = false
-            """)).fetchall()
-            
-            calculated = 0
-            alerts_sent = 0
-            
-            for profile in profiles:
-                try:
-                    # Calculate score
-                    score_data = self.scorer.calculate_health_score(
-                        profile.user_id, 
-                        profile.casino
-                    )
-                    
-                    # Skip if insufficient data
-                    if score_data['risk_level'] in ['NO_PROFILE', 'INSUFFICIENT_DATA']:
-                        continue
-                    
-                    calculated += 1
-                    
-                    # Check for critical scores
-                    if score_data['risk_level'] in ['CRITICAL', 'HIGH_RISK']:
-                        await self.send_critical_alert(
-                            profile.user_id,
-                            profile.casino,
-                            score_data
-                        )
-                        alerts_sent += 1
-                    
-                except Exception as e:
-                    logger.error(f"Error calculating score for {profile.user_id} @ {profile.casino}: {e}")
-            
-            logger.info(f"✅ Calculated {calculated} scores, sent {alerts_sent} alerts")
-            
-        finally:
-            db.close()
+            calculated, alerts = await asyncio.to_thread(run_batch_scoring, BOOK_HEALTH_SCORING_WORKERS)
+        except Exception as e:
+            logger.error(f"Error in daily Book Health score calculation: {e}")
+            return
+        
+        alerts_sent = 0
+        for alert in alerts:
+            try:
+                await self.send_critical_alert(alert['user_id'], alert['casino'], alert['score_data'])
+                alerts_sent += 1
+            except Exception as e:
+                logger.error(f"Error sending alert for {alert['user_id']} @ {alert['casino']}: {e}")
+        
+        logger.info(f"✅ Calculated {calculated} scores, sent {alerts_sent} alerts")
     
     async def update_bet_results(self):
         """Update bet results from completed games (runs every 6 hours)"""
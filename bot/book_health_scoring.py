@@ -15,6 +15,29 @@ from sqlalchemy import text as sql_text
 logger = logging.getLogger(__name__)
 
 
+# Upsert of today's score for a (user, casino) pair
+STORE_SCORE_SQL = sql_text("""
+    INSERT INTO book_health_scores (
+        score_id, user_id, casino, calculation_date,
+        win_rate_score, clv_score, diversity_score, timing_score,
+        stake_pattern_score, withdrawal_score, bet_type_score, activity_change_score,
+        total_score, risk_level, total_bets, win_rate, avg_clv,
+        sports_count, avg_delay_seconds, estimated_months_until_limit,
+        limit_probability
+    ) VALUES (
+        :id, :user_id, :casino, :date,
+        :win_rate_score, :clv_score, :diversity_score, :timing_score,
+        :stake_score, :withdrawal_score, :bet_type_score, :activity_score,
+        :total_score, :risk_level, :total_bets, :win_rate, :avg_clv,
+        :sports_count, :avg_delay, :estimated_months, :limit_prob
+    )
+    ON CONFLICT (user_id, casino, calculation_date) DO UPDATE SET
+        total_score = EXCLUDED.total_score,
+        risk_level = EXCLUDED.risk_level,
+        created_at = now()
+""")
+
+
 class BookHealthScoring:
     """Advanced scoring algorithm with 8 factors"""
     
@@ -64,50 +87,59 @@ class BookHealthScoring:
                 'withdrawal': self._calculate_withdrawal_factor(user_id, casino, db)
             }
             
-            # Combine factors
-            total_score = sum(f['score'] for f in factors.values())
-            
-            # Determine risk level
-            risk_level = self._get_risk_level(total_score)
-            
-            # Generate recommendations
-            recommendations = self._generate_recommendations(factors, total_score)
-            
-            # Estimate time until limit
-            estimated_months = self._estimate_months_until_limit(total_score, profile)
-            
-            # Calculate limit probability
-            limit_probability = self._calculate_limit_probability(total_score)
+            score_data = self.combine_factors(factors, profile, len(bets))
             
             # Store score in database
-            self._store_score(db, user_id, casino, factors, total_score, risk_level, 
-                            estimated_months, limit_probability, len(bets))
+            self._store_score(db, user_id, casino, factors, score_data['score'], score_data['risk_level'],
+                            score_data['estimated_months'], score_data['limit_probability'], len(bets))
             
             # Get trend
-            trend = self._calculate_trend(db, user_id, casino)
+            score_data['trend'] = self._calculate_trend(db, user_id, casino)
             
-            return {
-                'score': total_score,
-                'risk_level': risk_level,
-                'factors': factors,
-                'recommendations': recommendations,
-                'estimated_months': estimated_months,
-                'limit_probability': limit_probability,
-                'trend': trend,
-                'total_bets': len(bets)
-            }
+            return score_data
             
         finally:
             db.close()
     
+    def combine_factors(self, factors: Dict, profile, total_bets: int) -> Dict:
+        """Total score, risk level, recommendations and estimates from the 8 factors"""
+        # Combine factors
+        total_score = sum(f['score'] for f in factors.values())
+        
+        # Determine risk level
+        risk_level = self._get_risk_level(total_score)
+        
+        # Generate recommendations
+        recommendations = self._generate_recommendations(factors, total_score)
+        
+        # Estimate time until limit
+        estimated_months = self._estimate_months_until_limit(total_score, profile)
+        
+        # Calculate limit probability
+        limit_probability = self._calculate_limit_probability(total_score)
+        
+        return {
+            'score': total_score,
+            'risk_level': risk_level,
+            'factors': factors,
+            'recommendations': recommendations,
+            'estimated_months': estimated_months,
+            'limit_probability': limit_probability,
+            'total_bets': total_bets
+        }
+    
     def _calculate_win_rate_factor(self, bets) -> Dict:
         """Win rate factor (0-25 points) - Too high win rate is suspicious"""
         completed = [b for b in bets if b.result in ['won', 'lost']]
+        wins = len([b for b in completed if b.result == 'won'])
+        return self.win_rate_factor(wins, len(completed))
+    
+    def win_rate_factor(self, wins: int, completed: int) -> Dict:
+        """Win rate factor from counts (won / won+lost)"""
         if not completed:
             return {'score': 0, 'value': None, 'max': 25, 'label': 'No completed bets'}
         
-        wins = len([b for b in completed if b.result == 'won'])
-        win_rate = wins / len(completed)
+        win_rate = wins / completed
         
         # Score based on win rate
         if win_rate >= 0.65: score = 25  # 🔴 65%+ = VERY suspicious
@@ -127,10 +159,14 @@ class BookHealthScoring:
     def _calculate_clv_factor(self, bets) -> Dict:
         """CLV factor (0-30 points) - Most important factor"""
         bets_with_clv = [b for b in bets if b.clv is not None]
-        if not bets_with_clv:
+        return self.clv_factor(sum(float(b.clv) for b in bets_with_clv), len(bets_with_clv))
+    
+    def clv_factor(self, clv_sum: float, clv_count: int) -> Dict:
+        """CLV factor from the sum / count of non-null CLV values"""
+        if not clv_count:
             return {'score': 0, 'value': None, 'max': 30, 'label': 'No CLV data'}
         
-        avg_clv = sum(float(b.clv) for b in bets_with_clv) / len(bets_with_clv)
+        avg_clv = clv_sum / clv_count
         
         # Score based on CLV
         if avg_clv >= 0.08: score = 30  # 🔴 8%+ CLV = EXTREME sharp
@@ -152,10 +188,10 @@ class BookHealthScoring:
         """Diversity factor (0-15 points) - Low diversity is suspicious"""
         sports = set(b.sport for b in bets if b.sport)
         markets = set(b.market_type for b in bets if b.market_type)
-        
-        sports_count = len(sports)
-        markets_count = len(markets)
-        
+        return self.diversity_factor(len(sports), len(markets))
+    
+    def diversity_factor(self, sports_count: int, markets_count: int) -> Dict:
+        """Diversity factor from distinct sport / market counts"""
         # Low diversity = focusing on specific edges
         if sports_count <= 1 and markets_count <= 2: score = 15  # 🔴 ONE sport, TWO markets
         elif sports_count <= 2 and markets_count <= 3: score = 10
@@ -172,10 +208,14 @@ class BookHealthScoring:
     def _calculate_timing_factor(self, bets) -> Dict:
         """Timing factor (0-15 points) - Fast betting = bot-like"""
         bets_with_timing = [b for b in bets if b.seconds_after_post is not None]
-        if not bets_with_timing:
+        return self.timing_factor(sum(b.seconds_after_post for b in bets_with_timing), len(bets_with_timing))
+    
+    def timing_factor(self, delay_sum: float, delay_count: int) -> Dict:
+        """Timing factor from the sum / count of seconds_after_post"""
+        if not delay_count:
             return {'score': 0, 'value': None, 'max': 15, 'label': 'No timing data'}
         
-        avg_delay = sum(b.seconds_after_post for b in bets_with_timing) / len(bets_with_timing)
+        avg_delay = delay_sum / delay_count
         
         # Fast betting = bot-like behavior
         if avg_delay < 20: score = 15  # 🔴 < 20 seconds = BOT
@@ -195,20 +235,25 @@ class BookHealthScoring:
         """Stake pattern factor (0-10 points) - Precise stakes = calculator user"""
         stakes = [float(b.stake_amount) for b in bets if b.stake_amount]
         if not stakes:
-            return {'score': 0, 'value': None, 'max': 10, 'label': 'No stake data'}
+            return self.stake_pattern_factor(0, 0, 0.0, 0.0)
         
         # Check if stakes are rounded
         rounded = sum(1 for s in stakes if s % 5 == 0 or s % 10 == 0)
-        rounded_ratio = rounded / len(stakes)
         
-        # Calculate coefficient of variation
+        # Population standard deviation
         avg_stake = sum(stakes) / len(stakes)
-        if avg_stake > 0:
-            variance = sum((s - avg_stake) ** 2 for s in stakes) / len(stakes)
-            std_dev = math.sqrt(variance)
-            cv = std_dev / avg_stake
-        else:
-            cv = 0
+        variance = sum((s - avg_stake) ** 2 for s in stakes) / len(stakes)
+        return self.stake_pattern_factor(len(stakes), rounded, avg_stake, math.sqrt(variance))
+    
+    def stake_pattern_factor(self, stake_count: int, rounded: int, avg_stake: float, std_dev: float) -> Dict:
+        """Stake pattern factor from stake count, rounded count, mean and std dev"""
+        if not stake_count:
+            return {'score': 0, 'value': None, 'max': 10, 'label': 'No stake data'}
+        
+        rounded_ratio = rounded / stake_count
+        
+        # Coefficient of variation
+        cv = std_dev / avg_stake if avg_stake > 0 else 0
         
         # Low variance + non-rounded = calculator user
         if rounded_ratio < 0.3 and cv < 0.2: score = 10  # 🔴 VERY precise stakes
@@ -225,14 +270,15 @@ class BookHealthScoring:
     
     def _calculate_bet_type_factor(self, bets) -> Dict:
         """Bet type factor (0-20 points) - Too many sharp bets"""
-        total = len(bets)
-        
         # Count by source type
         plus_ev = len([b for b in bets if b.bet_source_type == 'plus_ev'])
         arbitrage = len([b for b in bets if b.bet_source_type == 'arbitrage'])
         middle = len([b for b in bets if b.bet_source_type == 'middle'])
         recreational = len([b for b in bets if b.bet_source_type == 'recreational'])
-        
+        return self.bet_type_factor(len(bets), plus_ev, arbitrage, middle, recreational)
+    
+    def bet_type_factor(self, total: int, plus_ev: int, arbitrage: int, middle: int, recreational: int) -> Dict:
+        """Bet type factor from counts per bet_source_type"""
         sharp_ratio = (plus_ev + arbitrage + middle) / total if total > 0 else 0
         rec_ratio = recreational / total if total > 0 else 0
         
@@ -259,6 +305,10 @@ class BookHealthScoring:
     
     def _calculate_activity_change_factor(self, bets, profile) -> Dict:
         """Activity change factor (0-15 points) - Sudden increase suspicious"""
+        return self.activity_change_factor(len(bets), profile)
+    
+    def activity_change_factor(self, total_bets: int, profile) -> Dict:
+        """Activity change factor from the bet count and the onboarding profile"""
         if not profile.was_active_before:
             # User wasn't active before - sudden activity is suspicious
             
@@ -266,9 +316,9 @@ class BookHealthScoring:
             if profile.created_at:
                 days_since_joined = (datetime.utcnow() - profile.created_at).days
                 if days_since_joined > 0:
-                    bets_per_month = (len(bets) / days_since_joined) * 30
+                    bets_per_month = (total_bets / days_since_joined) * 30
                 else:
-                    bets_per_month = len(bets) * 30
+                    bets_per_month = total_bets * 30
             else:
                 bets_per_month = 100  # Default high value
             
@@ -429,61 +479,46 @@ class BookHealthScoring:
         
         return recommendations[:5]  # Top 5 recommendations
     
+    def score_row(self, user_id: str, casino: str, factors: Dict, total_score: float, risk_level: str,
+                  estimated_months: float, limit_probability: float, total_bets: int) -> Dict:
+        """Parameters of STORE_SCORE_SQL (one book_health_scores row)"""
+        # Calculate metrics snapshot
+        win_rate = factors['win_rate']['value']
+        avg_clv = factors['clv']['value']
+        sports_count = factors['diversity']['value']['sports'] if factors['diversity']['value'] else 0
+        avg_delay = factors['timing']['value']
+        
+        return {
+            'id': str(uuid.uuid4()),
+            'user_id': user_id,
+            'casino': casino,
+            'date': date.today(),
+            'win_rate_score': factors['win_rate']['score'],
+            'clv_score': factors['clv']['score'],
+            'diversity_score': factors['diversity']['score'],
+            'timing_score': factors['timing']['score'],
+            'stake_score': factors['stake_pattern']['score'],
+            'withdrawal_score': factors['withdrawal']['score'],
+            'bet_type_score': factors['bet_type']['score'],
+            'activity_score': factors['activity_change']['score'],
+            'total_score': total_score,
+            'risk_level': risk_level,
+            'total_bets': total_bets,
+            'win_rate': win_rate,
+            'avg_clv': avg_clv,
+            'sports_count': sports_count,
+            'avg_delay': int(avg_delay) if avg_delay else None,
+            'estimated_months': estimated_months,
+            'limit_prob': limit_probability
+        }
+    
     def _store_score(self, db, user_id: str, casino: str, factors: Dict, 
                     total_score: float, risk_level: str, estimated_months: float,
                     limit_probability: float, total_bets: int):
         """Store calculated score in database"""
         try:
-            # Calculate metrics snapshot
-            win_rate = factors['win_rate']['value']
-            avg_clv = factors['clv']['value']
-            sports_count = factors['diversity']['value']['sports'] if factors['diversity']['value'] else 0
-            avg_delay = factors['timing']['value']
-            
-            # Insert new score record
-            db.execute(sql_text("""
-                INSERT INTO book_health_scores (
-                    score_id, user_id, casino, calculation_date,
-                    win_rate_score, clv_score, diversity_score, timing_score,
-                    stake_pattern_score, withdrawal_score, bet_type_score, activity_change_score,
-                    total_score, risk_level, total_bets, win_rate, avg_clv,
-                    sports_count, avg_delay_seconds, estimated_months_until_limit,
-                    limit_probability
-                ) VALUES (
-                    :id, :user_id, :casino, :date,
-                    :win_rate_score, :clv_score, :diversity_score, :timing_score,
-                    :stake_score, :withdrawal_score, :bet_type_score, :activity_score,
-                    :total_score, :risk_level, :total_bets, :win_rate, :avg_clv,
-                    :sports_count, :avg_delay, :estimated_months, :limit_prob
-                )
-                ON CONFLICT (user_id, casino, calculation_date) DO UPDATE SET
-                    total_score = EXCLUDED.total_score,
-                    risk_level = EXCLUDED.risk_level,
-                    created_at = now()
-            """), {
-                'id': str(uuid.uuid4()),
-                'user_id': user_id,
-                'casino': casino,
-                'date': date.today(),
-                'win_rate_score': factors['win_rate']['score'],
-                'clv_score': factors['clv']['score'],
-                'diversity_score': factors['diversity']['score'],
-                'timing_score': factors['timing']['score'],
-                'stake_score': factors['stake_pattern']['score'],
-                'withdrawal_score': factors['withdrawal']['score'],
-                'bet_type_score': factors['bet_type']['score'],
-                'activity_score': factors['activity_change']['score'],
-                'total_score': total_score,
-                'risk_level': risk_level,
-                'total_bets': total_bets,
-                'win_rate': win_rate,
-                'avg_clv': avg_clv,
-                'sports_count': sports_count,
-                'avg_delay': int(avg_delay) if avg_delay else None,
-                'estimated_months': estimated_months,
-                'limit_prob': limit_probability
-            })
-            
+            db.execute(STORE_SCORE_SQL, self.score_row(user_id, casino, factors, total_score, risk_level,
+                                                       estimated_months, limit_probability, total_bets))
             db.commit()
             
         except Exception as e:
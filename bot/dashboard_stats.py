@@ -15,6 +15,7 @@ from database import SessionLocal
 from models.user import User, TierLevel
 from models.bet import DailyStats, UserBet
 from models.drop_event import DropEvent
+from utils import pnl_aggregates
 
 import logging
 logger = logging.getLogger(__name__)
@@ -77,7 +78,20 @@ def calculate_streak(bets: List[UserBet]) -> str:
     
     # Sort bets by date descending
     sorted_bets = sorted(bets, key=lambda x: x.bet_date, reverse=True)
-    
+    return _streak_from_sorted(sorted_bets)
+
+
+def calculate_recent_streak(bets_query, batch_size: int = 50) -> str:
+    """
+    Current streak straight from a UserBet query: reads the most recent bets
+    in batches and stops at the first break (instead of loading every bet)
+    """
+    ordered = bets_query.order_by(UserBet.bet_date.desc(), UserBet.id.asc()).yield_per(batch_size)
+    return _streak_from_sorted(ordered)
+
+
+def _streak_from_sorted(sorted_bets) -> str:
+    """Streak over bets already sorted by date descending"""
     streak_type = None
     streak_count = 0
     
@@ -284,16 +298,15 @@ async def show_dashboard_stats(callback: types.CallbackQuery, filter_month: str
                 UserBet.bet_date <= filter_month_end
             )
         
-        all_user_bets = bets_query.all()
-        recent_bets = bets_query.order_by(UserBet.bet_date.desc()).limit(3).all()
-        
-        # Calculate overall metrics
-        total_profit = sum(b.actual_profit if b.actual_profit is not None else b.expected_profit for b in all_user_bets)
-        total_staked = sum(b.total_stake for b in all_user_bets)
+        # Calculate overall metrics (daily aggregates, O(days) rows)
+        by_type = pnl_aggregates.totals_by_type(db, user_id, filter_month_start, filter_month_end)
+        overall = pnl_aggregates.merge(by_type)
+        total_profit = overall['profit']
+        total_staked = overall['stake']
         overall_roi = (total_profit / total_staked * 100) if total_staked > 0 else 0
         
-        win_rate, wins, losses = calculate_win_rate(all_user_bets)
-        current_streak = calculate_streak(all_user_bets)
+        win_rate = pnl_aggregates.win_rate(overall)
+        current_streak = calculate_recent_streak(bets_query)
         
         # Build dashboard header (compact style)
         if lang == 'fr':
@@ -379,126 +392,6 @@ async def show_dashboard_stats(callback: types.CallbackQuery, filter_month: str
             month_bets, month_staked, month_profit, month_roi, active_str
         )
         
-        # Stats by type
-        arb_stats = db.query(
-            func.count(UserBet.id),
-            func.sum(case((UserBet.actual_profit != None, UserBet.actual_profit), else_=UserBet.expected_profit)),
-            func.sum(UserBet.total_stake)
-        ).filter(
-            UserBet.user_id == user_id,
-            UserBet.bet_type == 'arbitrage'
-        ).first()
-        
-        arb_bets = int(arb_stats[0] or 0)
-        arb_profit = float(arb_stats[1] or 0.0)
-        arb_staked = float(arb_stats[2] or 0.0)
-        arb_roi = (arb_profit / arb_staked * 100) if arb_staked > 0 else 0
-        arb_avg_stake = (arb_staked / arb_bets) if arb_bets > 0 else 0
-        
-        # ARBITRAGE = tous les bets sont des WINS (profit garanti!)
-        arb_wins = arb_bets  # Tous les arbitrages sont des wins!
-        arb_losses = 0  # Arbitrage ne peut pas perdre
-        arb_pending = 0  # On pourrait ajouter un compteur pour les pending si nécessaire
-        arb_wr = 100.0 if arb_bets > 0 else 0
-        
-        arb_card = format_bet_type_card(
-            "ARBITRAGE", "⚖️", arb_bets, arb_wins, arb_losses,
-            arb_wr, arb_profit, arb_roi, arb_avg_stake, lang, is_arbitrage=True
-        )
-        
-        # Good EV stats
-        ev_stats = db.query(
-            func.count(UserBet.id),
-            func.sum(case((UserBet.actual_profit != None, UserBet.actual_profit), else_=UserBet.expected_profit)),
-            func.sum(UserBet.total_stake)
-        ).filter(
-            UserBet.user_id == user_id,
-            UserBet.bet_type == 'good_ev'
-        ).first()
-        
-        ev_bets = int(ev_stats[0] or 0)
-        ev_profit = float(ev_stats[1] or 0.0)
-        ev_staked = float(ev_stats[2] or 0.0)
-        ev_roi = (ev_profit / ev_staked * 100) if ev_staked > 0 else 0
-        ev_avg_stake = (ev_staked / ev_bets) if ev_bets > 0 else 0
-        
-        # Good EV: Count wins and losses from settled bets only
-        ev_wins = db.query(func.count(UserBet.id)).filter(
-            UserBet.user_id == user_id,
-            UserBet.bet_type == 'good_ev',
-            UserBet.actual_profit != None,
-            UserBet.actual_profit > 0
-        ).scalar() or 0
-        
-        ev_losses = db.query(func.count(UserBet.id)).filter(
-            UserBet.user_id == user_id,
-            UserBet.bet_type == 'good_ev',
-            UserBet.actual_profit != None,
-            UserBet.actual_profit < 0
-        ).scalar() or 0
-        
-        ev_settled = ev_wins + ev_losses
-        ev_wr = (ev_wins / ev_settled * 100) if ev_settled > 0 else 0
-        
-        ev_card = format_bet_type_card(
-            "GOOD +EV", "💎", ev_bets, ev_wins, ev_losses,
-            ev_wr, ev_profit, ev_roi, ev_avg_stake, lang
-        )
-        
-        # Middle stats
-        middle_stats = db.query(
-            func.count(UserBet.id),
-            func.sum(case((UserBet.actual_profit != None, UserBet.actual_profit), else_=UserBet.expected_profit)),
-            func.sum(UserBet.total_stake)
-        ).filter(
-            UserBet.user_id == user_id,
-            UserBet.bet_type == 'middle'
-        ).first()
-        
-        middle_bets = int(middle_stats[0] or 0)
-        middle_profit = float(middle_stats[1] or 0.0)
-        middle_staked = float(middle_stats[2] or 0.0)
-        middle_roi = (middle_profit / middle_staked * 100) if middle_staked > 0 else 0
-        middle_avg_stake = (middle_staked / middle_bets) if middle_bets > 0 else 0
-        
-        # Middle bets: Count wins (actual_profit > 0) and losses (actual_profit < 0)
-        # Anything with actual_profit = NULL is pending
-        middle_wins = db.query(func.count(UserBet.id)).filter(
-            UserBet.user_id == user_id,
-            UserBet.bet_type == 'middle',
-            UserBet.actual_profit != None,
-            UserBet.actual_profit > 0
-        ).scalar() or 0
-        
-        middle_losses = db.query(func.count(UserBet.id)).filter(
-            UserBet.user_id == user_id,
-            UserBet.bet_type == 'middle',
-            UserBet.actual_profit != None,
-            UserBet.actual_profit < 0
-        ).scalar() or 0
-        
-        middle_settled = middle_wins + middle_losses
-        middle_wr = (middle_wins / middle_settled * 100) if middle_settled > 0 else 0
-        
-        middle_card = format_bet_type_card(
-            "MIDDLE BETS", "🎯", middle_bets, middle_wins, middle_losses,
-            middle_wr, middle_profit, middle_roi, middle_avg_stake, lang
-        )
-        
-        # Bet history - Show last 10 bets (removed useless Load More)
-        history_section = ""
-        if all_user_bets:
-            history_title = "📋 <b>HISTORIQUE DES BETS</b>" if lang == 'fr' else "📋 <b>BET HISTORY</b>"
-            history_section = f"\n━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n{history_title}\n\n"
-            
-            # Show last 10 bets
-            last_10_bets = db.query(UserBet).filter(
-                UserBet.user_id == user_id
-            ).order_by(UserBet.bet_date.desc()).limit(10).all()
-            
-            for bet in last_10_bets:
-                history_section += format_bet_history_card(bet, db, lang) + "\n"
-        
         # Build complete message (removed STATS BY BET TYPE section)
         stats_text = (
             f"{header}"
@@ -583,17 +476,17 @@ async def show_complete_stats(callback: types.CallbackQuery):
         user = db.query(User).filter(User.telegram_id == user_id).first()
         lang = user.language if user else 'en'
         
-        # Get all user bets
-        all_bets = db.query(UserBet).filter(UserBet.user_id == user_id).all()
-        
-        # Calculate global metrics
-        total_bets = len(all_bets)
-        total_profit = sum(b.actual_profit if b.actual_profit is not None else b.expected_profit for b in all_bets)
-        total_staked = sum(b.total_stake for b in all_bets)
+        # Global metrics from daily aggregates
+        by_type = pnl_aggregates.totals_by_type(db, user_id)
+        overall = pnl_aggregates.merge(by_type)
+        total_bets = int(overall['bets'])
+        total_profit = overall['profit']
+        total_staked = overall['stake']
         overall_roi = (total_profit / total_staked * 100) if total_staked > 0 else 0
         
-        win_rate, wins, losses = calculate_win_rate(all_bets)
-        current_streak = calculate_streak(all_bets)
+        win_rate = pnl_aggregates.win_rate(overall)
+        wins, losses = overall['wins'], overall['losses']
+        current_streak = calculate_recent_streak(db.query(UserBet).filter(UserBet.user_id == user_id))
         
         # Period stats
         today = date.today()
@@ -609,16 +502,13 @@ async def show_complete_stats(callback: types.CallbackQuery):
         
         period_stats = {}
         for period_name, period_date in periods.items():
-            if period_date:
-                period_bets = [b for b in all_bets if b.bet_date >= period_date]
-            else:
-                period_bets = all_bets
+            period = pnl_aggregates.totals(db, user_id, start=period_date) if period_date else overall
             
-            p_count = len(period_bets)
-            p_profit = sum(b.actual_profit if b.actual_profit is not None else b.expected_profit for b in period_bets)
-            p_staked = sum(b.total_stake for b in period_bets)
+            p_count = int(period['bets'])
+            p_profit = period['profit']
+            p_staked = period['stake']
             p_roi = (p_profit / p_staked * 100) if p_staked > 0 else 0
-            p_wr, p_wins, p_losses = calculate_win_rate(period_bets)
+            p_wr = pnl_aggregates.win_rate(period)
             
             period_stats[period_name] = {
                 'bets': p_count,
@@ -630,10 +520,10 @@ async def show_complete_stats(callback: types.CallbackQuery):
         # Category stats
         cat_stats = []
         for cat_type, cat_emoji, cat_name in [('arbitrage', '⚖️', 'Arbitrage'), ('good_ev', '💎', 'Good +EV'), ('middle', '🎯', 'Middle')]:
-            cat_bets = [b for b in all_bets if b.bet_type == cat_type]
-            c_count = len(cat_bets)
-            c_profit = sum(b.actual_profit if b.actual_profit is not None else b.expected_profit for b in cat_bets)
-            c_wr, _, _ = calculate_win_rate(cat_bets)
+            cat = by_type.get(cat_type) or pnl_aggregates.merge({})
+            c_count = int(cat['bets'])
+            c_profit = cat['profit']
+            c_wr = pnl_aggregates.win_rate(cat)
             cat_stats.append((cat_emoji, cat_name, {
                 'bets': c_count,
                 'wr': f"{c_wr:.0f}%" if c_count > 0 else 'N/A',
@@ -783,21 +673,25 @@ async def show_advanced_performance(callback: types.CallbackQuery):
         user = db.query(User).filter(User.telegram_id == user_id).first()
         lang = user.language if user else 'en'
         
-        all_bets = db.query(UserBet).filter(UserBet.user_id == user_id).all()
+        overall = pnl_aggregates.totals(db, user_id)
         
-        total_bets = len(all_bets)
-        total_profit = sum(b.actual_profit if b.actual_profit is not None else b.expected_profit for b in all_bets)
-        total_staked = sum(b.total_stake for b in all_bets)
+        total_bets = int(overall['bets'])
+        total_profit = overall['profit']
+        total_staked = overall['stake']
         overall_roi = (total_profit / total_staked * 100) if total_staked > 0 else 0
         
-        win_rate, wins, losses = calculate_win_rate(all_bets)
+        win_rate = pnl_aggregates.win_rate(overall)
+        wins, losses = overall['wins'], overall['losses']
         avg_profit = total_profit / total_bets if total_bets > 0 else 0
         avg_stake = total_staked / total_bets if total_bets > 0 else 0
         
-        # Best/worst bets
-        profits = [b.actual_profit if b.actual_profit is not None else b.expected_profit for b in all_bets]
-        best_bet = max(profits) if profits else 0
-        worst_bet = min(profits) if profits else 0
+        # Best/worst bets (MIN/MAX côté SQL, pas de chargement des bets)
+        profit_expr = case((UserBet.actual_profit != None, UserBet.actual_profit), else_=UserBet.expected_profit)
+        best_bet, worst_bet = db.query(func.max(profit_expr), func.min(profit_expr)).filter(
+            UserBet.user_id == user_id
+        ).first()
+        best_bet = best_bet or 0
+        worst_bet = worst_bet or 0
         
         if lang == 'fr':
             text = (
@@ -25,6 +25,7 @@ from core.casinos import CASINOS, get_casino_referral_link, get_casino_logo
 from core.languages import Translations
 from config import ADMIN_CHAT_ID
 from utils.drops_stats import get_today_stats_for_tier
+from utils import pnl_aggregates
 from bot.commands_setup import set_user_commands
 from bot.message_manager import BotMessageManager
 from bot.nowpayments_handler import NOWPaymentsManager
@@ -2041,6 +2042,7 @@ async def callback_erase_all_history_confirmed(callback: types.CallbackQuery):
         
         # DELETE ALL user bets
         db.query(UserBet).filter(UserBet.user_id == user_id).delete()
+        pnl_aggregates.clear_user(db, user_id)  # Bulk delete skips the mapper events
         db.commit()
         
         if lang == 'fr':
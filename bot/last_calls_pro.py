@@ -4,13 +4,13 @@ Last Calls Pro - Enhanced with pagination, sorting, and casino filters
 from aiogram import Router, F, types
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from aiogram.enums import ParseMode
-from datetime import date, timedelta
-import json
+from datetime import date, datetime, time, timedelta, timezone
 
 from database import SessionLocal
-from models.user import User
 from models.drop_event import DropEvent
-from sqlalchemy import desc
+from sqlalchemy import and_, func, or_
+from utils.drop_filters import decode_tags, has_any_tag, payload_casinos
+from utils.user_prefs import user_prefs
 
 import logging
 logger = logging.getLogger(__name__)
@@ -90,27 +90,110 @@ async def toggle_settings_filter(callback: types.CallbackQuery):
 
 
 def extract_casinos_from_drop(drop: DropEvent):
-    """Extract casino names from drop payload"""
-    casinos = []
-    if drop.payload:
-        # Try to extract from payload
-        if isinstance(drop.payload, dict):
-            # Check for 'outcomes' array (standard format)
-            if 'outcomes' in drop.payload:
-                for outcome in drop.payload.get('outcomes', []):
-                    if 'casino' in outcome:
-                        casinos.append(outcome['casino'])
-            # Check different possible structures
-            elif 'legs' in drop.payload:
-                for leg in drop.payload.get('legs', []):
-                    if 'casino' in leg:
-                        casinos.append(leg['casino'])
-            elif 'side_a' in drop.payload:
-                if 'casino' in drop.payload['side_a']:
-                    casinos.append(drop.payload['side_a']['casino'])
-                if 'casino' in drop.payload.get('side_b', {}):
-                    casinos.append(drop.payload['side_b']['casino'])
-    return list(set(casinos)) if casinos else ['Unknown']
+    """Extract casino names from drop (denormalised column, payload as fallback)"""
+    if drop.casinos:
+        return decode_tags(drop.casinos)
+    return payload_casinos(drop.payload)
+
+
+PER_PAGE = 10
+
+# sort -> (SQL sort key, descending)
+SORT_KEYS = {
+    'time': (DropEvent.received_at, True),
+    'desc': (func.coalesce(DropEvent.arb_percentage, 0.0), True),
+    'asc': (func.coalesce(DropEvent.arb_percentage, 0.0), False),
+}
+
+
+def build_last_calls_filter(db, user, filters: dict, bet_type: str):
+    """
+    Filtered DropEvent query for Last Calls (everything in SQL, no ordering)
+
+    user is the UserPrefs snapshot (utils.user_prefs), None for unknown users
+
+    Returns:
+        (query, signature) - signature changes whenever the result set criteria change
+    """
+    today = date.today()
+    query = db.query(DropEvent).filter(DropEvent.bet_type == bet_type)
+
+    match_today_only = filters.get('match_today_only', False)
+    if match_today_only:
+        # MATCH TODAY MODE: calls from last 5 days whose match (UTC date) is today
+        start_date = today - timedelta(days=5)
+        match_start = datetime.combine(today, time.min, tzinfo=timezone.utc)
+        query = query.filter(
+            DropEvent.received_at >= start_date,
+            DropEvent.match_time >= match_start,
+            DropEvent.match_time < match_start + timedelta(days=1),
+        )
+    else:
+        # NORMAL MODE: drops from specific day
+        target_date = today - timedelta(days=filters.get('days_before', 0))
+        query = query.filter(
+            DropEvent.received_at >= target_date,
+            DropEvent.received_at < target_date + timedelta(days=1),
+        )
+
+    sport_filter = filters.get('sport', 'all')
+    if sport_filter != 'all':
+        query = query.filter(has_any_tag(DropEvent.sports, [sport_filter]))
+
+    settings = None
+    if filters.get('use_my_settings', True) and user:
+        # USE MY SETTINGS: user's configured % range and casinos
+        min_pct, max_pct = user.percent_range(bet_type)
+        pct = func.coalesce(DropEvent.arb_percentage, 0.0)
+        query = query.filter(pct >= min_pct, pct <= max_pct)
+        casinos = user.casino_names
+        if casinos:
+            query = query.filter(has_any_tag(DropEvent.casinos, casinos))
+        settings = (min_pct, max_pct, casinos)
+    elif 'all' not in filters['casinos']:
+        # ALL CALLS MODE: manual casino filter from buttons
+        query = query.filter(has_any_tag(DropEvent.casinos, filters['casinos']))
+
+    signature = (
+        today, bet_type, match_today_only, filters.get('days_before', 0), sport_filter,
+        settings, tuple(filters['casinos']), filters['sort'],
+    )
+    return query, signature
+
+
+def fetch_last_calls_page(query, filters: dict, signature, page: int):
+    """
+    One page of drops with keyset pagination
+
+    The last (sort key, id) of each page shown is kept in filters['cursors'],
+    so "next page" seeks directly after it. Jumps to a page without a known
+    cursor (restart, filter change) fall back to OFFSET.
+    """
+    sort_key, descending = SORT_KEYS.get(filters['sort'], SORT_KEYS['time'])
+    cursors = filters.get('cursors')
+    if not cursors or cursors.get('signature') != signature:
+        cursors = filters['cursors'] = {'signature': signature, 'pages': {}}
+
+    paged = query.add_columns(sort_key.label('sort_key'))
+    if descending:
+        paged = paged.order_by(sort_key.desc(), DropEvent.id.desc())
+    else:
+        paged = paged.order_by(sort_key.asc(), DropEvent.id.asc())
+
+    previous = cursors['pages'].get(page - 1)
+    if previous is not None:
+        last_key, last_id = previous
+        if descending:
+            paged = paged.filter(or_(sort_key < last_key, and_(sort_key == last_key, DropEvent.id < last_id)))
+        else:
+            paged = paged.filter(or_(sort_key > last_key, and_(sort_key == last_key, DropEvent.id > last_id)))
+    elif page > 1:
+        paged = paged.offset((page - 1) * PER_PAGE)
+
+    rows = paged.limit(PER_PAGE).all()
+    if rows:
+        cursors['pages'][page] = (rows[-1].sort_key, rows[-1][0].id)
+    return [row[0] for row in rows]
 
 
 async def _show_last_calls_internal(callback: types.CallbackQuery, category: str, page: int, skip_answer: bool = False):
@@ -122,7 +205,7 @@ async def _show_last_calls_internal(callback: types.CallbackQuery, category: str
     db = SessionLocal()
     
     try:
-        user = db.query(User).filter(User.telegram_id == user_id).first()
+        user = user_prefs.get(user_id)
         lang = user.language if user else 'en'
         
         # Get filters
@@ -136,155 +219,16 @@ async def _show_last_calls_internal(callback: types.CallbackQuery, category: str
             'goodev': 'good_ev'
         }
         bet_type = category_to_type.get(category, 'arbitrage')
-        
-        # Get drops filtered by bet_type
         match_today_only = filters.get('match_today_only', False)
+        days_before = filters.get('days_before', 0)
         
-        if match_today_only:
-            # MATCH TODAY MODE: Get calls from last 5 days but filter by match date later
-            days_back = 5  # Look back 5 days
-            start_date = date.today() - timedelta(days=days_back)
-            
-            query = db.query(DropEvent).filter(
-                DropEvent.received_at >= start_date,
-                DropEvent.bet_type == bet_type  # Filter by category!
-            )
-        else:
-            # NORMAL MODE: Get drops from specific day
-            days_before = filters.get('days_before', 0)
-            target_date = date.today() - timedelta(days=days_before)
-            next_date = target_date + timedelta(days=1)
-            
-            query = db.query(DropEvent).filter(
-                DropEvent.received_at >= target_date,
-                DropEvent.received_at < next_date,
-                DropEvent.bet_type == bet_type  # Filter by category!
-            )
+        # Filters, count and page all run in SQL (see utils.drop_filters)
+        query, signature = build_last_calls_filter(db, user, filters, bet_type)
+        total_drops = query.order_by(None).count()
+        total_pages = (total_drops + PER_PAGE - 1) // PER_PAGE
         
-        # Apply sorting
-        if filters['sort'] == 'desc':
-            # Highest % first
-            query = query.order_by(desc(DropEvent.arb_percentage))
-        elif filters['sort'] == 'asc':
-            # Lowest % first
-            query = query.order_by(DropEvent.arb_percentage)
-        else:
-            # 'time' = latest calls first (most recent received_at)
-            query = query.order_by(desc(DropEvent.received_at))
-        
-        all_drops = query.all()
-        
-        # Filter by match date if "Match Today" mode is active
-        if match_today_only:
-            from datetime import datetime, timezone
-            today_date = date.today()
-            filtered_by_match_date = []
-            
-            for drop in all_drops:
-                # Extract commence_time from payload
-                if drop.payload and isinstance(drop.payload, dict):
-                    commence_time_iso = drop.payload.get('commence_time')
-                    if commence_time_iso:
-                        try:
-                            # Parse ISO timestamp and get date
-                            dt = datetime.fromisoformat(commence_time_iso.replace('Z', '+00:00'))
-                            match_date = dt.date()
-                            
-                            # Only include if match is TODAY
-                            if match_date == today_date:
-                                filtered_by_match_date.append(drop)
-                        except Exception as e:
-                            logger.debug(f"Could not parse commence_time for drop {drop.id}: {e}")
-                            continue
-            
-            all_drops = filtered_by_match_date
-        
-        # Apply sport filter if not 'all'
-        sport_filter = filters.get('sport', 'all')
-        if sport_filter != 'all':
-            filtered_by_sport = []
-            sport_keywords = {
-                'basketball': ['nba', 'ncaa basketball', 'wnba', 'basketball'],
-                'soccer': ['soccer', 'football', 'mls', 'premier league', 'la liga', 'serie a', 'bundesliga', 'ligue 1'],
-                'tennis': ['tennis', 'atp', 'wta'],
-                'hockey': ['nhl', 'hockey'],
-                'football': ['nfl', 'ncaa football', 'american football'],
-                'baseball': ['mlb', 'baseball'],
-                'mma': ['ufc', 'mma', 'bellator']
-            }
-            
-            keywords = sport_keywords.get(sport_filter, [])
-            for drop in all_drops:
-                # Check league field
-                league = (drop.league or '').lower()
-                # Also check payload for sport info
-                sport_name = ''
-                if drop.payload and isinstance(drop.payload, dict):
-                    sport_name = (drop.payload.get('sport_key') or '').lower()
-                
-                # Match if any keyword is in league or sport_name
-                if any(kw in league or kw in sport_name for kw in keywords):
-                    filtered_by_sport.append(drop)
-            
-            all_drops = filtered_by_sport
-        
-        # Apply filters based on use_my_settings
-        if filters.get('use_my_settings', True) and user:
-            # USE MY SETTINGS: Filter by user's configured % and casinos
-            filtered_drops = []
-            for drop in all_drops:
-                pct = drop.arb_percentage or 0
-                
-                # Get user's min/max % for this bet type
-                if bet_type == 'arbitrage':
-                    min_pct = user.min_arb_percent or 0.5
-                    max_pct = user.max_arb_percent or 100.0
-                elif bet_type == 'middle':
-                    min_pct = user.min_middle_percent or 0.5
-                    max_pct = user.max_middle_percent or 100.0
-                elif bet_type == 'good_ev':
-                    min_pct = user.min_good_ev_percent or 0.5
-                    max_pct = user.max_good_ev_percent or 100.0
-                else:
-                    min_pct = 0.5
-                    max_pct = 100.0
-                
-                # Check if % is in user's range
-                if not (min_pct <= pct <= max_pct):
-                    continue
-                
-                # Check if casinos match user's selected casinos
-                if user.selected_casinos:
-                    try:
-                        user_selected = json.loads(user.selected_casinos)
-                        if user_selected:  # Only filter if user has selected specific casinos
-                            drop_casinos = extract_casinos_from_drop(drop)
-                            if not any(c in user_selected for c in drop_casinos):
-                                continue
-                    except:
-                        pass  # If JSON parsing fails, don't filter by casino
-                
-                filtered_drops.append(drop)
-            
-            all_drops = filtered_drops
-        else:
-            # ALL CALLS MODE: Use manual casino filter from buttons (if not 'all')
-            if 'all' not in filters['casinos']:
-                filtered_drops = []
-                for drop in all_drops:
-                    drop_casinos = extract_casinos_from_drop(drop)
-                    if any(c in filters['casinos'] for c in drop_casinos):
-                        filtered_drops.append(drop)
-                all_drops = filtered_drops
-        
-        # Pagination: 10 per page
-        per_page = 10
-        total_drops = len(all_drops)
-        total_pages = (total_drops + per_page - 1) // per_page
-        
-        start_idx = (page - 1) * per_page
-        end_idx = start_idx + per_page
-        page_drops = all_drops[start_idx:end_idx]
+        start_idx = (page - 1) * PER_PAGE
+        page_drops = fetch_last_calls_page(query, filters, signature, page)
         
         # Build message
         category_names = {
@@ -575,7 +519,7 @@ async def show_days_filter(callback: types.CallbackQuery):
     
     db = SessionLocal()
     try:
-        user = db.query(User).filter(User.telegram_id == user_id).first()
+        user = user_prefs.get(user_id)
         lang = user.language if user else 'en'
         
         filters = get_user_filters(user_id, category)
@@ -678,7 +622,7 @@ async def show_sport_filter(callback: types.CallbackQuery):
     
     db = SessionLocal()
     try:
-        user = db.query(User).filter(User.telegram_id == user_id).first()
+        user = user_prefs.get(user_id)
         lang = user.language if user else 'en'
         
         # Get current selected sport
@@ -763,7 +707,7 @@ async def select_sport_filter(callback: types.CallbackQuery):
     
     db = SessionLocal()
     try:
-        user = db.query(User).filter(User.telegram_id == user_id).first()
+        user = user_prefs.get(user_id)
         lang = user.language if user else 'en'
         
         sport_name_fr, sport_name_en = sport_names.get(sport, ('Sport', 'Sport'))
@@ -793,7 +737,7 @@ async def show_casino_filter(callback: types.CallbackQuery):
     
     db = SessionLocal()
     try:
-        user = db.query(User).filter(User.telegram_id == user_id).first()
+        user = user_prefs.get(user_id)
         lang = user.language if user else 'en'
         
         # Map category to bet_type
@@ -806,15 +750,14 @@ async def show_casino_filter(callback: types.CallbackQuery):
         
         # Get all unique casinos from today's drops for this category
         today = date.today()
-        all_drops = db.query(DropEvent).filter(
+        casino_rows = db.query(DropEvent.casinos).filter(
             DropEvent.received_at >= today,
-            DropEvent.bet_type == bet_type  # Filter by category!
-        ).all()
+            DropEvent.bet_type == bet_type
+        ).distinct()
         
         casinos_set = set()
-        for drop in all_drops:
-            drop_casinos = extract_casinos_from_drop(drop)
-            casinos_set.update(drop_casinos)
+        for (casinos,) in casino_rows:
+            casinos_set.update(decode_tags(casinos) or ['Unknown'])
         
         casinos_list = sorted(list(casinos_set))
         
@@ -948,7 +891,7 @@ async def toggle_casino(callback: types.CallbackQuery):
     # Rebuild the casino filter display
     db = SessionLocal()
     try:
-        user = db.query(User).filter(User.telegram_id == user_id).first()
+        user = user_prefs.get(user_id)
         lang = user.language if user else 'en'
         
         # Map category to bet_type
@@ -961,15 +904,14 @@ async def toggle_casino(callback: types.CallbackQuery):
         
         # Get all unique casinos from today's drops for this category
         today = date.today()
-        all_drops = db.query(DropEvent).filter(
+        casino_rows = db.query(DropEvent.casinos).filter(
             DropEvent.received_at >= today,
             DropEvent.bet_type == bet_type
-        ).all()
+        ).distinct()
         
         casinos_set = set()
-        for drop in all_drops:
-            drop_casinos = extract_casinos_from_drop(drop)
-            casinos_set.update(drop_casinos)
+        for (casinos,) in casino_rows:
+            casinos_set.update(decode_tags(casinos) or ['Unknown'])
         
         casinos_list = sorted(list(casinos_set))
         
@@ -1052,7 +994,7 @@ async def view_call_details(callback: types.CallbackQuery):
     
     db = SessionLocal()
     try:
-        user = db.query(User).filter(User.telegram_id == user_id).first()
+        user = user_prefs.get(user_id)
         lang = user.language if user else 'en'
         # Get user's rounding preferences
         user_rounding = user.stake_rounding if user else 0
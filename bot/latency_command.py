@@ -0,0 +1,62 @@
+"""
+Latency Command for Admin
+Hot-path latency per stage (drop receipt -> message delivered) vs the 2s target
+"""
+from aiogram import Router, types
+from aiogram.filters import Command, CommandObject
+from aiogram.enums import ParseMode
+
+from bot.ml_stats_command import is_admin
+from utils.latency_tracer import latency_tracer
+
+router = Router()
+
+
+def _ms(value) -> str:
+    if value is None:
+        return "-"
+    if value >= 1000:
+        return f"{value / 1000:.2f}s"
+    return f"{value:.0f}ms" if value >= 10 else f"{value:.1f}ms" if value >= 1 else f"{value:.2f}ms"
+
+
+@router.message(Command("latency"))
+async def cmd_latency(message: types.Message, command: CommandObject):
+    """Show p50/p95/p99 per pipeline stage (/latency reset clears the histograms)"""
+    if not is_admin(message.from_user.id):
+        await message.answer("❌ Admin only command")
+        return
+
+    summary = latency_tracer.summary()
+    reset = (command.args or "").strip().lower() == "reset"
+    if reset:
+        latency_tracer.reset()
+
+    stages = summary['stages']
+    if not stages:
+        await message.answer("⏱️ <b>LATENCY</b>\n\nNo drop traced yet.", parse_mode=ParseMode.HTML)
+        return
+
+    lines = [f"⏱️ <b>HOT PATH LATENCY</b> (target {_ms(summary['target_ms'])})\n"]
+    within = summary['within_target_pct']
+    if within is not None:
+        end_to_end = stages['drop_to_sent']
+        health_emoji = "🟢" if within >= 99 else "🟡" if within >= 95 else "🔴"
+        lines.append(
+            f"{health_emoji} <b>Drop → sent:</b> {within:.1f}% under target "
+            f"({end_to_end['over_target']}/{end_to_end['count']} late)\n"
+        )
+
+    lines.append(f"<code>{'stage':<13} {'n':>5} {'p50':>6} {'p95':>6} {'p99':>6} {'max':>6}</code>")
+    for stage, s in stages.items():
+        lines.append(
+            f"<code>{stage:<13} {s['count']:>5} {_ms(s['p50']):>6} {_ms(s['p95']):>6} "
+            f"{_ms(s['p99']):>6} {_ms(s['max']):>6}</code>"
+        )
+
+    if reset:
+        lines.append("\n🔄 Histograms reset")
+    else:
+        lines.append("\n💡 /latency reset - start a new window")
+
+    await message.answer("\n".join(lines), parse_mode=ParseMode.HTML)
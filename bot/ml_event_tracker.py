@@ -1,8 +1,12 @@
 """
 ML Event Tracking System
 Captures all user actions for machine learning
+Writes go through an in-memory write-behind buffer flushed in batches (thread)
 """
+import asyncio
 import logging
+import os
+import threading
 import uuid
 import json
 from datetime import datetime
@@ -14,11 +18,239 @@ from sqlalchemy import text as sql_text
 logger = logging.getLogger(__name__)
 
 
+# Write-behind buffer: flush every FLUSH_SECONDS or as soon as FLUSH_BATCH items wait
+FLUSH_SECONDS = float(os.getenv("ML_TRACKER_FLUSH_SECONDS", "1.0"))
+FLUSH_BATCH = int(os.getenv("ML_TRACKER_FLUSH_BATCH", "500"))
+# Items kept in memory at most (DB down): beyond that new items are dropped and counted
+MAX_PENDING = int(os.getenv("ML_TRACKER_MAX_PENDING", "50000"))
+MAX_FLUSH_ATTEMPTS = 10
+
+# Order of a flush: inserts before the updates that target them
+_INSERT_EVENT = sql_text("""
+    INSERT INTO system_events (
+        event_id, event_type, event_category, user_id,
+        session_id, event_data, importance_score, tags, source
+    ) VALUES (
+        :event_id, :event_type, :category, :user_id,
+        :session_id, :event_data, :importance, :tags, :source
+    )
+""")
+_INSERT_SESSION = sql_text("""
+    INSERT INTO user_behavior_sessions (
+        session_id, user_id, device_type, platform, started_at
+    ) VALUES (:session_id, :user_id, :device, :platform, :now)
+""")
+_INSERT_DECISION = sql_text("""
+    INSERT INTO bet_decisions (
+        decision_id, user_id, parlay_data, user_context,
+        decision, decision_time_seconds, actual_stake,
+        presented_at, decided_at
+    ) VALUES (
+        :id, :user_id, :parlay, :context,
+        :decision, :time, :stake,
+        :presented, :decided
+    )
+""")
+_END_SESSION = sql_text("""
+    UPDATE user_behavior_sessions
+    SET ended_at = :now,
+        duration_seconds = (
+            CAST((julianday(:now) - julianday(started_at)) * 86400 AS INTEGER)
+        )
+    WHERE session_id = :session_id
+""")
+_UPDATE_BET_RESULT = sql_text("""
+    UPDATE bet_decisions
+    SET bet_result = :result,
+        profit_loss = :profit,
+        roi = :roi
+    WHERE decision_id = :id
+""")
+_FLUSH_ORDER = (_INSERT_EVENT, _INSERT_SESSION, _INSERT_DECISION, _END_SESSION, _UPDATE_BET_RESULT)
+
+
 class MLEventTracker:
-    """Comprehensive event tracking for ML/LLM training"""
+    """
+    Comprehensive event tracking for ML/LLM training
+
+    Writes are buffered in memory and flushed in batches from a background
+    task (DB work in a thread): handlers never wait on analytics commits.
+    Stats readers merge the items not flushed yet.
+    """
     
     def __init__(self):
         self.session_cache = {}  # Cache active sessions
+        # (statement, params) waiting for the next flush
+        self._pending: List[tuple] = []
+        # Batch being written (still visible to stats readers until commit)
+        self._in_flight: List[tuple] = []
+        self._lock = threading.Lock()
+        # Held while a batch is written: readers see DB + buffers consistently
+        self._flush_lock = threading.Lock()
+        # session_id -> (user_id, started_at), for durations of unflushed session ends
+        self._open_sessions: Dict[str, tuple] = {}
+        self._flusher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self.stats = {
+            'buffered': 0,
+            'flushed': 0,
+            'flushes': 0,
+            'flush_errors': 0,
+            'dropped': 0,
+        }
+    
+    # ---------- Write-behind buffer ----------
+    
+    def _buffer(self, statement, params: Dict) -> None:
+        """Queue a write for the background flush (never touches the DB)"""
+        with self._lock:
+            if len(self._pending) >= MAX_PENDING:
+                self.stats['dropped'] += 1
+                if self.stats['dropped'] % 1000 == 1:
+                    logger.warning(f"⚠️ ML tracker buffer full ({MAX_PENDING}), {self.stats['dropped']} items dropped")
+                return
+            self._pending.append((statement, params))
+            self.stats['buffered'] += 1
+            pending = len(self._pending)
+        self._ensure_flusher()
+        if pending >= FLUSH_BATCH and self._wakeup is not None:
+            self._wakeup.set()
+    
+    def _ensure_flusher(self) -> None:
+        if self._flusher is not None and not self._flusher.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._wakeup = asyncio.Event()
+        self._flusher = loop.create_task(self._flush_loop())
+        logger.info("📊 ML event tracker write-behind flusher started")
+    
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"ML tracker flush loop error: {e}")
+    
+    async def flush(self) -> int:
+        """Write everything buffered so far, returns the number of items written"""
+        written = 0
+        while True:
+            with self._lock:
+                busy = bool(self._in_flight)
+                if not busy:
+                    if not self._pending:
+                        return written
+                    self._in_flight, self._pending = self._pending, []
+            if busy:
+                # Batch of the background flusher still being written
+                await asyncio.sleep(0.05)
+                continue
+            count = await asyncio.to_thread(self._write_in_flight)
+            if count is None:
+                # DB error: items are back in the buffer, next flush retries
+                return written
+            written += count
+    
+    async def stop(self):
+        """Flush pending items and stop the background flusher"""
+        if self._flusher is not None:
+            self._flusher.cancel()
+            try:
+                await self._flusher
+            except asyncio.CancelledError:
+                pass
+            self._flusher = None
+        await self.flush()
+    
+    def _write_in_flight(self) -> Optional[int]:
+        """
+        Write the in-flight batch: one session, executemany per statement (thread)
+        If the batch fails, retry item by item so one bad row does not cost
+        the whole batch; items that still fail go back to the buffer
+        """
+        batch = self._in_flight
+        
+        with self._flush_lock:
+            error = self._execute(batch)
+            failed = []
+            if error is not None:
+                if len(batch) > 1:
+                    logger.warning(f"⚠️ ML tracker batch of {len(batch)} failed ({error}), retrying item by item")
+                    for item in self._ordered(batch):
+                        item_error = self._execute([item])
+                        if item_error is not None:
+                            error = item_error
+                            failed.append(item)
+                else:
+                    failed = batch
+                if failed:
+                    logger.error(f"Error flushing {len(failed)} ML events: {error}")
+            
+            with self._lock:
+                self._in_flight = []
+                written = len(batch) - len(failed)
+                self.stats['flushed'] += written
+                self.stats['flushes'] += 1
+                if not failed:
+                    return written
+                self.stats['flush_errors'] += 1
+                # Back at the front of the queue, up to MAX_FLUSH_ATTEMPTS flushes
+                retry = []
+                for statement, params in failed:
+                    attempts = params.get('_attempts', 0) + 1
+                    if attempts < MAX_FLUSH_ATTEMPTS:
+                        retry.append((statement, {**params, '_attempts': attempts}))
+                    else:
+                        self.stats['dropped'] += 1
+                self._pending = retry + self._pending
+        return None
+    
+    @staticmethod
+    def _ordered(batch: List[tuple]) -> List[tuple]:
+        """Items in _FLUSH_ORDER (inserts before the updates that target them)"""
+        return sorted(batch, key=lambda item: _FLUSH_ORDER.index(item[0]))
+    
+    @staticmethod
+    def _execute(batch: List[tuple]) -> Optional[Exception]:
+        """Write items in one transaction, returns the error (None on success)"""
+        grouped = {statement: [] for statement in _FLUSH_ORDER}
+        for statement, params in batch:
+            grouped[statement].append(params)
+        
+        db = SessionLocal()
+        try:
+            for statement in _FLUSH_ORDER:
+                if grouped[statement]:
+                    db.execute(statement, grouped[statement])
+            db.commit()
+            return None
+        except Exception as e:
+            db.rollback()
+            return e
+        finally:
+            db.close()
+    
+    def _unflushed(self) -> List[tuple]:
+        with self._lock:
+            return self._in_flight + self._pending
+    
+    def get_buffer_stats(self) -> Dict:
+        """Write-behind counters (pending items, flushes, drops)"""
+        with self._lock:
+            pending = len(self._pending) + len(self._in_flight)
+        return {'pending': pending, **self.stats}
+    
+    # ---------- Tracking API (non-blocking) ----------
     
     async def track_event(
         self,
@@ -42,23 +274,11 @@ class MLEventTracker:
             tags: List of tags for filtering
             source: Where event came from
         """
-        db = SessionLocal()
         try:
-            event_id = str(uuid.uuid4())
-            category = self._categorize_event(event_type)
-            
-            db.execute(sql_text("""
-                INSERT INTO system_events (
-                    event_id, event_type, event_category, user_id,
-                    session_id, event_data, importance_score, tags, source
-                ) VALUES (
-                    :event_id, :event_type, :category, :user_id,
-                    :session_id, :event_data, :importance, :tags, :source
-                )
-            """), {
-                "event_id": event_id,
+            self._buffer(_INSERT_EVENT, {
+                "event_id": str(uuid.uuid4()),
                 "event_type": event_type,
-                "category": category,
+                "category": self._categorize_event(event_type),
                 "user_id": user_id,
                 "session_id": session_id,
                 "event_data": json.dumps(event_data),
@@ -66,15 +286,10 @@ class MLEventTracker:
                 "tags": json.dumps(tags or []),
                 "source": source
             })
-            
-            db.commit()
-            logger.info(f"📊 Event tracked: {event_type} for user {user_id}")
+            logger.debug(f"📊 Event tracked: {event_type} for user {user_id}")
             
         except Exception as e:
             logger.error(f"Error tracking event: {e}")
-            db.rollback()
-        finally:
-            db.close()
     
     async def start_session(
         self,
@@ -84,63 +299,46 @@ class MLEventTracker:
     ) -> str:
         """Start a user behavior session"""
         session_id = str(uuid.uuid4())
+        now = datetime.utcnow()
         
-        db = SessionLocal()
         try:
-            db.execute(sql_text("""
-                INSERT INTO user_behavior_sessions (
-                    session_id, user_id, device_type, platform, started_at
-                ) VALUES (:session_id, :user_id, :device, :platform, :now)
-            """), {
+            self._buffer(_INSERT_SESSION, {
                 "session_id": session_id,
                 "user_id": user_id,
                 "device": device_type,
                 "platform": platform,
-                "now": datetime.utcnow()
+                "now": now
             })
             
-            db.commit()
-            
-            # Cache session
+            # Cache session (a new session replaces the user's previous one)
+            previous = self.session_cache.get(user_id)
+            if previous:
+                self._open_sessions.pop(previous['session_id'], None)
             self.session_cache[user_id] = {
                 'session_id': session_id,
-                'started_at': datetime.utcnow()
+                'started_at': now
             }
+            self._open_sessions[session_id] = (user_id, now)
             
             logger.info(f"🚀 Session started: {session_id} for user {user_id}")
             
         except Exception as e:
             logger.error(f"Error starting session: {e}")
-            db.rollback()
-        finally:
-            db.close()
         
         return session_id
     
     async def end_session(self, session_id: str):
         """End a user session"""
-        db = SessionLocal()
         try:
-            db.execute(sql_text("""
-                UPDATE user_behavior_sessions
-                SET ended_at = :now,
-                    duration_seconds = (
-                        CAST((julianday(:now) - julianday(started_at)) * 86400 AS INTEGER)
-                    )
-                WHERE session_id = :session_id
-            """), {
+            self._buffer(_END_SESSION, {
                 "session_id": session_id,
-                "now": datetime.utcnow()
+                "now": datetime.utcnow(),
+                "_session": self._open_sessions.pop(session_id, None)
             })
-            
-            db.commit()
             logger.info(f"🏁 Session ended: {session_id}")
             
         except Exception as e:
             logger.error(f"Error ending session: {e}")
-            db.rollback()
-        finally:
-            db.close()
     
     async def track_bet_decision(
         self,
@@ -162,34 +360,20 @@ class MLEventTracker:
             decision_time: Seconds to make decision
             stake: Amount bet (if decision was 'bet')
         """
-        db = SessionLocal()
         try:
-            decision_id = str(uuid.uuid4())
-            
-            db.execute(sql_text("""
-                INSERT INTO bet_decisions (
-                    decision_id, user_id, parlay_data, user_context,
-                    decision, decision_time_seconds, actual_stake,
-                    presented_at, decided_at
-                ) VALUES (
-                    :id, :user_id, :parlay, :context,
-                    :decision, :time, :stake,
-                    :presented, :decided
-                )
-            """), {
-                "id": decision_id,
+            now = datetime.utcnow()
+            self._buffer(_INSERT_DECISION, {
+                "id": str(uuid.uuid4()),
                 "user_id": user_id,
                 "parlay": json.dumps(parlay_data),
                 "context": json.dumps(user_context),
                 "decision": decision,
                 "time": decision_time,
                 "stake": stake,
-                "presented": datetime.utcnow(),
-                "decided": datetime.utcnow()
+                "presented": now,
+                "decided": now
             })
             
-            db.commit()
-            
             # Also track as event
             await self.track_event(
                 'bet_decision',
@@ -208,9 +392,6 @@ class MLEventTracker:
             
         except Exception as e:
             logger.error(f"Error tracking bet decision: {e}")
-            db.rollback()
-        finally:
-            db.close()
     
     async def update_bet_result(
         self,
@@ -220,29 +401,17 @@ class MLEventTracker:
         roi: float
     ):
         """Update bet decision with actual outcome"""
-        db = SessionLocal()
         try:
-            db.execute(sql_text("""
-                UPDATE bet_decisions
-                SET bet_result = :result,
-                    profit_loss = :profit,
-                    roi = :roi
-                WHERE decision_id = :id
-            """), {
+            self._buffer(_UPDATE_BET_RESULT, {
                 "result": result,
                 "profit": profit_loss,
                 "roi": roi,
                 "id": decision_id
             })
-            
-            db.commit()
             logger.info(f"✅ Bet result updated: {decision_id} -> {result}")
             
         except Exception as e:
             logger.error(f"Error updating bet result: {e}")
-            db.rollback()
-        finally:
-            db.close()
     
     def _categorize_event(self, event_type: str) -> str:
         """Categorize event for better organization"""
@@ -271,59 +440,93 @@ class MLEventTracker:
         return categories.get(event_type, 'other')
     
     async def get_user_session_stats(self, user_id: str) -> Dict:
-        """Get session statistics for a user"""
-        db = SessionLocal()
-        try:
-            result = db.execute(sql_text("""
-                SELECT 
-                    COUNT(*) as total_sessions,
-                    AVG(duration_seconds) as avg_duration,
-                    SUM(messages_sent) as total_messages,
-                    SUM(bets_clicked) as total_bets_clicked
-                FROM user_behavior_sessions
-                WHERE user_id = :user_id
-            """), {"user_id": user_id}).first()
-            
-            if result:
-                return {
-                    'total_sessions': result.total_sessions or 0,
-                    'avg_duration': result.avg_duration or 0,
-                    'total_messages': result.total_messages or 0,
-                    'total_bets_clicked': result.total_bets_clicked or 0
-                }
-            
-            return {}
-            
-        finally:
-            db.close()
+        """Get session statistics for a user (flushed + still buffered)"""
+        return await asyncio.to_thread(self._user_session_stats, user_id)
     
     async def get_decision_stats(self, user_id: str) -> Dict:
-        """Get betting decision statistics"""
-        db = SessionLocal()
-        try:
-            result = db.execute(sql_text("""
-                SELECT 
-                    COUNT(*) as total_decisions,
-                    SUM(CASE WHEN decision = 'bet' THEN 1 ELSE 0 END) as bets_placed,
-                    SUM(CASE WHEN decision = 'skip' THEN 1 ELSE 0 END) as bets_skipped,
-                    AVG(decision_time_seconds) as avg_decision_time
-                FROM bet_decisions
-                WHERE user_id = :user_id
-            """), {"user_id": user_id}).first()
-            
-            if result and result.total_decisions:
-                return {
-                    'total_decisions': result.total_decisions,
-                    'bets_placed': result.bets_placed or 0,
-                    'bets_skipped': result.bets_skipped or 0,
-                    'bet_rate': (result.bets_placed or 0) / result.total_decisions,
-                    'avg_decision_time': result.avg_decision_time or 0
-                }
-            
+        """Get betting decision statistics (flushed + still buffered)"""
+        return await asyncio.to_thread(self._decision_stats, user_id)
+    
+    def _user_session_stats(self, user_id: str) -> Dict:
+        # DB and buffers read under the flush lock: no item counted twice or missed
+        with self._flush_lock:
+            db = SessionLocal()
+            try:
+                result = db.execute(sql_text("""
+                    SELECT 
+                        COUNT(*) as total_sessions,
+                        COUNT(duration_seconds) as timed_sessions,
+                        AVG(duration_seconds) as avg_duration,
+                        SUM(messages_sent) as total_messages,
+                        SUM(bets_clicked) as total_bets_clicked
+                    FROM user_behavior_sessions
+                    WHERE user_id = :user_id
+                """), {"user_id": user_id}).first()
+            finally:
+                db.close()
+            unflushed = self._unflushed()
+        
+        sessions = (result.total_sessions or 0) if result else 0
+        timed = (result.timed_sessions or 0) if result else 0
+        duration_sum = (result.avg_duration or 0) * timed
+        for statement, params in unflushed:
+            if statement is _INSERT_SESSION and params["user_id"] == user_id:
+                sessions += 1
+            elif statement is _END_SESSION and params["_session"] and params["_session"][0] == user_id:
+                timed += 1
+                duration_sum += int((params["now"] - params["_session"][1]).total_seconds())
+        
+        if not result and not sessions:
             return {}
-            
-        finally:
-            db.close()
+        return {
+            'total_sessions': sessions,
+            'avg_duration': duration_sum / timed if timed else 0,
+            'total_messages': (result.total_messages if result else 0) or 0,
+            'total_bets_clicked': (result.total_bets_clicked if result else 0) or 0
+        }
+    
+    def _decision_stats(self, user_id: str) -> Dict:
+        with self._flush_lock:
+            db = SessionLocal()
+            try:
+                result = db.execute(sql_text("""
+                    SELECT 
+                        COUNT(*) as total_decisions,
+                        SUM(CASE WHEN decision = 'bet' THEN 1 ELSE 0 END) as bets_placed,
+                        SUM(CASE WHEN decision = 'skip' THEN 1 ELSE 0 END) as bets_skipped,
+                        COUNT(decision_time_seconds) as timed_decisions,
+                        AVG(decision_time_seconds) as avg_decision_time
+                    FROM bet_decisions
+                    WHERE user_id = :user_id
+                """), {"user_id": user_id}).first()
+            finally:
+                db.close()
+            unflushed = self._unflushed()
+        
+        total = (result.total_decisions or 0) if result else 0
+        placed = (result.bets_placed or 0) if result else 0
+        skipped = (result.bets_skipped or 0) if result else 0
+        timed = (result.timed_decisions or 0) if result else 0
+        time_sum = (result.avg_decision_time or 0) * timed if result else 0
+        for statement, params in unflushed:
+            if statement is not _INSERT_DECISION or params["user_id"] != user_id:
+                continue
+            total += 1
+            placed += params["decision"] == 'bet'
+            skipped += params["decision"] == 'skip'
+            if params["time"] is not None:
+                timed += 1
+                time_sum += params["time"]
+        
+        if not total:
+            return {}
+        return {
+            'total_decisions': total,
+            'bets_placed': placed,
+            'bets_skipped': skipped,
+            'bet_rate': placed / total,
+            'avg_decision_time': time_sum / timed if timed else 0
+        }
 
 
 # Global instance
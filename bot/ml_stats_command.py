@@ -105,6 +105,20 @@ async def cmd_ml_stats(message: types.Message):
         if stats['last_error']:
             text += f"🔴 Last error: {stats['last_error'][:100]}\n"
         
+        # Write queue (batched worker): drops mean data was lost during a burst
+        from utils.call_logger import get_call_logger
+        queue_stats = get_call_logger().get_stats()
+        dropped = queue_stats['dropped_calls'] + queue_stats['dropped_clicks'] + queue_stats['dropped_results']
+        text += (
+            f"\n📥 <b>WRITE QUEUE</b>\n"
+            f"⏳ Pending: {queue_stats['queue_depth']}\n"
+            f"📦 Batches: {queue_stats['batches']} (max {queue_stats['max_batch']} items)\n"
+            f"💾 Written: {queue_stats['calls_written']} calls, {queue_stats['clicks_written']} clicks\n"
+            f"{'🔴' if dropped else '✅'} Dropped (queue full): {dropped}\n"
+        )
+        if queue_stats['rows_lost']:
+            text += f"🔴 Lost on DB errors: {queue_stats['rows_lost']}\n"
+        
         text += (
             f"\n💾 <b>DATABASE STATS</b>\n"
             f"📞 Total calls logged: {db_stats['total_calls']}\n"
@@ -118,10 +118,8 @@ import re
 from datetime import datetime
 from typing import Optional
 from io import BytesIO
-from PIL import Image, ImageOps, ImageFilter, ImageDraw, ImageFont
-import pytesseract
+from PIL import Image, ImageDraw, ImageFont
 import hashlib
-import sqlite3
 import logging
 
 from telethon import TelegramClient, events, Button
@@ -132,25 +130,18 @@ import base64
 import json
 from dotenv import load_dotenv
 from bookmakers import resolve_bookmaker, identify_bookmaker
+from utils.image_pipeline import ImagePipeline
+from utils.dedup_store import DedupStore
 try:
     import openai
     OPENAI_AVAILABLE = True
 except ImportError:
     OPENAI_AVAILABLE = False
     print("⚠️ OpenAI not available. Install: pip install openai")
-try:
-    from logo_detector import detect_casinos_in_image
-    LOGO_DETECTION_ENABLED = True
-except ImportError:
-    LOGO_DETECTION_ENABLED = False
+from utils.image_pipeline import LOGO_DETECTION_ENABLED
+if not LOGO_DETECTION_ENABLED:
     print("⚠️ Logo detection not available. Install opencv-python: pip install opencv-python")
 
-try:
-    from simple_logo_detector import SimpleLogoDetector
-    SIMPLE_DETECTION_ENABLED = True
-except ImportError:
-    SIMPLE_DETECTION_ENABLED = False
-
 # Configuration
 load_dotenv()
 API_ID = int(os.getenv("TELEGRAM_API_ID", "0"))  # Get from my.telegram.org
@@ -172,11 +163,14 @@ DESTINATION_CHAT_ID_ENV = os.getenv("DESTINATION_CHAT_ID", "").strip()
 DESTINATION_CHAT_ID = int(DESTINATION_CHAT_ID_ENV) if DESTINATION_CHAT_ID_ENV.lstrip("-").isdigit() else None
 STRICT_BOOKS = os.getenv("STRICT_BOOKS", "0").strip() == "1"
 
-# Initialize Telethon client (user account)
-client = TelegramClient('bridge_session', API_ID, API_HASH)
+# Créés dans main(): les workers spawn du pipeline d'images ré-importent ce
+# module (__mp_main__) et ne doivent ouvrir ni la session Telethon ni les stores
+# Telethon client (user account)
+client: Optional[TelegramClient] = None
+
+# OCR / logos dans un pool de processus, photos traitées via une file bornée
+image_pipeline: Optional[ImagePipeline] = None
 
-# Logging setup
-logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
 logger = logging.getLogger("ocr_bridge")
 
 
@@ -315,76 +309,27 @@ def parse_arbitrage_message(text: str) -> Optional[dict]:
         return None
 
 
-SENT_CALLS: set[str] = set()
+# Persistent dedup store (shared with the API process, expired hashes pruned)
+BRIDGE_DEDUP_TTL_HOURS = float(os.getenv("BRIDGE_DEDUP_TTL_HOURS", "48"))
+_ocr_call_dedup: Optional[DedupStore] = None
+
+
+def _get_ocr_call_dedup() -> DedupStore:
+    """Opened on first use (never in the image pipeline workers)"""
+    global _ocr_call_dedup
+    if _ocr_call_dedup is None:
+        # DEDUP_DB_PATH, default ocr_calls.db; only this store imports the old sent_calls table
+        _ocr_call_dedup = DedupStore("ocr_calls", ttl_seconds=BRIDGE_DEDUP_TTL_HOURS * 3600, legacy_table="sent_calls")
+    return _ocr_call_dedup
 
-# SQLite persistent dedup store
-DEDUP_DB_PATH = os.getenv("DEDUP_DB_PATH", "ocr_calls.db")
-_dedup_conn = sqlite3.connect(DEDUP_DB_PATH, check_same_thread=False)
-_dedup_conn.execute(
-    """
-    CREATE TABLE IF NOT EXISTS sent_calls (
-        hash TEXT PRIMARY KEY,
-        created_at TEXT DEFAULT (datetime('now'))
-    )
-    """
-)
-_dedup_conn.commit()
 
 def _mark_if_new(hash_str: str) -> bool:
     """Return True if this hash is new (and mark it), False if already seen."""
-    if hash_str in SENT_CALLS:
-        return False
-    try:
-        cur = _dedup_conn.cursor()
-        cur.execute("SELECT 1 FROM sent_calls WHERE hash=?", (hash_str,))
-        row = cur.fetchone()
-        if row:
-            return False
-        cur.execute("INSERT INTO sent_calls(hash) VALUES (?)", (hash_str,))
-        _dedup_conn.commit()
-        SENT_CALLS.add(hash_str)
-        return True
-    except Exception as e:
-        logger.warning(f"Dedup DB error: {e}")
-        # Fallback to memory-only
-        SENT_CALLS.add(hash_str)
-        return True
+    return _get_ocr_call_dedup().mark_if_new(hash_str)
 
 
 # ===== OCR + Parsing for image screenshots =====
-def extract_text_from_image(photo_bytes: bytes) -> str:
-    """OCR the image bytes to text using Tesseract.
-    Requires tesseract engine installed on system.
-    """
-    try:
-        image = Image.open(BytesIO(photo_bytes))
-        # Basic upscale and preprocessing for better OCR on small or noisy text
-        try:
-            w, h = image.size
-            scale = float(os.getenv("OCR_SCALE", "1.5"))
-            if max(w, h) < 1400:
-                image = image.resize((int(w*scale), int(h*scale)), resample=Image.BICUBIC)
-        except Exception:
-            pass
-        try:
-            image = image.convert("L")
-            image = ImageOps.autocontrast(image)
-            image = image.filter(ImageFilter.SHARPEN)
-        except Exception:
-            pass
-
-        # Tesseract configuration
-        tess_cmd = os.getenv("TESSERACT_CMD", "")
-        if tess_cmd:
-            pytesseract.pytesseract.tesseract_cmd = tess_cmd
-        lang = os.getenv("TESSERACT_LANG", "eng")
-        cfg = os.getenv("TESSERACT_CONFIG", "--oem 3 --psm 6")
-
-        text = pytesseract.image_to_string(image, lang=lang, config=cfg)
-        return text or ""
-    except Exception as e:
-        print(f"❌ OCR error: {e}")
-        return ""
+# extract_text_from_image: voir utils/image_pipeline.py (exécuté dans le pool de processus)
 
 
 def _split_call_blocks(text: str) -> list[tuple[str, str]]:
@@ -1020,7 +965,9 @@ Pour chaque call d'arbitrage:
 Renvoie JSON: {{"calls": [...]}}. RIEN d'autre."""
         
         client = openai.OpenAI(api_key=OPENAI_API_KEY)
-        response = client.chat.completions.create(
+        # Client OpenAI synchrone: dans un thread pour ne pas bloquer la boucle Telethon
+        response = await asyncio.to_thread(
+            client.chat.completions.create,
             model="gpt-4o-mini",
             messages=[{
                 "role": "user",
@@ -1102,23 +1049,20 @@ async def process_photo_event(event) -> None:
     """Download photo, OCR it, parse calls, deduplicate, format, and forward."""
     try:
         buf = BytesIO()
-        await event.download_media(file=buf)
+        with image_pipeline.timer("download"):
+            await event.download_media(file=buf)
         photo_bytes = buf.getvalue()
     except Exception as e:
         print(f"❌ Download photo error: {e}")
         return
 
-    text = extract_text_from_image(photo_bytes)
-    
+    # OCR et logos en parallèle dans le pool; GPT démarre dès que les logos sont connus
+    ocr_task = asyncio.create_task(image_pipeline.ocr(photo_bytes))
+
     # LAYER 1: Visual logo detection
-    visual_casinos = []
-    if LOGO_DETECTION_ENABLED:
-        try:
-            visual_casinos = detect_casinos_in_image(photo_bytes)
-            if visual_casinos:
-                logger.info(f"🎯 LAYER 1 - Visual logos: {visual_casinos}")
-        except Exception as e:
-            logger.warning(f"Logo detection error: {e}")
+    visual_casinos, simple_casinos = await image_pipeline.detect_logos(photo_bytes)
+    if visual_casinos:
+        logger.info(f"🎯 LAYER 1 - Visual logos: {visual_casinos}")
     
     # LAYER 2: GPT-4o-mini Vision parsing
     gpt_calls = []
@@ -1126,21 +1070,19 @@ async def process_photo_event(event) -> None:
         try:
             # Si aucun logo détecté visuellement, dire à GPT d'utiliser OCR seulement
             logos_for_gpt = visual_casinos if visual_casinos else []
-            gpt_calls = await parse_with_gpt_vision(photo_bytes, logos_for_gpt)
+            with image_pipeline.timer("gpt"):
+                gpt_calls = await parse_with_gpt_vision(photo_bytes, logos_for_gpt)
             if gpt_calls:
                 logger.info(f"🧠 LAYER 2 - GPT Vision: {len(gpt_calls)} call(s)")
         except Exception as e:
             logger.error(f"GPT Vision error: {e}")
     
     # Fallback to simple color-based detection if no logos found
-    if not visual_casinos and SIMPLE_DETECTION_ENABLED:
-        try:
-            detector = SimpleLogoDetector()
-            visual_casinos = detector.detect_from_image(photo_bytes)
-            if visual_casinos:
-                logger.info(f"🎨 Simple color detection found: {visual_casinos}")
-        except Exception as e:
-            logger.warning(f"Simple detection error: {e}")
+    if not visual_casinos and simple_casinos:
+        visual_casinos = simple_casinos
+        logger.info(f"🎨 Simple color detection found: {visual_casinos}")
+
+    text = await ocr_task
     
     # Debug: optionally dump OCR text to disk for analysis
     try:
@@ -1325,7 +1267,6 @@ async def send_to_risk0_api(data: dict):
 PROCESSED_MESSAGES = set()
 
 
-@client.on(events.NewMessage)
 async def handle_new_message(event):
     """
     Handler pour les nouveaux messages de Nonoriribot
@@ -1377,11 +1318,11 @@ async def handle_new_message(event):
     print(f"{'='*60}")
     print(message_text[:200] + "..." if len(message_text) > 200 else message_text)
     print(f"{'='*60}")
-    # If photo/image: OCR pipeline
+    # If photo/image: OCR pipeline (file bornée, traité par les consumers du pipeline)
     if is_photo or is_img_doc:
-        await process_photo_event(event)
         if dedup_key:
             PROCESSED_MESSAGES.add(dedup_key)
+        await image_pipeline.enqueue(event)
         return
 
     # Parse le message texte
@@ -1411,6 +1352,12 @@ async def main():
     """
     Main function
     """
+    global client, image_pipeline
+    logging.basicConfig(level=logging.INFO, format='[%(asctime)s] %(levelname)s: %(message)s')
+    client = TelegramClient('bridge_session', API_ID, API_HASH)
+    client.add_event_handler(handle_new_message, events.NewMessage)
+    image_pipeline = ImagePipeline()
+    
     print("🚀 Bridge Nonoriribot → Risk0_bot")
     print("="*60)
     # Connect and handle two-step sign-in via .env code
@@ -1473,8 +1420,13 @@ async def main():
     print("="*60)
     print("\n⏳ En attente de messages...\n")
     
+    image_pipeline.start(process_photo_event)
+    
     # Keep running
-    await client.run_until_disconnected()
+    try:
+        await client.run_until_disconnected()
+    finally:
+        await image_pipeline.stop()
 
 
 if __name__ == "__main__":
@@ -1,8 +1,9 @@
 """
 Core business logic package
 """
-from core.casinos import CASINOS, get_casino, normalize_casino_name
+from core.casinos import CASINOS, get_casino, normalize_casino_name, normalize_casino_names
 from core.calculator import ArbitrageCalculator, BetMode
+from core.batch_calculator import BatchArbitrageCalculator, american_to_decimal_array
 from core.tiers import TierManager, TierLevel
 from core.referrals import ReferralManager
 
@@ -10,8 +11,11 @@ __all__ = [
     "CASINOS",
     "get_casino",
     "normalize_casino_name",
+    "normalize_casino_names",
     "ArbitrageCalculator",
     "BetMode",
+    "BatchArbitrageCalculator",
+    "american_to_decimal_array",
     "TierManager",
     "TierLevel",
     "ReferralManager",
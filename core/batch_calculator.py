@@ -0,0 +1,178 @@
+"""
+Batch (NumPy) version of ArbitrageCalculator
+Prices many calls and/or many bankrolls in one pass
+
+Shapes follow NumPy broadcasting:
+    odds:      (..., K) American odds, K outcomes per call
+    bankrolls: broadcast against odds[..., 0]
+
+    one drop, every user bankroll:   odds (K,)          bankrolls (M,)  -> (M,)
+    a slate of calls, one bankroll:  odds (N, K)        bankrolls ()    -> (N,)
+    a slate of calls x every user:   odds (N, 1, K)     bankrolls (M,)  -> (N, M)
+
+Values are not rounded (ArbitrageCalculator rounds to 2 decimals).
+"""
+from typing import Dict
+
+import numpy as np
+
+
+def american_to_decimal_array(american_odds) -> np.ndarray:
+    """
+    Convert American odds to decimal odds (element-wise)
+
+    Args:
+        american_odds: Array-like of American odds (e.g., [+250, -200])
+
+    Returns:
+        Float array of decimal odds (e.g., [3.50, 1.50])
+    """
+    odds = np.asarray(american_odds, dtype=np.float64)
+    with np.errstate(divide='ignore'):
+        return np.where(odds > 0, odds / 100 + 1, 100 / np.abs(odds) + 1)
+
+
+class BatchArbitrageCalculator:
+    """
+    SAFE / RISKED / optimal-risk calculations over arrays of calls and bankrolls
+    Same formulas as ArbitrageCalculator
+    """
+
+    @staticmethod
+    def arbitrage_percentage(odds) -> np.ndarray:
+        """
+        Arbitrage percentage for each call (0 when there is no arbitrage)
+
+        Args:
+            odds: American odds, shape (..., K)
+
+        Returns:
+            Array of shape odds.shape[:-1]
+        """
+        inverse_sum = (1 / american_to_decimal_array(odds)).sum(axis=-1)
+        return np.where(inverse_sum < 1.0, (1 - inverse_sum) / inverse_sum * 100, 0.0)
+
+    @staticmethod
+    def safe_stakes(odds, bankrolls) -> Dict[str, np.ndarray]:
+        """
+        SAFE mode stakes (equal return on every outcome)
+
+        Args:
+            odds: American odds, shape (..., K)
+            bankrolls: Total amount to bet, broadcast against odds[..., 0]
+
+        Returns:
+            Dictionary of arrays:
+            stakes / returns (..., K), profit, profit_percentage, roi_percent,
+            arb_percentage, inverse_sum, has_arbitrage (...)
+        """
+        decimal_odds = american_to_decimal_array(odds)
+        inverse = 1 / decimal_odds
+        inverse_sum = inverse.sum(axis=-1)
+        bankrolls = np.asarray(bankrolls, dtype=np.float64)
+
+        # Same stakes as ArbitrageCalculator.calculate_safe_stakes (even without arbitrage)
+        scale = bankrolls / inverse_sum
+        stakes = scale[..., None] * inverse
+        returns = stakes * decimal_odds
+        profit = returns.min(axis=-1) - bankrolls
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            roi = np.where(bankrolls > 0, profit / bankrolls * 100, 0.0)
+
+        return {
+            "stakes": stakes,
+            "returns": returns,
+            "profit": profit,
+            "profit_percentage": roi,
+            "roi_percent": roi,
+            "arb_percentage": np.broadcast_to((1 - inverse_sum) / inverse_sum * 100, profit.shape),
+            "inverse_sum": np.broadcast_to(inverse_sum, profit.shape),
+            "has_arbitrage": np.broadcast_to(inverse_sum < 1.0, profit.shape),
+        }
+
+    @staticmethod
+    def risked_stakes(
+        odds,
+        bankrolls,
+        risk_percentage=5.0,
+        favor_outcome=0,
+        risk_amount=None,
+    ) -> Dict[str, np.ndarray]:
+        """
+        RISKED mode stakes (2-way only): the unfavored outcome loses risk_amount
+
+        Args:
+            odds: American odds, shape (..., 2)
+            bankrolls: Total amount to bet, broadcast against odds[..., 0]
+            risk_percentage: Percentage of bankroll willing to risk (scalar or array)
+            favor_outcome: Index of outcome to favor, 0 or 1 (scalar or array)
+            risk_amount: Fixed amount willing to risk (overrides risk_percentage)
+
+        Returns:
+            Dictionary of arrays:
+            stakes / returns / profits (..., 2), max_profit, risk_loss,
+            risk_reward_ratio, favored_outcome (...)
+        """
+        decimal_odds = american_to_decimal_array(odds)
+        if decimal_odds.shape[-1] != 2:
+            raise ValueError("RISKED mode currently supports only 2-way bets")
+
+        bankrolls = np.asarray(bankrolls, dtype=np.float64)
+        if risk_amount is None:
+            risk_amount = bankrolls * (np.asarray(risk_percentage, dtype=np.float64) / 100)
+        risk_amount = np.asarray(risk_amount, dtype=np.float64)
+        favor = np.asarray(favor_outcome, dtype=np.int64)
+
+        # stake_unfavored * odd_unfavored = bankroll - risk_amount
+        odd_unfavored = np.where(favor == 0, decimal_odds[..., 1], decimal_odds[..., 0])
+        stake_unfavored = (bankrolls - risk_amount) / odd_unfavored
+        stake_favored = bankrolls - stake_unfavored
+
+        stake_0 = np.where(favor == 0, stake_favored, stake_unfavored)
+        stake_1 = np.where(favor == 0, stake_unfavored, stake_favored)
+        stakes = np.stack(np.broadcast_arrays(stake_0, stake_1), axis=-1)
+        returns = stakes * decimal_odds
+        profits = returns - np.asarray(bankrolls)[..., None]
+
+        max_profit = profits.max(axis=-1)
+        risk_loss = np.abs(profits.min(axis=-1))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ratio = np.where(risk_loss > 0, max_profit / risk_loss, 0.0)
+
+        return {
+            "stakes": stakes,
+            "returns": returns,
+            "profits": profits,
+            "max_profit": max_profit,
+            "risk_loss": risk_loss,
+            "risk_reward_ratio": ratio,
+            "favored_outcome": np.broadcast_to(favor, max_profit.shape),
+        }
+
+    @staticmethod
+    def optimal_risk(odds, bankrolls, max_risk_percentage=5.0) -> Dict[str, np.ndarray]:
+        """
+        Optimal RISKED bet for each call: favors the outcome with the better
+        risk/reward ratio (outcome 1 on ties, like calculate_optimal_risk)
+
+        Args:
+            odds: American odds, shape (..., 2)
+            bankrolls: Total bankroll, broadcast against odds[..., 0]
+            max_risk_percentage: Maximum risk as percentage of bankroll
+
+        Returns:
+            Same arrays as risked_stakes, for the chosen outcome
+        """
+        bankrolls = np.asarray(bankrolls, dtype=np.float64)
+        risk_amount = bankrolls * (np.asarray(max_risk_percentage, dtype=np.float64) / 100)
+        result_0 = BatchArbitrageCalculator.risked_stakes(odds, bankrolls, favor_outcome=0, risk_amount=risk_amount)
+        result_1 = BatchArbitrageCalculator.risked_stakes(odds, bankrolls, favor_outcome=1, risk_amount=risk_amount)
+
+        # calculate_optimal_risk compares the ratios rounded to 2 decimals
+        pick_0 = np.round(result_0["risk_reward_ratio"], 2) > np.round(result_1["risk_reward_ratio"], 2)
+        best = {}
+        for key, value_0 in result_0.items():
+            mask = pick_0[..., None] if value_0.ndim > pick_0.ndim else pick_0
+            best[key] = np.where(mask, value_0, result_1[key])
+        return best
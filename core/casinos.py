@@ -3,6 +3,8 @@ Casino configuration and referral links
 Canadian/Quebec market casinos
 """
 import os
+from functools import lru_cache
+from typing import Iterable, List
 
 # Casino configuration with referral links
 # TODO: Replace placeholder links with your actual referral links from affiliate programs
@@ -136,6 +138,68 @@ CASINOS = {
 }
 
 
+# OCR / notification misspellings seen by the bridges (bookmakers.ALIASES used by
+# bridge.py::_canon_book, ocr_patterns of casino_logos.json used by bridge_hybrid.py)
+OCR_ALIASES = {
+    "888sport": ["888-sport"],
+    "BET99": ["b99", "bets9", "betsg", "bet-99"],
+    "Betsson": ["betson", "betss0", "betsso"],
+    "Coolbet": [
+        "coobet", "colbet", "coolber", "coolser", "coolsecr", "cooser", "coosecr",
+        "cootsec", "cootsecr", "coouser", "costser",
+    ],
+    "iBet": ["lbet", "1bet"],
+    "Jackpot.bet": ["jackpot bet"],
+    "Pinnacle": ["pinacle"],
+    "Sports Interaction": ["sports-interaction", "sports inter", "sia"],
+}
+
+
+def _clean(name: str) -> str:
+    """ "@ Betsson " -> "betsson" """
+    return name.strip().replace("@", "").strip().lower()
+
+
+def _compact(name: str) -> str:
+    """ "Mise-o-jeu" / "mise o jeu" -> "miseojeu" """
+    return "".join(ch for ch in name if ch.isalnum())
+
+
+def _build_casino_index() -> tuple:
+    """
+    Index built once at import: lower-cased key / name / aliases -> CASINOS key,
+    plus the same names without spaces or punctuation for a second lookup.
+    Entries of CASINOS win over OCR_ALIASES (e.g. "bet105" stays bet105).
+    """
+    exact, compact = {}, {}
+    names = [
+        (key, [key, data["name"], *data.get("aliases", [])])
+        for key, data in CASINOS.items()
+    ]
+    names += [(key, aliases) for key, aliases in OCR_ALIASES.items() if key in CASINOS]
+    for key, variants in names:
+        for variant in variants:
+            cleaned = _clean(variant)
+            if cleaned:
+                exact.setdefault(cleaned, key)
+            squeezed = _compact(cleaned)
+            if squeezed:
+                compact.setdefault(squeezed, key)
+    return exact, compact
+
+
+_CASINO_INDEX, _COMPACT_INDEX = _build_casino_index()
+
+
+@lru_cache(maxsize=4096)
+def _resolve_casino_key(name: str):
+    cleaned = _clean(name)
+    key = _CASINO_INDEX.get(cleaned)
+    if key is None:
+        key = _COMPACT_INDEX.get(_compact(cleaned))
+    return key
+
+
 def normalize_casino_name(name: str) -> str:
     """
     Normalize casino name for matching
@@ -143,6 +207,7 @@ def normalize_casino_name(name: str) -> str:
     - "@ Betsson" -> "betsson"
     - "PINNACLE" -> "pinnacle"
     - "Pinny" -> "pinnacle"
+    - "Coolser" / "Mise o jeu" (OCR, spacing) -> "Coolbet" / "Mise-o-jeu"
     
     Args:
         name: Raw casino name from source
@@ -152,26 +217,20 @@ def normalize_casino_name(name: str) -> str:
     """
     if not name:
         return ""
+    return _resolve_casino_key(name) or name
+
+
+def normalize_casino_names(names: Iterable[str]) -> List[str]:
+    """
+    Bulk version of normalize_casino_name (payload outcomes, legs...)
     
-    # Remove @ symbol and extra spaces
-    cleaned = name.strip().replace("@", "").strip().lower()
-    
-    # Direct match
-    for casino_key, casino_data in CASINOS.items():
-        if cleaned == casino_key.lower():
-            return casino_key
-        
-        # Check main name
-        if cleaned == casino_data["name"].lower():
-            return casino_key
+    Args:
+        names: Raw casino names
         
-        # Check aliases
-        for alias in casino_data.get("aliases", []):
-            if cleaned == alias.lower():
-                return casino_key
-    
-    # Return original if no match
-    return name
+    Returns:
+        Normalized names, same order and length
+    """
+    return [normalize_casino_name(name) for name in names]
 
 
 def get_casino(name: str) -> dict:
@@ -184,18 +243,10 @@ def get_casino(name: str) -> dict:
     Returns:
         Casino configuration dict or None if not found
     """
-    normalized = normalize_casino_name(name)
-    
-    # Try direct lookup
-    if normalized in CASINOS:
-        return CASINOS[normalized]
-    
-    # Try case-insensitive search
-    for key, value in CASINOS.items():
-        if key.lower() == normalized.lower():
-            return value
-    
-    return None
+    if not name:
+        return None
+    key = _resolve_casino_key(name)
+    return CASINOS[key] if key is not None else None
 
 
 def get_casino_referral_link(name: str) -> str:
@@ -3,6 +3,7 @@ Logo detection using template matching with OpenCV
 Compares casino logos in screenshots with reference PNG files
 """
 import cv2
+import hashlib
 import numpy as np
 import os
 from PIL import Image
@@ -10,11 +11,30 @@ from io import BytesIO
 import json
 from typing import List, Dict, Tuple, Optional
 
+# Pyramide de recherche: passe grossière à 1/2 résolution, puis raffinement local
+COARSE_FACTOR = 0.5
+# Les scores à basse résolution sont plus bas (flou): marge sous le seuil final
+COARSE_MARGIN = 0.15
+# Nombre de pics grossiers raffinés par template/échelle
+COARSE_CANDIDATES = 3
+# En dessous de cette taille (px), un template réduit n'est plus discriminant
+MIN_COARSE_TEMPLATE = 8
+# Marge (px pleine résolution) autour du candidat grossier lors du raffinement
+REFINE_PAD = int(round(2 / COARSE_FACTOR)) + 2
+
+
 class LogoDetector:
-    def __init__(self, logo_dir: str = "logos/", config_file: str = "casino_logos.json"):
+    def __init__(self, logo_dir: str = "logos/", config_file: str = "casino_logos.json",
+                 search_regions: Optional[List[Tuple[float, float, float, float]]] = None):
         self.logo_dir = logo_dir
         self.templates = {}
         self.casino_names = {}
+        # Zones (fractions x0, y0, x1, y1) où les logos apparaissent sur les cartes source;
+        # None = image entière. Peut aussi venir de "search_regions" dans casino_logos.json
+        self.search_regions = search_regions
+        # Dernière image décodée (grayscale + pyramide), partagée entre templates et appels
+        self._image_cache_key = None
+        self._image_cache = None
         self._load_templates(config_file)
     
     def _load_templates(self, config_file: str):
@@ -24,6 +44,9 @@ class LogoDetector:
             with open(config_file, "r", encoding="utf-8") as f:
                 data = json.load(f)
             
+            if self.search_regions is None and data.get("search_regions"):
+                self.search_regions = [tuple(r) for r in data["search_regions"]]
+            
             for casino in data.get("casinos", []):
                 name = casino.get("name")
                 logo_file = casino.get("logo_file")
@@ -57,47 +80,118 @@ class LogoDetector:
             height = int(template.shape[0] * scale)
             if width > 10 and height > 10:  # Minimum size check
                 scaled = cv2.resize(template, (width, height))
-                scaled_templates.append((scale, scaled))
+                # Version réduite pour la passe grossière (None si trop petite)
+                cw, ch = int(width * COARSE_FACTOR), int(height * COARSE_FACTOR)
+                coarse = None
+                if min(cw, ch) >= MIN_COARSE_TEMPLATE:
+                    coarse = cv2.resize(scaled, (cw, ch), interpolation=cv2.INTER_AREA)
+                scaled_templates.append((scale, scaled, coarse))
         return scaled_templates
     
+    def _prepare_image(self, image_bytes: bytes):
+        """Décode l'image une seule fois (grayscale + niveau réduit), avec cache 1 entrée."""
+        # Digest 128 bits: une collision de hash() (64 bits) renverrait l'image précédente
+        key = hashlib.blake2b(image_bytes, digest_size=16).digest()
+        if key == self._image_cache_key:
+            return self._image_cache
+        nparr = np.frombuffer(image_bytes, np.uint8)
+        img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
+        prepared = self._prepare_gray(img) if img is not None else None
+        self._image_cache_key = key
+        self._image_cache = prepared
+        return prepared
+    
+    def _prepare_gray(self, img: np.ndarray) -> Dict:
+        h, w = img.shape[:2]
+        regions = []
+        for x0, y0, x1, y1 in (self.search_regions or [(0.0, 0.0, 1.0, 1.0)]):
+            rx0, ry0 = int(x0 * w), int(y0 * h)
+            rx1, ry1 = int(np.ceil(x1 * w)), int(np.ceil(y1 * h))
+            roi = img[ry0:ry1, rx0:rx1]
+            if roi.size == 0:
+                continue
+            small = cv2.resize(roi, None, fx=COARSE_FACTOR, fy=COARSE_FACTOR, interpolation=cv2.INTER_AREA)
+            regions.append({"offset": (rx0, ry0), "full": roi, "coarse": small})
+        return {"gray": img, "regions": regions}
+    
+    @staticmethod
+    def _match_scale(region: Dict, scaled: np.ndarray, coarse: Optional[np.ndarray], threshold: float) -> Tuple[float, Tuple[int, int]]:
+        """
+        Meilleur score TM_CCOEFF_NORMED d'un template dans une région (coarse-to-fine).
+        Le score renvoyé est toujours celui de la pleine résolution.
+        """
+        full = region["full"]
+        th, tw = scaled.shape[:2]
+        if th > full.shape[0] or tw > full.shape[1]:
+            return 0.0, (0, 0)
+        
+        small = region["coarse"]
+        if coarse is None or coarse.shape[0] > small.shape[0] or coarse.shape[1] > small.shape[1]:
+            # Template trop petit pour la passe grossière: recherche pleine résolution
+            result = cv2.matchTemplate(full, scaled, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, max_loc = cv2.minMaxLoc(result)
+            return max_val, max_loc
+        
+        result = cv2.matchTemplate(small, coarse, cv2.TM_CCOEFF_NORMED)
+        ch, cw = coarse.shape[:2]
+        best_val, best_loc = 0.0, (0, 0)
+        # Raffiner les COARSE_CANDIDATES meilleurs pics (à basse résolution, un leurre
+        # peut dépasser le vrai logo), avec suppression des non-maxima entre pics
+        for _ in range(COARSE_CANDIDATES):
+            _, coarse_val, _, (cx, cy) = cv2.minMaxLoc(result)
+            if coarse_val < threshold - COARSE_MARGIN:
+                break
+            result[max(0, cy - ch // 2):cy + ch // 2 + 1, max(0, cx - cw // 2):cx + cw // 2 + 1] = -1
+            
+            # Raffinement pleine résolution autour du candidat
+            x, y = int(cx / COARSE_FACTOR), int(cy / COARSE_FACTOR)
+            x0, y0 = max(0, x - REFINE_PAD), max(0, y - REFINE_PAD)
+            x1 = min(full.shape[1], x + tw + REFINE_PAD)
+            y1 = min(full.shape[0], y + th + REFINE_PAD)
+            refined = cv2.matchTemplate(full[y0:y1, x0:x1], scaled, cv2.TM_CCOEFF_NORMED)
+            _, max_val, _, (mx, my) = cv2.minMaxLoc(refined)
+            if max_val > best_val:
+                best_val, best_loc = max_val, (x0 + mx, y0 + my)
+        return best_val, best_loc
+    
     def detect_logos(self, image_bytes: bytes, threshold: float = 0.5) -> List[Dict]:
         """
         Detect casino logos in an image.
         Returns list of detected casinos with confidence and location.
         """
+        try:
+            prepared = self._prepare_image(image_bytes)
+        except Exception as e:
+            print(f"❌ Error detecting logos: {e}")
+            return []
+        if prepared is None:
+            return []
+        return self._detect_prepared(prepared, threshold)
+    
+    def _detect_prepared(self, prepared: Dict, threshold: float) -> List[Dict]:
         detected = []
         
         try:
-            # Convert bytes to OpenCV image
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-            if img is None:
-                return detected
-            
             # For each casino template
             for casino_name, template_data in self.templates.items():
                 best_match = None
                 best_score = 0
                 
-                # Try multiple scales
-                for scale, scaled_template in template_data["scales"]:
-                    # Skip if template is larger than image
-                    if scaled_template.shape[0] > img.shape[0] or scaled_template.shape[1] > img.shape[1]:
-                        continue
-                    
-                    # Template matching
-                    result = cv2.matchTemplate(img, scaled_template, cv2.TM_CCOEFF_NORMED)
-                    min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
-                    
-                    if max_val > best_score and max_val > threshold:
-                        best_score = max_val
-                        best_match = {
-                            "casino": casino_name,
-                            "confidence": float(max_val),
-                            "location": max_loc,
-                            "scale": scale,
-                            "emoji": self.casino_names[casino_name]["emoji"]
-                        }
+                for region in prepared["regions"]:
+                    ox, oy = region["offset"]
+                    # Try multiple scales
+                    for scale, scaled_template, coarse_template in template_data["scales"]:
+                        score, loc = self._match_scale(region, scaled_template, coarse_template, threshold)
+                        
+                        if score > best_score and score > threshold:
+                            best_score = score
+                            best_match = {
+                                "casino": casino_name,
+                                "confidence": float(score),
+                                "location": (loc[0] + ox, loc[1] + oy),
+                                "scale": scale,
+                                "emoji": self.casino_names[casino_name]["emoji"]
+                            }
                 
                 if best_match:
                     detected.append(best_match)
@@ -114,22 +208,21 @@ class LogoDetector:
         region = (x, y, width, height)
         """
         try:
-            # Convert bytes to OpenCV image
-            nparr = np.frombuffer(image_bytes, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-            if img is None:
+            prepared = self._prepare_image(image_bytes)
+            if prepared is None:
                 return None
+            img = prepared["gray"]
             
             # Extract region of interest
             x, y, w, h = region
             roi = img[y:y+h, x:x+w]
             
-            # Create temporary image bytes from ROI
-            _, buffer = cv2.imencode('.png', roi)
-            roi_bytes = buffer.tobytes()
-            
-            # Detect logos in ROI
-            detections = self.detect_logos(roi_bytes, threshold=0.6)
+            # Detect logos in ROI (directement sur le grayscale, sans ré-encodage PNG)
+            saved_regions, self.search_regions = self.search_regions, None
+            try:
+                detections = self._detect_prepared(self._prepare_gray(roi), threshold=0.6)
+            finally:
+                self.search_regions = saved_regions
             
             if detections:
                 # Return casino with highest confidence
@@ -180,13 +273,24 @@ class LogoDetector:
         return matches
 
 
+_detector_instance = None
+
+
+def get_logo_detector() -> LogoDetector:
+    """Détecteur partagé: templates et pyramides chargés une fois par processus"""
+    global _detector_instance
+    if _detector_instance is None:
+        _detector_instance = LogoDetector()
+    return _detector_instance
+
+
 # Standalone function for integration with bridge.py
 def detect_casinos_in_image(image_bytes: bytes, fallback_ocr_casinos: List[str] = None) -> List[str]:
     """
     Simple function to detect casinos in an image.
     Returns list of detected casino names, with OCR fallback.
     """
-    detector = LogoDetector()
+    detector = get_logo_detector()
     # Use lower base threshold to detect real logos
     detections = detector.detect_logos(image_bytes, threshold=0.75)
     
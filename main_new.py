@@ -3,7 +3,9 @@ ArbitrageBot Canada - Main Entry Point
 Integrates existing bot with new tier/referral system
 """
 import asyncio
+import functools
 import os
+import time
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
@@ -43,16 +45,26 @@ from config import BOT_TOKEN, ADMIN_CHAT_ID
 from utils.parser_ai import extract_from_email
 from utils.image_card import generate_card
 from utils.drops_stats import get_today_stats_for_tier, record_drop
+from utils.drop_ingest import upsert_drop, update_drop_enrichment
 from realtime_parlay_generator import on_drop_received
 from utils.odds_api_links import get_links_for_drop, get_fallback_url
-from utils.odds_enricher import enrich_alert_with_api
+from utils.enrichment_queue import enrichment_queue
+from utils.events_snapshot import events_snapshot
 from utils.last_calls_store import push_good_odds, push_middle
+from utils.send_scheduler import SendScheduler, LANE_ARBITRAGE, LANE_MIDDLE, LANE_GOOD_EV
+from utils.latency_tracer import latency_tracer
+from utils.pending_call_store import PendingCallStore
+from utils.dedup_store import DedupStore
 from utils.call_processor import (
     BettingCall, Side, EventDatetime, ArbAnalysis,
     process_call_from_drop,
+    build_call_template,
+    project_call_for_bankroll,
+    project_call_for_bankrolls,
     enrich_call_with_odds_api,
     analyze_arbitrage_two_way,
     format_call_message,
+    CallMessageTemplate,
     should_send_call
 )
 
@@ -63,17 +75,18 @@ from models.drop_event import DropEvent
 
 # In-memory stores
 DROPS = {}  # Store for drops
-PENDING_CALLS = {}  # Store for BettingCalls awaiting verification
-# Map drop_event_id (DB id) -> BettingCall.call_id for per-call CASHH changes
-CALL_IDS_BY_DROP_ID: dict[str, str] = {}
-PENDING_CALLS_FILE = "pending_calls.pkl"
+# BettingCalls awaiting verification, by call_id and drop_event_id (DB id),
+# TTL-bounded and persisted entry by entry (pending_calls.db)
+PENDING_CALLS = PendingCallStore()
 
-# Deduplication store: hash -> timestamp
-SENT_CALLS_CACHE = {}  # {call_hash: timestamp}
+# Deduplication store: call hashes seen in the last CACHE_EXPIRY_MINUTES
+# (bounded time buckets + shared SQLite, see utils/dedup_store.py)
 CACHE_EXPIRY_MINUTES = 10  # Keep hashes for 10 minutes
+CALL_DEDUP = DedupStore("calls", ttl_seconds=CACHE_EXPIRY_MINUTES * 60)
 
 # Initialize
 bot = Bot(token=BOT_TOKEN)
+send_scheduler = SendScheduler(bot)
 dp = Dispatcher(storage=MemoryStorage())
 app = FastAPI()
 calc_router = Router()
@@ -137,97 +150,23 @@ from fastapi import WebSocket, WebSocketDisconnect
 @app.websocket("/ws/live")
 async def websocket_live_endpoint(websocket: WebSocket):
     """WebSocket for real-time call updates"""
-    await ws_manager.connect(websocket)
+    await ws_manager.connect(websocket, dict(websocket.query_params))
     try:
         while True:
             data = await websocket.receive_text()
-            if data == "ping":
-                await websocket.send_json({"type": "pong"})
+            ws_manager.handle_text(websocket, data)
     except WebSocketDisconnect:
         ws_manager.disconnect(websocket)
     except Exception:
         ws_manager.disconnect(websocket)
 
-# Early logger initialization (used by load_pending_calls)
+# Early logger initialization
 logger = logging.getLogger(__name__)
 
 # ===== CASINO & SPORT FILTER HELPERS =====
-def user_passes_casino_filter(user, casinos: list) -> bool:
-    """
-    Check if user's selected_casinos filter allows these casinos.
-    Returns True if user should receive alert, False if filtered out.
-    If user has no filter (null/empty), allow all casinos.
-    """
-    import json
-    try:
-        selected_casinos_str = user.selected_casinos
-        if not selected_casinos_str:
-            return True  # No filter = allow all
-        
-        selected = json.loads(selected_casinos_str)
-        if not selected:
-            return True  # Empty list = allow all
-        
-        # Normalize casino names for comparison
-        selected_lower = [c.lower().strip() for c in selected]
-        casinos_lower = [c.lower().strip() for c in casinos if c]
-        
-        # Check if ANY casino from alert is in user's selected list
-        for casino in casinos_lower:
-            if casino in selected_lower:
-                return True
-        
-        logger.debug(f"🚫 Casino filter blocked: casinos={casinos}, selected={selected}")
-        return False
-    except Exception as e:
-        logger.warning(f"⚠️ Casino filter error: {e}")
-        return True  # On error, allow through
-
-def user_passes_sport_filter(user, sport: str) -> bool:
-    """
-    Check if user's selected_sports filter allows this sport.
-    Returns True if user should receive alert, False if filtered out.
-    If user has no filter (null/empty), allow all sports.
-    """
-    import json
-    try:
-        selected_sports_str = user.selected_sports
-        if not selected_sports_str:
-            return True  # No filter = allow all
-        
-        selected = json.loads(selected_sports_str)
-        if not selected:
-            return True  # Empty list = allow all
-        
-        # Normalize sport name
-        sport_lower = (sport or "").lower().strip()
-        selected_lower = [s.lower().strip() for s in selected]
-        
-        # Check if sport is in user's selected list
-        if sport_lower in selected_lower:
-            return True
-        
-        # Also check partial matches (e.g., "nba" matches "basketball")
-        sport_mappings = {
-            'nba': 'basketball', 'ncaa basketball': 'basketball', 'ncaab': 'basketball',
-            'nfl': 'football', 'ncaa football': 'football', 'ncaaf': 'football',
-            'nhl': 'hockey', 'ice hockey': 'hockey',
-            'mlb': 'baseball',
-            'mls': 'soccer', 'la liga': 'soccer', 'premier league': 'soccer', 'serie a': 'soccer', 'bundesliga': 'soccer', 'ligue 1': 'soccer',
-            'ufc': 'mma', 'mixed martial arts': 'mma',
-            'atp': 'tennis', 'wta': 'tennis',
-        }
-        
-        # Try mapping
-        for key, mapped in sport_mappings.items():
-            if key in sport_lower and mapped in selected_lower:
-                return True
-        
-        logger.debug(f"🚫 Sport filter blocked: sport={sport}, selected={selected}")
-        return False
-    except Exception as e:
-        logger.warning(f"⚠️ Sport filter error: {e}")
-        return True  # On error, allow through
+# Defined next to the subscriber index so the fan-out and per-user checks share one semantics
+from utils.subscriber_index import subscriber_index
+from utils.user_prefs import user_prefs
 
 def generate_call_hash(call_data: dict) -> str:
     """
@@ -267,54 +206,20 @@ def is_duplicate_call(call_data: dict) -> bool:
     Check if this call was already sent recently (within CACHE_EXPIRY_MINUTES)
     Returns True if duplicate, False if new call
     """
-    global SENT_CALLS_CACHE
-    
-    # Clean old entries first
-    now = datetime.now()
-    expired_keys = [
-        key for key, timestamp in SENT_CALLS_CACHE.items()
-        if (now - timestamp).total_seconds() > CACHE_EXPIRY_MINUTES * 60
-    ]
-    for key in expired_keys:
-        del SENT_CALLS_CACHE[key]
-    
     # Generate hash for this call
     call_hash = generate_call_hash(call_data)
     
-    # Check if already sent recently
-    if call_hash in SENT_CALLS_CACHE:
-        time_since = (now - SENT_CALLS_CACHE[call_hash]).total_seconds()
+    # Check-and-mark (no sweep: expired time buckets are dropped as a whole)
+    if not CALL_DEDUP.mark_if_new(call_hash):
+        last_seen = CALL_DEDUP.last_seen(call_hash)
+        time_since = time.time() - last_seen if last_seen else 0
         logger.warning(f"🚫 DUPLICATE CALL DETECTED! Hash: {call_hash}, sent {time_since:.0f}s ago")
         return True
     
-    # Mark as sent
-    SENT_CALLS_CACHE[call_hash] = now
     logger.info(f"✅ New call registered: {call_hash}")
     return False
 
 
-# Load pending calls from disk if exists
-def load_pending_calls():
-    global PENDING_CALLS
-    try:
-        import pickle
-        if os.path.exists(PENDING_CALLS_FILE):
-            with open(PENDING_CALLS_FILE, 'rb') as f:
-                PENDING_CALLS = pickle.load(f)
-            logger.info(f"✅ Loaded {len(PENDING_CALLS)} pending calls from disk")
-    except Exception as e:
-        logger.warning(f"⚠️ Failed to load pending calls: {e}")
-
-def save_pending_calls():
-    try:
-        import pickle
-        with open(PENDING_CALLS_FILE, 'wb') as f:
-            pickle.dump(PENDING_CALLS, f)
-    except Exception as e:
-        logger.warning(f"⚠️ Failed to save pending calls: {e}")
-
-load_pending_calls()
-
 # Debug flag: allow sending duplicates (for testing)
 ALLOW_DUPLICATE_SEND = os.getenv("ALLOW_DUPLICATE_SEND", "1").strip() in ("1", "true", "True")
 DEBUG_ADMIN_PREVIEW = os.getenv("DEBUG_ADMIN_PREVIEW", "0").strip() in ("1", "true", "True")
@@ -408,6 +313,9 @@ dp.include_router(admin_password_handlers.router)  # Added this line
 # ML Stats Command (admin monitoring) - Put here for command priority
 from bot import ml_stats_command
 dp.include_router(ml_stats_command.router)
+# Hot-path latency (admin monitoring, same data as /health/latency)
+from bot import latency_command
+dp.include_router(latency_command.router)
 
 # ... (rest of the code remains the same)
 # 🎯 CRITICAL: Register bet handlers DIRECTLY on dispatcher BEFORE calc_router
@@ -936,7 +844,9 @@ async def send_arbitrage_alert_to_users(arb_data: dict):
         arb_data: Parsed arbitrage data from source bot
     """
     # DEDUPLICATION CHECK - Block duplicate calls
-    if is_duplicate_call(arb_data):
+    with latency_tracer.span("dedup"):
+        is_duplicate = is_duplicate_call(arb_data)
+    if is_duplicate:
         logger.warning(f"🚫 ARBITRAGE DUPLICATE BLOCKED: {arb_data.get('match', 'Unknown')} - {arb_data.get('arb_percentage', 0)}%")
         return
     
@@ -956,116 +866,94 @@ async def send_arbitrage_alert_to_users(arb_data: dict):
         # arb_data should already be enriched if it's a new call (not duplicate)
         # This saves 2-3s per call by avoiding redundant API calls
 
-        # Get all active users (notifications filter handled per-user to treat NULL as enabled)
-        users = db.query(User).filter(
-            User.is_active == True,
-            User.is_banned == False,
-        ).all()
+        # Eligible recipients from the in-memory subscriber index (set intersections
+        # on tier / % range / casinos / sport instead of a loop over every User row)
+        casinos = []
+        for outcome in arb_data.get('outcomes', []):
+            casino = outcome.get('casino') or outcome.get('bookmaker', '')
+            if casino:
+                casinos.append(casino)
+        sport = arb_data.get('sport', '') or arb_data.get('league', '')
+        eligibility = subscriber_index.eligible_for_arbitrage(
+            float(arb_data.get('arb_percentage', 0)),
+            casinos,
+            sport,
+            commence_time=arb_data.get('commence_time'),
+        )
+        latency_tracer.record("eligibility", eligibility.elapsed_ms)
         
-        print(f"🔍 DEBUG: Found {len(users)} active users in DB")
         print(f"🔍 DEBUG: Arb percentage: {arb_data.get('arb_percentage')}%")
+        print(f"🔍 DEBUG: {len(eligibility.immediate)} immediate / {len(eligibility.delayed)} delayed recipients ({eligibility.elapsed_ms:.1f}ms)")
+        
+        recipient_ids = [tid for tid, _ in eligibility.immediate] + eligibility.delayed
+        if not recipient_ids:
+            return
+        
+        # Load only the recipients (alert counters are updated on the ORM rows)
+        with latency_tracer.span("recipients"):
+            users_by_tid = {
+                u.telegram_id: u
+                for u in db.query(User).filter(User.telegram_id.in_(recipient_ids)).all()
+            }
         
-        # ✅ OPTIMIZATION #4: Process users in PARALLEL with asyncio.gather
-        # Helper function to process and send to one user
-        async def process_user_send(user):
-            """Process one user and send alert if eligible. Returns True if sent."""
+        # Build + enrich the BettingCall ONCE for this drop (Odds API round trip),
+        # each user only gets a cheap bankroll projection in send_alert_to_user
+        call_template = None
+        if eligibility.immediate:
             try:
-                # Resolve user's effective tier (respect subscription expiry)
-                def _core_tier_from_model(t):
-                    try:
-                        name = t.name.lower()
-                    except Exception:
-                        return TierLevel.FREE
-                    return TierLevel.PREMIUM if name == 'premium' else TierLevel.FREE
-
-                tier_core = _core_tier_from_model(user.tier)
-                
-                # downgrade to FREE if subscription expired (but NOT lifetime!)
-                if tier_core != TierLevel.FREE and not user.subscription_active:
-                    tier_core = TierLevel.FREE
-
-                # Skip if user explicitly disabled notifications
-                if user.notifications_enabled is False:
-                    return False
-
-                # Check if user can view this alert
-                if not TierManager.can_view_alert(tier_core, arb_data['arb_percentage']):
-                    return False
-                
-                # Check user's custom percentage filter for arbitrage
-                arb_percent = float(arb_data.get('arb_percentage', 0))
-                user_min = user.min_arb_percent or 0.5
-                user_max = user.max_arb_percent or 100.0
-                if not (user_min <= arb_percent <= user_max):
-                    print(f"⛔ FILTER: User {user.telegram_id} blocked - arb {arb_percent}% not in [{user_min}%, {user_max}%]")
-                    return False
-                
-                # Check casino filter (both sides of arbitrage)
-                casinos = []
-                for outcome in arb_data.get('outcomes', []):
-                    casino = outcome.get('casino') or outcome.get('bookmaker', '')
-                    if casino:
-                        casinos.append(casino)
-                if casinos and not user_passes_casino_filter(user, casinos):
-                    return False
-                
-                # Check sport filter
-                sport = arb_data.get('sport', '') or arb_data.get('league', '')
-                if not user_passes_sport_filter(user, sport):
-                    return False
-                
-                # Check "Match Today Only" filter
-                if getattr(user, 'match_today_only', False):
-                    commence_time_iso = arb_data.get('commence_time')
-                    if commence_time_iso:
-                        try:
-                            from datetime import datetime, date, timezone
-                            dt = datetime.fromisoformat(commence_time_iso.replace('Z', '+00:00'))
-                            match_date = dt.date()
-                            today_date = date.today()
-                            if match_date != today_date:
-                                return False
-                        except Exception:
-                            pass  # If can't parse, let it through
-                
-                # Check daily alert limit
-                features = TierManager.get_features(tier_core)
-                max_alerts = features.get('max_alerts_per_day', 5)
-                if not user.can_receive_alert_today(max_alerts):
-                    return False
-                
-                # Check spacing for FREE tier (2 hours between calls)
-                if tier_core == TierLevel.FREE:
-                    min_spacing = features.get('min_spacing_minutes', 120)
-                    if user.last_alert_at:
-                        from datetime import datetime, timedelta
-                        time_since_last = datetime.now() - user.last_alert_at.replace(tzinfo=None)
-                        if time_since_last < timedelta(minutes=min_spacing):
-                            return False
-                
-                # Apply delay for FREE tier ONLY for first alert
-                delay = 0
-                if tier_core == TierLevel.FREE and user.last_alert_at is None:
-                    delay = TierManager.get_alert_delay(tier_core)  # 15 minutes
-                
-                if delay > 0:
-                    # Schedule delayed send (first alert only)
-                    asyncio.create_task(send_delayed_alert(user.telegram_id, arb_data, delay))
-                    user.increment_alert_count()
-                    return False  # Don't count as immediate send
-                else:
-                    # Send immediately
-                    await send_alert_to_user(user.telegram_id, tier_core, arb_data)
-                    user.increment_alert_count()
-                    return True
+                with latency_tracer.span("call_template"):
+                    call_template = await asyncio.to_thread(build_call_template, arb_data)
+            except Exception as e:
+                logger.error(f"Failed to build call template: {e}")
+        
+        # Schedule delayed send (FREE tier, first alert only)
+        for tid in eligibility.delayed:
+            user = users_by_tid.get(tid)
+            if user is None:
+                continue
+            asyncio.create_task(send_delayed_alert(tid, arb_data, TierManager.get_alert_delay(TierLevel.FREE)))
+            user.increment_alert_count()
+        
+        # SAFE stakes for every recipient's bankroll in one batch
+        projected_calls = {}
+        if call_template is not None:
+            try:
+                batch = [
+                    (tid, users_by_tid[tid].default_bankroll or TierManager.get_features(tier).get('bankroll_amount', 750))
+                    for tid, tier in eligibility.immediate if tid in users_by_tid
+                ]
+                projected_calls = dict(zip(
+                    [tid for tid, _ in batch],
+                    project_call_for_bankrolls(call_template, [bankroll for _, bankroll in batch]),
+                ))
             except Exception as e:
-                print(f"❌ ERROR: process_user_send failed for {user.telegram_id}: {e}")
+                logger.error(f"Failed to batch-project call template: {e}")
+        
+        # Alert text / casino buttons rendered once per language for this drop
+        message_templates = {}
+        
+        async def process_user_send(tid, tier_core):
+            """Send alert to one eligible user. Returns True if sent."""
+            user = users_by_tid.get(tid)
+            if user is None:
+                return False
+            try:
+                # template_attempted: a failed template (None) means legacy format,
+                # not one Odds API enrichment per recipient
+                await send_alert_to_user(tid, tier_core, arb_data, call_template=call_template,
+                                         template_attempted=True,
+                                         projected_call=projected_calls.get(tid),
+                                         message_templates=message_templates)
+                user.increment_alert_count()
+                return True
+            except Exception as e:
+                print(f"❌ ERROR: process_user_send failed for {tid}: {e}")
                 return False
         
         # ⚡ Send to all users in PARALLEL (saves 6-7s)
-        results = await asyncio.gather(*[process_user_send(u) for u in users], return_exceptions=True)
+        results = await asyncio.gather(*[process_user_send(tid, tier) for tid, tier in eligibility.immediate], return_exceptions=True)
         sent_count = sum(1 for r in results if r is True)
-        print(f"📊 DEBUG: Sent to {sent_count}/{len(users)} users (PARALLEL)")
+        print(f"📊 DEBUG: Sent to {sent_count}/{len(eligibility.immediate)} users (PARALLEL)")
         db.commit()
     
     finally:
@@ -1081,34 +969,32 @@ async def send_delayed_alert(user_id: int, arb_data: dict, delay_minutes: int):
         arb_data: Arbitrage data
         delay_minutes: Delay in minutes
     """
+    # Deliberately late: kept out of the drop_to_sent latency
+    latency_tracer.clear_drop()
     await asyncio.sleep(delay_minutes * 60)
     
-    # Get user tier
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.telegram_id == user_id).first()
-        if user:
-            def _core_tier_from_model(t):
-                try:
-                    name = t.name.lower()
-                except Exception:
-                    return TierLevel.FREE
-                return TierLevel.PREMIUM if name == 'premium' else TierLevel.FREE
-            tier_core = _core_tier_from_model(user.tier)
+    # Get user tier (in-memory snapshot, tier may have changed during the delay)
+    user = user_prefs.get(user_id)
+    if user:
+        def _core_tier_from_model(t):
             try:
-                if tier_core != TierLevel.FREE and not user.subscription_active:
-                    tier_core = TierLevel.FREE
+                name = t.name.lower()
             except Exception:
-                pass
-            try:
-                await send_alert_to_user(user_id, tier_core, arb_data)
-            except Exception as e:
-                print(f"❌ ERROR: delayed send_alert_to_user failed for {user_id}: {e}")
-    finally:
-        db.close()
+                return TierLevel.FREE
+            return TierLevel.PREMIUM if name == 'premium' else TierLevel.FREE
+        tier_core = _core_tier_from_model(user.tier)
+        try:
+            if tier_core != TierLevel.FREE and not user.subscription_active:
+                tier_core = TierLevel.FREE
+        except Exception:
+            pass
+        try:
+            await send_alert_to_user(user_id, tier_core, arb_data)
+        except Exception as e:
+            print(f"❌ ERROR: delayed send_alert_to_user failed for {user_id}: {e}")
 
 
-async def send_alert_to_user(user_id: int, tier: TierLevel, arb_data: dict, use_new_processor: bool = True):
+async def send_alert_to_user(user_id: int, tier: TierLevel, arb_data: dict, use_new_processor: bool = True, call_template: BettingCall = None, projected_call: BettingCall = None, message_templates: dict = None, template_attempted: bool = False):
     """
     Send formatted arbitrage alert to a user
     
@@ -1117,30 +1003,42 @@ async def send_alert_to_user(user_id: int, tier: TierLevel, arb_data: dict, use_
         tier: User's tier level
         arb_data: Arbitrage data
         use_new_processor: Use enriched processor with Odds API
+        call_template: Pre-enriched BettingCall for this drop (built once per fan-out).
+            If None, the call is built and enriched here (unless template_attempted).
+        projected_call: call_template already projected on this user's bankroll
+            (batch computed by the fan-out). If None, projected here.
+        message_templates: lang -> CallMessageTemplate shared by the fan-out
+            (user-independent text and casino buttons rendered once per drop)
+        template_attempted: The fan-out already tried to build call_template;
+            if it is None the build failed, go straight to the legacy format
     """
     calculator = ArbitrageCalculator()
     
-    # Get user preferences first (including rounding)
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.telegram_id == user_id).first()
-        if not user:
-            return
-        # Use 'language' field from User model ("fr"/"en")
-        lang_pref = (user.language or 'en') if hasattr(user, 'language') else 'en'
-        # Get rounding preferences
-        user_rounding = user.stake_rounding or 0
-        user_mode = getattr(user, 'rounding_mode', 'nearest') or 'nearest'
-        # Get user bankroll
-        user_bankroll = user.default_bankroll or TierManager.get_features(tier).get('bankroll_amount', 750)
-    finally:
-        db.close()
+    # Get user preferences first (including rounding) from the in-memory
+    # snapshot: no DB round trip per recipient on the fan-out
+    user = user_prefs.get(user_id)
+    if not user:
+        return
+    # "fr"/"en"
+    lang_pref = user.language or 'en'
+    # Get rounding preferences
+    user_rounding = user.stake_rounding or 0
+    user_mode = user.rounding_mode or 'nearest'
+    # Get user bankroll
+    user_bankroll = user.default_bankroll or TierManager.get_features(tier).get('bankroll_amount', 750)
     
     # Try new enriched processor
     if use_new_processor:
         try:
-            # Process call with enrichment - use user's bankroll
-            betting_call = process_call_from_drop(arb_data, user_bankroll)
+            # ⏱️ Per-user preparation: stakes, rounding, message + keyboard
+            format_started = time.perf_counter()
+            # Enrich once per drop, then scale stakes to user's bankroll
+            if call_template is None and not template_attempted:
+                call_template = await asyncio.to_thread(build_call_template, arb_data)
+            if projected_call is not None:
+                betting_call = projected_call
+            else:
+                betting_call = project_call_for_bankroll(call_template, user_bankroll) if call_template else None
             
             # Apply user's stake rounding to the betting call with CORRECT recalculation
             if betting_call and user_rounding > 0 and len(betting_call.sides) >= 2:
@@ -1167,39 +1065,27 @@ async def send_alert_to_user(user_id: int, tier: TierLevel, arb_data: dict, use_
                     betting_call = analyze_arbitrage_two_way(betting_call)
             
             if betting_call:
-                # Store for later verification
-                PENDING_CALLS[betting_call.call_id] = betting_call
-                save_pending_calls()
+                # Store for later verification (writes this entry only)
+                PENDING_CALLS.put(betting_call, drop_id=arb_data.get('drop_event_id'))
                 
-                # Format enriched message
-                message_text = format_call_message(betting_call, lang=lang_pref, verified=False)
+                # Format enriched message: user-independent parts rendered once
+                # per drop and language, only stakes / profits filled here
+                if message_templates is None:
+                    message_templates = {}
+                template = message_templates.get(lang_pref)
+                if template is None:
+                    template = message_templates[lang_pref] = CallMessageTemplate(call_template or betting_call, lang_pref)
+                    logger.info(f"🔗 Casino buttons for {betting_call.call_id} ({lang_pref}): {template.casino_buttons}")
+                message_text = template.render(betting_call)
                 
                 # Build keyboard with casino links and verify button
                 keyboard = []
                 
-                # Casino buttons with best available links
-                casino_buttons = []
-                for side in betting_call.sides[:2]:
-                    # Priority: deep link > referral > fallback
-                    link = side.deep_link or None
-                    if not link:
-                        link = get_casino_referral_link(side.book_name)
-                    if not link:
-                        link = side.fallback_link
-                    
-                    # Always have a link (use generic site URL as last resort)
-                    if not link:
-                        link = f"https://{side.book_name.lower().replace(' ', '')}.com"
-                    
-                    logger.info(f"🔗 Casino button for {side.book_name}: deep={side.deep_link}, referral={get_casino_referral_link(side.book_name)}, fallback={side.fallback_link}, final={link}")
-                    
-                    if link:
-                        casino_buttons.append(
-                            InlineKeyboardButton(
-                                text=f"{get_casino_logo(side.book_name)} {side.book_name}",
-                                url=link
-                            )
-                        )
+                # Casino buttons with best available links (deep link > referral > fallback)
+                casino_buttons = [
+                    InlineKeyboardButton(text=text, url=link)
+                    for text, link in template.casino_buttons
+                ]
                 
                 if casino_buttons:
                     keyboard.append(casino_buttons)
@@ -1228,8 +1114,7 @@ async def send_alert_to_user(user_id: int, tier: TierLevel, arb_data: dict, use_
                 # Map drop_event_id -> call_id so CASHH changes can rebuild the
                 # same enriched keyboard (including Verify Odds button)
                 try:
-                    if drop_event_id:
-                        CALL_IDS_BY_DROP_ID[str(drop_event_id)] = betting_call.call_id
+                    PENDING_CALLS.link_drop(drop_event_id, betting_call.call_id)
                 except Exception:
                     pass
                 
@@ -1268,6 +1153,7 @@ async def send_alert_to_user(user_id: int, tier: TierLevel, arb_data: dict, use_
                 # ])
                 
                 reply_markup = InlineKeyboardMarkup(inline_keyboard=keyboard)
+                latency_tracer.record_since("format", format_started)
                 
                 # Send message
                 try:
@@ -1275,14 +1161,19 @@ async def send_alert_to_user(user_id: int, tier: TierLevel, arb_data: dict, use_
                 except Exception:
                     pass
                 
-                await bot.send_message(
-                    user_id, 
-                    message_text, 
-                    parse_mode="HTML",
-                    reply_markup=reply_markup,
-                    disable_web_page_preview=False,  # Show link previews
-                    protect_content=True  # Prevent forwarding and copying
-                )
+                # send = scheduler queue + rate limits + Bot API round trip
+                with latency_tracer.span("send"):
+                    await send_scheduler.send_message(
+                        user_id, 
+                        message_text, 
+                        lane=LANE_ARBITRAGE,
+                        premium=(tier == TierLevel.PREMIUM),
+                        parse_mode="HTML",
+                        reply_markup=reply_markup,
+                        disable_web_page_preview=False,  # Show link previews
+                        protect_content=True  # Prevent forwarding and copying
+                    )
+                latency_tracer.record_drop_to_sent()
                 
                 try:
                     print(f"✅ DEBUG: Successfully sent enriched message to {user_id}")
@@ -1299,13 +1190,7 @@ async def send_alert_to_user(user_id: int, tier: TierLevel, arb_data: dict, use_
     calculator = ArbitrageCalculator()
     
     # Get user's default bankroll and language
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.telegram_id == user_id).first()
-        bankroll = user.default_bankroll if user else 400.0
-        lang_pref = (user.language if user else "en") or "en"
-    finally:
-        db.close()
+    bankroll = user.default_bankroll or 400.0
     
     # Extract odds (limit to 2 outcomes) and cast to int robustly
     outcomes_list = (arb_data.get('outcomes') or [])[:2]
@@ -1489,14 +1374,17 @@ async def send_alert_to_user(user_id: int, tier: TierLevel, arb_data: dict, use_
     
     try:
         print(f"📤 DEBUG: Attempting to send message to {user_id}")
-        await bot.send_message(
-            chat_id=user_id,
-            text=message_text,
+        await send_scheduler.send_message(
+            user_id,
+            message_text,
+            lane=LANE_ARBITRAGE,
+            premium=(tier == TierLevel.PREMIUM),
             parse_mode=ParseMode.HTML,
             reply_markup=reply_markup,
             disable_web_page_preview=False,
             protect_content=True  # Prevent forwarding and copying
         )
+        latency_tracer.record_drop_to_sent()
         print(f"✅ DEBUG: Successfully sent message to {user_id}")
     except Exception as e:
         print(f"❌ ERROR: Failed to send alert to {user_id}: {e}")
@@ -1512,7 +1400,14 @@ async def receive_drop(req: Request):
     Receive arbitrage drop from external source
     Format: JSON with event details
     """
-    d = await req.json()
+    # ⏱️ Hot-path tracing: receipt time follows the fan-out tasks (drop_to_sent)
+    latency_tracer.mark_drop_received()
+    with latency_tracer.span("receive_drop"):
+        return await _process_drop(await req.json())
+
+
+async def _process_drop(d: dict) -> dict:
+    """receive_drop body: persist, background enrichment, fan-out"""
     eid = d.get("event_id")
     try:
         print(f"📥 DEBUG: /public/drop received eid={eid}")
@@ -1527,149 +1422,70 @@ async def receive_drop(req: Request):
     except Exception:
         d["arb_percentage"] = 0.0
     
-    # ✅ OPTIMIZATION #1: Check duplicate BEFORE API enrichment (saves 2-3s per duplicate)
-    db = SessionLocal()
-    is_duplicate = False
-    existing_drop_id = None
+    if d["arb_percentage"] <= 0:
+        d["arb_percentage"] = _compute_arb_percent(d)
+    
+    # Mark receive time for later re-send to new PREMIUM users
+    d["received_at"] = datetime.now().isoformat()
+    
+    # ✅ ONE upsert per drop: id + duplicate flag in a single transaction
+    # (duplicates are refreshed so they appear in Last Calls again)
     try:
-        ev = db.query(DropEvent).filter(DropEvent.event_id == eid).first()
-        if ev:
-            is_duplicate = True
-            existing_drop_id = ev.id  # ✅ Save ID before closing session
-            print(f"🚨 DUPLICATE event_id: {eid} - Skipping API enrichment")
-    finally:
-        db.close()
+        with latency_tracer.span("persist"):
+            drop_id, inserted = await asyncio.to_thread(upsert_drop, d)
+    except Exception as e:
+        print(f"⚠️ Drop upsert failed for {eid}: {e}")
+        drop_id, inserted = None, True
+    is_duplicate = not inserted
+    if drop_id:
+        # Add drop_event_id to data for bet tracking
+        d['drop_event_id'] = drop_id
+    DROPS[eid] = d
     
-    # ✅ OPTIMIZATION #2: Enrich in BACKGROUND (non-blocking!) to keep bot fast
+    # ✅ Enrich in BACKGROUND (non-blocking!) to keep bot fast, skipped for duplicates (saves 2-3s)
     if not is_duplicate:
-        # Send call IMMEDIATELY, enrich in background
+        print(f"💾 DEBUG: Stored drop {eid} with id={drop_id} (arb%={d['arb_percentage']})")
         print(f"⚡ SPEED: Sending call immediately, enrichment in background")
         
-        # Start enrichment in background (won't block)
-        async def enrich_in_background():
+        async def on_enriched(enriched: dict, ok: bool):
+            if not ok:
+                print(f"⚠️ Background enrichment failed or cancelled for {eid}")
+                return
+            # Update stored drop with enriched data
+            DROPS[eid] = enriched
+            print(f"🔗 Background enrichment done: {len(enriched.get('deep_links', {}))} deep links")
+            
+            # ✅ Partial update of the stored row (payload + match_time) for web dashboard
             try:
-                from utils.odds_enricher import enrich_alert_with_api
-                enriched = enrich_alert_with_api(d, 'arbitrage')
-                # Update stored drop with enriched data
-                DROPS[eid] = enriched
-                print(f"🔗 Background enrichment done: {len(enriched.get('deep_links', {}))} deep links")
-                
-                # ✅ Also update the database with enriched data (for web dashboard)
-                try:
-                    db_update = SessionLocal()
-                    ev_update = db_update.query(DropEvent).filter(DropEvent.event_id == eid).first()
-                    if ev_update:
-                        ev_update.payload = enriched
-                        # ✅ Save match_time to dedicated column
-                        if enriched.get('commence_time'):
-                            from datetime import datetime
-                            try:
-                                ev_update.match_time = datetime.fromisoformat(enriched['commence_time'].replace('Z', '+00:00'))
-                            except:
-                                pass
-                        db_update.commit()
-                        print(f"💾 DB updated with match_time: {enriched.get('formatted_time', 'N/A')}")
-                except Exception as db_err:
-                    print(f"⚠️ DB update failed: {db_err}")
-                finally:
-                    try:
-                        db_update.close()
-                    except:
-                        pass
-            except Exception as e:
-                print(f"⚠️ Background enrichment failed: {e}")
+                if await asyncio.to_thread(update_drop_enrichment, drop_id, enriched):
+                    print(f"💾 DB updated with match_time: {enriched.get('formatted_time', 'N/A')}")
+            except Exception as db_err:
+                print(f"⚠️ DB update failed: {db_err}")
         
-        # Launch in background, don't wait
-        asyncio.create_task(enrich_in_background())
-    else:
-        print(f"⚡ SKIP: Enrichment skipped for duplicate {eid}")
-        # ✅ Assign drop_event_id immediately for duplicates
-        if existing_drop_id:
-            d['drop_event_id'] = existing_drop_id
-    
-    # Mark receive time for later re-send to new PREMIUM users
-    d["received_at"] = datetime.now().isoformat()
-    DROPS[eid] = d
-    try:
-        drop_id = record_drop(d)
-        # ⚡ Parlays générés APRÈS envoi aux users (voir fin de fonction)
-    except Exception:
-        drop_id = None
-    # Persist to DB (duplicate already detected above)
-    db = SessionLocal()
-    try:
-        ev = db.query(DropEvent).filter(DropEvent.event_id == eid).first()
-        if ev:
-            # Update existing duplicate
-            # Refresh timestamp so it appears in Last Calls, and update payload/ap if provided
-            try:
-                try:
-                    ap = float(d.get('arb_percentage') or 0)
-                except Exception:
-                    ap = 0.0
-                if ap <= 0:
-                    ap = _compute_arb_percent(d)
-                    d['arb_percentage'] = ap
-                ev.arb_percentage = ap if ap else ev.arb_percentage
-                ev.match = d.get('match') or ev.match
-                ev.league = d.get('league') or ev.league
-                ev.market = d.get('market') or ev.market
-                ev.payload = d or ev.payload
-                ev.received_at = datetime.now()
-                db.commit()
-                print(f"♻️ DEBUG: Refreshed duplicate drop {eid} (id={ev.id})")
-            except Exception as _e:
-                try:
-                    db.rollback()
-                except Exception:
-                    pass
-        else:
-            ev = DropEvent(event_id=eid)
-            db.add(ev)
+        # Shared enrichment queue (priority, retries, API concurrency), don't wait
+        enrichment_queue.submit('arbitrage', d, on_enriched, edge=d["arb_percentage"])
         
-        if not is_duplicate:
-            ev.received_at = datetime.now()
-            try:
-                ap = float(d.get('arb_percentage') or 0)
-            except Exception:
-                ap = 0.0
-            if ap <= 0:
-                ap = _compute_arb_percent(d)
-                d['arb_percentage'] = ap
-            ev.arb_percentage = ap
-            ev.match = d.get('match') or d.get('event')
-            ev.league = d.get('league')
-            ev.market = d.get('market')
-            ev.payload = d
-            db.commit()
-            # Add drop_event_id to data for bet tracking
-            d['drop_event_id'] = ev.id
-            try:
-                print(f"💾 DEBUG: Stored drop {eid} with id={ev.id} (arb%={ev.arb_percentage})")
-            except Exception:
-                pass
-            
-            # 🔴 LIVE: Notify web dashboard via WebSocket
+        # 🔴 LIVE: Notify web dashboard via WebSocket
+        if drop_id:
             try:
                 from api.web_api import notify_new_call
                 asyncio.create_task(notify_new_call({
-                    "id": ev.id,
+                    "id": drop_id,
                     "eventId": eid,
                     "betType": "arbitrage",
-                    "arbPercentage": ap,
-                    "match": ev.match,
-                    "league": ev.league,
-                    "market": ev.market,
+                    "arbPercentage": d["arb_percentage"],
+                    "match": d.get('match') or d.get('event'),
+                    "league": d.get('league'),
+                    "market": d.get('market'),
                     "matchTime": d.get('formatted_time') or d.get('commence_time'),
                     "payload": d
                 }))
                 print(f"🔴 LIVE: Notified web clients of new call")
             except Exception as ws_err:
                 print(f"⚠️ WebSocket notify failed: {ws_err}")
-    except Exception:
-        db.rollback()
-    finally:
-        db.close()
+    else:
+        print(f"🚨 DUPLICATE event_id: {eid} - Skipping API enrichment")
+        print(f"♻️ DEBUG: Refreshed duplicate drop {eid} (id={drop_id})")
     
     # Debug: show duplicate state and flag
     try:
@@ -1685,10 +1501,6 @@ async def receive_drop(req: Request):
             pass
         return {"ok": True, "skipped": "duplicate"}
     
-    # ✅ Ensure drop_event_id is present (already set above for duplicates, set here for new drops)
-    if 'drop_event_id' not in d and existing_drop_id:
-        d['drop_event_id'] = existing_drop_id
-    
     # Send to users
     try:
         print("🚀 DEBUG: Calling send_arbitrage_alert_to_users")
@@ -1842,10 +1654,6 @@ async def handle_positive_ev(req: Request):
         
         # Import parser
         from utils.oddsjam_parser import parse_positive_ev_notification
-        from utils.oddsjam_formatters import format_good_odds_message
-        from utils.odds_api_links import get_links_for_drop, get_fallback_url
-        from utils.ev_quality import get_user_profile, SYSTEM_MIN_EV
-        from utils.odds_enricher import enrich_alert_with_api
         
         # Parse notification
         parsed = parse_positive_ev_notification(notif_text)
@@ -1855,23 +1663,37 @@ async def handle_positive_ev(req: Request):
             return {"status": "error", "message": "Failed to parse"}
         
         # Enrichir avec les données API si EV >= 5% (pour avoir la date du match)
+        # via la file d'enrichissement: le handler rend la main tout de suite
         try:
             ev_percent = float(parsed.get('ev_percent', 0))
-            if ev_percent >= 5.0:
-                logger.info(f"Good EV {ev_percent}% >= 5%, enriching with API")
-                enriched = enrich_alert_with_api(parsed, 'good_ev')
-                if enriched:
-                    parsed = enriched
-                else:
-                    logger.warning("API enrichment returned None for Good EV, using original data")
-            else:
-                logger.info(f"Good EV {ev_percent}% < 5%, skipping API enrichment to save quota")
-                # Remove any existing commence_time or formatted_time to prevent date display for low EV
-                parsed.pop('commence_time', None)
-                parsed.pop('formatted_time', None)
-        except Exception as e:
-            logger.error(f"API enrichment failed for Good EV: {e}, using original data")
-            # Remove dates on API failure too
+        except Exception:
+            ev_percent = 0.0
+        if ev_percent >= 5.0:
+            logger.info(f"Good EV {ev_percent}% >= 5%, queued for API enrichment")
+            on_enriched = functools.partial(_dispatch_good_ev, notif_text=notif_text)
+            if enrichment_queue.submit('good_ev', parsed, on_enriched, edge=ev_percent):
+                return {"status": "queued"}
+        else:
+            logger.info(f"Good EV {ev_percent}% < 5%, skipping API enrichment to save quota")
+        return await _dispatch_good_ev(parsed, False, notif_text=notif_text)
+            
+    except Exception as e:
+        try:
+            logger.error(f"Error in handle_positive_ev: {e}")
+        except Exception:
+            print(f"Error in handle_positive_ev: {e}")
+        return {"status": "error", "message": str(e)}
+
+
+async def _dispatch_good_ev(parsed: dict, enriched: bool, notif_text: str) -> dict:
+    """Good EV pipeline after (optional) API enrichment: persist, dedup, fan-out"""
+    try:
+        from utils.oddsjam_formatters import GoodOddsTemplate
+        from utils.odds_api_links import get_links_for_drop, get_fallback_url
+        from utils.ev_quality import SYSTEM_MIN_EV
+        
+        if not enriched:
+            # Low EV, queue full or API failure: no match date displayed
             parsed.pop('commence_time', None)
             parsed.pop('formatted_time', None)
         
@@ -1943,16 +1765,19 @@ async def handle_positive_ev(req: Request):
             logger.info("\n" + "="*60)
             logger.info("🔔 GOOD EV ALERT - Starting to query users...")
             logger.info("Filtering: enable_good_odds=True, is_banned=False, notifications_enabled=True")
-            users = db.query(User).filter(
-                User.enable_good_odds == True,
-                User.is_banned == False,
-                User.notifications_enabled == True,
-            ).all()
+            # In-memory preference snapshots (utils.user_prefs), no User query per alert
+            users = [u for u in user_prefs.all() if u.enable_good_odds and u.receives_alerts]
             logger.info(f"✅ Found {len(users)} users matching Good EV filters")
             if len(users) == 0:
                 logger.warning("⚠️ NO USERS have enable_good_odds=True! No one will receive this alert.")
             
             sent_count = 0
+            pending_sends = []
+            # Drop-level message parts and casino button, rendered once per language
+            message_templates = {}
+            deep_links = parsed.get('deep_links', {})
+            bookmaker_url = deep_links.get(parsed.get('bookmaker')) or get_fallback_url(parsed.get('bookmaker'))
+            bookmaker_button_text = f"{get_casino_logo(parsed['bookmaker'])} {parsed['bookmaker']}"
             for user in users:
                 try:
                     # Check if user's tier can receive Good EV alerts
@@ -1984,13 +1809,13 @@ async def handle_positive_ev(req: Request):
                     
                     # Check casino filter
                     bookmaker = parsed.get('bookmaker', '')
-                    if not user_passes_casino_filter(user, [bookmaker]):
+                    if not user.passes_casino_filter([bookmaker]):
                         logger.info(f"🎰 Good EV: User {user.telegram_id} SKIPPED - casino filter (bookmaker: {bookmaker})")
                         continue
                     
                     # Check sport filter
                     sport = parsed.get('sport', '') or parsed.get('league', '')
-                    if not user_passes_sport_filter(user, sport):
+                    if not user.passes_sport_filter(sport):
                         logger.info(f"🏅 Good EV: User {user.telegram_id} SKIPPED - sport filter (sport: {sport})")
                         continue
                     
@@ -2013,12 +1838,10 @@ async def handle_positive_ev(req: Request):
                     
                     user_cash = user.default_bankroll
                     
-                    # Determine user profile based on total_bets
-                    # For now use total_bets as proxy (later can track good_odds_bets separately)
-                    total_bets = user.total_bets or 0
-                    user_profile = get_user_profile(total_bets)
-                    
-                    message = format_good_odds_message(parsed, user_cash, user.language, user_profile, total_bets)
+                    template = message_templates.get(user.language)
+                    if template is None:
+                        template = message_templates[user.language] = GoodOddsTemplate(parsed, user.language)
+                    message = template.render(user_cash)
                     
                     # 🎯 FIX: Use user_cash directly as stake (matches message "Stake: $user_cash")
                     stake = round(user_cash, 2)
@@ -2042,10 +1865,6 @@ async def handle_positive_ev(req: Request):
                     # Build keyboard - unified layout like arbitrage
                     from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
                     
-                    # UTILISER les deep_links DÉJÀ enrichis!
-                    deep_links = parsed.get('deep_links', {})
-                    bookmaker_url = deep_links.get(parsed.get('bookmaker')) or get_fallback_url(parsed.get('bookmaker'))
-                    
                     # Create unique call_id for Good Odds (for Verify Odds / persistence)
                     import uuid
                     call_id = str(uuid.uuid4())[:8]
@@ -2069,7 +1888,7 @@ async def handle_positive_ev(req: Request):
                     keyboard = [
                         # Row 1: Casino button
                         [InlineKeyboardButton(
-                            text=f"{get_casino_logo(parsed['bookmaker'])} {parsed['bookmaker']}",
+                            text=bookmaker_button_text,
                             url=bookmaker_url
                         )],
                         # Row 2: JE PARIE button (using full stake shown in message)
@@ -2099,21 +1918,29 @@ async def handle_positive_ev(req: Request):
                         )]
                     ]
                     
-                    msg_sent = await bot.send_message(
-                        chat_id=user.telegram_id,
-                        text=message,
+                    # Mis en file: le scheduler respecte les limites Telegram
+                    pending_sends.append((user.telegram_id, send_scheduler.submit(
+                        user.telegram_id,
+                        message,
+                        lane=LANE_GOOD_EV,
+                        premium=(tier_core == TierLevel.PREMIUM),
                         reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard),
                         parse_mode=ParseMode.HTML,
                         protect_content=True  # Prevent forwarding and copying
-                    )
-                    sent_count += 1
-                    logger.info(f"✅ Good EV sent successfully to {user.telegram_id}")
+                    )))
                 except Exception as e:
                     logger.error(f"Failed to send Good Odds to user {user.telegram_id}: {e}")
                     # Log full traceback for debugging
                     import traceback
                     logger.error(f"Traceback: {traceback.format_exc()}")
             
+            results = await asyncio.gather(*(fut for _, fut in pending_sends), return_exceptions=True)
+            for (telegram_id, _), result in zip(pending_sends, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Failed to send Good EV to user {telegram_id}: {result}")
+                else:
+                    sent_count += 1
+            
             try:
                 logger.info(f"Good Odds alert sent to {sent_count} users")
             except Exception:
@@ -2132,10 +1959,7 @@ async def handle_positive_ev(req: Request):
             db.close()
             
     except Exception as e:
-        try:
-            logger.error(f"Error in handle_positive_ev: {e}")
-        except Exception:
-            print(f"Error in handle_positive_ev: {e}")
+        logger.error(f"Error in _dispatch_good_ev: {e}")
         return {"status": "error", "message": str(e)}
 
 
@@ -2153,9 +1977,7 @@ async def handle_middle(req: Request):
             return {"status": "error", "message": "Missing text"}
         
         # Import parser
-        from utils.oddsjam_parser import parse_middle_notification, calculate_middle_stakes, parse_arbitrage_from_text
-        from utils.oddsjam_formatters import format_middle_message
-        from utils.odds_api_links import get_fallback_url
+        from utils.oddsjam_parser import parse_middle_notification, parse_arbitrage_from_text
         
         # Detect if it's a pure arbitrage alert (coming from Tasker/bridge)
         # We keep real "Middle Alert" notifications on the dedicated middle pipeline
@@ -2184,23 +2006,37 @@ async def handle_middle(req: Request):
             return {"status": "error", "message": "Failed to parse"}
         
         # Enrichir avec les données API si middle >= 0.5% (pour avoir la date du match)
+        # via la file d'enrichissement: le handler rend la main tout de suite
         try:
             middle_percent = float(parsed.get('middle_percent', 0))
-            if middle_percent >= 0.5:
-                logger.info(f"Middle {middle_percent}% >= 0.5%, enriching with API")
-                enriched = enrich_alert_with_api(parsed, 'middle')
-                if enriched:
-                    parsed = enriched
-                else:
-                    logger.warning("API enrichment returned None, using original data")
-            else:
-                logger.info(f"Middle {middle_percent}% < 0.5%, skipping API enrichment to save quota")
-                # Remove any existing commence_time or formatted_time to prevent date display for low% middle
-                parsed.pop('commence_time', None)
-                parsed.pop('formatted_time', None)
-        except Exception as e:
-            logger.error(f"API enrichment failed: {e}, using original data")
-            # Remove dates on API failure too
+        except Exception:
+            middle_percent = 0.0
+        if middle_percent >= 0.5:
+            logger.info(f"Middle {middle_percent}% >= 0.5%, queued for API enrichment")
+            on_enriched = functools.partial(_dispatch_middle, notif_text=notif_text)
+            if enrichment_queue.submit('middle', parsed, on_enriched, edge=middle_percent):
+                return {"status": "queued"}
+        else:
+            logger.info(f"Middle {middle_percent}% < 0.5%, skipping API enrichment to save quota")
+        return await _dispatch_middle(parsed, False, notif_text=notif_text)
+            
+    except Exception as e:
+        try:
+            logger.error(f"Error in handle_middle: {e}")
+        except Exception:
+            print(f"Error in handle_middle: {e}")
+        return {"status": "error", "message": str(e)}
+
+
+async def _dispatch_middle(parsed: dict, enriched: bool, notif_text: str) -> dict:
+    """Middle pipeline after (optional) API enrichment: persist, dedup, fan-out"""
+    try:
+        from utils.oddsjam_parser import calculate_middle_stakes
+        from utils.oddsjam_formatters import format_middle_message
+        from utils.odds_api_links import get_fallback_url
+        
+        if not enriched:
+            # Low %, queue full or API failure: no match date displayed
             parsed.pop('commence_time', None)
             parsed.pop('formatted_time', None)
         
@@ -2263,16 +2099,14 @@ async def handle_middle(req: Request):
             logger.info("\n" + "="*60)
             logger.info("🔔 MIDDLE ALERT - Starting to query users...")
             logger.info("Filtering: enable_middle=True, is_banned=False, notifications_enabled=True")
-            users = db.query(User).filter(
-                User.enable_middle == True,
-                User.is_banned == False,
-                User.notifications_enabled == True
-            ).all()
+            # In-memory preference snapshots (utils.user_prefs), no User query per alert
+            users = [u for u in user_prefs.all() if u.enable_middle and u.receives_alerts]
             logger.info(f"✅ Found {len(users)} users matching Middle filters")
             if len(users) == 0:
                 logger.warning("⚠️ NO USERS have enable_middle=True! No one will receive this alert.")
             
             sent_count = 0
+            pending_sends = []
             for user in users:
                 try:
                     # Check if user's tier can receive Middle alerts
@@ -2307,13 +2141,13 @@ async def handle_middle(req: Request):
                     # Check casino filter (both sides of middle)
                     bookmaker_a = parsed.get('side_a', {}).get('bookmaker', '')
                     bookmaker_b = parsed.get('side_b', {}).get('bookmaker', '')
-                    if not user_passes_casino_filter(user, [bookmaker_a, bookmaker_b]):
+                    if not user.passes_casino_filter([bookmaker_a, bookmaker_b]):
                         logger.info(f"🎰 Middle: User {user.telegram_id} SKIPPED - casino filter (casinos: {bookmaker_a}, {bookmaker_b})")
                         continue
                     
                     # Check sport filter
                     sport = parsed.get('sport', '') or parsed.get('league', '')
-                    if not user_passes_sport_filter(user, sport):
+                    if not user.passes_sport_filter(sport):
                         logger.info(f"🏅 Middle: User {user.telegram_id} SKIPPED - sport filter (sport: {sport})")
                         continue
                     
@@ -2422,21 +2256,29 @@ async def handle_middle(req: Request):
                         )]
                     ]
                     
-                    await bot.send_message(
-                        chat_id=user.telegram_id,
-                        text=message,
+                    # Mis en file: le scheduler respecte les limites Telegram
+                    pending_sends.append((user.telegram_id, send_scheduler.submit(
+                        user.telegram_id,
+                        message,
+                        lane=LANE_MIDDLE,
+                        premium=(tier_core == TierLevel.PREMIUM),
                         reply_markup=InlineKeyboardMarkup(inline_keyboard=keyboard),
                         parse_mode=ParseMode.HTML,
                         protect_content=True  # Prevent forwarding and copying
-                    )
-                    sent_count += 1
-                    logger.info(f"✅ Middle sent successfully to {user.telegram_id}")
+                    )))
                 except Exception as e:
                     logger.error(f"Failed to send Middle to user {user.telegram_id}: {e}")
                     # Log full traceback for debugging
                     import traceback
                     logger.error(f"Traceback: {traceback.format_exc()}")
             
+            results = await asyncio.gather(*(fut for _, fut in pending_sends), return_exceptions=True)
+            for (telegram_id, _), result in zip(pending_sends, results):
+                if isinstance(result, Exception):
+                    logger.error(f"Failed to send Middle to user {telegram_id}: {result}")
+                else:
+                    sent_count += 1
+            
             try:
                 logger.info(f"Middle alert sent to {sent_count} users")
             except Exception:
@@ -2455,10 +2297,7 @@ async def handle_middle(req: Request):
             db.close()
             
     except Exception as e:
-        try:
-            logger.error(f"Error in handle_middle: {e}")
-        except Exception:
-            print(f"Error in handle_middle: {e}")
+        logger.error(f"Error in _dispatch_middle: {e}")
         return {"status": "error", "message": str(e)}
 
 
@@ -2664,31 +2503,21 @@ async def admin_resend_last():
 # ===== Calculator & Risked Interactive Handlers =====
 
 def _get_user_prefs(user_id: int) -> tuple[float, str, float]:
-    """Get user preferences from database."""
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.telegram_id == user_id).first()
-        if user:
-            return user.default_bankroll or 400.0, (user.language or "en"), (user.default_risk_percentage or 5.0)
-        return 400.0, "en", 5.0
-    finally:
-        db.close()
+    """Get user preferences (in-memory snapshot, see utils.user_prefs)."""
+    prefs = user_prefs.get(user_id)
+    if prefs:
+        return prefs.default_bankroll or 400.0, (prefs.language or "en"), (prefs.default_risk_percentage or 5.0)
+    return 400.0, "en", 5.0
 
 
 def _get_user_rounding(user_id: int) -> tuple[int, str]:
-    """Get user stake rounding preferences from database.
+    """Get user stake rounding preferences (in-memory snapshot).
     Returns (rounding_level, rounding_mode)
     """
-    db = SessionLocal()
-    try:
-        user = db.query(User).filter(User.telegram_id == user_id).first()
-        if user:
-            rounding_level = user.stake_rounding or 0
-            rounding_mode = getattr(user, 'rounding_mode', 'nearest') or 'nearest'
-            return rounding_level, rounding_mode
-        return 0, 'nearest'
-    finally:
-        db.close()
+    prefs = user_prefs.get(user_id)
+    if prefs:
+        return prefs.stake_rounding or 0, prefs.rounding_mode or 'nearest'
+    return 0, 'nearest'
 
 
 def _format_currency(x: float) -> str:
@@ -3765,7 +3594,7 @@ async def handle_custom_cashh_amount(message: types.Message, state: FSMContext):
     ])
 
     # Row 5: Verify Odds - DISABLED (not working properly)
-    # call_id = CALL_IDS_BY_DROP_ID.get(str(de_id))
+    # call_id = PENDING_CALLS.call_id_for_drop(de_id)
     # if call_id:
     #     verify_text = "✅ Vérifier les cotes" if lang=='fr' else "✅ Verify Odds"
     #     kb.append([
@@ -3786,8 +3615,8 @@ async def handle_custom_cashh_amount(message: types.Message, state: FSMContext):
     
     # 🔥 IMPORTANT: Update PENDING_CALLS with new bankroll for custom amounts too
     drop_event_id = str(drop.get('drop_event_id', ''))
-    if drop_event_id and drop_event_id in PENDING_CALLS:
-        betting_call = PENDING_CALLS[drop_event_id]
+    betting_call = PENDING_CALLS.get_by_drop(drop_event_id) if drop_event_id else None
+    if betting_call is not None:
         # Update bankroll and recalculate stakes
         betting_call.bankroll = amount
         
@@ -3800,12 +3629,9 @@ async def handle_custom_cashh_amount(message: types.Message, state: FSMContext):
         # Recalculate arbitrage analysis
         betting_call = analyze_arbitrage_two_way(betting_call)
         
-        # Save back to PENDING_CALLS
-        PENDING_CALLS[drop_event_id] = betting_call
-        
-        # Save to pickle
+        # Save back to PENDING_CALLS (this entry only)
         try:
-            save_pending_calls()
+            PENDING_CALLS.put(betting_call, drop_id=drop_event_id)
             logger.info(f"Updated bankroll to ${amount} for call {drop_event_id} (custom amount)")
         except Exception as e:
             logger.error(f"Failed to save pending calls after custom bankroll change: {e}")
@@ -3840,7 +3666,7 @@ async def quick_amount_callback(callback: types.CallbackQuery):
     
     # Try to get drop first, then fallback to PENDING_CALLS
     drop = _get_drop(eid)
-    betting_call = PENDING_CALLS.get(str(eid))
+    betting_call = PENDING_CALLS.get(str(eid)) or PENDING_CALLS.get_by_drop(eid)
     
     if not drop and not betting_call:
         await callback.answer("❌ Drop expiré", show_alert=True)
@@ -3974,7 +3800,7 @@ async def quick_amount_callback(callback: types.CallbackQuery):
     ])
 
     # Row 5: Verify Odds - DISABLED (not working properly)
-    # call_id = CALL_IDS_BY_DROP_ID.get(str(de_id))
+    # call_id = PENDING_CALLS.call_id_for_drop(de_id)
     # if call_id:
     #     verify_text = "✅ Vérifier les cotes" if lang=='fr' else "✅ Verify Odds"
     #     kb.append([
@@ -3984,11 +3810,12 @@ async def quick_amount_callback(callback: types.CallbackQuery):
     
     # 🔥 IMPORTANT: Update PENDING_CALLS with new bankroll
     drop_event_id = str(de_id)
-    if drop_event_id and drop_event_id in PENDING_CALLS:
+    pending_call = PENDING_CALLS.get_by_drop(drop_event_id) if drop_event_id else None
+    if pending_call is not None:
         # If we already updated betting_call above (no drop case), it's already saved
         if drop:
             # Need to update PENDING_CALLS from the drop data
-            betting_call_to_update = PENDING_CALLS[drop_event_id]
+            betting_call_to_update = pending_call
             betting_call_to_update.bankroll = amount
             
             # Recalculate stakes for both sides
@@ -3999,16 +3826,13 @@ async def quick_amount_callback(callback: types.CallbackQuery):
             
             # Recalculate arbitrage analysis
             betting_call_to_update = analyze_arbitrage_two_way(betting_call_to_update)
-            
-            # Save back to PENDING_CALLS
-            PENDING_CALLS[drop_event_id] = betting_call_to_update
         else:
             # betting_call was already modified above, just save it
-            PENDING_CALLS[drop_event_id] = betting_call
+            betting_call_to_update = betting_call
         
-        # Save to pickle
+        # Save back to PENDING_CALLS (this entry only)
         try:
-            save_pending_calls()
+            PENDING_CALLS.put(betting_call_to_update, drop_id=drop_event_id)
             logger.info(f"Updated bankroll to ${amount} for call {drop_event_id}")
         except Exception as e:
             logger.error(f"Failed to save pending calls after bankroll change: {e}")
@@ -4932,8 +4756,7 @@ async def callback_verify_odds(callback: types.CallbackQuery):
                     await callback.answer("⚠️ Impossible de reconstruire le call.", show_alert=True)
                     return
                 call_id = betting_call.call_id
-                PENDING_CALLS[call_id] = betting_call
-                save_pending_calls()
+                PENDING_CALLS.put(betting_call)
             except Exception as e:
                 logger.error(f"Failed to reconstruct call: {e}")
                 await callback.answer("⚠️ Reconstruction impossible.", show_alert=True)
@@ -4954,8 +4777,7 @@ async def callback_verify_odds(callback: types.CallbackQuery):
 
         # Update stored call
         betting_call.last_checked_source = "user"
-        PENDING_CALLS[call_id] = betting_call
-        save_pending_calls()
+        PENDING_CALLS.put(betting_call, call_id=call_id)
         
         # Format updated message (only mark as verified on real success)
         message_text = format_call_message(
@@ -5342,6 +5164,39 @@ async def health_check():
     return {"status": "ok", "timestamp": datetime.now().isoformat()}
 
 
+@app.get("/health/send-queue")
+async def send_queue_health():
+    """Telegram send scheduler metrics (queue depth, latency, retries)"""
+    return send_scheduler.metrics()
+
+
+@app.get("/health/enrichment")
+async def enrichment_health():
+    """Odds API enrichment queue metrics (queue depth, latency percentiles, retries)"""
+    return enrichment_queue.metrics()
+
+
+@app.get("/health/websockets")
+async def websockets_health():
+    """Dashboard WebSocket fan-out metrics (clients, drops, slow-client disconnects, latency)"""
+    return ws_manager.metrics()
+
+
+@app.get("/health/latency")
+async def latency_health():
+    """
+    Hot-path latency per stage (drop receipt -> message delivered), p50/p95/p99 vs the 2s target
+    Read-only: histograms are reset with the admin /latency reset bot command
+    """
+    return latency_tracer.summary()
+
+
+@app.get("/health/events-snapshot")
+async def events_snapshot_health():
+    """Per-sport Odds API events snapshot (age, next refresh, hit/miss counters)"""
+    return events_snapshot.status()
+
+
 # ===== Startup =====
 
 async def on_startup():
@@ -5349,6 +5204,16 @@ async def on_startup():
     print("🚀 Initializing database...")
     init_db()
     print("✅ Database initialized")
+    try:
+        subscriber_index.load()
+    except Exception as e:
+        print(f"⚠️ Subscriber index load failed (will retry on first drop): {e}")
+    try:
+        user_prefs.load()
+    except Exception as e:
+        print(f"⚠️ User prefs load failed (will retry on first read): {e}")
+    # Dernier snapshot des événements Odds API (redémarrage à chaud)
+    events_snapshot.load()
 
 
 async def runner():
@@ -5427,7 +5292,19 @@ async def runner():
     from bot.book_health_cron import schedule_book_health_tasks
     tasks.append(schedule_book_health_tasks(bot))
     
-    await asyncio.gather(*tasks)
+    # Keep per-sport Odds API events snapshots fresh (enrichment resolves events locally)
+    tasks.append(events_snapshot.refresh_loop())
+
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        # Shutdown: write the ML events still in the write-behind buffer
+        from bot.ml_event_tracker import ml_tracker
+        try:
+            await ml_tracker.stop()
+            print(f"✅ ML event tracker flushed ({ml_tracker.get_buffer_stats()['pending']} pending)")
+        except Exception as e:
+            print(f"⚠️ Failed to flush ML event tracker: {e}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,49 @@
+"""
+Migration: Add denormalised Last Calls filter columns to drop_events
+(sports, casinos), the (bet_type, received_at, id) / (bet_type, match_time)
+indexes, then backfill them (and missing match_time) from the payloads.
+sports / casinos are not indexed (LIKE '%|tag|%' cannot use a B-tree): the
+indexes created by an earlier run of this migration are dropped
+"""
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import inspect, text
+from database import engine
+from models.drop_event import DropEvent
+from utils.drop_filters import backfill
+
+NEW_COLUMNS = {
+    'sports': 'VARCHAR(100)',
+    'casinos': 'VARCHAR(500)',
+}
+
+# Created by earlier versions of this migration, unused by the LIKE filters
+DROPPED_INDEXES = ('ix_drop_events_sports', 'ix_drop_events_casinos')
+
+
+def upgrade():
+    """Add sports / casinos columns, indexes and backfill"""
+    columns = {c['name'] for c in inspect(engine).get_columns('drop_events')}
+    with engine.begin() as conn:
+        for name, sql_type in NEW_COLUMNS.items():
+            if name not in columns:
+                conn.execute(text(f"ALTER TABLE drop_events ADD COLUMN {name} {sql_type}"))
+                print(f"✅ Column {name} added")
+            else:
+                print(f"✓ Column {name} already exists")
+
+    with engine.begin() as conn:
+        for name in DROPPED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    for index in DropEvent.__table__.indexes:
+        index.create(engine, checkfirst=True)
+    print("✅ Indexes ready")
+
+    count = backfill()
+    print(f"✅ Backfilled {count} drop_events")
+
+
+if __name__ == "__main__":
+    upgrade()
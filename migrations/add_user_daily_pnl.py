@@ -0,0 +1,33 @@
+"""
+Add user_daily_pnl table (materialised per-user daily P&L) and backfill it
+from user_bets
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import SessionLocal, engine
+from models.bet import UserDailyPnL
+from utils.pnl_aggregates import rebuild
+
+
+def run_migration():
+    UserDailyPnL.__table__.create(engine, checkfirst=True)
+    print("✅ user_daily_pnl table ready")
+    
+    db = SessionLocal()
+    try:
+        count = rebuild(db)
+        db.commit()
+        print(f"✅ Backfilled {count} daily P&L rows from user_bets")
+    except Exception as e:
+        db.rollback()
+        print(f"❌ Backfill failed: {e}")
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -176,6 +176,31 @@ class DailyStats(Base):
         return (self.total_profit / self.total_staked) * 100
 
 
+class UserDailyPnL(Base):
+    """
+    Per-user, per-day, per-bet_type P&L aggregates
+    Maintained incrementally from UserBet writes (utils/pnl_aggregates.py)
+    so dashboards and the calendar read O(days) rows instead of O(bets)
+    """
+    __tablename__ = "user_daily_pnl"
+    __table_args__ = (UniqueConstraint('user_id', 'day', 'bet_type', name='_user_day_type_uc'),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey('users.telegram_id'), index=True, nullable=False)
+    day = Column(Date, nullable=False, index=True)  # = UserBet.bet_date
+    bet_type = Column(String(20), nullable=False, default='arbitrage')
+    bets = Column(Integer, nullable=False, default=0)
+    stake = Column(Float, nullable=False, default=0.0)
+    profit = Column(Float, nullable=False, default=0.0)  # actual_profit, sinon expected_profit
+    wins = Column(Integer, nullable=False, default=0)  # Règle dashboard (arbitrage = toujours win)
+    losses = Column(Integer, nullable=False, default=0)
+    positive = Column(Integer, nullable=False, default=0)  # Bets avec profit > 0 (calendrier)
+    negative = Column(Integer, nullable=False, default=0)  # Bets avec profit < 0
+    
+    def __repr__(self):
+        return f"<UserDailyPnL(user={self.user_id}, day={self.day}, type={self.bet_type}, bets={self.bets}, profit={self.profit})>"
+
+
 class ConversationState(Base):
     """
     Track conversation state for bet corrections
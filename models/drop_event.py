@@ -2,7 +2,7 @@
 DropEvent model to persist incoming arbitrage alerts (drops)
 """
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, UniqueConstraint
+from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, UniqueConstraint, Index
 from sqlalchemy.sql import func
 from database import Base
 
@@ -24,11 +24,19 @@ class DropEvent(Base):
     # Match time from The Odds API
     match_time = Column(DateTime(timezone=True), nullable=True, index=True)
 
+    # Denormalised filters for Last Calls (see utils.drop_filters): "|tag1|tag2|"
+    # Not indexed: only queried with LIKE '%|tag|%', which a B-tree cannot use
+    sports = Column(String(100), nullable=True)
+    casinos = Column(String(500), nullable=True)
+
     # full payload as JSON for later rendering
     payload = Column(JSON)
 
     __table_args__ = (
         UniqueConstraint('event_id', name='uq_drop_event_event_id'),
+        # Last Calls: one category, one day (or match day), newest first
+        Index('ix_drop_events_type_received', 'bet_type', 'received_at', 'id'),
+        Index('ix_drop_events_type_match_time', 'bet_type', 'match_time'),
     )
 
     def __repr__(self) -> str:
@@ -6,13 +6,14 @@ Gets REAL odds, REAL times, REAL everything!
 import json
 import random
 import os
-import aiohttp
 import asyncio
 from datetime import datetime, timedelta
 from database import SessionLocal
 from sqlalchemy import text
 from dotenv import load_dotenv
 
+from utils.odds_api_client import odds_api
+
 load_dotenv()
 
 class OddsAPIParlayGenerator:
@@ -80,41 +81,42 @@ class OddsAPIParlayGenerator:
             'americanfootball_ncaaf'
         ]
         
-        async with aiohttp.ClientSession() as session:
-            for sport in sports:
-                try:
-                    # Get events for this sport
-                    # Build bookmakers string (only API-supported ones)
-                    supported_bookmakers = [
-                        key for key, info in self.api_supported_books.items() 
-                        if info['api_support'] is True
-                    ]
-                    bookmakers_str = ','.join(supported_bookmakers)
-                    
-                    url = f"{self.base_url}/sports/{sport}/odds"
-                    params = {
-                        'apiKey': self.api_key,
-                        'regions': 'us,us2,uk,eu,au',  # Multiple regions for better coverage
-                        'markets': 'h2h,spreads,totals',  # All main markets
-                        'oddsFormat': 'decimal',
-                        'bookmakers': bookmakers_str,  # ALL supported bookmakers!
-                        'includeLinks': 'true'  # Get deep links!
-                    }
-                    
-                    async with session.get(url, params=params) as response:
-                        if response.status == 200:
-                            data = await response.json()
-                            
-                            for event in data:
-                                # Parse event into our format
-                                parsed = self.parse_api_event(event, sport)
-                                if parsed:
-                                    games.extend(parsed)
-                        else:
-                            print(f"API error for {sport}: {response.status}")
-                            
-                except Exception as e:
-                    print(f"Error fetching {sport}: {e}")
+        # Build bookmakers string (only API-supported ones)
+        supported_bookmakers = [
+            key for key, info in self.api_supported_books.items() 
+            if info['api_support'] is True
+        ]
+        bookmakers_str = ','.join(supported_bookmakers)
+        params = {
+            'apiKey': self.api_key,
+            'regions': 'us,us2,uk,eu,au',  # Multiple regions for better coverage
+            'markets': 'h2h,spreads,totals',  # All main markets
+            'oddsFormat': 'decimal',
+            'bookmakers': bookmakers_str,  # ALL supported bookmakers!
+            'includeLinks': 'true'  # Get deep links!
+        }
+        
+        # All sports fetched concurrently through the shared pooled client
+        results = await asyncio.gather(
+            *[odds_api.aget_sport_odds(sport, params) for sport in sports],
+            return_exceptions=True
+        )
+        
+        for sport, data in zip(sports, results):
+            if isinstance(data, Exception):
+                print(f"Error fetching {sport}: {data}")
+                continue
+            if data is None:
+                print(f"API error for {sport}")
+                continue
+            try:
+                for event in data:
+                    # Parse event into our format
+                    parsed = self.parse_api_event(event, sport)
+                    if parsed:
+                        games.extend(parsed)
+            except Exception as e:
+                print(f"Error fetching {sport}: {e}")
         
         print(f"✅ Found {len(games)} REAL betting opportunities")
         return games
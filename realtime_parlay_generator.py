@@ -8,17 +8,15 @@ Se déclenche automatiquement quand un nouveau drop arrive
 """
 import json
 from datetime import datetime
-from database import SessionLocal
-from sqlalchemy import text
 
 # Import du nouveau moteur intelligent
-from smart_parlay_engine import SmartParlayEngine
+from smart_parlay_engine import SmartParlayEngine, get_incremental_engine
 
 class RealtimeParlayGenerator:
     
     def __init__(self):
-        self.db = SessionLocal()
-        self.engine = SmartParlayEngine()
+        # Moteur complet (scan 7 jours) créé seulement pour une régénération totale
+        self.engine = None
     
     def should_generate(self, new_drop):
         """
@@ -40,8 +38,14 @@ class RealtimeParlayGenerator:
         try:
             print(f"🔥 New drop {drop_event_id} - Generating ALL parlay types...")
             
-            # Utiliser le nouveau moteur intelligent
-            parlays = self.engine.generate_all_parlays()
+            if drop_event_id:
+                # Pool de legs en mémoire: seulement les combinaisons avec les nouveaux legs
+                parlays = get_incremental_engine().on_new_drop(drop_event_id)
+            else:
+                # 0 = régénération complète à partir de tous les drops
+                self.engine = SmartParlayEngine()
+                parlays = self.engine.generate_all_parlays()
+                get_incremental_engine().reset()
             
             if parlays:
                 # Compter par stratégie
@@ -62,7 +66,8 @@ class RealtimeParlayGenerator:
             traceback.print_exc()
     
     def close(self):
-        self.db.close()
+        if self.engine is not None:
+            self.engine.db.close()
 
 # Fonction hook pour main_new.py
 def on_drop_received(drop_event_id):
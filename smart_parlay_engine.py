@@ -7,15 +7,39 @@ Génère des parlays intelligents à partir de TOUS les drops (Arbitrage, Middle
 - Same-day et Cross-day parlays
 - Calcule EV réel de chaque parlay
 """
+import bisect
+import heapq
+import itertools
 import json
+import threading
 from datetime import datetime, date, timedelta, timezone
 from database import SessionLocal
 from sqlalchemy import text
 from typing import List, Dict, Optional
 import logging
 
+from utils.parlay_search import top_k_parlays
+
 logger = logging.getLogger(__name__)
 
+# (stratégie, max_legs, min_combined, max_combined, legs minimum dans le groupe)
+SAME_DAY_STRATEGIES = [
+    ('SAME_DAY_SAFE', 2, 1.5, 3.0, 2),
+    ('SAME_DAY_BALANCED', 3, 2.0, 6.0, 2),
+    ('SAME_DAY_AGGRESSIVE', 4, 4.0, 15.0, 3),
+]
+CROSS_DAY_STRATEGIES = [
+    ('CROSS_DAY_SAFE', 2, 1.5, 3.0, 2),
+    ('CROSS_DAY_BALANCED', 3, 2.5, 8.0, 2),
+    ('CROSS_DAY_AGGRESSIVE', 4, 5.0, 20.0, 2),
+    ('LOTTERY', 6, 10.0, 100.0, 4),
+]
+HIGH_EV_STRATEGY = ('HIGH_EV', 3, 2.0, 10.0, 2)
+HIGH_EV_POOL_SIZE = 20
+
+# Par casino et stratégie: les meilleurs parlays (EV), 5 par taille de parlay possible
+COMBOS_PER_SIZE = 5
+
 class SmartParlayEngine:
     """
     Moteur de génération de parlays intelligent
@@ -284,36 +308,23 @@ class SmartParlayEngine:
                 legs_by_date[date_key].append(leg)
         
         for date_key, date_legs in legs_by_date.items():
-            if len(date_legs) >= 2:
-                # Safe 2-leg same day
-                parlays.extend(self._create_parlays(date_legs, 'SAME_DAY_SAFE', max_legs=2, min_combined=1.5, max_combined=3.0))
-                # Balanced 2-3 legs same day
-                parlays.extend(self._create_parlays(date_legs, 'SAME_DAY_BALANCED', max_legs=3, min_combined=2.0, max_combined=6.0))
-                # Aggressive 3-4 legs same day
-                if len(date_legs) >= 3:
-                    parlays.extend(self._create_parlays(date_legs, 'SAME_DAY_AGGRESSIVE', max_legs=4, min_combined=4.0, max_combined=15.0))
+            # Safe / Balanced / Aggressive same day
+            for strategy, max_legs, min_c, max_c, min_pool in SAME_DAY_STRATEGIES:
+                if len(date_legs) >= min_pool:
+                    parlays.extend(self._create_parlays(date_legs, strategy, max_legs=max_legs, min_combined=min_c, max_combined=max_c))
         
         # ===== CROSS DAY PARLAYS (pas de vérif de date) =====
-        # Utiliser TOUS les legs peu importe la date
-        
-        # Safe cross-day
-        parlays.extend(self._create_parlays(all_legs, 'CROSS_DAY_SAFE', max_legs=2, min_combined=1.5, max_combined=3.0))
-        
-        # Balanced cross-day
-        parlays.extend(self._create_parlays(all_legs, 'CROSS_DAY_BALANCED', max_legs=3, min_combined=2.5, max_combined=8.0))
-        
-        # Aggressive cross-day
-        parlays.extend(self._create_parlays(all_legs, 'CROSS_DAY_AGGRESSIVE', max_legs=4, min_combined=5.0, max_combined=20.0))
-        
-        # Lottery (jackpot potential)
-        if len(all_legs) >= 4:
-            parlays.extend(self._create_parlays(all_legs, 'LOTTERY', max_legs=6, min_combined=10.0, max_combined=100.0))
+        # Utiliser TOUS les legs peu importe la date (+ Lottery, jackpot potential)
+        for strategy, max_legs, min_c, max_c, min_pool in CROSS_DAY_STRATEGIES:
+            if len(all_legs) >= min_pool:
+                parlays.extend(self._create_parlays(all_legs, strategy, max_legs=max_legs, min_combined=min_c, max_combined=max_c))
         
         # ===== HIGH EV PARLAYS =====
         # Combiner les legs avec le plus haut edge
-        high_ev_legs = sorted(all_legs, key=lambda x: x['edge'], reverse=True)[:20]
-        if len(high_ev_legs) >= 2:
-            parlays.extend(self._create_parlays(high_ev_legs, 'HIGH_EV', max_legs=3, min_combined=2.0, max_combined=10.0))
+        high_ev_legs = sorted(all_legs, key=lambda x: x['edge'], reverse=True)[:HIGH_EV_POOL_SIZE]
+        strategy, max_legs, min_c, max_c, min_pool = HIGH_EV_STRATEGY
+        if len(high_ev_legs) >= min_pool:
+            parlays.extend(self._create_parlays(high_ev_legs, strategy, max_legs=max_legs, min_combined=min_c, max_combined=max_c))
         
         # Dédupliquer et sauvegarder
         unique_parlays = self._deduplicate_parlays(parlays)
@@ -350,61 +361,46 @@ class SmartParlayEngine:
                     legs_by_casino[casino] = []
                 legs_by_casino[casino].append(leg)
         
-        # Créer des parlays pour CHAQUE casino séparément
-        from itertools import combinations
-        
+        # Créer des parlays pour CHAQUE casino séparément:
+        # top-K par EV dans la fenêtre de cotes (branch-and-bound, tous les legs du casino)
+        k = COMBOS_PER_SIZE * (max_legs - 1)
         for casino, casino_legs in legs_by_casino.items():
             if len(casino_legs) < 2:
                 continue
             
-            # Trier par edge (meilleurs en premier)
-            sorted_legs = sorted(casino_legs, key=lambda x: x['edge'], reverse=True)
-            
-            for num_legs in range(2, min(max_legs + 1, len(sorted_legs) + 1)):
-                # Prendre les meilleures combinaisons pour CE casino
-                for combo in list(combinations(sorted_legs[:10], num_legs))[:5]:
-                    # Vérifier que les legs sont de matchs différents
-                    matches = set(leg['match'] for leg in combo)
-                    if len(matches) < len(combo):
-                        continue  # Skip si même match
-                    
-                    # Calculer les cotes combinées
-                    combined_odds = 1.0
-                    for leg in combo:
-                        combined_odds *= leg['odds']
-                    
-                    # Vérifier les limites
-                    if min_combined <= combined_odds <= max_combined:
-                        # Calculer l'EV du parlay
-                        avg_edge = sum(leg['edge'] for leg in combo) / len(combo)
-                        
-                        # Estimer la probabilité de gain
-                        win_prob = 1.0
-                        for leg in combo:
-                            # Convertir edge en probabilité approximative
-                            leg_prob = 0.5 + (leg['edge'] / 100) * 0.3  # Ajustement basé sur edge
-                            win_prob *= leg_prob
-                        
-                        expected_value = (combined_odds * win_prob) - 1
-                        
-                        parlay = {
-                            'strategy': strategy,
-                            'casino': casino,  # 🎯 CASINO UNIQUE!
-                            'legs': list(combo),
-                            'num_legs': len(combo),
-                            'combined_odds': round(combined_odds, 2),
-                            'avg_edge': round(avg_edge, 2),
-                            'estimated_win_prob': round(win_prob * 100, 1),
-                            'expected_value': round(expected_value * 100, 2),
-                            'potential_return': f"{combined_odds:.2f}x",
-                            'created_at': datetime.now().isoformat(),
-                            'risk_level': self._get_risk_level(strategy)
-                        }
-                        
-                        parlays.append(parlay)
+            for combined_odds, combo in top_k_parlays(casino_legs, max_legs, min_combined, max_combined, k):
+                combo = sorted(combo, key=lambda x: x['edge'], reverse=True)
+                parlays.append(self._build_parlay(combo, strategy, casino, combined_odds))
         
         return parlays
     
+    def _build_parlay(self, combo, strategy: str, casino: str, combined_odds: float) -> Dict:
+        """Calcule EV / probabilité d'un combo de legs et construit le parlay"""
+        avg_edge = sum(leg['edge'] for leg in combo) / len(combo)
+        
+        # Estimer la probabilité de gain
+        win_prob = 1.0
+        for leg in combo:
+            # Convertir edge en probabilité approximative
+            leg_prob = 0.5 + (leg['edge'] / 100) * 0.3  # Ajustement basé sur edge
+            win_prob *= leg_prob
+        
+        expected_value = (combined_odds * win_prob) - 1
+        
+        return {
+            'strategy': strategy,
+            'casino': casino,  # 🎯 CASINO UNIQUE!
+            'legs': list(combo),
+            'num_legs': len(combo),
+            'combined_odds': round(combined_odds, 2),
+            'avg_edge': round(avg_edge, 2),
+            'estimated_win_prob': round(win_prob * 100, 1),
+            'expected_value': round(expected_value * 100, 2),
+            'potential_return': f"{combined_odds:.2f}x",
+            'created_at': datetime.now().isoformat(),
+            'risk_level': self._get_risk_level(strategy)
+        }
+    
     def _get_risk_level(self, strategy: str) -> str:
         """Retourne le niveau de risque pour une stratégie"""
         if 'SAFE' in strategy:
@@ -447,30 +443,7 @@ class SmartParlayEngine:
             if existing:
                 return False
             
-            # Créer le parlay
-            self.db.execute(text("""
-                INSERT INTO parlays (
-                    strategy, casino, num_legs, combined_odds, avg_edge,
-                    estimated_win_prob, expected_value, risk_level,
-                    leg_drop_ids, legs_json, created_at, status
-                ) VALUES (
-                    :strategy, :casino, :num_legs, :combined_odds, :avg_edge,
-                    :win_prob, :ev, :risk, :leg_ids, :legs_json, :created, 'active'
-                )
-            """), {
-                'strategy': parlay['strategy'],
-                'casino': parlay.get('casino', 'Unknown'),
-                'num_legs': parlay['num_legs'],
-                'combined_odds': parlay['combined_odds'],
-                'avg_edge': parlay['avg_edge'],
-                'win_prob': parlay['estimated_win_prob'],
-                'ev': parlay['expected_value'],
-                'risk': parlay['risk_level'],
-                'leg_ids': leg_ids,
-                'legs_json': json.dumps(parlay['legs'], default=str),
-                'created': datetime.now()
-            })
-            
+            self._insert_parlay(parlay, leg_ids)
             self.db.commit()
             return True
             
@@ -479,6 +452,31 @@ class SmartParlayEngine:
             self.db.rollback()
             return False
     
+    def _insert_parlay(self, parlay: Dict, leg_ids: str) -> None:
+        """INSERT d'un parlay (sans commit)"""
+        self.db.execute(text("""
+            INSERT INTO parlays (
+                strategy, casino, num_legs, combined_odds, avg_edge,
+                estimated_win_prob, expected_value, risk_level,
+                leg_drop_ids, legs_json, created_at, status
+            ) VALUES (
+                :strategy, :casino, :num_legs, :combined_odds, :avg_edge,
+                :win_prob, :ev, :risk, :leg_ids, :legs_json, :created, 'active'
+            )
+        """), {
+            'strategy': parlay['strategy'],
+            'casino': parlay.get('casino', 'Unknown'),
+            'num_legs': parlay['num_legs'],
+            'combined_odds': parlay['combined_odds'],
+            'avg_edge': parlay['avg_edge'],
+            'win_prob': parlay['estimated_win_prob'],
+            'ev': parlay['expected_value'],
+            'risk': parlay['risk_level'],
+            'leg_ids': leg_ids,
+            'legs_json': json.dumps(parlay['legs'], default=str),
+            'created': datetime.now()
+        })
+    
     def get_parlays_for_user(self, user_id: int, risk_levels: List[str] = None) -> List[Dict]:
         """
         Récupère les parlays actifs pour un utilisateur
@@ -521,6 +519,263 @@ class SmartParlayEngine:
             return []
 
 
+class LegPool:
+    """
+    Legs actifs en mémoire, indexés par casino, (casino, date de match) et edge
+    Chaque index est une liste triée par edge décroissant.
+    Un leg expire à son commence_time (ou 7 jours après réception).
+    """
+    
+    def __init__(self, max_age_days: int = 7):
+        self.max_age = timedelta(days=max_age_days)
+        self._seq = itertools.count()
+        self._by_casino: Dict[str, list] = {}
+        self._by_casino_date: Dict[tuple, list] = {}
+        self._by_edge: list = []
+        self._legs_per_date: Dict[date, int] = {}
+        self._by_drop: Dict[int, list] = {}
+        self._expiry: list = []  # heap (expires_at, seq, entry)
+    
+    def __len__(self) -> int:
+        return len(self._by_edge)
+    
+    def _expires_at(self, leg: Dict) -> Optional[float]:
+        expiries = []
+        commence_time = leg.get('commence_time')
+        if commence_time:
+            try:
+                match_time = datetime.fromisoformat(str(commence_time).replace('Z', '+00:00'))
+                # Heure naïve = non comparable (moteur historique: leg conservé)
+                if match_time.tzinfo is not None:
+                    expiries.append(match_time.timestamp())
+            except Exception:
+                pass
+        received_at = leg.get('received_at')
+        if isinstance(received_at, str):
+            # SQLite (requête text()) renvoie les DATETIME en chaîne
+            try:
+                received_at = datetime.fromisoformat(received_at)
+            except ValueError:
+                received_at = None
+        if isinstance(received_at, datetime):
+            expiries.append((received_at + self.max_age).timestamp())
+        return min(expiries) if expiries else None
+    
+    def add(self, leg: Dict, now: Optional[float] = None) -> bool:
+        """Ajoute un leg; False s'il est déjà expiré"""
+        now = now if now is not None else datetime.now(timezone.utc).timestamp()
+        expires_at = self._expires_at(leg)
+        if expires_at is not None and expires_at <= now:
+            return False
+        
+        entry = (-leg['edge'], next(self._seq), leg)
+        bisect.insort(self._by_edge, entry)
+        casino = leg.get('bookmaker') or 'Unknown'
+        bisect.insort(self._by_casino.setdefault(casino, []), entry)
+        if leg.get('match_date'):
+            bisect.insort(self._by_casino_date.setdefault((casino, leg['match_date']), []), entry)
+            self._legs_per_date[leg['match_date']] = self._legs_per_date.get(leg['match_date'], 0) + 1
+        self._by_drop.setdefault(leg['drop_id'], []).append(entry)
+        if expires_at is not None:
+            heapq.heappush(self._expiry, (expires_at, entry[1], entry))
+        return True
+    
+    def _discard(self, entry) -> None:
+        leg = entry[2]
+        casino = leg.get('bookmaker') or 'Unknown'
+        indexes = [self._by_edge, self._by_casino.get(casino)]
+        if leg.get('match_date'):
+            indexes.append(self._by_casino_date.get((casino, leg['match_date'])))
+        for index in indexes:
+            if not index:
+                continue
+            i = bisect.bisect_left(index, entry[:2])
+            if i < len(index) and index[i][1] == entry[1]:
+                del index[i]
+        if leg.get('match_date'):
+            self._legs_per_date[leg['match_date']] -= 1
+        drop_entries = self._by_drop.get(leg['drop_id'])
+        if drop_entries is not None:
+            drop_entries.remove(entry)
+            if not drop_entries:
+                del self._by_drop[leg['drop_id']]
+    
+    def remove_drop(self, drop_id: int) -> int:
+        """Retire les legs d'un drop (drop mis à jour = legs remplacés)"""
+        entries = list(self._by_drop.get(drop_id, []))
+        for entry in entries:
+            self._discard(entry)
+        return len(entries)
+    
+    def expire(self, now: Optional[float] = None) -> int:
+        """Retire les legs dont le match a commencé (ou trop vieux)"""
+        now = now if now is not None else datetime.now(timezone.utc).timestamp()
+        expired = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            _, _, entry = heapq.heappop(self._expiry)
+            if entry in self._by_drop.get(entry[2]['drop_id'], ()):
+                self._discard(entry)
+                expired += 1
+        return expired
+    
+    def casino_legs(self, casino: str) -> List[Dict]:
+        return [e[2] for e in self._by_casino.get(casino, ())]
+    
+    def casino_date_legs(self, casino: str, match_date: date) -> List[Dict]:
+        return [e[2] for e in self._by_casino_date.get((casino, match_date), ())]
+    
+    def date_count(self, match_date: date) -> int:
+        return self._legs_per_date.get(match_date, 0)
+    
+    def top_edge(self, n: int) -> List[Dict]:
+        return [e[2] for e in self._by_edge[:n]]
+
+
+class IncrementalParlayEngine(SmartParlayEngine):
+    """
+    Génération incrémentale: le pool de legs actifs reste en mémoire.
+    À chaque drop: expiration, ajout des legs du drop, puis seulement les
+    combinaisons qui contiennent au moins un nouveau leg.
+    Les drops des 7 derniers jours ne sont lus qu'une fois (warm-up).
+    """
+    
+    def __init__(self):
+        # Session ouverte uniquement pendant un traitement (instance longue durée)
+        self.db = None
+        self.pool = LegPool()
+        self._saved_keys = set()
+        self._warm = False
+        self._lock = threading.Lock()
+    
+    def reset(self) -> None:
+        """Force un rechargement complet au prochain drop"""
+        with self._lock:
+            self.pool = LegPool()
+            self._saved_keys = set()
+            self._warm = False
+    
+    def _warm_up(self) -> None:
+        drops_data = self.get_all_recent_drops(days_back=7)
+        loaded = 0
+        for data in drops_data:
+            for leg in data['legs']:
+                loaded += self.pool.add(leg)
+        rows = self.db.execute(text("""
+            SELECT leg_drop_ids FROM parlays WHERE created_at >= :since
+        """), {'since': datetime.now() - timedelta(days=8)}).fetchall()
+        self._saved_keys = {r.leg_drop_ids for r in rows if r.leg_drop_ids}
+        self._warm = True
+        logger.info(f"🎰 Parlay pool warmed up: {loaded} active legs, {len(self._saved_keys)} known parlays")
+    
+    def _fetch_drop(self, drop_event_id: int):
+        return self.db.execute(text("""
+            SELECT id, event_id, match, league, market, bet_type,
+                   arb_percentage, payload, received_at
+            FROM drop_events
+            WHERE id = :id
+        """), {'id': drop_event_id}).fetchone()
+    
+    def on_new_drop(self, drop_event_id: int) -> List[Dict]:
+        """Ajoute les legs du drop au pool et génère les nouveaux parlays"""
+        with self._lock:
+            self.db = SessionLocal()
+            try:
+                if not self._warm:
+                    self._warm_up()
+                expired = self.pool.expire()
+                
+                row = self._fetch_drop(drop_event_id)
+                parsed = self._parse_drop(row) if row else None
+                # Drop re-reçu (mise à jour): ses legs sont remplacés et traités comme nouveaux
+                self.pool.remove_drop(drop_event_id)
+                if not parsed:
+                    return []
+                new_legs = [leg for leg in parsed['legs'] if self.pool.add(leg)]
+                
+                parlays = self._deduplicate_parlays(self._parlays_with_new_legs(new_legs))
+                saved = self._save_new_parlays(parlays)
+                logger.info(
+                    f"🎰 Drop {drop_event_id}: +{len(new_legs)} legs, -{expired} expired, "
+                    f"pool={len(self.pool)}, {len(parlays)} new parlays ({saved} saved)"
+                )
+                return parlays
+            finally:
+                self.db.close()
+                self.db = None
+    
+    def _parlays_with_new_legs(self, new_legs: List[Dict]) -> List[Dict]:
+        parlays = []
+        top_edge = self.pool.top_edge(HIGH_EV_POOL_SIZE)
+        for leg in new_legs:
+            casino = leg.get('bookmaker', 'Unknown')
+            if not casino or casino == 'Unknown':
+                continue
+            
+            # ===== SAME DAY =====
+            if leg['match_date']:
+                date_legs = self.pool.casino_date_legs(casino, leg['match_date'])
+                for strategy, max_legs, min_c, max_c, min_pool in SAME_DAY_STRATEGIES:
+                    if self.pool.date_count(leg['match_date']) >= min_pool:
+                        parlays.extend(self._combos_with_leg(leg, date_legs, strategy, max_legs, min_c, max_c))
+            
+            # ===== CROSS DAY + LOTTERY =====
+            casino_legs = self.pool.casino_legs(casino)
+            for strategy, max_legs, min_c, max_c, min_pool in CROSS_DAY_STRATEGIES:
+                if len(self.pool) >= min_pool:
+                    parlays.extend(self._combos_with_leg(leg, casino_legs, strategy, max_legs, min_c, max_c))
+            
+            # ===== HIGH EV (le nouveau leg doit être dans le top edge) =====
+            if any(l is leg for l in top_edge):
+                strategy, max_legs, min_c, max_c, _ = HIGH_EV_STRATEGY
+                high_ev_legs = [l for l in top_edge if l.get('bookmaker') == casino]
+                parlays.extend(self._combos_with_leg(leg, high_ev_legs, strategy, max_legs, min_c, max_c))
+        return parlays
+    
+    def _combos_with_leg(self, leg: Dict, candidates: List[Dict], strategy: str, max_legs: int,
+                         min_combined: float, max_combined: float) -> List[Dict]:
+        """Meilleurs parlays (même casino, matchs différents) qui incluent `leg`"""
+        parlays = []
+        for combined_odds, combo in top_k_parlays(candidates, max_legs, min_combined, max_combined,
+                                                  COMBOS_PER_SIZE, required=leg):
+            combo = sorted(combo, key=lambda l: l['edge'], reverse=True)
+            parlays.append(self._build_parlay(combo, strategy, leg['bookmaker'], combined_odds))
+        return parlays
+    
+    def _save_new_parlays(self, parlays: List[Dict]) -> int:
+        """INSERT groupés (un seul commit), dédup par leg_drop_ids en mémoire"""
+        saved_keys = []
+        try:
+            for parlay in parlays:
+                leg_ids = json.dumps(sorted(leg['drop_id'] for leg in parlay['legs']))
+                if leg_ids in self._saved_keys:
+                    continue
+                self._insert_parlay(parlay, leg_ids)
+                self._saved_keys.add(leg_ids)
+                saved_keys.append(leg_ids)
+            if saved_keys:
+                self.db.commit()
+            return len(saved_keys)
+        except Exception as e:
+            logger.error(f"Error saving parlays: {e}")
+            self.db.rollback()
+            self._saved_keys.difference_update(saved_keys)
+            return 0
+
+
+_incremental_engine = None
+_incremental_engine_lock = threading.Lock()
+
+
+def get_incremental_engine() -> IncrementalParlayEngine:
+    """Moteur incrémental partagé (pool de legs par processus)"""
+    global _incremental_engine
+    if _incremental_engine is None:
+        with _incremental_engine_lock:
+            if _incremental_engine is None:
+                _incremental_engine = IncrementalParlayEngine()
+    return _incremental_engine
+
+
 # Fonction globale pour génération en temps réel
 def on_drop_received(drop_event_id: int):
     """
@@ -528,12 +783,19 @@ def on_drop_received(drop_event_id: int):
     Génère immédiatement des parlays
     """
     try:
-        engine = SmartParlayEngine()
-        
         print(f"🔥 New drop {drop_event_id} - Analyzing for parlays...")
         
-        # Générer tous les parlays possibles
-        parlays = engine.generate_all_parlays()
+        if drop_event_id:
+            # Seulement les combinaisons avec les legs du nouveau drop
+            parlays = get_incremental_engine().on_new_drop(drop_event_id)
+        else:
+            # 0 = régénération complète (scan des 7 derniers jours)
+            engine = SmartParlayEngine()
+            try:
+                parlays = engine.generate_all_parlays()
+            finally:
+                engine.db.close()
+            get_incremental_engine().reset()
         
         if parlays:
             print(f"🎉 Generated {len(parlays)} parlays from drop {drop_event_id}")
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test: agrégats user_daily_pnl incrémentaux (mapper events) == rebuild()
+
+Bets aléatoires, commit, puis modifications sur des instances expirées par
+le commit (attributs assignés sans être lus avant), suppressions, et
+comparaison ligne à ligne avec un rebuild() depuis user_bets.
+
+Usage: python test_pnl_aggregates.py
+"""
+import importlib
+import os
+import random
+import sys
+import tempfile
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp(prefix='test_pnl_')}/test.db"
+
+from sqlalchemy import select  # noqa: E402
+
+from database import Base, SessionLocal, engine  # noqa: E402
+from models.bet import UserBet, UserDailyPnL  # noqa: E402
+from models.user import User  # noqa: E402
+from utils import pnl_aggregates  # noqa: E402
+
+# UserBet.drop_event est déclaré par nom: le mapper a besoin de DropEvent
+importlib.import_module("models.drop_event")
+
+BET_TYPES = ("arbitrage", "middle", "good_ev")
+USERS = (1, 2, 3)
+
+
+def _snapshot(db):
+    rows = db.execute(select(UserDailyPnL.__table__)).mappings()
+    return {
+        (r["user_id"], r["day"], r["bet_type"]): tuple(round(float(r[c]), 6) for c in pnl_aggregates.COUNTERS)
+        for r in rows
+    }
+
+
+def _random_bet(rnd, today):
+    expected = round(rnd.uniform(1, 50), 2)
+    return UserBet(
+        user_id=rnd.choice(USERS),
+        bet_type=rnd.choice(BET_TYPES),
+        bet_date=today - timedelta(days=rnd.randint(0, 9)),
+        total_stake=round(rnd.uniform(50, 500), 2),
+        expected_profit=expected,
+        actual_profit=rnd.choice([None, expected, -rnd.uniform(10, 100), 0.0]),
+    )
+
+
+def test_incremental_matches_rebuild():
+    Base.metadata.create_all(bind=engine)
+    rnd = random.Random(7)
+    today = date.today()
+    db = SessionLocal()
+    try:
+        for tid in USERS:
+            db.add(User(telegram_id=tid, username=f"user{tid}"))
+        db.commit()
+
+        db.add_all([_random_bet(rnd, today) for _ in range(200)])
+        db.commit()
+
+        # Instances expirées par le commit: assignation sans lecture préalable
+        bets = db.query(UserBet).all()
+        db.commit()
+        for bet in rnd.sample(bets, 120):
+            bet.actual_profit = rnd.choice([None, 25.0, -40.0, 0.0])
+            if rnd.random() < 0.4:
+                bet.bet_date = today - timedelta(days=rnd.randint(0, 9))
+            if rnd.random() < 0.3:
+                bet.bet_type = rnd.choice(BET_TYPES)
+            if rnd.random() < 0.2:
+                bet.total_stake = round(rnd.uniform(50, 500), 2)
+        db.commit()
+
+        for bet in rnd.sample(db.query(UserBet).all(), 30):
+            db.delete(bet)
+        db.commit()
+
+        incremental = _snapshot(db)
+        pnl_aggregates.rebuild(db)
+        db.commit()
+        rebuilt = _snapshot(db)
+    finally:
+        db.close()
+
+    assert incremental == rebuilt, (
+        f"{sum(1 for k in rebuilt if incremental.get(k) != rebuilt[k])}/{len(rebuilt)} rows differ"
+    )
+    print(f"✅ {len(rebuilt)}/{len(rebuilt)} user_daily_pnl rows match rebuild()")
+
+
+if __name__ == "__main__":
+    test_incremental_matches_rebuild()
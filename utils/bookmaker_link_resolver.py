@@ -13,11 +13,12 @@ Hiérarchie de résolution:
 import os
 import re
 import logging
-import requests
 from typing import Optional, Dict, Tuple
 from datetime import datetime, timedelta
 from urllib.parse import quote_plus, urlparse
 
+from utils.odds_api_client import odds_api
+
 logger = logging.getLogger(__name__)
 
 # API Keys
@@ -131,7 +132,6 @@ class BookmakerLinkResolver:
             logger.info(f"⚠️ Player props not in standard API for {bookmaker}")
             return None
         
-        url = f"{ODDS_API_BASE}/sports/{sport_key}/events/{event_id}/odds"
         params = {
             "apiKey": ODDS_API_KEY,
             "regions": "eu",  # EU a plus de deep links
@@ -142,9 +142,9 @@ class BookmakerLinkResolver:
         }
         
         try:
-            response = requests.get(url, params=params, timeout=5)
-            response.raise_for_status()
-            data = response.json()
+            data = odds_api.get_event_odds(sport_key, event_id, params, timeout=5)
+            if data is None:
+                return None
             
             bookmakers = data.get('bookmakers', [])
             if not bookmakers:
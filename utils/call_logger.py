@@ -1,15 +1,49 @@
 """
 Call Logger for ML/LLM Data Collection
 OPTIMIZED: Asynchronous, non-blocking, lightweight
+- Worker drains the queue in micro-batches (size or time triggered)
+- One session / commit per batch: executemany inserts, clicks coalesced per call_id
+- Drop counters when the queue is full (see get_stats / /ml_stats)
 """
 import asyncio
+import os
+import time
+from collections import Counter
 from datetime import datetime, timedelta
 import hashlib
-from typing import Optional
+from typing import Dict, List, Optional
 import logging
 
+from sqlalchemy import text
+
 logger = logging.getLogger(__name__)
 
+CALL_LOGGER_QUEUE_SIZE = int(os.getenv("CALL_LOGGER_QUEUE_SIZE", "10000"))
+CALL_LOGGER_BATCH_SIZE = int(os.getenv("CALL_LOGGER_BATCH_SIZE", "500"))
+# Max wait after the first item of a batch before writing it
+CALL_LOGGER_FLUSH_SECONDS = float(os.getenv("CALL_LOGGER_FLUSH_SECONDS", "1.0"))
+
+_INSERT_CALL = text("""
+    INSERT INTO arbitrage_calls
+        (call_id, call_type, sport, team_a, team_b, match_date,
+         book_a, book_b, market, odds_a, odds_b, roi_percent,
+         stake_a, stake_b, profit_expected, users_notified, sent_at)
+    VALUES (:call_id, :call_type, :sport, :team_a, :team_b, :match_date,
+            :book_a, :book_b, :market, :odds_a, :odds_b, :roi_percent,
+            :stake_a, :stake_b, :profit_expected, :users_notified, :sent_at)
+    ON CONFLICT (call_id) DO NOTHING
+""")
+_INCREMENT_CLICKS = text("""
+    UPDATE arbitrage_calls
+    SET users_clicked = COALESCE(users_clicked, 0) + :clicks
+    WHERE call_id = :call_id
+""")
+_UPDATE_RESULT = text("""
+    UPDATE arbitrage_calls
+    SET outcome = :outcome, profit_actual = :profit_actual
+    WHERE call_id = :call_id
+""")
+
 
 class CallLogger:
     """
@@ -17,10 +51,29 @@ class CallLogger:
     NO performance impact on bot - uses background queue
     """
     
-    def __init__(self):
-        self.queue = asyncio.Queue(maxsize=1000)  # Prevent memory overflow
+    def __init__(
+        self,
+        queue_size: int = CALL_LOGGER_QUEUE_SIZE,
+        batch_size: int = CALL_LOGGER_BATCH_SIZE,
+        flush_seconds: float = CALL_LOGGER_FLUSH_SECONDS,
+    ):
+        self.queue = asyncio.Queue(maxsize=queue_size)  # Prevent memory overflow
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
         self.running = False
         self._worker_task = None
+        self.stats = {
+            'calls_written': 0,
+            'clicks_written': 0,
+            'results_written': 0,
+            'batches': 0,
+            'max_batch': 0,
+            'write_errors': 0,
+            'rows_lost': 0,
+            'dropped_calls': 0,
+            'dropped_clicks': 0,
+            'dropped_results': 0,
+        }
         
     async def start(self):
         """Start background worker"""
@@ -29,13 +82,20 @@ class CallLogger:
             self._worker_task = asyncio.create_task(self._process_queue())
             logger.info("📊 Call Logger started (background mode)")
     
-    async def stop(self):
-        """Stop background worker"""
+    async def stop(self, timeout: float = 10.0):
+        """Stop background worker (pending items are flushed first)"""
         self.running = False
         if self._worker_task:
-            self._worker_task.cancel()
+            try:
+                await asyncio.wait_for(self._worker_task, timeout)
+            except asyncio.TimeoutError:
+                self._worker_task.cancel()
             logger.info("📊 Call Logger stopped")
     
+    def get_stats(self) -> dict:
+        """Write queue counters (queue depth, batches, drops)"""
+        return {'queue_depth': self.queue.qsize(), **self.stats}
+    
     async def log_call(
         self,
         call_type: str,
@@ -81,11 +141,7 @@ class CallLogger:
             }
             
             # Add to queue (non-blocking)
-            if not self.queue.full():
-                await self.queue.put(call_data)
-            else:
-                # Queue full - skip (better than blocking bot)
-                logger.warning("⚠️ Call logger queue full - skipping call")
+            self._enqueue(call_data, 'dropped_calls')
                 
         except Exception as e:
             # NEVER let logging crash the bot!
@@ -100,8 +156,7 @@ class CallLogger:
                 'action': 'increment_click',
                 'call_id': call_id
             }
-            if not self.queue.full():
-                await self.queue.put(update_data)
+            self._enqueue(update_data, 'dropped_clicks')
         except Exception as e:
             logger.error(f"Error incrementing click: {e}")
     
@@ -116,86 +171,122 @@ class CallLogger:
                 'outcome': outcome,
                 'profit_actual': round(profit_actual, 2)
             }
-            if not self.queue.full():
-                await self.queue.put(update_data)
+            self._enqueue(update_data, 'dropped_results')
         except Exception as e:
             logger.error(f"Error updating result: {e}")
     
+    def _enqueue(self, data: dict, drop_counter: str):
+        try:
+            self.queue.put_nowait(data)
+        except asyncio.QueueFull:
+            # Queue full - skip (better than blocking bot), but count it
+            self.stats[drop_counter] += 1
+            dropped = self.stats[drop_counter]
+            if dropped == 1 or dropped % 1000 == 0:
+                logger.warning(f"⚠️ Call logger queue full - {dropped} {drop_counter.split('_')[1]} dropped so far")
+    
     async def _process_queue(self):
         """
-        Background worker - processes queue WITHOUT blocking bot
+        Background worker - drains the queue in micro-batches WITHOUT blocking bot
         """
-        from database import SessionLocal
-        
-        while self.running:
+        while self.running or not self.queue.empty():
             try:
-                # Wait for item (non-blocking for bot)
-                call_data = await asyncio.wait_for(self.queue.get(), timeout=5.0)
-                
-                # Process in background (separate DB session)
-                await self._save_to_db(call_data)
-                
-                # Small delay to avoid DB overload
-                await asyncio.sleep(0.1)
-                
-            except asyncio.TimeoutError:
-                # No items - that's fine
-                continue
+                batch = await self._next_batch()
+                if batch:
+                    # One DB session / commit per batch, in a thread
+                    await asyncio.to_thread(self._save_batch, batch)
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Error in call logger worker: {e}")
                 await asyncio.sleep(1)  # Prevent rapid errors
     
-    async def _save_to_db(self, data: dict):
+    async def _next_batch(self) -> List[dict]:
+        """Up to batch_size items, at most flush_seconds after the first one"""
+        try:
+            first = await asyncio.wait_for(self.queue.get(), timeout=5.0)
+        except asyncio.TimeoutError:
+            # No items - that's fine
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_seconds
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self.queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.running:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+    
+    @staticmethod
+    def _coalesce(batch: List[dict]):
+        """(inserts, clicks per call_id, last result per call_id)"""
+        inserts: List[dict] = []
+        clicks: Counter = Counter()
+        results: Dict[str, dict] = {}
+        for data in batch:
+            action = data.get('action')
+            if action == 'increment_click':
+                clicks[data['call_id']] += 1
+            elif action == 'update_result':
+                results[data['call_id']] = data
+            else:
+                inserts.append(data)
+        return inserts, clicks, results
+    
+    def _save_batch(self, batch: List[dict]):
         """
-        Save to database (runs in background thread)
+        Save a batch to database (runs in background thread)
+        Inserts first so clicks / results of calls from the same batch apply
         """
         from database import SessionLocal
         
+        inserts, clicks, results = self._coalesce(batch)
         db = SessionLocal()
         try:
-            if data.get('action') == 'increment_click':
-                # Update click count
-                db.execute(
-                    """UPDATE arbitrage_calls 
-                       SET users_clicked = users_clicked + 1 
-                       WHERE call_id = ?""",
-                    (data['call_id'],)
-                )
-            elif data.get('action') == 'update_result':
-                # Update result
-                db.execute(
-                    """UPDATE arbitrage_calls 
-                       SET outcome = ?, profit_actual = ? 
-                       WHERE call_id = ?""",
-                    (data['outcome'], data['profit_actual'], data['call_id'])
-                )
-            else:
-                # Insert new call
-                db.execute(
-                    """INSERT OR IGNORE INTO arbitrage_calls 
-                       (call_id, call_type, sport, team_a, team_b, match_date,
-                        book_a, book_b, market, odds_a, odds_b, roi_percent,
-                        stake_a, stake_b, profit_expected, users_notified, sent_at)
-                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                    (
-                        data['call_id'], data['call_type'], data['sport'],
-                        data['team_a'], data['team_b'], data['match_date'],
-                        data['book_a'], data['book_b'], data['market'],
-                        data['odds_a'], data['odds_b'], data['roi_percent'],
-                        data['stake_a'], data['stake_b'], data['profit_expected'],
-                        data['users_notified'], data['sent_at']
-                    )
-                )
-            
+            if inserts:
+                db.execute(_INSERT_CALL, inserts)
+            if results:
+                db.execute(_UPDATE_RESULT, [
+                    {'call_id': r['call_id'], 'outcome': r['outcome'], 'profit_actual': r['profit_actual']}
+                    for r in results.values()
+                ])
+            if clicks:
+                db.execute(_INCREMENT_CLICKS, [
+                    {'call_id': call_id, 'clicks': n} for call_id, n in clicks.items()
+                ])
             db.commit()
-            
         except Exception as e:
-            logger.error(f"Error saving call to DB: {e}")
             db.rollback()
+            error = e
+        else:
+            error = None
+            self.stats['calls_written'] += len(inserts)
+            self.stats['clicks_written'] += sum(clicks.values())
+            self.stats['results_written'] += len(results)
+            self.stats['batches'] += 1
+            self.stats['max_batch'] = max(self.stats['max_batch'], len(batch))
         finally:
             db.close()
+        
+        if error is None:
+            return
+        if len(batch) > 1:
+            # One bad row must not cost the whole batch: retry item by item
+            logger.warning(f"⚠️ Call logger batch of {len(batch)} failed ({error}), retrying item by item")
+            for data in batch:
+                self._save_batch([data])
+            return
+        logger.error(f"Error saving call to DB: {error}")
+        self.stats['write_errors'] += 1
+        self.stats['rows_lost'] += 1
     
     def _generate_call_id(self, team_a: str, team_b: str, book_a: str, book_b: str, odds_a: float, odds_b: float) -> str:
         """
@@ -215,8 +306,8 @@ class CallLogger:
             cutoff_date = datetime.now() - timedelta(days=days_to_keep)
             
             result = db.execute(
-                "DELETE FROM arbitrage_calls WHERE sent_at < ?",
-                (cutoff_date,)
+                text("DELETE FROM arbitrage_calls WHERE sent_at < :cutoff"),
+                {'cutoff': cutoff_date}
             )
             
             deleted = result.rowcount
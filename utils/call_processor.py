@@ -3,12 +3,11 @@ Call Processor - Enrichissement et vérification des calls d'arbitrage
 Récupère dates, cotes actuelles, recalcule profits et génère liens directs
 """
 
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, replace
 from datetime import datetime
 from typing import Optional, List, Dict, Tuple
 from zoneinfo import ZoneInfo
 import logging
-import requests
 import re
 import hashlib
 
@@ -19,10 +18,11 @@ from utils.odds_api_links import (
     get_fallback_url,
     BOOKMAKER_API_KEYS,
     ODDS_API_KEY,
-    ODDS_API_BASE
 )
+from utils.events_snapshot import events_snapshot
 from core.casinos import get_casino_referral_link, get_casino_logo
 from core.calculator import ArbitrageCalculator
+from core.batch_calculator import BatchArbitrageCalculator
 
 logger = logging.getLogger(__name__)
 
@@ -161,28 +161,12 @@ def find_event_by_teams(sport_key: str, team1: str, team2: str) -> Optional[Dict
         return None
         
     try:
-        url = f"{ODDS_API_BASE}/sports/{sport_key}/events"
         params = {
             "apiKey": ODDS_API_KEY,
             "dateFormat": "iso"
         }
         
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        events = response.json() or []
-        
-        # Normaliser pour comparaison
-        t1_norm = team1.lower().strip()
-        t2_norm = team2.lower().strip()
-        
-        for event in events:
-            home = (event.get('home_team') or '').lower().strip()
-            away = (event.get('away_team') or '').lower().strip()
-            
-            # Match flexible
-            if ((t1_norm in home or home in t1_norm) and (t2_norm in away or away in t2_norm)) or \
-               ((t2_norm in home or home in t2_norm) and (t1_norm in away or away in t1_norm)):
-                return event
+        return events_snapshot.find_event(sport_key, team1, team2, params)
                 
     except Exception as e:
         logger.error(f"Failed to find event: {e}")
@@ -434,21 +418,8 @@ def format_odds_change(initial: float, current: Optional[float], american_format
         arrow = "↑" if current > initial else "↓"
         return f"{initial:.2f} → {current:.2f} {arrow}"
 
-def format_call_message(call: BettingCall, lang: str = "fr", verified: bool = False) -> str:
-    """
-    Génère le message formaté pour Telegram
-    
-    Args:
-        call: BettingCall enrichi
-        lang: Langue ("fr" ou "en")
-        verified: True si on affiche les cotes vérifiées
-    
-    Returns:
-        Message formaté
-    """
-    lines = []
-    
-    # === Header ===
+def _call_header(call: BettingCall, verified: bool) -> str:
+    """En-tête du message (dépend de l'analyse, donc des stakes du user)"""
     # Utiliser le pourcentage d'arbitrage recalculé si disponible et valide
     # Si les cotes actuelles ne sont pas disponibles, garder l'original
     if (call.arb_analysis and 
@@ -464,195 +435,252 @@ def format_call_message(call: BettingCall, lang: str = "fr", verified: bool = Fa
         # Si edge positif annoncé et pas encore expiré → toujours "ALERTE ARBITRAGE"
         if call.expected_edge_pct > 0 and status != "NO_ARB":
             emoji = "🚨"
-            header = f"{emoji} ALERTE ARBITRAGE - {edge_str} {emoji}"
+            return f"{emoji} ALERTE ARBITRAGE - {edge_str} {emoji}"
         elif status == "NO_ARB" and verified:
             emoji = "⚠️"
-            header = f"{emoji} ARBITRAGE EXPIRÉ - {edge_str} {emoji}"
+            return f"{emoji} ARBITRAGE EXPIRÉ - {edge_str} {emoji}"
         elif status == "MIDDLE":
             emoji = "🎯"
-            header = f"{emoji} MIDDLE OPPORTUNITY - {edge_str} {emoji}"
+            return f"{emoji} MIDDLE OPPORTUNITY - {edge_str} {emoji}"
         else:
             emoji = "📊"
-            header = f"{emoji} SIGNAL - {edge_str} {emoji}"
-    else:
-        # Si pas d'analyse mais call_type arbitrage → ALERTE
-        if call.call_type == "arbitrage" and call.expected_edge_pct > 0:
-            emoji = "🚨"
-            header = f"{emoji} ALERTE ARBITRAGE - {edge_str} {emoji}"
-        else:
-            header = f"📊 {call.call_type.upper()} - {edge_str} 📊"
-    
-    lines.append(header)
-    
-    # Indicateur si vérifié
-    if verified and call.last_checked_at:
-        check_time = call.last_checked_at.strftime("%H:%M")
-        lines.append(f"🔍 Vérifié à {check_time}")
-    
-    lines.append("")
-    
-    # === Match Info ===
-    lines.append(f"🏟️ {call.match}")
-    
-    # Sport/League avec emoji
-    sport_emoji = "🏈" if "football" in call.sport.lower() else \
-                  "🏀" if "basketball" in call.sport.lower() else \
-                  "⚽" if "soccer" in call.sport.lower() else \
-                  "🏒" if "hockey" in call.sport.lower() else "🏅"
-    
-    lines.append(f"{sport_emoji} {call.league} - {call.market}")
-    
-    # Date/heure
-    if call.event_datetime:
-        lines.append(f"🕐 {call.event_datetime.display}")
-    else:
-        lines.append("🕐 Date à confirmer")
-    
-    lines.append("")
-    
-    # === Configuration ===
-    total_stake = sum(s.stake for s in call.sides)
-    lines.append(f"💰 CASHH: ${total_stake:.1f}")
-    
-    # === Analyse (toujours afficher profit si dispo) ===
-    if call.arb_analysis:
-        a = call.arb_analysis
-        lines.append(f"✅ Profit Garanti: ${a.min_profit:.2f} (ROI: {a.roi_min_pct:.2f}%)")
+            return f"{emoji} SIGNAL - {edge_str} {emoji}"
+    # Si pas d'analyse mais call_type arbitrage → ALERTE
+    if call.call_type == "arbitrage" and call.expected_edge_pct > 0:
+        emoji = "🚨"
+        return f"{emoji} ALERTE ARBITRAGE - {edge_str} {emoji}"
+    return f"📊 {call.call_type.upper()} - {edge_str} 📊"
+
+
+def _side_link(side: Side) -> Optional[str]:
+    """Lien d'un side (priorité: deep link > referral > fallback)"""
+    return side.deep_link or get_casino_referral_link(side.book_name) or side.fallback_link
+
+
+class CallMessageTemplate:
+    """
+    Parties d'un message d'alerte qui ne dépendent pas du user (match, marché,
+    date, logos, libellés et cotes des sides, liens des boutons casino),
+    rendues une fois par drop et par langue. render() ne remplit que les
+    stakes / profits d'un BettingCall projeté sur le bankroll du user.
+    """
+
+    __slots__ = ("lang", "verified", "intro", "side_labels", "side_odds", "outro", "casino_buttons")
+
+    def __init__(self, call: BettingCall, lang: str = "fr", verified: bool = False):
+        self.lang = lang
+        self.verified = verified
+
+        intro = []
+        # Indicateur si vérifié
+        if verified and call.last_checked_at:
+            check_time = call.last_checked_at.strftime("%H:%M")
+            intro.append(f"🔍 Vérifié à {check_time}")
+        intro.append("")
         
-        if call.call_type == "middle" and abs(a.max_profit - a.min_profit) > 10:
-            lines.append(f"🎯 Profit Max (middle): ${a.max_profit:.2f}")
-    
-    lines.append("")
-    
-    # === Sides ===
-    for i, side in enumerate(call.sides):
-        # Emoji bookmaker
-        logo = get_casino_logo(side.book_name)
+        # === Match Info ===
+        intro.append(f"🏟️ {call.match}")
         
-        # Lien (priorité: deep link > referral > fallback)
-        link = side.deep_link or None
-        if not link:
-            link = get_casino_referral_link(side.book_name)
-        if not link:
-            link = side.fallback_link
+        # Sport/League avec emoji
+        sport_emoji = "🏈" if "football" in call.sport.lower() else \
+                      "🏀" if "basketball" in call.sport.lower() else \
+                      "⚽" if "soccer" in call.sport.lower() else \
+                      "🏒" if "hockey" in call.sport.lower() else "🏅"
         
-        lines.append(f"{logo} [{side.book_name}] {side.outcome_name}")
+        intro.append(f"{sport_emoji} {call.league} - {call.market}")
         
-        # Cotes
-        if verified and side.odds_current_american:
-            odds_str = format_odds_change(
-                side.odds_initial, 
-                side.odds_current,
-                american_format=True
-            )
-            ret = side.stake * (side.odds_current or side.odds_initial)
-            lines.append(f"💵 Miser: ${side.stake:.2f} ({odds_str}) → Retour: ${ret:.2f}")
+        # Date/heure
+        if call.event_datetime:
+            intro.append(f"🕐 {call.event_datetime.display}")
         else:
-            am = side.odds_american
-            odds_str = f"{'+' if am > 0 else ''}{am}"
-            ret = side.stake * side.odds_initial
-            lines.append(f"💵 Miser: ${side.stake:.2f} ({odds_str}) → Retour: ${ret:.2f}")
+            intro.append("🕐 Date à confirmer")
         
-        lines.append("")
+        intro.append("")
+        self.intro = "\n".join(intro)
 
-    # === Avertissement global sur les cotes ===
-    if lang == "fr":
-        lines.append("⚠️ Attention: les cotes peuvent changer - toujours vérifier avant de bet!")
-    else:
-        lines.append("⚠️ Odds can change - always verify before betting!")
-    
-    # === Section vérification des cotes (si vérifiées) ===
-    if verified and call.last_checked_at:
-        lines.append("")
-        lines.append("━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+        # === Sides: libellé + cotes affichées + cote utilisée pour le retour ===
+        self.side_labels = []
+        self.side_odds = []
+        for side in call.sides:
+            self.side_labels.append(f"{get_casino_logo(side.book_name)} [{side.book_name}] {side.outcome_name}")
+            if verified and side.odds_current_american:
+                odds_str = format_odds_change(
+                    side.odds_initial, 
+                    side.odds_current,
+                    american_format=True
+                )
+                self.side_odds.append((odds_str, side.odds_current or side.odds_initial))
+            else:
+                am = side.odds_american
+                self.side_odds.append((f"{'+' if am > 0 else ''}{am}", side.odds_initial))
+
+        # === Avertissement global sur les cotes ===
         if lang == "fr":
-            lines.append("🔍 VÉRIFICATION DES COTES")
+            self.outro = "⚠️ Attention: les cotes peuvent changer - toujours vérifier avant de bet!"
         else:
-            lines.append("🔍 ODDS VERIFICATION")
-        lines.append("━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
-        lines.append("")
+            self.outro = "⚠️ Odds can change - always verify before betting!"
+
+        # Boutons casino (texte, url): toujours un lien, site générique en dernier recours
+        self.casino_buttons = []
+        for side in call.sides[:2]:
+            link = _side_link(side) or f"https://{side.book_name.lower().replace(' ', '')}.com"
+            self.casino_buttons.append((f"{get_casino_logo(side.book_name)} {side.book_name}", link))
+
+    def render(self, call: BettingCall) -> str:
+        """Message complet pour un BettingCall projeté (mêmes sides que le template)"""
+        lines = [_call_header(call, self.verified), self.intro]
+        
+        # === Configuration ===
+        total_stake = sum(s.stake for s in call.sides)
+        lines.append(f"💰 CASHH: ${total_stake:.1f}")
         
-        # Statut
+        # === Analyse (toujours afficher profit si dispo) ===
         if call.arb_analysis:
-            if call.arb_analysis.status == "ARB":
-                status_text = "✅ Arbitrage toujours valide" if lang == "fr" else "✅ Arbitrage still valid"
-            elif call.arb_analysis.status == "NO_ARB":
-                status_text = "❌ Arbitrage expiré" if lang == "fr" else "❌ Arbitrage expired"
-            elif call.arb_analysis.status == "BREAKEVEN":
-                status_text = "⚠️ Break-even (profit minimal)" if lang == "fr" else "⚠️ Break-even (minimal profit)"
-            else:
-                status_text = "📊 Vérification effectuée" if lang == "fr" else "📊 Verification completed"
-        else:
-            status_text = "📊 Vérification effectuée" if lang == "fr" else "📊 Verification completed"
+            a = call.arb_analysis
+            lines.append(f"✅ Profit Garanti: ${a.min_profit:.2f} (ROI: {a.roi_min_pct:.2f}%)")
+            
+            if call.call_type == "middle" and abs(a.max_profit - a.min_profit) > 10:
+                lines.append(f"🎯 Profit Max (middle): ${a.max_profit:.2f}")
         
-        lines.append(f"• Statut: {status_text}")
+        lines.append("")
         
-        # Heure de vérification
-        check_time = call.last_checked_at.strftime("%H:%M:%S")
-        if lang == "fr":
-            lines.append(f"• Dernière vérification: {check_time}")
-        else:
-            lines.append(f"• Last check: {check_time}")
+        # === Sides ===
+        for side, label, (odds_str, odds) in zip(call.sides, self.side_labels, self.side_odds):
+            lines.append(label)
+            lines.append(f"💵 Miser: ${side.stake:.2f} ({odds_str}) → Retour: ${side.stake * odds:.2f}")
+            lines.append("")
         
-        # Changements de cotes
-        if call.odds_fetched:
-            # Si on n'a pas pu récupérer les cotes actuelles (ex: Player Props)
-            if call.sides[0].odds_current is None or call.sides[1].odds_current is None:
-                lines.append("")
-                
-                # Logique plus fine selon le marché et les bookmakers
-                market_type = determine_market_type(call.market)
-                is_player_prop = market_type.startswith('player_')
-                
-                if not is_player_prop:
-                    # Marché standard mais pas de cotes → problème technique
-                    if lang == "fr":
-                        lines.append("⚠️ Impossible de vérifier ces cotes (problème technique)")
-                    else:
-                        lines.append("⚠️ Cannot verify these odds (technical issue)")
-                elif len(call.api_supported_books) == 0:
-                    # Player prop mais aucun bookmaker dans l'API
-                    if lang == "fr":
-                        lines.append("⚠️ Vérification manuelle requise (bookmakers non couverts par l'API)")
-                    else:
-                        lines.append("⚠️ Manual verification required (bookmakers not covered by API)")
+        lines.append(self.outro)
+        
+        # === Section vérification des cotes (si vérifiées) ===
+        if self.verified and call.last_checked_at:
+            lines.extend(_verification_lines(call, self.lang))
+        
+        return "\n".join(lines)
+
+
+def _verification_lines(call: BettingCall, lang: str) -> List[str]:
+    lines = [""]
+    lines.append("━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+    if lang == "fr":
+        lines.append("🔍 VÉRIFICATION DES COTES")
+    else:
+        lines.append("🔍 ODDS VERIFICATION")
+    lines.append("━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
+    lines.append("")
+    
+    # Statut
+    if call.arb_analysis:
+        if call.arb_analysis.status == "ARB":
+            status_text = "✅ Arbitrage toujours valide" if lang == "fr" else "✅ Arbitrage still valid"
+        elif call.arb_analysis.status == "NO_ARB":
+            status_text = "❌ Arbitrage expiré" if lang == "fr" else "❌ Arbitrage expired"
+        elif call.arb_analysis.status == "BREAKEVEN":
+            status_text = "⚠️ Break-even (profit minimal)" if lang == "fr" else "⚠️ Break-even (minimal profit)"
+        else:
+            status_text = "📊 Vérification effectuée" if lang == "fr" else "📊 Verification completed"
+    else:
+        status_text = "📊 Vérification effectuée" if lang == "fr" else "📊 Verification completed"
+    
+    lines.append(f"• Statut: {status_text}")
+    
+    # Heure de vérification
+    check_time = call.last_checked_at.strftime("%H:%M:%S")
+    if lang == "fr":
+        lines.append(f"• Dernière vérification: {check_time}")
+    else:
+        lines.append(f"• Last check: {check_time}")
+    
+    # Changements de cotes
+    if call.odds_fetched:
+        # Si on n'a pas pu récupérer les cotes actuelles (ex: Player Props)
+        if call.sides[0].odds_current is None or call.sides[1].odds_current is None:
+            lines.append("")
+            
+            # Logique plus fine selon le marché et les bookmakers
+            market_type = determine_market_type(call.market)
+            is_player_prop = market_type.startswith('player_')
+            
+            if not is_player_prop:
+                # Marché standard mais pas de cotes → problème technique
+                if lang == "fr":
+                    lines.append("⚠️ Impossible de vérifier ces cotes (problème technique)")
                 else:
-                    # Player prop supporté mais pas de match trouvé
-                    if lang == "fr":
-                        lines.append("⚠️ Impossible de vérifier ces cotes (marché non supporté par l'API)")
-                    else:
-                        lines.append("⚠️ Cannot verify these odds (market not supported by API)")
-            elif call.arb_analysis and call.arb_analysis.has_changed:
-                lines.append("")
+                    lines.append("⚠️ Cannot verify these odds (technical issue)")
+            elif len(call.api_supported_books) == 0:
+                # Player prop mais aucun bookmaker dans l'API
                 if lang == "fr":
-                    lines.append("📊 Changements de cotes:")
+                    lines.append("⚠️ Vérification manuelle requise (bookmakers non couverts par l'API)")
                 else:
-                    lines.append("📊 Odds changes:")
+                    lines.append("⚠️ Manual verification required (bookmakers not covered by API)")
             else:
-                lines.append("")
+                # Player prop supporté mais pas de match trouvé
                 if lang == "fr":
-                    lines.append("✅ Aucun changement de cotes détecté")
+                    lines.append("⚠️ Impossible de vérifier ces cotes (marché non supporté par l'API)")
                 else:
-                    lines.append("✅ No odds changes detected")
+                    lines.append("⚠️ Cannot verify these odds (market not supported by API)")
+        elif call.arb_analysis and call.arb_analysis.has_changed:
+            lines.append("")
+            if lang == "fr":
+                lines.append("📊 Changements de cotes:")
+            else:
+                lines.append("📊 Odds changes:")
         else:
-            # Aucune donnée API récupérée
             lines.append("")
             if lang == "fr":
-                lines.append("⚠️ Vérification manuelle requise (sport/bookmakers non couverts)")
+                lines.append("✅ Aucun changement de cotes détecté")
             else:
-                lines.append("⚠️ Manual verification required (sport/bookmakers not covered)")
+                lines.append("✅ No odds changes detected")
+    else:
+        # Aucune donnée API récupérée
+        lines.append("")
+        if lang == "fr":
+            lines.append("⚠️ Vérification manuelle requise (sport/bookmakers non couverts)")
+        else:
+            lines.append("⚠️ Manual verification required (sport/bookmakers not covered)")
+
+    return lines
+
+
+def format_call_message(call: BettingCall, lang: str = "fr", verified: bool = False) -> str:
+    """
+    Génère le message formaté pour Telegram
+    
+    Pour un envoi à plusieurs users, construire CallMessageTemplate une fois
+    par langue et appeler template.render(call_du_user).
     
-    return "\n".join(lines)
+    Args:
+        call: BettingCall enrichi
+        lang: Langue ("fr" ou "en")
+        verified: True si on affiche les cotes vérifiées
+    
+    Returns:
+        Message formaté
+    """
+    return CallMessageTemplate(call, lang, verified).render(call)
 
 # ============== Processing Pipeline ==============
 
-def process_call_from_drop(drop_data: Dict, bankroll: float = 750.0) -> Optional[BettingCall]:
+def _sides_odds_list(sides: List[Side]) -> List[int]:
+    return [_decimal_to_american(_american_to_decimal(s.odds_american)) for s in sides[:2]]
+
+def _safe_stakes_for_sides(sides: List[Side], bankroll: float) -> List[float]:
+    """Stakes SAFE pour les 2 premiers sides, répartis sur le bankroll donné"""
+    calc = ArbitrageCalculator()
+    result = calc.calculate_safe_stakes(bankroll, _sides_odds_list(sides))
+    return result.get('stakes', [bankroll/2, bankroll/2])
+
+def build_call_template(drop_data: Dict, bankroll: float = 750.0) -> Optional[BettingCall]:
     """
-    Crée un BettingCall depuis un drop d'arbitrage et l'enrichit
+    Construit et enrichit le BettingCall d'un drop UNE SEULE FOIS
+    
+    Le template contient tout ce qui ne dépend pas du user (équipes, sides,
+    date, liens, cotes actuelles). Les stakes sont calculées pour `bankroll`
+    et peuvent être ré-échelonnées par user via project_call_for_bankroll().
     
     Args:
         drop_data: Dict depuis /public/drop ou parser
-        bankroll: Bankroll totale à répartir
+        bankroll: Bankroll de référence
     
     Returns:
         BettingCall enrichi ou None si échec
@@ -691,20 +719,7 @@ def process_call_from_drop(drop_data: Dict, bankroll: float = 750.0) -> Optional
         # Créer les sides depuis outcomes
         outcomes = drop_data.get('outcomes', [])
         if len(outcomes) >= 2:
-            # Calculer stakes optimales
-            odds_list = []
-            for o in outcomes[:2]:
-                am_odds = int(o.get('odds', 0))
-                dec_odds = _american_to_decimal(am_odds)
-                odds_list.append(dec_odds)
-            
-            # Utiliser ArbitrageCalculator pour stakes optimales
-            calc = ArbitrageCalculator()
-            result = calc.calculate_safe_stakes(bankroll, [_decimal_to_american(o) for o in odds_list])
-            
-            stakes = result.get('stakes', [bankroll/2, bankroll/2])
-            
-            for i, outcome in enumerate(outcomes[:2]):
+            for outcome in outcomes[:2]:
                 casino = outcome.get('casino', '')
                 am_odds = int(outcome.get('odds', 0))
                 dec_odds = _american_to_decimal(am_odds)
@@ -716,9 +731,13 @@ def process_call_from_drop(drop_data: Dict, bankroll: float = 750.0) -> Optional
                     outcome_name=outcome.get('outcome', ''),
                     odds_initial=dec_odds,
                     odds_american=am_odds,
-                    stake=stakes[i] if i < len(stakes) else bankroll/2
                 )
                 call.sides.append(side)
+            
+            # Stakes optimales pour le bankroll de référence
+            stakes = _safe_stakes_for_sides(call.sides, bankroll)
+            for i, side in enumerate(call.sides):
+                side.stake = stakes[i] if i < len(stakes) else bankroll/2
         
         # Enrichir avec The Odds API
         call = enrich_call_with_odds_api(call)
@@ -729,9 +748,74 @@ def process_call_from_drop(drop_data: Dict, bankroll: float = 750.0) -> Optional
         return call
         
     except Exception as e:
-        logger.error(f"Failed to process call: {e}")
+        logger.error(f"Failed to build call template: {e}")
         return None
 
+def project_call_for_bankroll(template: BettingCall, bankroll: float) -> BettingCall:
+    """
+    Projette un template déjà enrichi sur le bankroll d'un user
+    
+    Aucun appel API: copie les sides, recalcule les stakes SAFE pour
+    `bankroll` et refait l'analyse. Le template n'est jamais modifié.
+    
+    Args:
+        template: BettingCall retourné par build_call_template()
+        bankroll: Bankroll du user
+    
+    Returns:
+        Nouveau BettingCall avec stakes du user
+    """
+    stakes = _safe_stakes_for_sides(template.sides, bankroll) if len(template.sides) >= 2 else None
+    return _project_call(template, bankroll, stakes)
+
+def project_call_for_bankrolls(template: BettingCall, bankrolls: List[float]) -> List[BettingCall]:
+    """
+    project_call_for_bankroll() pour tous les bankrolls d'un envoi
+    
+    Les stakes SAFE de tous les users sont calculées en un seul passage NumPy
+    (mêmes valeurs arrondies que ArbitrageCalculator.calculate_safe_stakes).
+    
+    Returns:
+        Un BettingCall par bankroll, dans le même ordre
+    """
+    if len(template.sides) < 2:
+        return [_project_call(template, b, None) for b in bankrolls]
+    stakes = BatchArbitrageCalculator.safe_stakes(_sides_odds_list(template.sides), bankrolls)["stakes"]
+    return [
+        _project_call(template, bankroll, [round(float(x), 2) for x in row])
+        for bankroll, row in zip(bankrolls, stakes)
+    ]
+
+def _project_call(template: BettingCall, bankroll: float, stakes: Optional[List[float]]) -> BettingCall:
+    call = replace(
+        template,
+        sides=[replace(s) for s in template.sides],
+        api_supported_books=list(template.api_supported_books),
+        arb_analysis=None,
+    )
+    
+    if stakes is not None:
+        for i, side in enumerate(call.sides[:2]):
+            side.stake = stakes[i] if i < len(stakes) else bankroll/2
+    
+    return analyze_arbitrage_two_way(call)
+
+def process_call_from_drop(drop_data: Dict, bankroll: float = 750.0) -> Optional[BettingCall]:
+    """
+    Crée un BettingCall depuis un drop d'arbitrage et l'enrichit
+    
+    Pour un envoi à plusieurs users, préférer build_call_template() une fois
+    puis project_call_for_bankroll() par user.
+    
+    Args:
+        drop_data: Dict depuis /public/drop ou parser
+        bankroll: Bankroll totale à répartir
+    
+    Returns:
+        BettingCall enrichi ou None si échec
+    """
+    return build_call_template(drop_data, bankroll)
+
 def should_send_call(call: BettingCall, min_profit: float = 0) -> bool:
     """
     Décide si un call doit être envoyé
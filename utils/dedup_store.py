@@ -0,0 +1,264 @@
+"""
+Déduplication des calls (bridge OCR + app FastAPI/bot)
+- Vérification à chaud: buckets temporels de hashes (anneau de N sets),
+  mémoire bornée, pas de balayage du cache à chaque call: un bucket expiré
+  est vidé d'un coup quand l'anneau tourne
+- Persistance SQLite partagée entre process (WAL): une clé par namespace,
+  check-and-mark atomique (INSERT ... ON CONFLICT ... WHERE expiré), purge
+  périodique des clés expirées
+- Remplace SENT_CALLS_CACHE (main_new) et la table sent_calls jamais purgée
+  de ocr_calls.db (bridge)
+
+Usage:
+    CALL_DEDUP = DedupStore("calls", ttl_seconds=600)
+    OCR_CALL_DEDUP = DedupStore("ocr_calls", ttl_seconds=48 * 3600, legacy_table="sent_calls")
+    if not CALL_DEDUP.mark_if_new(call_hash):
+        ...  # doublon
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEDUP_DB_PATH = os.getenv("DEDUP_DB_PATH", "ocr_calls.db")
+# Clés max gardées en mémoire par namespace (au-delà la fenêtre chaude raccourcit)
+DEDUP_MAX_HOT_KEYS = int(os.getenv("DEDUP_MAX_HOT_KEYS", "50000"))
+_BUCKETS = 12
+_PRUNE_INTERVAL_SECONDS = 300
+_BUSY_TIMEOUT_MS = 5000
+
+
+class DedupStore:
+    """Ensemble de clés vues récemment (TTL), borné en mémoire, persisté et partagé"""
+
+    def __init__(
+        self,
+        namespace: str,
+        ttl_seconds: float,
+        path: Optional[str] = DEDUP_DB_PATH,
+        max_hot_keys: int = DEDUP_MAX_HOT_KEYS,
+        legacy_table: Optional[str] = None,
+    ):
+        self.namespace = namespace
+        # Ancienne table de hashes à importer dans ce namespace (bridge: sent_calls)
+        self.legacy_table = legacy_table
+        self.ttl = float(ttl_seconds)
+        self.path = path
+        self._bucket_span = self.ttl / _BUCKETS
+        self.max_hot_keys = max(1, max_hot_keys)
+        self._hot_count = 0
+        # Anneau: _buckets[i] = {key: timestamp}, _bucket_ids[i] = numéro de tranche de temps
+        self._buckets: List[Dict[str, float]] = [{} for _ in range(_BUCKETS)]
+        self._bucket_ids: List[int] = [-1] * _BUCKETS
+        self._lock = threading.Lock()
+        self._last_prune = 0.0
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            self._open()
+
+    # ---------- Persistance ----------
+
+    def _open(self) -> None:
+        try:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False, timeout=_BUSY_TIMEOUT_MS / 1000)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(f"PRAGMA busy_timeout={_BUSY_TIMEOUT_MS}")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS dedup_keys (
+                    namespace TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_dedup_keys_created ON dedup_keys (created_at)")
+            self._conn.commit()
+            if self.legacy_table:
+                self._migrate_legacy_table()
+            self._warm()
+        except Exception as e:
+            logger.warning(f"⚠️ Dedup DB unavailable ({self.path}), memory only: {e}")
+            self._conn = None
+
+    def _migrate_legacy_table(self) -> None:
+        """Ancienne table (hash, created_at) du bridge: import des clés encore valides, puis suppression"""
+        exists = self._conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (self.legacy_table,)
+        ).fetchone()
+        if not exists:
+            return
+        cutoff = time.time() - self.ttl
+        with self._conn:
+            self._conn.execute(
+                f"""
+                INSERT OR IGNORE INTO dedup_keys (namespace, key, created_at)
+                SELECT ?, hash, CAST(strftime('%s', created_at) AS REAL)
+                FROM "{self.legacy_table}"
+                WHERE created_at IS NOT NULL AND CAST(strftime('%s', created_at) AS REAL) > ?
+                """,
+                (self.namespace, cutoff),
+            )
+            self._conn.execute(f'DROP TABLE "{self.legacy_table}"')
+        self._conn.execute("VACUUM")
+        logger.info(f"✅ Migrated legacy {self.legacy_table} table into dedup_keys[{self.namespace}]")
+
+    def _warm(self) -> None:
+        """Recharge les clés encore valides (redémarrage)"""
+        now = time.time()
+        rows = self._conn.execute(
+            "SELECT key, created_at FROM dedup_keys WHERE namespace = ? AND created_at > ? ORDER BY created_at",
+            (self.namespace, now - self.ttl),
+        ).fetchall()
+        with self._lock:
+            for key, created_at in rows:
+                self._remember(key, created_at)
+        if rows:
+            logger.info(f"✅ Loaded {len(rows)} dedup keys [{self.namespace}] from {self.path}")
+
+    def _claim(self, key: str, now: float) -> bool:
+        """Check-and-mark atomique entre process. True si la clé est nouvelle (ou expirée)"""
+        try:
+            cur = self._conn.execute(
+                """
+                INSERT INTO dedup_keys (namespace, key, created_at) VALUES (?, ?, ?)
+                ON CONFLICT (namespace, key) DO UPDATE SET created_at = excluded.created_at
+                WHERE dedup_keys.created_at <= ?
+                """,
+                (self.namespace, key, now, now - self.ttl),
+            )
+            self._conn.commit()
+            return cur.rowcount > 0
+        except Exception as e:
+            logger.warning(f"⚠️ Dedup DB error: {e}")
+            return True  # Mémoire seule pour cette clé
+
+    def _stored_at(self, key: str) -> Optional[float]:
+        try:
+            row = self._conn.execute(
+                "SELECT created_at FROM dedup_keys WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            return row[0] if row else None
+        except Exception:
+            return None
+
+    def prune(self) -> int:
+        """Supprime les clés expirées de la base (tous process confondus)"""
+        self._last_prune = time.time()
+        if self._conn is None:
+            return 0
+        try:
+            cur = self._conn.execute(
+                "DELETE FROM dedup_keys WHERE namespace = ? AND created_at <= ?",
+                (self.namespace, self._last_prune - self.ttl),
+            )
+            self._conn.commit()
+            if cur.rowcount:
+                logger.debug(f"🧹 Pruned {cur.rowcount} dedup keys [{self.namespace}]")
+            return cur.rowcount
+        except Exception as e:
+            logger.warning(f"⚠️ Dedup prune failed: {e}")
+            return 0
+
+    # ---------- Buckets mémoire ----------
+
+    def _slot(self, ts: float) -> Optional[Dict[str, float]]:
+        """Bucket de la tranche de temps de ts (réutilise le slot d'une tranche expirée)"""
+        bucket_id = int(ts // self._bucket_span)
+        index = bucket_id % _BUCKETS
+        if self._bucket_ids[index] != bucket_id:
+            if self._bucket_ids[index] > bucket_id:
+                return None  # Plus vieux que la fenêtre mémoire
+            self._hot_count -= len(self._buckets[index])
+            self._buckets[index] = {}
+            self._bucket_ids[index] = bucket_id
+        return self._buckets[index]
+
+    def _evict_oldest(self, keep: Dict[str, float]) -> None:
+        """Mémoire pleine: vide le plus vieux bucket (la base reste la référence)"""
+        candidates = [i for i, b in enumerate(self._buckets) if b and b is not keep]
+        if candidates:
+            index = min(candidates, key=lambda i: self._bucket_ids[i])
+            self._hot_count -= len(self._buckets[index])
+            self._buckets[index] = {}
+            return
+        # Un seul bucket: on oublie sa plus vieille moitié
+        for old in list(keep)[: max(1, len(keep) // 2)]:
+            del keep[old]
+            self._hot_count -= 1
+
+    def _remember(self, key: str, ts: float) -> None:
+        bucket = self._slot(ts)
+        if bucket is None:
+            return
+        if key in bucket:
+            bucket[key] = ts
+            return
+        if self._hot_count >= self.max_hot_keys:
+            self._evict_oldest(bucket)
+        bucket[key] = ts
+        self._hot_count += 1
+
+    def _hot_timestamp(self, key: str, now: float) -> Optional[float]:
+        oldest_valid = int((now - self.ttl) // self._bucket_span)
+        for bucket_id, bucket in zip(self._bucket_ids, self._buckets):
+            if bucket_id < oldest_valid:
+                continue
+            ts = bucket.get(key)
+            if ts is not None and now - ts < self.ttl:
+                return ts
+        return None
+
+    # ---------- API publique ----------
+
+    def mark_if_new(self, key: str) -> bool:
+        """
+        Marque la clé comme vue
+
+        Returns:
+            True si la clé est nouvelle (à traiter), False si doublon dans la fenêtre TTL
+        """
+        now = time.time()
+        with self._lock:
+            if self._hot_timestamp(key, now) is not None:
+                return False
+        if self._conn is not None:
+            if not self._claim(key, now):
+                stored = self._stored_at(key)
+                with self._lock:
+                    self._remember(key, stored or now)
+                return False
+            if now - self._last_prune > _PRUNE_INTERVAL_SECONDS:
+                self.prune()
+        with self._lock:
+            self._remember(key, now)
+        return True
+
+    def last_seen(self, key: str) -> Optional[float]:
+        """Timestamp de la dernière occurrence encore valide (None si inconnue / expirée)"""
+        now = time.time()
+        with self._lock:
+            ts = self._hot_timestamp(key, now)
+        if ts is None and self._conn is not None:
+            stored = self._stored_at(key)
+            if stored is not None and now - stored < self.ttl:
+                ts = stored
+        return ts
+
+    def __contains__(self, key: str) -> bool:
+        return self.last_seen(key) is not None
+
+    def stats(self) -> Dict:
+        return {
+            "namespace": self.namespace,
+            "hot_keys": self._hot_count,
+            "ttl_seconds": self.ttl,
+            "persistent": self._conn is not None,
+        }
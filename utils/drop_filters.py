@@ -0,0 +1,171 @@
+"""
+Colonnes dénormalisées de drop_events pour les filtres Last Calls
+- sports:  familles de sport reconnues, format "|basketball|" (mots-clés sur
+  league + payload.sport_key, mêmes règles que l'ancien filtre Python)
+- casinos: casinos du payload, format "|Betsson|Coolbet|" ('Unknown' si aucun)
+- match_time: rempli depuis payload.commence_time s'il manque
+
+Maintenues par les mapper events (écritures ORM) et par utils.drop_ingest
+(écritures SQL). Les filtres SQL (LIKE '%|tag|%') s'appliquent sur la plage
+(bet_type, received_at / match_time) déjà restreinte par index.
+
+Backfill:
+    python -m utils.drop_filters backfill
+"""
+import logging
+import sys
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import event, false, or_, select, update
+from sqlalchemy.orm.attributes import get_history
+
+from database import engine
+from models.drop_event import DropEvent
+
+logger = logging.getLogger(__name__)
+
+SPORT_KEYWORDS = {
+    'basketball': ['nba', 'ncaa basketball', 'wnba', 'basketball'],
+    'soccer': ['soccer', 'football', 'mls', 'premier league', 'la liga', 'serie a', 'bundesliga', 'ligue 1'],
+    'tennis': ['tennis', 'atp', 'wta'],
+    'hockey': ['nhl', 'hockey'],
+    'football': ['nfl', 'ncaa football', 'american football'],
+    'baseball': ['mlb', 'baseball'],
+    'mma': ['ufc', 'mma', 'bellator'],
+}
+_SEPARATOR = '|'
+_BACKFILL_BATCH = 1000
+
+
+def encode_tags(tags: Iterable[str]) -> Optional[str]:
+    tags = sorted({str(t).replace(_SEPARATOR, ' ') for t in tags if t})
+    return f"{_SEPARATOR}{_SEPARATOR.join(tags)}{_SEPARATOR}" if tags else None
+
+
+def decode_tags(value: Optional[str]) -> List[str]:
+    return [t for t in (value or '').split(_SEPARATOR) if t]
+
+
+def sport_families(league: Optional[str], payload) -> List[str]:
+    """Familles de sport dont un mot-clé apparaît dans league ou payload.sport_key"""
+    league = (league or '').lower()
+    sport_name = ''
+    if isinstance(payload, dict):
+        sport_name = str(payload.get('sport_key') or '').lower()
+    return [
+        sport for sport, keywords in SPORT_KEYWORDS.items()
+        if any(kw in league or kw in sport_name for kw in keywords)
+    ]
+
+
+def payload_casinos(payload) -> List[str]:
+    """Casinos du payload (outcomes, legs ou side_a/side_b), ['Unknown'] si aucun"""
+    casinos = []
+    if isinstance(payload, dict):
+        if 'outcomes' in payload:
+            for outcome in payload.get('outcomes') or []:
+                if isinstance(outcome, dict) and outcome.get('casino'):
+                    casinos.append(outcome['casino'])
+        elif 'legs' in payload:
+            for leg in payload.get('legs') or []:
+                if isinstance(leg, dict) and leg.get('casino'):
+                    casinos.append(leg['casino'])
+        elif 'side_a' in payload:
+            for side in (payload.get('side_a'), payload.get('side_b')):
+                if isinstance(side, dict) and side.get('casino'):
+                    casinos.append(side['casino'])
+    return list(set(casinos)) if casinos else ['Unknown']
+
+
+def parse_match_time(payload) -> Optional[datetime]:
+    commence = payload.get('commence_time') if isinstance(payload, dict) else None
+    if not commence:
+        return None
+    try:
+        return datetime.fromisoformat(str(commence).replace('Z', '+00:00'))
+    except Exception:
+        return None
+
+
+def denormalised_values(league: Optional[str], payload) -> Dict[str, Optional[str]]:
+    """Valeurs des colonnes sports / casinos pour un drop"""
+    return {
+        'sports': encode_tags(sport_families(league, payload)),
+        'casinos': encode_tags(payload_casinos(payload)),
+    }
+
+
+def has_any_tag(column, tags: Iterable[str]):
+    """Condition SQL: la colonne contient au moins un des tags"""
+    clauses = []
+    for tag in tags:
+        escaped = str(tag).replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        clauses.append(column.like(f"%{_SEPARATOR}{escaped}{_SEPARATOR}%", escape='\\'))
+    return or_(*clauses) if clauses else false()
+
+
+# ===== Écritures ORM =====
+
+def _refresh_columns(target) -> None:
+    values = denormalised_values(target.league, target.payload)
+    target.sports = values['sports']
+    target.casinos = values['casinos']
+    if target.match_time is None:
+        target.match_time = parse_match_time(target.payload)
+
+
+def _on_drop_inserted(mapper, connection, target):
+    _refresh_columns(target)
+
+
+def _on_drop_updated(mapper, connection, target):
+    if any(get_history(target, attr).has_changes() for attr in ('league', 'payload', 'match_time')):
+        _refresh_columns(target)
+
+
+event.listen(DropEvent, "before_insert", _on_drop_inserted)
+event.listen(DropEvent, "before_update", _on_drop_updated)
+
+
+# ===== Backfill =====
+
+def backfill(only_missing: bool = False) -> int:
+    """
+    Recalcule sports / casinos (et match_time manquant) pour les drops existants
+
+    Returns:
+        Nombre de lignes mises à jour
+    """
+    table = DropEvent.__table__
+    query = select(table.c.id, table.c.league, table.c.payload, table.c.match_time).order_by(table.c.id)
+    if only_missing:
+        query = query.where(table.c.casinos.is_(None))
+
+    updated, last_id = 0, 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(query.where(table.c.id > last_id).limit(_BACKFILL_BATCH)).fetchall()
+            for row in rows:
+                values = denormalised_values(row.league, row.payload)
+                if row.match_time is None:
+                    match_time = parse_match_time(row.payload)
+                    if match_time is not None:
+                        values['match_time'] = match_time
+                conn.execute(update(table).where(table.c.id == row.id).values(**values))
+        if not rows:
+            return updated
+        updated += len(rows)
+        last_id = rows[-1].id
+
+
+def main(argv: List[str]) -> None:
+    if not argv or argv[0] != "backfill":
+        print("Usage: python -m utils.drop_filters backfill [--missing]")
+        return
+    count = backfill(only_missing="--missing" in argv)
+    print(f"✅ drop_events sports/casinos backfilled: {count} rows")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
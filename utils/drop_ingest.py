@@ -0,0 +1,158 @@
+"""
+Ingestion des drops: un seul upsert (une transaction) par drop
+- INSERT ... ON CONFLICT (event_id) DO NOTHING RETURNING id  (SQLite / Postgres)
+  -> ligne renvoyée = nouveau drop
+  -> sinon UPDATE ... RETURNING id dans la même transaction = doublon rafraîchi
+- Colonnes de filtre sports / casinos calculées ici (voir utils.drop_filters)
+- L'enrichissement Odds API est appliqué plus tard par update_drop_enrichment()
+  (UPDATE partiel par clé primaire, pas de re-lecture)
+
+Autres dialectes: même logique via l'ORM, toujours en un seul commit.
+"""
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from database import SessionLocal, engine
+from models.drop_event import DropEvent
+from utils.drop_filters import denormalised_values, parse_match_time as _parse_match_time
+
+_INSERTS = {"sqlite": sqlite_insert, "postgresql": pg_insert}
+
+
+def _arb_percentage(drop: Dict) -> float:
+    try:
+        return float(drop.get("arb_percentage") or 0.0)
+    except Exception:
+        return 0.0
+
+
+def upsert_drop(drop: Dict, bet_type: Optional[str] = None) -> Tuple[Optional[int], bool]:
+    """
+    Insère ou rafraîchit un drop (clé: event_id)
+
+    Nouveau drop: tous les champs. Doublon: payload et received_at rafraîchis,
+    les autres champs seulement s'ils sont fournis (arb_percentage > 0, match...).
+
+    Args:
+        drop: Payload du drop (event_id obligatoire)
+        bet_type: Type explicite (défaut: drop['bet_type'] ou 'arbitrage' à la création)
+
+    Returns:
+        (drop_event_id, inserted) - (None, False) si pas d'event_id
+    """
+    eid = str(drop.get("event_id") or "").strip()
+    if not eid:
+        return None, False
+
+    explicit_type = bet_type or drop.get("bet_type") or None
+    now = datetime.now()
+    arb = _arb_percentage(drop)
+    match = drop.get("match") or drop.get("event") or None
+    league = drop.get("league") or None
+    market = drop.get("market") or None
+    match_time = _parse_match_time(drop)
+    tags = denormalised_values(league, drop)
+
+    insert = _INSERTS.get(engine.dialect.name)
+    if insert is None:
+        return _upsert_drop_orm(eid, drop, explicit_type, now, arb, match, league, market, match_time, tags)
+
+    table = DropEvent.__table__
+    insert_stmt = (
+        insert(table)
+        .values(
+            event_id=eid,
+            bet_type=str(explicit_type or "arbitrage"),
+            arb_percentage=arb,
+            match=match,
+            league=league,
+            market=market,
+            payload=drop,
+            match_time=match_time,
+            received_at=now,
+            **tags,
+        )
+        .on_conflict_do_nothing(index_elements=[table.c.event_id])
+        .returning(table.c.id)
+    )
+    with engine.begin() as conn:
+        drop_id = conn.execute(insert_stmt).scalar()
+        if drop_id is not None:
+            return drop_id, True
+
+        refresh = {
+            "match": func.coalesce(match, table.c.match),
+            "league": func.coalesce(league, table.c.league),
+            "market": func.coalesce(market, table.c.market),
+            "payload": drop,
+            "received_at": now,
+            "casinos": tags["casinos"],
+            # Sans league fournie: on garde les familles déjà calculées
+            "sports": func.coalesce(tags["sports"], table.c.sports),
+        }
+        if arb > 0:
+            refresh["arb_percentage"] = arb
+        if match_time is not None:
+            refresh["match_time"] = match_time
+        if explicit_type:
+            refresh["bet_type"] = str(explicit_type)
+        drop_id = conn.execute(
+            update(table).where(table.c.event_id == eid).values(**refresh).returning(table.c.id)
+        ).scalar()
+        return drop_id, False
+
+
+def _upsert_drop_orm(eid, drop, explicit_type, now, arb, match, league, market, match_time, tags):
+    db = SessionLocal()
+    try:
+        ev = db.execute(select(DropEvent).where(DropEvent.event_id == eid)).scalar_one_or_none()
+        inserted = ev is None
+        if inserted:
+            ev = DropEvent(event_id=eid, bet_type=str(explicit_type or "arbitrage"), arb_percentage=arb,
+                           match=match, league=league, market=market, match_time=match_time, **tags)
+            db.add(ev)
+        else:
+            if arb > 0:
+                ev.arb_percentage = arb
+            ev.match = match or ev.match
+            ev.league = league or ev.league
+            ev.market = market or ev.market
+            if match_time is not None:
+                ev.match_time = match_time
+            if explicit_type:
+                ev.bet_type = str(explicit_type)
+            ev.casinos = tags["casinos"]
+            # Sans league fournie: on garde les familles déjà calculées
+            ev.sports = tags["sports"] or ev.sports
+        ev.payload = drop
+        ev.received_at = now
+        db.commit()
+        return ev.id, inserted
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+def update_drop_enrichment(drop_id: int, enriched: Dict) -> bool:
+    """
+    Applique l'enrichissement (payload, match_time, sports / casinos) à un drop déjà inséré
+
+    Returns:
+        True si la ligne a été mise à jour
+    """
+    if not drop_id:
+        return False
+    # Le payload enrichi est une copie du drop (league incluse) + sport_key, commence_time...
+    values = {"payload": enriched, **denormalised_values(enriched.get("league"), enriched)}
+    match_time = _parse_match_time(enriched)
+    if match_time is not None:
+        values["match_time"] = match_time
+    with engine.begin() as conn:
+        result = conn.execute(update(DropEvent.__table__).where(DropEvent.__table__.c.id == drop_id).values(**values))
+    return result.rowcount > 0
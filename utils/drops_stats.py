@@ -5,6 +5,7 @@ from typing import Tuple
 from core.tiers import TierManager, TierLevel as CoreTierLevel
 from database import SessionLocal
 from models.drop_event import DropEvent
+from utils.drop_ingest import upsert_drop
 
 
 def record_drop(drop: dict) -> int:
@@ -18,57 +19,9 @@ def record_drop(drop: dict) -> int:
     if not drop:
         return None
     try:
-        eid = str(drop.get("event_id") or "").strip()
-        if not eid:
-            return None
-        db = SessionLocal()
-        try:
-            ev = db.query(DropEvent).filter(DropEvent.event_id == eid).first()
-            now = datetime.now()
-            bet_type = str(drop.get("bet_type") or "arbitrage")
-            # Parse match_time from commence_time if available
-            match_time = None
-            if drop.get("commence_time"):
-                try:
-                    match_time = datetime.fromisoformat(drop["commence_time"].replace('Z', '+00:00'))
-                except:
-                    pass
-            
-            if ev is None:
-                ev = DropEvent(
-                    event_id=eid,
-                    bet_type=bet_type,
-                    arb_percentage=float(drop.get("arb_percentage") or 0.0),
-                    match=str(drop.get("match") or ""),
-                    league=str(drop.get("league") or ""),
-                    market=str(drop.get("market") or ""),
-                    payload=drop,
-                    match_time=match_time,
-                )
-                ev.received_at = now
-                db.add(ev)
-            else:
-                # Update core fields, keep existing bet_type unless a new one is explicitly provided
-                if "bet_type" in drop and drop.get("bet_type"):
-                    ev.bet_type = bet_type
-                ev.arb_percentage = float(drop.get("arb_percentage") or ev.arb_percentage or 0.0)
-                ev.match = str(drop.get("match") or ev.match or "")
-                ev.league = str(drop.get("league") or ev.league or "")
-                ev.market = str(drop.get("market") or ev.market or "")
-                ev.payload = drop
-                ev.received_at = now
-                # Update match_time if available
-                if match_time:
-                    ev.match_time = match_time
-            db.commit()
-            
-            # Refresh to get the ID
-            db.refresh(ev)
-            drop_id = ev.id
-            
-            return drop_id
-        finally:
-            db.close()
+        # One INSERT ... ON CONFLICT round trip (see utils.drop_ingest)
+        drop_id, _ = upsert_drop(drop)
+        return drop_id
     except Exception:
         # Do not crash on persistence errors; calculator will fallback to memory
         return None
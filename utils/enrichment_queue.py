@@ -0,0 +1,268 @@
+"""
+File d'enrichissement Odds API partagée par tous les drops (arbitrage, middle, good EV)
+- File bornée + N workers async: la concurrence API est contrôlée ici, les
+  handlers HTTP rendent la main tout de suite
+- Priorité: edge % le plus haut d'abord, puis le match qui commence le plus tôt
+- Retry avec backoff exponentiel sur erreur API (réseau / HTTP), pas sur
+  "événement introuvable"
+- Jobs périmés (match déjà commencé) annulés: plus d'appel API
+- Dans tous les cas la suite du pipeline est appelée: on_done(data, enriched)
+- Métriques: profondeur de file, attente, latence d'enrichissement (p50/p95/p99)
+
+Usage:
+    enrichment_queue.submit('good_ev', parsed, on_done, edge=ev_percent)
+    # on_done: async def on_done(data: dict, enriched: bool)
+"""
+import asyncio
+import itertools
+import logging
+import os
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from utils.latency_tracer import latency_tracer
+from utils.odds_api_client import odds_api
+from utils.odds_enricher import enrich_alert_with_api
+from utils.metrics import percentiles
+
+logger = logging.getLogger(__name__)
+
+ENRICHMENT_WORKERS = int(os.getenv("ENRICHMENT_WORKERS", "4"))
+ENRICHMENT_QUEUE_SIZE = int(os.getenv("ENRICHMENT_QUEUE_SIZE", "500"))
+MAX_ATTEMPTS = 3
+BACKOFF_BASE_SECONDS = 2.0
+BACKOFF_MAX_SECONDS = 30.0
+_LATENCY_SAMPLES = 2000
+
+OnDone = Callable[[Dict, bool], Awaitable[Any]]
+
+
+def _commence_at(data: Dict) -> Optional[float]:
+    """commence_time du drop en timestamp (None si absent / illisible)"""
+    commence = data.get('commence_time')
+    if not commence:
+        return None
+    try:
+        return datetime.fromisoformat(str(commence).replace('Z', '+00:00')).timestamp()
+    except Exception:
+        return None
+
+
+class _EnrichmentJob:
+    __slots__ = ("alert_type", "data", "on_done", "edge", "enqueued_at", "attempts")
+
+    def __init__(self, alert_type: str, data: Dict, on_done: OnDone, edge: float):
+        self.alert_type = alert_type
+        self.data = data
+        self.on_done = on_done
+        self.edge = edge
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+    def priority(self) -> Tuple[float, float]:
+        commence = _commence_at(self.data)
+        return (-self.edge, commence if commence is not None else float("inf"))
+
+    def stale(self) -> bool:
+        commence = _commence_at(self.data)
+        return commence is not None and commence <= time.time()
+
+
+class EnrichmentQueue:
+    """File prioritaire d'enrichissement avec workers, retry et métriques"""
+
+    def __init__(
+        self,
+        workers: int = ENRICHMENT_WORKERS,
+        max_size: int = ENRICHMENT_QUEUE_SIZE,
+        max_attempts: int = MAX_ATTEMPTS,
+        backoff_base: float = BACKOFF_BASE_SECONDS,
+        enrich: Callable[[Dict, str], Dict] = enrich_alert_with_api,
+    ):
+        self.n_workers = workers
+        self.max_size = max_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.enrich = enrich
+
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._workers: list = []
+        self._retry_tasks: set = set()
+        self._callbacks: set = set()
+        self._seq = itertools.count()
+        self._in_flight = 0
+
+        # ms: attente avant le 1er essai, enqueue -> résultat, durée de l'appel API
+        self._waits = deque(maxlen=_LATENCY_SAMPLES)
+        self._latencies = deque(maxlen=_LATENCY_SAMPLES)
+        self._api_times = deque(maxlen=_LATENCY_SAMPLES)
+        self.stats = {
+            "submitted": 0,
+            "enriched": 0,
+            "failed": 0,
+            "retried": 0,
+            "cancelled_stale": 0,
+            "rejected": 0,
+            "max_queue_depth": 0,
+        }
+
+    # ---------- Cycle de vie ----------
+
+    def start(self) -> None:
+        """Démarre les workers sur la boucle courante (appelé automatiquement)"""
+        if self._workers:
+            return
+        self._queue = asyncio.PriorityQueue(maxsize=self.max_size)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"enrichment-{i}")
+            for i in range(self.n_workers)
+        ]
+        logger.info(f"🔗 EnrichmentQueue started ({self.n_workers} workers, max {self.max_size} jobs)")
+
+    async def stop(self) -> None:
+        for task in [*self._workers, *self._retry_tasks]:
+            task.cancel()
+        await asyncio.gather(*self._workers, *self._retry_tasks, return_exceptions=True)
+        self._workers = []
+        self._retry_tasks.clear()
+
+    # ---------- API publique ----------
+
+    def submit(self, alert_type: str, data: Dict, on_done: OnDone, edge: float = 0.0) -> bool:
+        """
+        Met un drop en file d'enrichissement
+
+        Args:
+            alert_type: 'arbitrage', 'middle' ou 'good_ev' (passé à enrich_alert_with_api)
+            data: Drop parsé (enrichi sur place)
+            on_done: Coroutine appelée avec (data, enriched) une fois le job terminé
+            edge: Arb / middle / EV % (priorité)
+
+        Returns:
+            False si la file est pleine (job non accepté, à traiter par l'appelant)
+        """
+        self.start()
+        job = _EnrichmentJob(alert_type, data, on_done, float(edge or 0.0))
+        if not self._enqueue(job):
+            self.stats["rejected"] += 1
+            logger.warning(f"⚠️ Enrichment queue full ({self.max_size}), {alert_type} drop not enriched")
+            return False
+        self.stats["submitted"] += 1
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot pour /health ou commandes admin"""
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "in_flight": self._in_flight,
+            "pending_retries": len(self._retry_tasks),
+            "workers": len(self._workers),
+            **self.stats,
+            "wait_ms": percentiles(self._waits),
+            "latency_ms": percentiles(self._latencies),
+            "api_ms": percentiles(self._api_times),
+        }
+
+    # ---------- Interne ----------
+
+    def _enqueue(self, job: _EnrichmentJob) -> bool:
+        try:
+            self._queue.put_nowait((job.priority(), next(self._seq), job))
+        except asyncio.QueueFull:
+            return False
+        depth = self._queue.qsize()
+        if depth > self.stats["max_queue_depth"]:
+            self.stats["max_queue_depth"] = depth
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            _, _, job = await self._queue.get()
+            self._in_flight += 1
+            try:
+                await self._run(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"EnrichmentQueue worker error ({job.alert_type}): {e}")
+            finally:
+                self._in_flight -= 1
+                self._queue.task_done()
+
+    def _enrich_in_thread(self, job: _EnrichmentJob) -> Tuple[Dict, bool]:
+        """Appel bloquant (thread): (données, erreur API pendant l'appel)"""
+        errors_before = odds_api.thread_errors()
+        result = self.enrich(job.data, job.alert_type)
+        return result or job.data, odds_api.thread_errors() > errors_before
+
+    async def _run(self, job: _EnrichmentJob) -> None:
+        if job.attempts == 0:
+            self._waits.append((time.monotonic() - job.enqueued_at) * 1000)
+        if job.stale():
+            self.stats["cancelled_stale"] += 1
+            logger.info(f"⏭️ Enrichment cancelled, match already started ({job.data.get('match', '?')})")
+            await self._finish(job, job.data, False)
+            return
+
+        job.attempts += 1
+        started = time.monotonic()
+        try:
+            data, api_error = await asyncio.to_thread(self._enrich_in_thread, job)
+        except Exception as e:
+            data, api_error = job.data, True
+            logger.error(f"Enrichment error ({job.alert_type}): {e}")
+        self._api_times.append((time.monotonic() - started) * 1000)
+
+        if api_error:
+            if job.attempts < self.max_attempts:
+                self._retry_later(job)
+                return
+            self.stats["failed"] += 1
+            logger.error(f"❌ Enrichment gave up after {job.attempts} attempts ({job.data.get('match', '?')})")
+            await self._finish(job, job.data, False)
+            return
+
+        self.stats["enriched"] += 1
+        await self._finish(job, data, True)
+
+    def _retry_later(self, job: _EnrichmentJob) -> None:
+        delay = min(self.backoff_base * 2 ** (job.attempts - 1), BACKOFF_MAX_SECONDS)
+        self.stats["retried"] += 1
+
+        async def _requeue():
+            await asyncio.sleep(delay)
+            if job.stale() or not self._enqueue(job):
+                await self._abandon(job)
+
+        task = asyncio.create_task(_requeue())
+        self._retry_tasks.add(task)
+        task.add_done_callback(self._retry_tasks.discard)
+
+    async def _abandon(self, job: _EnrichmentJob) -> None:
+        if job.stale():
+            self.stats["cancelled_stale"] += 1
+        else:
+            self.stats["failed"] += 1
+            logger.warning(f"⚠️ Enrichment queue full, retry dropped ({job.data.get('match', '?')})")
+        await self._finish(job, job.data, False)
+
+    async def _finish(self, job: _EnrichmentJob, data: Dict, enriched: bool) -> None:
+        """Suite du pipeline dans sa propre tâche: les workers ne font que l'API"""
+        latency = (time.monotonic() - job.enqueued_at) * 1000
+        self._latencies.append(latency)
+        latency_tracer.record("enrichment", latency)
+        task = asyncio.create_task(self._callback(job, data, enriched))
+        self._callbacks.add(task)
+        task.add_done_callback(self._callbacks.discard)
+
+    async def _callback(self, job: _EnrichmentJob, data: Dict, enriched: bool) -> None:
+        try:
+            await job.on_done(data, enriched)
+        except Exception as e:
+            logger.error(f"Enrichment callback failed ({job.alert_type}): {e}")
+
+
+# Instance partagée (handlers /public/drop, /api/oddsjam/*)
+enrichment_queue = EnrichmentQueue()
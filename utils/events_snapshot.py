@@ -0,0 +1,270 @@
+"""
+Snapshot en mémoire des événements à venir par sport (GET /sports/{key}/events)
+- Les chemins d'enrichissement (odds_enricher, call_processor, odds_api_links)
+  lisent le snapshot: event_id / commence_time résolus sans appel réseau
+- Un sport devient "actif" à sa première lecture (fetch synchrone une fois),
+  puis est rafraîchi en tâche de fond tant qu'il est lu
+- Fréquence de rafraîchissement selon le prochain match du sport: toutes les
+  2 min si un match commence dans l'heure, jusqu'à 1 h si rien avant demain
+- Match introuvable dans un snapshot de plus de 5 min: refetch synchrone
+  avant de conclure (match listé depuis le dernier rafraîchissement)
+- Dernier snapshot écrit sur disque (JSON) pour un redémarrage à chaud
+
+Usage (remplace odds_api.get_events):
+    events = events_snapshot.get_events(sport_key, {"apiKey": ODDS_API_KEY})
+    event = events_snapshot.find_event(sport_key, team1, team2, {"apiKey": ODDS_API_KEY})
+    tasks.append(events_snapshot.refresh_loop())   # dans runner()
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from utils.odds_api_client import odds_api
+from utils.team_index import team_index_for
+
+logger = logging.getLogger(__name__)
+
+EVENTS_SNAPSHOT_PATH = os.getenv("EVENTS_SNAPSHOT_PATH", "events_snapshot.json")
+
+# Un sport non lu depuis ce délai n'est plus rafraîchi (ni persisté)
+ACTIVE_SPORT_SECONDS = 6 * 3600
+# Snapshot plus vieux: refetch synchrone à la lecture plutôt que servir du périmé
+MAX_SNAPSHOT_AGE_SECONDS = 12 * 3600
+# Match absent d'un snapshot plus vieux: refetch avant "introuvable" (ancien cache client: 5 min)
+MISS_REFRESH_SECONDS = 300
+REFRESH_TICK_SECONDS = 30
+REFRESH_RETRY_SECONDS = 60
+
+# (match dans moins de N secondes, intervalle de rafraîchissement)
+REFRESH_SCHEDULE = (
+    (3600, 120),
+    (6 * 3600, 600),
+    (24 * 3600, 1800),
+)
+REFRESH_IDLE_SECONDS = 3600
+
+
+def refresh_interval(events: List[Dict], now: Optional[float] = None) -> int:
+    """Intervalle de rafraîchissement d'après le prochain match à venir"""
+    now = now or time.time()
+    soonest = None
+    for event in events:
+        try:
+            start = datetime.fromisoformat(str(event.get('commence_time')).replace('Z', '+00:00')).timestamp()
+        except Exception:
+            continue
+        if start >= now and (soonest is None or start < soonest):
+            soonest = start
+    if soonest is None:
+        return REFRESH_IDLE_SECONDS
+    for within, interval in REFRESH_SCHEDULE:
+        if soonest - now <= within:
+            return interval
+    return REFRESH_IDLE_SECONDS
+
+
+class _SportSnapshot:
+    __slots__ = ("events", "params", "fetched_at", "last_read", "refresh_at")
+
+    def __init__(self, events: List[Dict], params: Dict, fetched_at: float, last_read: float):
+        self.events = events
+        # Query params des lecteurs (apiKey...), réutilisés par le refresher
+        self.params = params
+        self.fetched_at = fetched_at
+        self.last_read = last_read
+        self.refresh_at = fetched_at + refresh_interval(events, fetched_at)
+
+
+class EventsSnapshot:
+    """sport_key -> liste d'événements, rafraîchie en arrière-plan"""
+
+    def __init__(self, path: Optional[str] = EVENTS_SNAPSHOT_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._sports: Dict[str, _SportSnapshot] = {}
+        self.stats = {"hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0, "miss_refreshes": 0}
+
+    # ---------- Lecture ----------
+
+    def get_events(self, sport_key: str, params: Optional[Dict] = None) -> Optional[List[Dict]]:
+        """
+        Événements du sport (même liste tant qu'elle n'est pas rafraîchie)
+
+        Returns:
+            Liste d'événements, None si le sport n'est pas encore connu et que
+            l'API est en erreur (voir odds_api.thread_errors())
+        """
+        now = time.time()
+        with self._lock:
+            snap = self._sports.get(sport_key)
+            if snap is not None:
+                snap.last_read = now
+                if params:
+                    snap.params = {**snap.params, **params}
+                if now - snap.fetched_at < MAX_SNAPSHOT_AGE_SECONDS:
+                    self.stats["hits"] += 1
+                    return snap.events
+
+        # Sport inconnu (ou snapshot trop vieux): un fetch synchrone, puis le refresher prend le relais
+        self.stats["misses"] += 1
+        params = params or {}
+        events = odds_api.get(f"/sports/{sport_key}/events", params, ttl=0)
+        if events is None:
+            return snap.events if snap is not None else None
+        self._store(sport_key, events, params, now)
+        return events
+
+    def find_event(self, sport_key: str, team1: str, team2: str, params: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Événement du match dans le snapshot du sport
+
+        Absent d'un snapshot de plus de MISS_REFRESH_SECONDS: un refetch synchrone
+        avant de répondre None (un échec API reste visible via odds_api.thread_errors(),
+        l'appelant ne conclut pas à un match introuvable)
+        """
+        events = self.get_events(sport_key, params)
+        if events is None:
+            return None
+        event = team_index_for(sport_key, events).find(team1, team2)
+        if event is not None:
+            return event
+        events = self._refetch_if_older(sport_key, params, MISS_REFRESH_SECONDS)
+        if events is None:
+            return None
+        return team_index_for(sport_key, events).find(team1, team2)
+
+    def status(self) -> Dict[str, Any]:
+        """Snapshot pour /health ou commandes admin"""
+        now = time.time()
+        with self._lock:
+            sports = {
+                key: {
+                    "events": len(snap.events),
+                    "age_s": round(now - snap.fetched_at),
+                    "next_refresh_s": max(0, round(snap.refresh_at - now)),
+                }
+                for key, snap in self._sports.items()
+            }
+        return {"sports": sports, **self.stats}
+
+    # ---------- Rafraîchissement ----------
+
+    async def refresh_loop(self) -> None:
+        """Tâche de fond: rafraîchit les sports actifs arrivés à échéance"""
+        logger.info("📅 Events snapshot refresher started")
+        while True:
+            try:
+                if await self.refresh_due():
+                    await asyncio.to_thread(self.save)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Events snapshot refresh error: {e}")
+            await asyncio.sleep(REFRESH_TICK_SECONDS)
+
+    async def refresh_due(self) -> int:
+        """Rafraîchit les sports dont l'échéance est passée, retire les inactifs"""
+        now = time.time()
+        with self._lock:
+            for key in [k for k, s in self._sports.items() if now - s.last_read > ACTIVE_SPORT_SECONDS]:
+                del self._sports[key]
+            due = [(k, s.params) for k, s in self._sports.items() if s.refresh_at <= now]
+
+        refreshed = 0
+        for sport_key, params in due:
+            events = await odds_api.aget(f"/sports/{sport_key}/events", params, ttl=0)
+            if events is None:
+                self.stats["refresh_errors"] += 1
+                # On garde l'ancien snapshot, nouvel essai bientôt
+                with self._lock:
+                    snap = self._sports.get(sport_key)
+                    if snap is not None:
+                        snap.refresh_at = time.time() + REFRESH_RETRY_SECONDS
+                continue
+            self._store(sport_key, events, params, time.time())
+            self.stats["refreshes"] += 1
+            refreshed += 1
+        return refreshed
+
+    # ---------- Persistance ----------
+
+    def save(self) -> None:
+        """Écrit le snapshot sur disque (remplacement atomique)"""
+        if not self.path:
+            return
+        with self._lock:
+            data = {
+                # apiKey jamais écrite sur disque
+                key: {
+                    "events": snap.events,
+                    "params": {k: v for k, v in snap.params.items() if k != "apiKey"},
+                    "fetched_at": snap.fetched_at,
+                    "last_read": snap.last_read,
+                }
+                for key, snap in self._sports.items()
+            }
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"⚠️ Events snapshot save failed: {e}")
+
+    def load(self) -> int:
+        """Recharge le dernier snapshot (redémarrage à chaud), retourne le nombre de sports"""
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Events snapshot load failed: {e}")
+            return 0
+        # Import local: odds_api_links importe ce module
+        from utils.odds_api_links import ODDS_API_KEY
+
+        now = time.time()
+        sports = {}
+        for key, entry in data.items():
+            if now - entry.get("last_read", 0) > ACTIVE_SPORT_SECONDS:
+                continue
+            # apiKey jamais sur disque: clé par défaut, remplacée par celle du premier lecteur
+            params = {"apiKey": ODDS_API_KEY, **(entry.get("params") or {})}
+            sports[key] = _SportSnapshot(entry.get("events") or [], params, entry.get("fetched_at", 0), entry["last_read"])
+        with self._lock:
+            self._sports.update(sports)
+        logger.info(f"📅 Events snapshot loaded: {len(sports)} sports")
+        return len(sports)
+
+    # ---------- Interne ----------
+
+    def _refetch_if_older(self, sport_key: str, params: Optional[Dict], max_age: float) -> Optional[List[Dict]]:
+        """Refetch synchrone si le snapshot a plus de max_age secondes, None sinon (ou erreur API)"""
+        now = time.time()
+        with self._lock:
+            snap = self._sports.get(sport_key)
+            if snap is None or now - snap.fetched_at < max_age:
+                return None
+            params = {**snap.params, **(params or {})}
+        self.stats["miss_refreshes"] += 1
+        events = odds_api.get(f"/sports/{sport_key}/events", params, ttl=0)
+        if events is None:
+            return None
+        self._store(sport_key, events, params, now)
+        return events
+
+    def _store(self, sport_key: str, events: List[Dict], params: Dict, fetched_at: float) -> None:
+        with self._lock:
+            previous = self._sports.get(sport_key)
+            last_read = previous.last_read if previous is not None else fetched_at
+            self._sports[sport_key] = _SportSnapshot(events, params, fetched_at, last_read)
+
+
+# Instance partagée
+events_snapshot = EventsSnapshot()
@@ -2,16 +2,19 @@
 Hybrid Odds Tracking System - The Odds API + Manual
 """
 import logging
-import aiohttp
 import asyncio
 import os
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime, timedelta
 from decimal import Decimal
 from database import SessionLocal
+from models.bet import UserBet
 from sqlalchemy import text
 import json
 
+from utils.odds_api_client import odds_api
+from utils.team_index import TeamIndex, team_index_for
+
 logger = logging.getLogger(__name__)
 
 
@@ -63,21 +66,15 @@ class HybridOddsTracker:
     
     def __init__(self):
         self.odds_api_key = os.getenv('ODDS_API_KEY', '')
-        self.odds_api_base_url = 'https://api.the-odds-api.com/v4'
         self.casino_mapping = {**ODDS_API_COVERAGE['supported'], **ODDS_API_COVERAGE['partial']}
-        self.session = None
         self.db = None
         
     async def initialize(self):
-        """Initialize aiohttp session"""
-        if not self.session:
-            self.session = aiohttp.ClientSession()
+        """Open DB session (HTTP goes through the shared odds_api client)"""
         self.db = SessionLocal()
         
     async def close(self):
         """Cleanup resources"""
-        if self.session:
-            await self.session.close()
         if self.db:
             self.db.close()
     
@@ -169,8 +166,6 @@ class HybridOddsTracker:
             return None
         
         try:
-            # Build API URL
-            url = f"{self.odds_api_base_url}/sports/{sport_key}/odds"
             params = {
                 'apiKey': self.odds_api_key,
                 'regions': 'us,us2,uk,eu,au',
@@ -179,20 +174,18 @@ class HybridOddsTracker:
                 'oddsFormat': 'american'
             }
             
-            async with self.session.get(url, params=params) as response:
-                if response.status != 200:
-                    logger.error(f"Odds API error: {response.status}")
-                    return None
-                
-                data = await response.json()
-                
-                # Find matching game
-                game = self.find_matching_game(data, bet)
-                if not game:
-                    return None
-                
-                # Extract odds for this bet
-                return self.extract_bet_odds(game, bet, bookmaker_key)
+            # Shared client: bets on the same sport/bookmaker reuse one request
+            data = await odds_api.aget_sport_odds(sport_key, params)
+            if data is None:
+                return None
+            
+            # Find matching game
+            game = self.find_matching_game(data, bet, index_key=f"{sport_key}:{bookmaker_key}")
+            if not game:
+                return None
+            
+            # Extract odds for this bet
+            return self.extract_bet_odds(game, bet, bookmaker_key)
                 
         except Exception as e:
             logger.error(f"Odds API fetch error: {e}")
@@ -224,7 +217,7 @@ class HybridOddsTracker:
         
         return None
     
-    def find_matching_game(self, api_data: List[Dict], bet) -> Optional[Dict]:
+    def find_matching_game(self, api_data: List[Dict], bet, index_key: Optional[str] = None) -> Optional[Dict]:
         """Find the game matching this bet in API response"""
         if not bet.match_name:
             return None
@@ -234,19 +227,9 @@ class HybridOddsTracker:
         if not teams:
             return None
         
-        # Search for matching game in API data
-        for game in api_data:
-            home_team = game.get('home_team', '').lower()
-            away_team = game.get('away_team', '').lower()
-            
-            # Check if teams match (fuzzy match)
-            if (self.fuzzy_match_team(teams[0], home_team) and 
-                self.fuzzy_match_team(teams[1], away_team)) or \
-               (self.fuzzy_match_team(teams[0], away_team) and 
-                self.fuzzy_match_team(teams[1], home_team)):
-                return game
-        
-        return None
+        # Team-name index, cached per sport/bookmaker for the API response lifetime
+        index = team_index_for(index_key, api_data) if index_key else TeamIndex(api_data)
+        return index.find(teams[0], teams[1])
     
     def extract_teams_from_match(self, match_name: str) -> Optional[Tuple[str, str]]:
         """Extract team names from match string"""
@@ -263,23 +246,6 @@ class HybridOddsTracker:
         
         return None
     
-    def fuzzy_match_team(self, team1: str, team2: str) -> bool:
-        """Fuzzy match team names"""
-        # Simple fuzzy match - can be improved
-        team1_words = set(team1.lower().split())
-        team2_words = set(team2.lower().split())
-        
-        # Check if significant overlap
-        common = team1_words & team2_words
-        if len(common) >= 1:  # At least one word in common
-            return True
-        
-        # Check if one contains the other
-        if team1 in team2 or team2 in team1:
-            return True
-        
-        return False
-    
     def extract_bet_odds(self, game: Dict, bet, bookmaker_key: str) -> Optional[Dict]:
         """Extract specific bet odds from game data"""
         bookmakers = game.get('bookmakers', [])
@@ -467,12 +433,9 @@ class ManualOddsReporter:
         Process user-reported odds change
         """
         try:
-            # Get current bet
-            result = self.db.execute(text("""
-                SELECT * FROM user_bets WHERE id = :bet_id AND user_id = :user_id
-            """), {'bet_id': bet_id, 'user_id': user_id})
-            
-            bet = result.fetchone()
+            # Get current bet (ORM: the update below must go through the mapper
+            # events that keep the daily P&L aggregates in sync)
+            bet = self.db.query(UserBet).filter(UserBet.id == bet_id, UserBet.user_id == user_id).first()
             if not bet:
                 return {'error': 'Bet not found'}
             
@@ -495,12 +458,7 @@ class ManualOddsReporter:
             })
             
             # Update bet (store in expected_profit for now)
-            self.db.execute(text("""
-                UPDATE user_bets 
-                SET expected_profit = :new_odds,
-                    updated_at = NOW()
-                WHERE id = :bet_id
-            """), {'new_odds': new_american_odds, 'bet_id': bet_id})
+            bet.expected_profit = new_american_odds
             
             self.db.commit()
             
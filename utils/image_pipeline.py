@@ -0,0 +1,256 @@
+"""
+Pipeline d'analyse des screenshots du bridge (hors boucle Telethon)
+- OCR (pytesseract) et détection de logos (OpenCV + fallback couleur) dans un
+  pool de processus, lancés en parallèle pour une même image
+- File bornée de photos à traiter + consumers: backpressure quand la file est pleine
+- Timings par étape (p50/p95/p99) pour repérer l'étape lente
+
+Les fonctions exécutées dans les workers sont au niveau module (picklables);
+workers lancés en spawn: le script principal est ré-importé (__mp_main__)
+sans passer par son bloc __main__, il ne doit donc rien ouvrir au niveau
+module (bridge.py crée client Telethon, pipeline et store de dédup dans main()).
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from io import BytesIO
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageOps, ImageFilter
+import pytesseract
+
+from utils.metrics import percentiles
+
+logger = logging.getLogger("ocr_bridge")
+
+try:
+    from logo_detector import detect_casinos_in_image
+    LOGO_DETECTION_ENABLED = True
+except ImportError:
+    LOGO_DETECTION_ENABLED = False
+
+try:
+    from simple_logo_detector import SimpleLogoDetector
+    SIMPLE_DETECTION_ENABLED = True
+except ImportError:
+    SIMPLE_DETECTION_ENABLED = False
+
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", str(min(4, os.cpu_count() or 1))))
+IMAGE_QUEUE_SIZE = int(os.getenv("IMAGE_QUEUE_SIZE", "32"))
+STAGE_TIMEOUT = float(os.getenv("IMAGE_STAGE_TIMEOUT", "60"))
+_TIMING_SAMPLES = 500
+
+
+# ===== Étapes exécutées dans les workers =====
+
+def extract_text_from_image(photo_bytes: bytes) -> str:
+    """OCR the image bytes to text using Tesseract.
+    Requires tesseract engine installed on system.
+    """
+    try:
+        image = Image.open(BytesIO(photo_bytes))
+        # Basic upscale and preprocessing for better OCR on small or noisy text
+        try:
+            w, h = image.size
+            scale = float(os.getenv("OCR_SCALE", "1.5"))
+            if max(w, h) < 1400:
+                image = image.resize((int(w*scale), int(h*scale)), resample=Image.BICUBIC)
+        except Exception:
+            pass
+        try:
+            image = image.convert("L")
+            image = ImageOps.autocontrast(image)
+            image = image.filter(ImageFilter.SHARPEN)
+        except Exception:
+            pass
+
+        # Tesseract configuration
+        tess_cmd = os.getenv("TESSERACT_CMD", "")
+        if tess_cmd:
+            pytesseract.pytesseract.tesseract_cmd = tess_cmd
+        lang = os.getenv("TESSERACT_LANG", "eng")
+        cfg = os.getenv("TESSERACT_CONFIG", "--oem 3 --psm 6")
+
+        text = pytesseract.image_to_string(image, lang=lang, config=cfg)
+        return text or ""
+    except Exception as e:
+        print(f"❌ OCR error: {e}")
+        return ""
+
+
+def detect_visual_casinos(photo_bytes: bytes) -> Tuple[List[str], List[str]]:
+    """
+    Détection visuelle des bookmakers
+
+    Returns:
+        (logos détectés par template matching, fallback couleur si aucun logo)
+    """
+    visual: List[str] = []
+    if LOGO_DETECTION_ENABLED:
+        try:
+            visual = detect_casinos_in_image(photo_bytes)
+        except Exception as e:
+            logger.warning(f"Logo detection error: {e}")
+
+    simple: List[str] = []
+    if not visual and SIMPLE_DETECTION_ENABLED:
+        try:
+            simple = SimpleLogoDetector().detect_from_image(photo_bytes)
+        except Exception as e:
+            logger.warning(f"Simple detection error: {e}")
+    return visual, simple
+
+
+def _timed_call(fn: Callable, photo_bytes: bytes) -> Tuple[Any, float]:
+    """Exécute fn dans le worker et renvoie (résultat, ms CPU côté worker)"""
+    t0 = time.perf_counter()
+    result = fn(photo_bytes)
+    return result, (time.perf_counter() - t0) * 1000
+
+
+def _worker_init() -> None:
+    # Tesseract/OpenCV multi-threadés: 1 thread par process pour ne pas sur-souscrire les cœurs
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+    try:
+        import cv2
+        cv2.setNumThreads(1)
+    except Exception:
+        pass
+
+
+# ===== Pipeline =====
+
+class ImagePipeline:
+    """Pool de processus + file bornée pour les photos reçues par le bridge"""
+
+    def __init__(self, max_workers: int = IMAGE_WORKERS, max_pending: int = IMAGE_QUEUE_SIZE):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max_pending
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._consumers: list = []
+        self._timings: Dict[str, deque] = {}
+        self.stats = {
+            "enqueued": 0,
+            "processed": 0,
+            "failed": 0,
+            "backpressure_waits": 0,
+            "stage_timeouts": 0,
+        }
+
+    # ---------- Pool de processus ----------
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn, pas fork: le pool est créé à la première photo, quand le client
+            # Telethon et les threads asyncio.to_thread existent déjà; un fork hériterait
+            # de verrous tenus par ces threads (deadlock possible dans les workers)
+            ctx = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=ctx, initializer=_worker_init,
+            )
+            logger.info(f"🧵 Image pipeline: {self.max_workers} worker process(es), queue {self.max_pending}")
+        return self._executor
+
+    async def _run_stage(self, stage: str, fn: Callable, photo_bytes: bytes, default: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        t0 = time.perf_counter()
+        try:
+            result, worker_ms = await asyncio.wait_for(
+                loop.run_in_executor(self._get_executor(), _timed_call, fn, photo_bytes),
+                timeout=STAGE_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            self.stats["stage_timeouts"] += 1
+            logger.warning(f"⏱️ Image stage '{stage}' timed out after {STAGE_TIMEOUT:.0f}s")
+            return default
+        except Exception as e:
+            logger.warning(f"Image stage '{stage}' failed: {e}")
+            return default
+        self.record(stage, worker_ms)
+        # Attente dans le pool (workers tous occupés)
+        self.record(f"{stage}_wait", (time.perf_counter() - t0) * 1000 - worker_ms)
+        return result
+
+    async def ocr(self, photo_bytes: bytes) -> str:
+        return await self._run_stage("ocr", extract_text_from_image, photo_bytes, "")
+
+    async def detect_logos(self, photo_bytes: bytes) -> Tuple[List[str], List[str]]:
+        return await self._run_stage("logos", detect_visual_casinos, photo_bytes, ([], []))
+
+    # ---------- File bornée ----------
+
+    def start(self, handler: Callable[[Any], Awaitable[None]], consumers: Optional[int] = None) -> None:
+        """Démarre les consumers qui appellent handler(item) pour chaque photo en file"""
+        if self._consumers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._consumers = [
+            asyncio.create_task(self._consume(handler), name=f"image-pipeline-{i}")
+            for i in range(consumers or self.max_workers)
+        ]
+
+    async def enqueue(self, item: Any) -> None:
+        """Ajoute une photo à traiter; attend si la file est pleine (backpressure)"""
+        if self._queue.full():
+            self.stats["backpressure_waits"] += 1
+            logger.warning(f"⚠️ Image queue full ({self.max_pending}) - waiting for a free slot")
+        await self._queue.put((time.perf_counter(), item))
+        self.stats["enqueued"] += 1
+
+    async def _consume(self, handler: Callable[[Any], Awaitable[None]]) -> None:
+        while True:
+            queued_at, item = await self._queue.get()
+            self.record("queue_wait", (time.perf_counter() - queued_at) * 1000)
+            try:
+                with self.timer("total"):
+                    await handler(item)
+                self.stats["processed"] += 1
+                if self.stats["processed"] % 50 == 0:
+                    logger.info(f"📈 Image pipeline metrics: {self.metrics()}")
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.error(f"Image pipeline handler error: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def stop(self) -> None:
+        for task in self._consumers:
+            task.cancel()
+        await asyncio.gather(*self._consumers, return_exceptions=True)
+        self._consumers = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    # ---------- Timings ----------
+
+    def record(self, stage: str, ms: float) -> None:
+        samples = self._timings.get(stage)
+        if samples is None:
+            samples = self._timings[stage] = deque(maxlen=_TIMING_SAMPLES)
+        samples.append(ms)
+
+    @contextmanager
+    def timer(self, stage: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - t0) * 1000)
+
+    def metrics(self) -> Dict[str, Any]:
+        stages = {}
+        for stage, samples in self._timings.items():
+            stages[stage] = {"count": len(samples), **percentiles(samples, ndigits=1)}
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "workers": self.max_workers,
+            **self.stats,
+            "stages_ms": stages,
+        }
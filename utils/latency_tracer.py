@@ -0,0 +1,167 @@
+"""
+Traçage de latence du chemin chaud: drop reçu -> message Telegram livré
+- Histogrammes en mémoire par étape (buckets log, ±5% de résolution):
+  mémoire constante, p50/p95/p99/max sans garder les échantillons
+- Spans par étape (receive_drop, persist, dedup, eligibility, recipients, call_template,
+  format, send, enrichment) + bout en bout drop_to_sent par destinataire
+- Heure de réception du drop portée par un ContextVar: suit les tâches
+  créées pendant le fan-out (gather, to_thread) sans toucher au payload du drop
+- Compteur exact des envois au-dessus de l'objectif (<2s, PERFORMANCE_OPTIMIZATIONS.md)
+
+Usage:
+    latency_tracer.mark_drop_received()
+    with latency_tracer.span("persist"):
+        drop_id, inserted = await asyncio.to_thread(upsert_drop, d)
+    latency_tracer.record("eligibility", eligibility.elapsed_ms)
+    latency_tracer.record_drop_to_sent()
+    latency_tracer.summary()
+"""
+import bisect
+import contextvars
+import math
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+LATENCY_TARGET_MS = float(os.getenv("LATENCY_TARGET_MS", "2000"))
+
+# Ordre d'affichage (les étapes inconnues suivent, triées)
+STAGES = (
+    "receive_drop",
+    "persist",
+    "dedup",
+    "eligibility",
+    "recipients",
+    "call_template",
+    "format",
+    "send",
+    "enrichment",
+    "drop_to_sent",
+)
+END_TO_END = "drop_to_sent"
+
+# Bornes hautes des buckets: 0.05 ms x 1.1^i, jusqu'à ~10 min (au-delà: max observé)
+_GROWTH = 1.1
+_BOUNDS = tuple(0.05 * _GROWTH ** i for i in range(173))
+
+# Monotonic de réception du drop en cours de traitement (None = hors drop, ex. envoi différé)
+_drop_received_at: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("drop_received_at", default=None)
+
+
+class LatencyHistogram:
+    """Histogramme à buckets logarithmiques (boucle asyncio unique, pas de verrou)"""
+
+    __slots__ = ("counts", "count", "total", "max", "over_target")
+
+    def __init__(self):
+        self.counts = [0] * (len(_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.over_target = 0
+
+    def add(self, ms: float, target_ms: float) -> None:
+        self.counts[bisect.bisect_left(_BOUNDS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+        if ms > target_ms:
+            self.over_target += 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Milieu (géométrique) du bucket contenant le rang demandé, plafonné au max observé"""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(pct / 100 * self.count))
+        seen = 0
+        for idx, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                if idx >= len(_BOUNDS):
+                    return self.max
+                estimate = _BOUNDS[idx] / math.sqrt(_GROWTH) if idx else _BOUNDS[0]
+                return min(estimate, self.max)
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+        def _round(value):
+            return round(value, 2) if value is not None else None
+
+        return {
+            "count": self.count,
+            "mean": _round(self.total / self.count) if self.count else None,
+            "p50": _round(self.percentile(50)),
+            "p95": _round(self.percentile(95)),
+            "p99": _round(self.percentile(99)),
+            "max": _round(self.max) if self.count else None,
+            "over_target": self.over_target,
+        }
+
+
+class LatencyTracer:
+    """Store de latences par étape du pipeline d'alerte"""
+
+    def __init__(self, target_ms: float = LATENCY_TARGET_MS):
+        self.target_ms = target_ms
+        self._histograms: Dict[str, LatencyHistogram] = {}
+        self.started_at = time.time()
+
+    def record(self, stage: str, ms: float) -> None:
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            histogram = self._histograms[stage] = LatencyHistogram()
+        histogram.add(ms, self.target_ms)
+
+    def record_since(self, stage: str, started: float) -> None:
+        """started: time.perf_counter() au début de l'étape"""
+        self.record(stage, (time.perf_counter() - started) * 1000)
+
+    @contextmanager
+    def span(self, stage: str):
+        """Mesure le bloc (await compris), enregistré même si le bloc lève"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, (time.perf_counter() - started) * 1000)
+
+    # ---------- Bout en bout ----------
+
+    def mark_drop_received(self) -> None:
+        """À appeler à la réception du drop: vaut pour les tâches créées ensuite"""
+        _drop_received_at.set(time.monotonic())
+
+    def clear_drop(self) -> None:
+        """Envoi hors du chemin chaud (différé): pas de drop_to_sent"""
+        _drop_received_at.set(None)
+
+    def record_drop_to_sent(self) -> None:
+        received_at = _drop_received_at.get()
+        if received_at is not None:
+            self.record(END_TO_END, (time.monotonic() - received_at) * 1000)
+
+    # ---------- Lecture ----------
+
+    def summary(self) -> Dict[str, Any]:
+        """Snapshot pour /health/latency ou commande admin"""
+        order = [s for s in STAGES if s in self._histograms]
+        order += sorted(s for s in self._histograms if s not in STAGES)
+        end_to_end = self._histograms.get(END_TO_END)
+        return {
+            "target_ms": self.target_ms,
+            "since": self.started_at,
+            "within_target_pct": (
+                round(100 * (1 - end_to_end.over_target / end_to_end.count), 2)
+                if end_to_end and end_to_end.count else None
+            ),
+            "stages": {stage: self._histograms[stage].snapshot() for stage in order},
+        }
+
+    def reset(self) -> None:
+        self._histograms = {}
+        self.started_at = time.time()
+
+
+latency_tracer = LatencyTracer()
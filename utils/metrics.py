@@ -0,0 +1,28 @@
+"""
+Percentiles des métriques internes (/health/*, commandes admin)
+Partagé par l'ordonnanceur d'envoi, la file d'enrichissement, le fan-out
+WebSocket et le pipeline d'images.
+
+Usage:
+    percentile(sorted(latencies), 95)
+    percentiles(latencies)  # {"p50": ..., "p95": ..., "p99": ...}
+"""
+from typing import Dict, Iterable, Optional, Sequence
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> Optional[float]:
+    """Percentile (rang le plus proche) d'une liste déjà triée, None si vide"""
+    if not sorted_values:
+        return None
+    idx = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def percentiles(values: Iterable[float], ndigits: Optional[int] = None) -> Dict[str, Optional[float]]:
+    """p50 / p95 / p99 d'échantillons non triés (arrondis à ndigits si fourni)"""
+    ordered = sorted(values)
+    result = {}
+    for name, pct in (("p50", 50), ("p95", 95), ("p99", 99)):
+        value = percentile(ordered, pct)
+        result[name] = round(value, ndigits) if value is not None and ndigits is not None else value
+    return result
@@ -0,0 +1,289 @@
+"""
+Client The Odds API partagé par tous les modules
+- Session aiohttp persistante (keep-alive) sur une boucle asyncio dédiée
+- Déduplication des requêtes en vol (mêmes path + params = 1 seule requête)
+- Cache TTL par clé
+- Budget de quota basé sur les headers x-requests-remaining / x-requests-used
+
+Utilisable depuis du code async (aget) ou sync (get). Les appels sync
+bloquent seulement le thread appelant, jamais la boucle du client.
+
+⚠️ Les données retournées sont partagées via le cache: ne pas les modifier.
+"""
+import asyncio
+import atexit
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+ODDS_API_BASE = "https://api.the-odds-api.com/v4"
+
+# TTL par défaut (secondes)
+EVENTS_TTL = 300   # /sports/{key}/events: liste des matchs, change peu
+ODDS_TTL = 60      # cotes/liens: même durée que LINKS_CACHE dans odds_api_links
+
+# Quota: en dessous de ce nombre de requêtes restantes, on ne sert plus que le cache
+MIN_REMAINING_REQUESTS = int(os.getenv("ODDS_API_MIN_REMAINING", "50"))
+# Quota bas: laisser passer 1 requête de temps en temps pour relire les headers (reset mensuel)
+QUOTA_RECHECK_SECONDS = 600
+
+_MAX_CACHE_ENTRIES = 1024
+
+
+class OddsAPIError(Exception):
+    """Erreur réseau / HTTP (les appelants reçoivent None, voir thread_errors())"""
+
+
+class OddsAPIClient:
+    """Client async poolé avec cache TTL, coalescing et budget de quota"""
+
+    def __init__(
+        self,
+        base_url: str = ODDS_API_BASE,
+        max_concurrency: int = 8,
+        min_remaining: int = MIN_REMAINING_REQUESTS,
+    ):
+        self.base_url = base_url
+        self.max_concurrency = max_concurrency
+        self.min_remaining = min_remaining
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        # key -> (expires_at monotonic, data)
+        self._cache: Dict[str, tuple] = {}
+        # key -> asyncio.Future (sur la boucle du client)
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        # Quota (headers de la dernière réponse)
+        self.requests_remaining: Optional[int] = None
+        self.requests_used: Optional[int] = None
+        self.requests_last_cost: Optional[int] = None
+        self._quota_seen_at = 0.0
+        # Erreurs vues par le thread appelant (get sync): permet de distinguer
+        # "pas de données" d'une panne API (retry côté file d'enrichissement)
+        self._thread_errors = threading.local()
+
+        self.stats = {
+            "network": 0,
+            "cache_hits": 0,
+            "coalesced": 0,
+            "errors": 0,
+            "budget_blocked": 0,
+        }
+
+    # ---------- Boucle dédiée ----------
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is not None:
+            return self._loop
+        with self._start_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(target=loop.run_forever, name="odds-api-client", daemon=True)
+                thread.start()
+                self._thread = thread
+                self._loop = loop
+        return self._loop
+
+    def _submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self._ensure_loop())
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency * 2,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._session
+
+    # ---------- API publique ----------
+
+    def get(self, path: str, params: Optional[Dict] = None, ttl: float = ODDS_TTL, timeout: float = 10.0) -> Optional[Any]:
+        """
+        GET synchrone (bloque le thread appelant seulement)
+
+        Args:
+            path: Chemin relatif à ODDS_API_BASE (ex: "/sports/basketball_nba/events")
+            params: Query params (apiKey inclus, ignoré pour la clé de cache)
+            ttl: Durée de vie en cache (secondes), 0 = pas de cache
+            timeout: Timeout réseau (secondes)
+
+        Returns:
+            JSON décodé ou None si erreur / quota épuisé sans cache
+        """
+        future = self._submit(self._fetch(path, params or {}, ttl, timeout))
+        try:
+            return future.result(timeout=timeout + 5)
+        except Exception as e:
+            self._thread_errors.count = self.thread_errors() + 1
+            logger.error(f"Odds API client error for {path}: {e}")
+            return None
+
+    async def aget(self, path: str, params: Optional[Dict] = None, ttl: float = ODDS_TTL, timeout: float = 10.0) -> Optional[Any]:
+        """Version async de get(), utilisable depuis n'importe quelle boucle"""
+        future = self._submit(self._fetch(path, params or {}, ttl, timeout))
+        try:
+            return await asyncio.wrap_future(future)
+        except Exception as e:
+            logger.error(f"Odds API client error for {path}: {e}")
+            return None
+
+    def thread_errors(self) -> int:
+        """Nombre d'appels get() en erreur dans le thread courant (compteur cumulatif)"""
+        return getattr(self._thread_errors, "count", 0)
+
+    def get_events(self, sport_key: str, params: Optional[Dict] = None) -> Optional[Any]:
+        """GET /sports/{sport_key}/events"""
+        return self.get(f"/sports/{sport_key}/events", params, ttl=EVENTS_TTL)
+
+    def get_event_odds(self, sport_key: str, event_id: str, params: Optional[Dict] = None, timeout: float = 10.0) -> Optional[Any]:
+        """GET /sports/{sport_key}/events/{event_id}/odds"""
+        return self.get(f"/sports/{sport_key}/events/{event_id}/odds", params, ttl=ODDS_TTL, timeout=timeout)
+
+    async def aget_sport_odds(self, sport_key: str, params: Optional[Dict] = None) -> Optional[Any]:
+        """GET /sports/{sport_key}/odds (async)"""
+        return await self.aget(f"/sports/{sport_key}/odds", params, ttl=ODDS_TTL)
+
+    def status(self) -> Dict[str, Any]:
+        """Snapshot quota + compteurs (pour /health ou admin)"""
+        return {
+            "requests_remaining": self.requests_remaining,
+            "requests_used": self.requests_used,
+            "requests_last_cost": self.requests_last_cost,
+            "cache_entries": len(self._cache),
+            "inflight": len(self._inflight),
+            **self.stats,
+        }
+
+    def close(self) -> None:
+        """Ferme la session et arrête la boucle dédiée"""
+        loop = self._loop
+        if loop is None:
+            return
+        try:
+            if self._session is not None:
+                asyncio.run_coroutine_threadsafe(self._session.close(), loop).result(timeout=5)
+        except Exception:
+            pass
+        loop.call_soon_threadsafe(loop.stop)
+        self._loop = None
+        self._session = None
+
+    # ---------- Interne ----------
+
+    @staticmethod
+    def _cache_key(path: str, params: Dict) -> str:
+        items = sorted((k, str(v)) for k, v in params.items() if k != "apiKey")
+        return path + "?" + "&".join(f"{k}={v}" for k, v in items)
+
+    def _budget_exhausted(self) -> bool:
+        if self.requests_remaining is None or self.requests_remaining > self.min_remaining:
+            return False
+        return time.monotonic() - self._quota_seen_at < QUOTA_RECHECK_SECONDS
+
+    def _prune_cache(self, now: float) -> None:
+        if len(self._cache) < _MAX_CACHE_ENTRIES:
+            return
+        for key in [k for k, (exp, _) in self._cache.items() if exp <= now]:
+            del self._cache[key]
+        # Toujours trop gros: retirer les plus anciennes entrées
+        while len(self._cache) >= _MAX_CACHE_ENTRIES:
+            self._cache.pop(next(iter(self._cache)))
+
+    def _read_quota(self, headers) -> None:
+        self._quota_seen_at = time.monotonic()
+        for header, attr in (
+            ("x-requests-remaining", "requests_remaining"),
+            ("x-requests-used", "requests_used"),
+            ("x-requests-last", "requests_last_cost"),
+        ):
+            value = headers.get(header)
+            if value is None:
+                continue
+            try:
+                setattr(self, attr, int(float(value)))
+            except ValueError:
+                pass
+
+    async def _fetch(self, path: str, params: Dict, ttl: float, timeout: float) -> Optional[Any]:
+        key = self._cache_key(path, params)
+        now = time.monotonic()
+
+        cached = self._cache.get(key)
+        if cached and cached[0] > now:
+            self.stats["cache_hits"] += 1
+            return cached[1]
+
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            # Erreur de la requête partagée relancée ici: chaque appelant la compte
+            return await asyncio.shield(pending)
+
+        if self._budget_exhausted():
+            self.stats["budget_blocked"] += 1
+            logger.warning(f"⚠️ Odds API quota low ({self.requests_remaining} left) - serving cache only for {path}")
+            return cached[1] if cached else None
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        data = None
+        error = None
+        try:
+            data = await self._request(path, params, timeout)
+            if data is not None and ttl > 0:
+                self._prune_cache(now)
+                self._cache[key] = (time.monotonic() + ttl, data)
+        except OddsAPIError as e:
+            error = e
+        finally:
+            self._inflight.pop(key, None)
+            if error is not None:
+                future.set_exception(error)
+                # Marquée comme lue: pas d'avertissement "never retrieved" s'il n'y a aucun waiter
+                future.exception()
+            else:
+                future.set_result(data)
+        if error is not None:
+            raise error
+        return data
+
+    async def _request(self, path: str, params: Dict, timeout: float) -> Optional[Any]:
+        session = await self._get_session()
+        async with self._semaphore:
+            self.stats["network"] += 1
+            try:
+                async with session.get(
+                    f"{self.base_url}{path}",
+                    params={k: str(v) for k, v in params.items() if v is not None},
+                    timeout=aiohttp.ClientTimeout(total=timeout),
+                ) as response:
+                    self._read_quota(response.headers)
+                    if response.status != 200:
+                        self.stats["errors"] += 1
+                        raise OddsAPIError(f"HTTP {response.status} for {path}")
+                    return await response.json()
+            except asyncio.TimeoutError:
+                self.stats["errors"] += 1
+                raise OddsAPIError(f"Timeout fetching {path}")
+            except aiohttp.ClientError as e:
+                self.stats["errors"] += 1
+                raise OddsAPIError(f"Request failed for {path}: {e}")
+
+
+# Instance partagée par tous les modules
+odds_api = OddsAPIClient()
+atexit.register(odds_api.close)
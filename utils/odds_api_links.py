@@ -2,7 +2,6 @@
 The Odds API Integration - Deep Links System
 Récupère les liens directs vers les paris sur les sites de bookmakers
 """
-import requests
 import logging
 import os
 from typing import Dict, Optional, List
@@ -13,6 +12,8 @@ try:
     from .bookmaker_link_resolver import resolver as link_resolver
 except ImportError:
     link_resolver = None
+from utils.odds_api_client import odds_api
+from utils.events_snapshot import events_snapshot
 
 # Configuration API
 ODDS_API_KEY = os.getenv("ODDS_API_KEY", "c5fc406d49eeea305125461f1fecea07")
@@ -112,22 +113,13 @@ def _split_match(match: str) -> List[str]:
 
 def _resolve_event_id(sport_key: str, team1: str, team2: str) -> Optional[str]:
     try:
-        url = f"{ODDS_API_BASE}/sports/{sport_key}/events"
         params = {
             "apiKey": ODDS_API_KEY,
             "dateFormat": "iso"
         }
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        events = response.json() or []
-        t1 = team1.lower().strip()
-        t2 = team2.lower().strip()
-        for ev in events:
-            h = (ev.get('home_team') or '').lower().strip()
-            a = (ev.get('away_team') or '').lower().strip()
-            names = {h, a}
-            if any(t1 in nm or nm in t1 for nm in names) and any(t2 in nm or nm in t2 for nm in names):
-                return ev.get('id')
+        ev = events_snapshot.find_event(sport_key, team1, team2, params)
+        if ev:
+            return ev.get('id')
     except Exception as e:
         logger.error(f"Failed to resolve event id: {e}")
     return None
@@ -231,8 +223,6 @@ def fetch_event_links(
     if markets is None:
         markets = ['h2h']
     
-    url = f"{ODDS_API_BASE}/sports/{sport_key}/events/{event_id}/odds"
-    
     params = {
         "apiKey": ODDS_API_KEY,
         "regions": "eu",
@@ -246,17 +236,12 @@ def fetch_event_links(
     
     try:
         logger.info(f"Fetching links for event {event_id} in sport {sport_key}; markets={','.join(markets)}")
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        data = response.json()
+        data = odds_api.get_event_odds(sport_key, event_id, params)
+        if data is None:
+            logger.error(f"Failed to fetch event links for {event_id}")
+            return {}
         logger.info(f"Successfully fetched links, {len(data.get('bookmakers', []))} bookmakers found")
         return data
-    except requests.exceptions.Timeout:
-        logger.error(f"Timeout fetching event links for {event_id}")
-        return {}
-    except requests.exceptions.RequestException as e:
-        logger.error(f"Failed to fetch event links: {e}")
-        return {}
     except Exception as e:
         logger.error(f"Unexpected error fetching event links: {e}")
         return {}
@@ -10,7 +10,9 @@ import re
 import logging
 from typing import Dict, Optional, List, Tuple, Set
 from datetime import datetime, timezone, timedelta
-import requests
+
+from utils.odds_api_client import odds_api
+from utils.events_snapshot import events_snapshot
 
 # Setup
 logger = logging.getLogger(__name__)
@@ -187,36 +189,21 @@ def find_event_by_teams(sport_key: str, team1: str, team2: str) -> Optional[Dict
     if not ODDS_API_KEY or not sport_key:
         return None
     
-    url = f"{ODDS_API_BASE}/sports/{sport_key}/events"
     params = {
         "apiKey": ODDS_API_KEY
     }
     
     try:
-        response = requests.get(url, params=params, timeout=5)
-        if response.status_code == 200:
-            events = response.json()
-            
-            # Normaliser pour comparaison
-            t1_lower = team1.lower()
-            t2_lower = team2.lower()
-            
-            for event in events:
-                home = event.get('home_team', '').lower()
-                away = event.get('away_team', '').lower()
-                
-                # Vérifier les deux ordres possibles
-                if (t1_lower in home and t2_lower in away) or \
-                   (t2_lower in home and t1_lower in away) or \
-                   (home in t1_lower and away in t2_lower) or \
-                   (away in t1_lower and home in t2_lower):
-                    return {
-                        'event_id': event.get('id'),
-                        'sport_key': sport_key,
-                        'commence_time': event.get('commence_time'),
-                        'home_team': event.get('home_team'),
-                        'away_team': event.get('away_team')
-                    }
+        # Match absent d'un snapshot > 5 min: refetch avant de conclure (voir events_snapshot)
+        event = events_snapshot.find_event(sport_key, team1, team2, params)
+        if event:
+            return {
+                'event_id': event.get('id'),
+                'sport_key': sport_key,
+                'commence_time': event.get('commence_time'),
+                'home_team': event.get('home_team'),
+                'away_team': event.get('away_team')
+            }
     except Exception as e:
         logger.error(f"Error finding event: {e}")
     
@@ -230,8 +217,6 @@ def get_odds_and_links(event_id: str, sport_key: str, bookmakers: List[str] = No
     if not ODDS_API_KEY or not event_id or not sport_key:
         return {}
     
-    url = f"{ODDS_API_BASE}/sports/{sport_key}/events/{event_id}/odds"
-    
     # Map bookmaker names to API keys
     bookmaker_keys = []
     if bookmakers:
@@ -265,9 +250,8 @@ def get_odds_and_links(event_id: str, sport_key: str, bookmakers: List[str] = No
         params["bookmakers"] = ",".join(bookmaker_keys)
     
     try:
-        response = requests.get(url, params=params, timeout=10)
-        if response.status_code == 200:
-            data = response.json()
+        data = odds_api.get_event_odds(sport_key, event_id, params)
+        if data is not None:
             
             result = {
                 'commence_time': data.get('commence_time'),
@@ -394,9 +378,14 @@ def enrich_alert_with_api(alert_data: Dict, alert_type: str = 'arbitrage') -> Di
         return alert_data
     
     # Trouver l'événement
+    errors_before = odds_api.thread_errors()
     event_info = find_event_by_teams(sport_key, team1, team2)
     
     if not event_info:
+        if odds_api.thread_errors() > errors_before:
+            # Panne API, pas une ligue mineure: ne pas la mettre en cache (retry possible)
+            logger.warning(f"⚠️ Odds API error while looking up {team1} vs {team2} ({league})")
+            return alert_data
         logger.info(f"⚠️ Event not found in API: {team1} vs {team2} ({league})")
         logger.info(f"   → Minor leagues (Challenger, Division 2, etc.) are usually not covered by The Odds API")
         # Add to cache for next time
@@ -9,6 +9,8 @@ import aiohttp
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 
+from utils.team_index import TeamIndex
+
 load_dotenv()
 
 class OddsVerifier:
@@ -178,49 +180,42 @@ class OddsVerifier:
     def find_matching_odds(self, events, match, market_type, bookmaker):
         """Find odds for specific match and market"""
         
-        # Normalize match name for comparison
-        match_normalized = match.lower().replace('@', 'vs').replace(' at ', ' vs ')
+        # Team-name index lookup ("A vs B" / "A @ B" / "A at B")
+        matched = TeamIndex(events).find_match(match)
         
-        for event in events:
-            # Check if event matches
-            home = event.get('home_team', '').lower()
-            away = event.get('away_team', '').lower()
-            
-            event_match = f"{away} vs {home}"
-            
-            if home not in match_normalized and away not in match_normalized:
+        if matched is None:
+            return None
+        
+        # Found matching event, now find odds
+        for book in matched.get('bookmakers', []):
+            if book.get('key', '') != self.map_bookmaker_to_api(bookmaker):
                 continue
             
-            # Found matching event, now find odds
-            for book in event.get('bookmakers', []):
-                if book.get('key', '') != self.map_bookmaker_to_api(bookmaker):
-                    continue
+            # Find matching market
+            for market in book.get('markets', []):
+                # Match market type
+                market_key = market.get('key', '')
+                
+                if ('ML' in market_type.upper() or 'MONEYLINE' in market_type.upper()) and market_key == 'h2h':
+                    # Return first outcome (simplified)
+                    outcomes = market.get('outcomes', [])
+                    if outcomes:
+                        return outcomes[0].get('price', 0)
+                
+                elif ('SPREAD' in market_type.upper() or 'HANDICAP' in market_type.upper()) and market_key == 'spreads':
+                    outcomes = market.get('outcomes', [])
+                    if outcomes:
+                        return outcomes[0].get('price', 0)
                 
-                # Find matching market
-                for market in book.get('markets', []):
-                    # Match market type
-                    market_key = market.get('key', '')
-                    
-                    if ('ML' in market_type.upper() or 'MONEYLINE' in market_type.upper()) and market_key == 'h2h':
-                        # Return first outcome (simplified)
-                        outcomes = market.get('outcomes', [])
-                        if outcomes:
-                            return outcomes[0].get('price', 0)
-                    
-                    elif ('SPREAD' in market_type.upper() or 'HANDICAP' in market_type.upper()) and market_key == 'spreads':
-                        outcomes = market.get('outcomes', [])
-                        if outcomes:
-                            return outcomes[0].get('price', 0)
-                    
-                    elif ('OVER' in market_type.upper() or 'UNDER' in market_type.upper() or 'TOTAL' in market_type.upper()) and market_key == 'totals':
-                        outcomes = market.get('outcomes', [])
-                        if outcomes:
-                            # Match over/under
-                            for outcome in outcomes:
-                                if 'OVER' in market_type.upper() and outcome.get('name', '').lower() == 'over':
-                                    return outcome.get('price', 0)
-                                elif 'UNDER' in market_type.upper() and outcome.get('name', '').lower() == 'under':
-                                    return outcome.get('price', 0)
+                elif ('OVER' in market_type.upper() or 'UNDER' in market_type.upper() or 'TOTAL' in market_type.upper()) and market_key == 'totals':
+                    outcomes = market.get('outcomes', [])
+                    if outcomes:
+                        # Match over/under
+                        for outcome in outcomes:
+                            if 'OVER' in market_type.upper() and outcome.get('name', '').lower() == 'over':
+                                return outcome.get('price', 0)
+                            elif 'UNDER' in market_type.upper() and outcome.get('name', '').lower() == 'under':
+                                return outcome.get('price', 0)
         
         return None
     
@@ -5,7 +5,7 @@ Format Good Odds and Middle alerts for Telegram
 from typing import Dict
 from utils.odds_api_links import get_fallback_url
 from core.casinos import get_casino_logo
-from utils.ev_quality import get_ev_quality, get_profile_warning, calculate_bankroll_multiplier
+from utils.ev_quality import get_ev_quality, calculate_bankroll_multiplier
 from utils.oddsjam_parser import american_to_decimal
 from utils.middle_calculator import (
     classify_middle_type,
@@ -13,12 +13,7 @@ from utils.middle_calculator import (
     get_unit,
     analyze_spread_window,
 )
-from utils.good_odds_calculator import (
-    calculate_true_winrate,
-    calculate_good_odds_example,
-    calculate_kelly_bankroll,
-    get_ev_quality_tag
-)
+from utils.good_odds_calculator import get_ev_quality_tag
 from utils.sport_emoji import get_sport_emoji
 
 
@@ -48,124 +43,74 @@ def extract_player_name(selection: str) -> str:
     return ""
 
 
-def format_good_odds_message(data: Dict, user_cash: float, lang: str = 'en', user_profile: str = 'beginner', total_bets: int = 0) -> str:
+class GoodOddsTemplate:
     """
-    Format Good Odds (Positive EV) message with quality tags and detailed projections
-    
-    Args:
-        data: Parsed good odds data
-        user_cash: User's stake amount
-        lang: Language ('en' or 'fr')
-        user_profile: User's experience level
-        total_bets: Total good odds bets placed by user
+    Good Odds message split in two: everything that depends only on the drop
+    (quality tag, match, market, time, player, bookmaker, odds, advice) is
+    rendered once per drop and language; render() fills the stake / profit
+    lines for one user's cash.
     """
-    
-    emoji = get_casino_logo(data['bookmaker'])
-    ev_percent = float(data['ev_percent'])
-    
-    # Parse odds
-    try:
-        odds_int = int(data['odds'].replace('+', ''))
-    except:
-        odds_int = 100
-    
-    # Get CORRECT quality tag
-    quality = get_ev_quality_tag(ev_percent, odds_int)
-    
-    # Calculate projections
-    avg_profit_per_bet = user_cash * (ev_percent / 100)
-    projection_100 = avg_profit_per_bet * 100
-    
-    # Calculate TRUE win rate (NOT implied!)
-    true_winrate = calculate_true_winrate(odds_int, ev_percent)
-    loss_rate = 1 - true_winrate
-    
-    # CORRECT example over 10 bets
-    example = calculate_good_odds_example(odds_int, user_cash, ev_percent, 10)
-    
-    # CORRECT recommended bankroll using Kelly
-    min_bankroll = calculate_kelly_bankroll(user_cash, ev_percent, odds_int, kelly_mult=0.25)
-    
-    # Get profile warning if applicable
-    profile_warning = get_profile_warning(ev_percent, user_profile, lang) if callable(get_profile_warning) else ""
-    
-    # Check if player field exists in data (from OddsJam parser)
-    player_name = data.get('player', '')
-    
-    # If no player field, try to extract from selection
-    if not player_name:
-        player_name = extract_player_name(data.get('selection', ''))
-    
-    # If still no player name found but it's a player prop, try to extract from market
-    # Market format examples: 
-    # - "Player Rebounds" or "Player Rebounds : Player Name Over 3.5"
-    # - "NBA - Player Rebounds"
-    if not player_name and 'Player' in data.get('market', ''):
-        market_str = data.get('market', '')
-        # Try to extract player name from market string after ":"
-        import re
-        if ':' in market_str:
-            # Split on : and extract name from right side
-            after_colon = market_str.split(':', 1)[1].strip()
-            # Extract name before "Over" or "Under"
-            match = re.match(r'^(.+?)\s+(?:Over|Under)\s+[\d.]+', after_colon, re.IGNORECASE)
-            if match:
-                player_name = match.group(1).strip()
-    
-    # Get correct sport emoji
-    sport_emoji = get_sport_emoji(data.get('league', ''), data.get('sport', ''))
-    
-    # Build market display with player name if it's a player prop
-    is_player_prop = 'Player' in data.get('market', '')
-    
-    if is_player_prop:
-        # For player props, show player name prominently if we have it
-        if player_name:
-            market_display = f"{data['league']} - {data['market']}"
+
+    __slots__ = ("lang", "ev_percent", "decimal_odds", "head", "tail")
+
+    def __init__(self, data: Dict, lang: str = 'en'):
+        self.lang = lang
+        emoji = get_casino_logo(data['bookmaker'])
+        ev_percent = float(data['ev_percent'])
+        self.ev_percent = ev_percent
+        
+        # Parse odds
+        try:
+            odds_int = int(data['odds'].replace('+', ''))
+        except:
+            odds_int = 100
+        self.decimal_odds = american_to_decimal(odds_int)
+        
+        # Get CORRECT quality tag
+        quality = get_ev_quality_tag(ev_percent, odds_int)
+        
+        # Check if player field exists in data (from OddsJam parser)
+        player_name = data.get('player', '')
+        
+        # If no player field, try to extract from selection
+        if not player_name:
+            player_name = extract_player_name(data.get('selection', ''))
+        
+        # If still no player name found but it's a player prop, try to extract from market
+        # Market format examples: 
+        # - "Player Rebounds" or "Player Rebounds : Player Name Over 3.5"
+        # - "NBA - Player Rebounds"
+        if not player_name and 'Player' in data.get('market', ''):
+            market_str = data.get('market', '')
+            # Try to extract player name from market string after ":"
+            import re
+            if ':' in market_str:
+                # Split on : and extract name from right side
+                after_colon = market_str.split(':', 1)[1].strip()
+                # Extract name before "Over" or "Under"
+                match = re.match(r'^(.+?)\s+(?:Over|Under)\s+[\d.]+', after_colon, re.IGNORECASE)
+                if match:
+                    player_name = match.group(1).strip()
+        
+        # Get correct sport emoji
+        sport_emoji = get_sport_emoji(data.get('league', ''), data.get('sport', ''))
+        
+        # Build market display with player name if it's a player prop
+        market_display = f"{data['league']} - {data['market']}"
+        if 'Player' in data.get('market', '') and player_name:
+            # For player props, show player name prominently if we have it
             player_line = f"👤 <b>{player_name}</b>: {data['selection']}\n"
         else:
-            # No player name extracted, show selection only
-            market_display = f"{data['league']} - {data['market']}"
             player_line = f"📊 {data['selection']}\n"
-    else:
-        # Not a player prop
-        market_display = f"{data['league']} - {data['market']}"
-        player_line = f"📊 {data['selection']}\n"
-    
-    # Match time from API enrichment
-    time_line = ""
-    if data.get('formatted_time'):
-        time_line = f"🕐 {data['formatted_time']}\n"
-    elif data.get('commence_time'):
-        time_line = f"🕐 {data['commence_time']}\n"
-    
-    if lang == 'fr':
-        message = (
-            f"{quality['tag']}\n\n"
-            f"{quality['emoji']} <b>GOOD ODDS ALERT - {ev_percent}% EV</b>\n\n"
-            f"{sport_emoji} <b>{data['team1']} vs {data['team2']}</b>\n"
-            f"📊 {market_display}\n"
-            f"{time_line}"
-            f"{player_line}"
-            f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-            f"💎 <b>MEILLEURE COTE</b>\n"
-            f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
-            f"{emoji} <b>[{data['bookmaker']}]</b> {data['selection']}\n"
-            f"Cote: <b>{data['odds']}</b>\n"
-            f"💵 Stake: <b>${user_cash:.2f}</b>\n\n"
-            f"💰 <b>CE PARI:</b>\n"
-            f"✅ <b>Si tu GAGNES:</b> +${example['profit_if_win']:.2f} profit (ROI: {example['profit_if_win']/user_cash*100:.1f}%)\n"
-            f"❌ <b>Si tu PERDS:</b> -{user_cash:.2f}$ (perte totale)\n\n"
-            f"📈 <b>VALUE:</b>\n"
-            f"• EV+: {ev_percent}%\n"
-            f"• Profit moyen/bet: ${avg_profit_per_bet:.2f}\n"
-            f"• Sur 100 bets: ~${projection_100:.0f}\n\n"
-            f"💡 <b>Recommandé pour:</b> {quality['recommended_for']}\n"
-            f"{quality['advice']}\n\n"
-            f"⚠️ <b>Attention: les cotes peuvent changer - toujours vérifier avant de bet!</b>"
-        )
-    else:
-        message = (
+        
+        # Match time from API enrichment
+        time_line = ""
+        if data.get('formatted_time'):
+            time_line = f"🕐 {data['formatted_time']}\n"
+        elif data.get('commence_time'):
+            time_line = f"🕐 {data['commence_time']}\n"
+        
+        head = (
             f"{quality['tag']}\n\n"
             f"{quality['emoji']} <b>GOOD ODDS ALERT - {ev_percent}% EV</b>\n\n"
             f"{sport_emoji} <b>{data['team1']} vs {data['team2']}</b>\n"
@@ -173,24 +118,80 @@ def format_good_odds_message(data: Dict, user_cash: float, lang: str = 'en', use
             f"{time_line}"
             f"{player_line}"
             f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n"
-            f"💎 <b>BEST ODDS</b>\n"
-            f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
-            f"{emoji} <b>[{data['bookmaker']}]</b> {data['selection']}\n"
-            f"Odds: <b>{data['odds']}</b>\n"
-            f"💵 Stake: <b>${user_cash:.2f}</b>\n\n"
-            f"💰 <b>THIS BET:</b>\n"
-            f"✅ <b>If you WIN:</b> +${example['profit_if_win']:.2f} profit (ROI: {example['profit_if_win']/user_cash*100:.1f}%)\n"
-            f"❌ <b>If you LOSE:</b> -${user_cash:.2f} (total loss)\n\n"
-            f"📈 <b>VALUE:</b>\n"
-            f"• EV+: {ev_percent}%\n"
-            f"• Avg profit/bet: ${avg_profit_per_bet:.2f}\n"
-            f"• Over 100 bets: ~${projection_100:.0f}\n\n"
-            f"💡 <b>Recommended for:</b> {quality['recommended_for']}\n"
-            f"{quality['advice']}\n\n"
-            f"⚠️ <b>Odds can change - always verify before betting!</b>"
         )
+        if lang == 'fr':
+            self.head = head + (
+                f"💎 <b>MEILLEURE COTE</b>\n"
+                f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+                f"{emoji} <b>[{data['bookmaker']}]</b> {data['selection']}\n"
+                f"Cote: <b>{data['odds']}</b>\n"
+            )
+            self.tail = (
+                f"💡 <b>Recommandé pour:</b> {quality['recommended_for']}\n"
+                f"{quality['advice']}\n\n"
+                f"⚠️ <b>Attention: les cotes peuvent changer - toujours vérifier avant de bet!</b>"
+            )
+        else:
+            self.head = head + (
+                f"💎 <b>BEST ODDS</b>\n"
+                f"━━━━━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
+                f"{emoji} <b>[{data['bookmaker']}]</b> {data['selection']}\n"
+                f"Odds: <b>{data['odds']}</b>\n"
+            )
+            self.tail = (
+                f"💡 <b>Recommended for:</b> {quality['recommended_for']}\n"
+                f"{quality['advice']}\n\n"
+                f"⚠️ <b>Odds can change - always verify before betting!</b>"
+            )
+
+    def render(self, user_cash: float) -> str:
+        """Full message for one user's stake"""
+        ev_percent = self.ev_percent
+        # Same values as calculate_good_odds_example(...)['profit_if_win'] and the projections
+        profit_if_win = round(user_cash * (self.decimal_odds - 1), 2)
+        avg_profit_per_bet = user_cash * (ev_percent / 100)
+        projection_100 = avg_profit_per_bet * 100
+        
+        if self.lang == 'fr':
+            body = (
+                f"💵 Stake: <b>${user_cash:.2f}</b>\n\n"
+                f"💰 <b>CE PARI:</b>\n"
+                f"✅ <b>Si tu GAGNES:</b> +${profit_if_win:.2f} profit (ROI: {profit_if_win/user_cash*100:.1f}%)\n"
+                f"❌ <b>Si tu PERDS:</b> -{user_cash:.2f}$ (perte totale)\n\n"
+                f"📈 <b>VALUE:</b>\n"
+                f"• EV+: {ev_percent}%\n"
+                f"• Profit moyen/bet: ${avg_profit_per_bet:.2f}\n"
+                f"• Sur 100 bets: ~${projection_100:.0f}\n\n"
+            )
+        else:
+            body = (
+                f"💵 Stake: <b>${user_cash:.2f}</b>\n\n"
+                f"💰 <b>THIS BET:</b>\n"
+                f"✅ <b>If you WIN:</b> +${profit_if_win:.2f} profit (ROI: {profit_if_win/user_cash*100:.1f}%)\n"
+                f"❌ <b>If you LOSE:</b> -${user_cash:.2f} (total loss)\n\n"
+                f"📈 <b>VALUE:</b>\n"
+                f"• EV+: {ev_percent}%\n"
+                f"• Avg profit/bet: ${avg_profit_per_bet:.2f}\n"
+                f"• Over 100 bets: ~${projection_100:.0f}\n\n"
+            )
+        return self.head + body + self.tail
+
+
+def format_good_odds_message(data: Dict, user_cash: float, lang: str = 'en', user_profile: str = 'beginner', total_bets: int = 0) -> str:
+    """
+    Format Good Odds (Positive EV) message with quality tags and detailed projections
     
-    return message
+    For a fan-out, build GoodOddsTemplate once per language and call
+    template.render(user_cash) per recipient.
+    
+    Args:
+        data: Parsed good odds data
+        user_cash: User's stake amount
+        lang: Language ('en' or 'fr')
+        user_profile: User's experience level
+        total_bets: Total good odds bets placed by user
+    """
+    return GoodOddsTemplate(data, lang).render(user_cash)
 
 
 def format_middle_message(data: Dict, calc: Dict, user_cash: float, lang: str = 'en', rounding: int = 0) -> str:
@@ -0,0 +1,195 @@
+"""
+Recherche top-K de parlays (branch-and-bound) pour un casino
+
+Score d'un parlay = EV du moteur SmartParlayEngine:
+    EV = Π odds_i × Π p_i − 1,  p_i = 0.5 + edge_i/100 × 0.3
+En log: log(1 + EV) = Σ w_i avec w_i = log(odds_i × p_i), et la contrainte
+de cotes combinées devient Σ log(odds_i) ∈ [log(min), log(max)].
+
+- Legs triés par w décroissant → borne supérieure = score courant + somme des
+  w positifs des prochains legs; dès qu'elle ne bat plus le K-ième meilleur, on coupe
+- Deuxième borne: score = Σ log(odds) + Σ log(p) ≤ log(max_combined) + Σ log(p),
+  et chaque leg ajouté apporte log(p) < 0 → coupe les extensions inutiles
+- log(odds) > 0: dépasser max_combined est définitif (élagage), et on coupe aussi
+  si même les plus grosses cotes restantes n'atteignent pas min_combined
+- Un seul leg par match
+- Réduction exacte du pool: à cote égale, un leg est inutile dès que K legs au
+  moins aussi bons (hors matchs des autres legs) peuvent le remplacer
+- Dernier niveau évalué en NumPy sur tous les legs restants d'un coup
+"""
+import heapq
+import itertools
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_LOG_EPS = 1e-9
+
+
+def leg_weights(legs: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """(log des cotes, poids w = log(cote × probabilité estimée)) pour chaque leg"""
+    odds = np.fromiter((leg['odds'] for leg in legs), dtype=np.float64, count=len(legs))
+    edge = np.fromiter((leg['edge'] for leg in legs), dtype=np.float64, count=len(legs))
+    log_odds = np.log(odds)
+    prob = 0.5 + (edge / 100) * 0.3
+    with np.errstate(divide='ignore', invalid='ignore'):
+        weights = log_odds + np.log(np.where(prob > 0, prob, np.nan))
+    return log_odds, np.nan_to_num(weights, nan=-np.inf)
+
+
+def _reduce_pool(legs: List[Dict], max_legs: int, k: int) -> List[Dict]:
+    """
+    Garde, pour chaque cote, les meilleurs legs (edge) suffisants pour le top-K
+
+    Dans un parlay contenant x, tout leg y de même cote, d'edge ≥ et d'un match libre
+    donne un parlay au moins aussi bon. Les autres legs bloquent au plus max_legs - 1
+    matchs: dès que K remplaçants sont garantis, les legs suivants ne peuvent plus
+    entrer dans le top-K (à égalité près).
+    """
+    by_odds: Dict[float, List[Dict]] = {}
+    for leg in legs:
+        by_odds.setdefault(leg['odds'], []).append(leg)
+
+    blocked = max_legs - 1
+    reduced = []
+    for bucket in by_odds.values():
+        if len(bucket) <= k + blocked:
+            reduced.extend(bucket)
+            continue
+        bucket.sort(key=lambda leg: leg['edge'], reverse=True)
+        per_match: Dict[str, int] = {}
+        max_per_match = 0
+        for kept, leg in enumerate(bucket):
+            if kept - blocked * max_per_match >= k:
+                break
+            reduced.append(leg)
+            count = per_match[leg['match']] = per_match.get(leg['match'], 0) + 1
+            max_per_match = max(max_per_match, count)
+    return reduced
+
+
+def top_k_parlays(
+    legs: List[Dict],
+    max_legs: int,
+    min_combined: float,
+    max_combined: float,
+    k: int,
+    min_legs: int = 2,
+    required: Optional[Dict] = None,
+) -> List[Tuple[float, List[Dict]]]:
+    """
+    Meilleurs parlays (EV décroissante) parmi `legs`
+
+    Args:
+        legs: Legs d'UN casino (dicts avec 'odds' décimales, 'edge', 'match')
+        max_legs / min_legs: Taille du parlay
+        min_combined / max_combined: Fenêtre de cotes combinées
+        k: Nombre de parlays à renvoyer
+        required: Leg imposé dans chaque parlay (génération incrémentale)
+
+    Returns:
+        Liste de (cotes combinées, legs) triée par EV décroissante
+    """
+    if k <= 0 or max_legs < min_legs:
+        return []
+
+    base_w, base_lo, used, chosen_base = 0.0, 0.0, set(), ()
+    if required is not None:
+        base_lo, base_w = (float(a[0]) for a in leg_weights([required]))
+        used = {required['match']}
+        legs = [leg for leg in legs if leg is not required and leg['match'] != required['match']]
+        chosen_base = (-1,)
+    legs = _reduce_pool(legs, max_legs, k)
+    if not legs and required is None:
+        return []
+
+    log_odds, weights = leg_weights(legs) if legs else (np.empty(0), np.empty(0))
+    order = np.argsort(-weights, kind='stable')
+    log_odds, weights = log_odds[order], weights[order]
+    match_index: Dict[str, int] = {}
+    match_ids = np.fromiter(
+        (match_index.setdefault(legs[i]['match'], len(match_index)) for i in order),
+        dtype=np.int64, count=len(order),
+    )
+    used_ids = {match_index[m] for m in used if m in match_index}
+    n = len(order)
+
+    # Tolérance: Σ log(odds) peut dépasser log(max) d'un ulp alors que le produit est pile dans la fenêtre
+    lo_min, lo_max = np.log(min_combined) - _LOG_EPS, np.log(max_combined) + _LOG_EPS
+    # Somme préfixe des poids positifs (borne supérieure du gain restant)
+    pos_prefix = np.concatenate(([0.0], np.cumsum(np.maximum(weights, 0.0))))
+    # log(p) de chaque leg et son maximum sur les legs restants (borne par la fenêtre de cotes)
+    log_prob = weights - log_odds
+    suffix_max_log_prob = np.concatenate((np.maximum.accumulate(log_prob[::-1])[::-1], [-np.inf]))
+    # Plus grosses cotes disponibles: Σ des r plus grands log(odds) (borne pour min_combined)
+    top_lo = np.concatenate(([0.0], np.cumsum(np.sort(log_odds)[::-1])))
+
+    heap: list = []  # (score, seq, indices) - min-heap des K meilleurs
+    seq = itertools.count()
+
+    def threshold() -> float:
+        return heap[0][0] if len(heap) >= k else -np.inf
+
+    def push(score: float, chosen: tuple) -> None:
+        item = (score, next(seq), chosen)
+        if len(heap) < k:
+            heapq.heappush(heap, item)
+        elif score > heap[0][0]:
+            heapq.heapreplace(heap, item)
+
+    def last_level(start: int, cur_w: float, cur_lo: float, chosen: tuple, used_ids: set) -> None:
+        # Vectorisé: tous les legs restants comme dernier leg
+        lo = cur_lo + log_odds[start:]
+        score = cur_w + weights[start:]
+        mask = (lo >= lo_min) & (lo <= lo_max) & (score > threshold())
+        if used_ids:
+            mask &= ~np.isin(match_ids[start:], list(used_ids))
+        candidates = np.flatnonzero(mask)
+        if candidates.size > k:
+            candidates = candidates[np.argpartition(-score[candidates], k - 1)[:k]]
+        for c in candidates:
+            push(float(score[c]), chosen + (start + int(c),))
+
+    def search(start: int, cur_w: float, cur_lo: float, chosen: tuple, used_ids: set) -> None:
+        size = len(chosen)
+        if size >= min_legs and lo_min <= cur_lo <= lo_max:
+            push(cur_w, chosen)
+        slots = max_legs - size
+        if slots <= 0 or start >= n:
+            return
+        cur_log_prob = cur_w - cur_lo
+        # Toute extension: score ≤ log(max_combined) + Σ log(p) avec au moins un log(p) de plus
+        if lo_max + cur_log_prob + suffix_max_log_prob[start] <= threshold():
+            return
+        if slots == 1:
+            if size + 1 >= min_legs:
+                last_level(start, cur_w, cur_lo, chosen, used_ids)
+            return
+        for j in range(start, n):
+            # Borne supérieure: legs triés par poids → non croissante en j
+            if cur_w + pos_prefix[min(j + slots, n)] - pos_prefix[j] <= threshold():
+                break
+            if lo_max + cur_log_prob + log_prob[j] <= threshold():
+                continue
+            new_lo = cur_lo + log_odds[j]
+            if new_lo > lo_max:
+                continue
+            if new_lo + top_lo[min(slots - 1, n)] < lo_min:
+                continue
+            match = int(match_ids[j])
+            if match in used_ids:
+                continue
+            used_ids.add(match)
+            search(j + 1, cur_w + weights[j], new_lo, chosen + (j,), used_ids)
+            used_ids.discard(match)
+
+    search(0, base_w, base_lo, chosen_base, set(used_ids))
+
+    results = []
+    for score, _, chosen in sorted(heap, reverse=True):
+        combo = [required if i == -1 else legs[int(order[i])] for i in chosen]
+        combined = 1.0
+        for leg in combo:
+            combined *= leg['odds']
+        results.append((combined, combo))
+    return results
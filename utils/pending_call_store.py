@@ -0,0 +1,276 @@
+"""
+Store des calls en attente de vérification (ex-PENDING_CALLS + pending_calls.pkl)
+- Accès par call_id et par drop_event_id (index en mémoire)
+- Borné: expiration au début du match + marge (TTL par défaut sinon), et
+  nombre max d'entrées (les plus proches de l'expiration partent d'abord)
+- Persistance SQLite: chaque put() n'écrit QUE l'entrée modifiée
+  (au lieu de re-pickler tout le dict à chaque envoi)
+
+Usage:
+    PENDING_CALLS = PendingCallStore()
+    PENDING_CALLS.put(call, drop_id=drop_event_id)
+    call = PENDING_CALLS.get(call_id) or PENDING_CALLS.get_by_drop(drop_event_id)
+"""
+import heapq
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PENDING_CALLS_DB = os.getenv("PENDING_CALLS_DB", "pending_calls.db")
+LEGACY_PICKLE_FILE = "pending_calls.pkl"
+MAX_PENDING_CALLS = int(os.getenv("MAX_PENDING_CALLS", "20000"))
+# Un call reste vérifiable quelques heures après le début du match
+EXPIRY_AFTER_START_HOURS = float(os.getenv("PENDING_CALL_GRACE_HOURS", "6"))
+# Date de match inconnue
+DEFAULT_TTL_HOURS = float(os.getenv("PENDING_CALL_TTL_HOURS", "48"))
+_SWEEP_INTERVAL_SECONDS = 60
+
+
+def _call_expiry(call: Any, now: float) -> float:
+    """Timestamp d'expiration: début du match + marge, sinon now + TTL par défaut"""
+    event_dt = getattr(call, "event_datetime", None)
+    start = getattr(event_dt, "utc", None) if event_dt is not None else None
+    if isinstance(start, datetime):
+        if start.tzinfo is None:
+            start = start.replace(tzinfo=timezone.utc)
+        return start.timestamp() + EXPIRY_AFTER_START_HOURS * 3600
+    return now + DEFAULT_TTL_HOURS * 3600
+
+
+class PendingCallStore:
+    """Calls en attente (call_id -> call), bornés, persistés entrée par entrée"""
+
+    def __init__(self, path: Optional[str] = PENDING_CALLS_DB, max_entries: int = MAX_PENDING_CALLS):
+        self.path = path
+        self.max_entries = max_entries
+        self._calls: Dict[str, Tuple[Any, Optional[str], float]] = {}  # call_id -> (call, drop_id, expires_at)
+        self._by_drop: Dict[str, str] = {}   # drop_id -> call_id
+        self._expiry_heap: list = []         # (expires_at, call_id), suppression paresseuse
+        self._lock = threading.Lock()
+        self._last_sweep = 0.0
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            self._open()
+            self._load()
+
+    # ---------- Persistance ----------
+
+    def _open(self) -> None:
+        try:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS pending_calls (
+                    call_id TEXT PRIMARY KEY,
+                    drop_id TEXT,
+                    expires_at REAL NOT NULL,
+                    payload BLOB NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pending_calls_drop ON pending_calls (drop_id)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_pending_calls_expires ON pending_calls (expires_at)")
+            self._conn.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ Pending calls DB unavailable ({self.path}), memory only: {e}")
+            self._conn = None
+
+    def _load(self) -> None:
+        if self._conn is None:
+            return
+        now = time.time()
+        loaded = 0
+        try:
+            self._conn.execute("DELETE FROM pending_calls WHERE expires_at <= ?", (now,))
+            self._conn.commit()
+            rows = self._conn.execute(
+                "SELECT call_id, drop_id, expires_at, payload FROM pending_calls ORDER BY expires_at"
+            ).fetchall()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to load pending calls: {e}")
+            return
+        for call_id, drop_id, expires_at, payload in rows:
+            try:
+                call = pickle.loads(payload)
+            except Exception:
+                continue
+            self._remember(call_id, call, drop_id, expires_at)
+            loaded += 1
+        migrated = self._migrate_legacy_pickle(now)
+        logger.info(f"✅ Loaded {loaded} pending calls from {self.path}" + (f" (+{migrated} from {LEGACY_PICKLE_FILE})" if migrated else ""))
+
+    def _migrate_legacy_pickle(self, now: float) -> int:
+        """Import unique de l'ancien pending_calls.pkl (renommé ensuite)"""
+        if not os.path.exists(LEGACY_PICKLE_FILE):
+            return 0
+        try:
+            with open(LEGACY_PICKLE_FILE, "rb") as f:
+                legacy = pickle.load(f)
+            count = 0
+            for call_id, call in legacy.items():
+                if _call_expiry(call, now) > now and call_id not in self._calls:
+                    self.put(call, call_id=call_id)
+                    count += 1
+            os.replace(LEGACY_PICKLE_FILE, LEGACY_PICKLE_FILE + ".migrated")
+            return count
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to migrate {LEGACY_PICKLE_FILE}: {e}")
+            return 0
+
+    def _write(self, call_id: str, call: Any, drop_id: Optional[str], expires_at: float) -> None:
+        if self._conn is None:
+            return
+        try:
+            payload = pickle.dumps(call, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception as e:
+            # Ex: dataclass locale à une fonction -> gardé en mémoire seulement
+            logger.debug(f"Pending call {call_id} not persisted (not picklable): {e}")
+            return
+        try:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO pending_calls (call_id, drop_id, expires_at, payload) VALUES (?, ?, ?, ?)",
+                (call_id, drop_id, expires_at, payload),
+            )
+            self._conn.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to save pending call {call_id}: {e}")
+
+    def _delete_rows(self, call_ids) -> None:
+        if self._conn is None or not call_ids:
+            return
+        try:
+            self._conn.executemany("DELETE FROM pending_calls WHERE call_id = ?", [(c,) for c in call_ids])
+            self._conn.commit()
+        except Exception as e:
+            logger.warning(f"⚠️ Failed to delete pending calls: {e}")
+
+    # ---------- Index mémoire ----------
+
+    def _remember(self, call_id: str, call: Any, drop_id: Optional[str], expires_at: float) -> None:
+        previous = self._calls.get(call_id)
+        if previous is not None:
+            drop_id = drop_id or previous[1]
+        self._calls[call_id] = (call, drop_id, expires_at)
+        if drop_id:
+            self._by_drop[drop_id] = call_id
+        if previous is None or previous[2] != expires_at:
+            heapq.heappush(self._expiry_heap, (expires_at, call_id))
+
+    def _forget(self, call_id: str) -> None:
+        entry = self._calls.pop(call_id, None)
+        if entry is not None and entry[1] and self._by_drop.get(entry[1]) == call_id:
+            del self._by_drop[entry[1]]
+
+    def _pop_heap(self, limit: float, over_capacity: bool) -> list:
+        """Retire les entrées expirées (et les plus proches de l'expiration si trop d'entrées)"""
+        evicted = []
+        while self._expiry_heap:
+            expires_at, call_id = self._expiry_heap[0]
+            entry = self._calls.get(call_id)
+            if entry is None or entry[2] != expires_at:
+                heapq.heappop(self._expiry_heap)  # entrée périmée du heap
+                continue
+            if expires_at > limit and not (over_capacity and len(self._calls) > self.max_entries):
+                break
+            heapq.heappop(self._expiry_heap)
+            self._forget(call_id)
+            evicted.append(call_id)
+        return evicted
+
+    def evict_expired(self) -> int:
+        """Supprime les calls expirés et ramène le store à max_entries"""
+        with self._lock:
+            now = time.time()
+            self._last_sweep = now
+            evicted = self._pop_heap(now, over_capacity=True)
+        self._delete_rows(evicted)
+        if evicted:
+            logger.debug(f"🧹 Evicted {len(evicted)} pending calls")
+        return len(evicted)
+
+    # ---------- API publique ----------
+
+    def put(self, call: Any, drop_id: Any = None, call_id: Optional[str] = None, expires_at: Optional[float] = None) -> None:
+        """
+        Ajoute / met à jour un call (écrit uniquement cette entrée)
+
+        Args:
+            call: BettingCall (ou tout objet avec .call_id)
+            drop_id: drop_event_id associé (lookup get_by_drop)
+            call_id: Clé si différente de call.call_id
+            expires_at: Timestamp d'expiration (défaut: début du match + marge)
+        """
+        call_id = str(call_id or call.call_id)
+        drop_id = str(drop_id) if drop_id not in (None, "", 0, "0") else None
+        now = time.time()
+        if expires_at is None:
+            expires_at = _call_expiry(call, now)
+        with self._lock:
+            self._remember(call_id, call, drop_id, expires_at)
+            drop_id = self._calls[call_id][1]
+            over_capacity = len(self._calls) > self.max_entries
+        self._write(call_id, call, drop_id, expires_at)
+        if over_capacity or now - self._last_sweep > _SWEEP_INTERVAL_SECONDS:
+            self.evict_expired()
+
+    def link_drop(self, drop_id: Any, call_id: str) -> None:
+        """Associe un drop_event_id à un call déjà stocké"""
+        if drop_id in (None, "", 0, "0"):
+            return
+        with self._lock:
+            entry = self._calls.get(call_id)
+            if entry is None or entry[1] == str(drop_id):
+                return
+            self._remember(call_id, entry[0], str(drop_id), entry[2])
+            call, drop, expires_at = self._calls[call_id]
+        self._write(call_id, call, drop, expires_at)
+
+    def get(self, call_id: Any, default: Any = None) -> Any:
+        entry = self._calls.get(str(call_id))
+        if entry is None or entry[2] <= time.time():
+            return default
+        return entry[0]
+
+    def get_by_drop(self, drop_id: Any, default: Any = None) -> Any:
+        call_id = self._by_drop.get(str(drop_id))
+        return self.get(call_id, default) if call_id is not None else default
+
+    def call_id_for_drop(self, drop_id: Any) -> Optional[str]:
+        return self._by_drop.get(str(drop_id))
+
+    def remove(self, call_id: Any) -> None:
+        with self._lock:
+            self._forget(str(call_id))
+        self._delete_rows([str(call_id)])
+
+    def __contains__(self, call_id: Any) -> bool:
+        return self.get(call_id) is not None
+
+    def __getitem__(self, call_id: Any) -> Any:
+        call = self.get(call_id)
+        if call is None:
+            raise KeyError(call_id)
+        return call
+
+    def __setitem__(self, call_id: Any, call: Any) -> None:
+        self.put(call, call_id=call_id)
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._calls),
+            "drops_indexed": len(self._by_drop),
+            "max_entries": self.max_entries,
+            "persistent": self._conn is not None,
+        }
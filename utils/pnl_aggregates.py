@@ -0,0 +1,280 @@
+"""
+P&L quotidien matérialisé (table user_daily_pnl)
+Une ligne par (user_id, jour, bet_type): bets, stake, profit, wins, losses,
+positive, negative - maintenue de façon incrémentale via les mapper events
+SQLAlchemy sur UserBet (création, confirmation/correction, suppression),
+dans la même transaction que l'écriture du bet.
+
+- Dashboards / calendrier: lisent O(jours) lignes au lieu de O(bets)
+- Écritures hors ORM (query().delete(), UPDATE SQL brut): appeler
+  clear_user() ou rebuild() ensuite
+
+Backfill:
+    python -m utils.pnl_aggregates backfill [user_id]
+"""
+import logging
+import sys
+from datetime import date
+from typing import Dict, List, Optional
+
+from sqlalchemy import and_, case, delete, event, func, insert as sa_insert, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+from database import SessionLocal, engine
+from models.bet import UserBet, UserDailyPnL
+
+logger = logging.getLogger(__name__)
+
+_INSERTS = {"sqlite": sqlite_insert, "postgresql": pg_insert}
+_KEY = ("user_id", "day", "bet_type")
+COUNTERS = ("bets", "stake", "profit", "wins", "losses", "positive", "negative")
+# Champs de UserBet qui changent la contribution d'un bet
+_TRACKED = ("user_id", "bet_date", "bet_type", "total_stake", "expected_profit", "actual_profit")
+SETTLED_TYPES = ("middle", "good_ev")
+
+
+def bet_contribution(bet_type: Optional[str], total_stake, expected_profit, actual_profit) -> Dict[str, float]:
+    """
+    Contribution d'un bet aux compteurs (mêmes règles que calculate_win_rate)
+    - arbitrage: toujours un win (profit garanti)
+    - middle / good_ev: win si actual > 0, loss si actual < 0, push (0) et pending ignorés
+    - autres types: win si actual > 0, loss sinon, pending ignorés
+    """
+    bet_type = bet_type or 'arbitrage'
+    profit = actual_profit if actual_profit is not None else (expected_profit or 0.0)
+    wins = losses = 0
+    if bet_type == 'arbitrage':
+        wins = 1
+    elif actual_profit is not None:
+        if actual_profit > 0:
+            wins = 1
+        elif actual_profit < 0 or bet_type not in SETTLED_TYPES:
+            losses = 1
+    return {
+        "bets": 1,
+        "stake": float(total_stake or 0.0),
+        "profit": float(profit),
+        "wins": wins,
+        "losses": losses,
+        "positive": int(profit > 0),
+        "negative": int(profit < 0),
+    }
+
+
+def _apply(connection, user_id, day, bet_type, delta: Dict[str, float]) -> None:
+    """Ajoute delta (positif ou négatif) à la ligne (user_id, day, bet_type)"""
+    if user_id is None or day is None:
+        return
+    table = UserDailyPnL.__table__
+    key = {"user_id": user_id, "day": day, "bet_type": bet_type or 'arbitrage'}
+    where = and_(*(table.c[k] == v for k, v in key.items()))
+
+    insert = _INSERTS.get(connection.dialect.name)
+    if insert is not None:
+        stmt = insert(table).values(**key, **delta)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c[k] for k in _KEY],
+            set_={c: table.c[c] + stmt.excluded[c] for c in COUNTERS},
+        )
+        connection.execute(stmt)
+    else:
+        result = connection.execute(update(table).where(where).values({c: table.c[c] + delta[c] for c in COUNTERS}))
+        if result.rowcount == 0:
+            connection.execute(sa_insert(table).values(**key, **delta))
+
+    if delta["bets"] < 0:
+        connection.execute(delete(table).where(where, table.c.bets <= 0))
+
+
+def _negate(delta: Dict[str, float]) -> Dict[str, float]:
+    return {k: -v for k, v in delta.items()}
+
+
+def _old_values(target) -> Dict:
+    """Valeurs avant le flush en cours (historique des attributs)"""
+    values = {}
+    for attr in _TRACKED:
+        hist = get_history(target, attr)
+        values[attr] = hist.deleted[0] if hist.deleted else getattr(target, attr)
+    return values
+
+
+def _contribution_of(values: Dict) -> Dict[str, float]:
+    return bet_contribution(values["bet_type"], values["total_stake"], values["expected_profit"], values["actual_profit"])
+
+
+def _on_bet_inserted(mapper, connection, target):
+    _apply(connection, target.user_id, target.bet_date, target.bet_type,
+           bet_contribution(target.bet_type, target.total_stake, target.expected_profit, target.actual_profit))
+
+
+def _on_bet_updated(mapper, connection, target):
+    if not any(get_history(target, attr).has_changes() for attr in _TRACKED):
+        return
+    old = _old_values(target)
+    new = {attr: getattr(target, attr) for attr in _TRACKED}
+    old_key = (old["user_id"], old["bet_date"], old["bet_type"] or 'arbitrage')
+    new_key = (new["user_id"], new["bet_date"], new["bet_type"] or 'arbitrage')
+    if old_key == new_key:
+        # Cas courant (confirmation / correction du profit): une seule écriture
+        before, after = _contribution_of(old), _contribution_of(new)
+        _apply(connection, *new_key, {c: after[c] - before[c] for c in COUNTERS})
+        return
+    _apply(connection, *old_key, _negate(_contribution_of(old)))
+    _apply(connection, *new_key, _contribution_of(new))
+
+
+def _on_bet_deleted(mapper, connection, target):
+    old = _old_values(target)
+    _apply(connection, old["user_id"], old["bet_date"], old["bet_type"], _negate(_contribution_of(old)))
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    """Rien à faire: le listener n'existe que pour active_history"""
+
+
+# active_history: l'ancienne valeur est chargée même si l'attribut est assigné
+# sans avoir été lu (instance expirée par un commit), sinon delta faux
+for _attr in _TRACKED:
+    event.listen(getattr(UserBet, _attr), "set", _load_old_value, active_history=True)
+
+event.listen(UserBet, "after_insert", _on_bet_inserted)
+event.listen(UserBet, "after_update", _on_bet_updated)
+event.listen(UserBet, "after_delete", _on_bet_deleted)
+
+
+# ===== Écritures hors ORM =====
+
+def clear_user(db: Session, user_id: int) -> None:
+    """À appeler avec un db.query(UserBet)...delete() en masse (même transaction)"""
+    db.execute(delete(UserDailyPnL.__table__).where(UserDailyPnL.__table__.c.user_id == user_id))
+
+
+def rebuild(db: Session, user_id: Optional[int] = None) -> int:
+    """
+    Recalcule les agrégats depuis user_bets (un GROUP BY SQL)
+
+    Args:
+        db: Session (le commit reste à l'appelant)
+        user_id: Un seul utilisateur (défaut: tous)
+
+    Returns:
+        Nombre de lignes d'agrégat écrites
+    """
+    bet_type = func.coalesce(UserBet.bet_type, 'arbitrage')
+    profit = func.coalesce(UserBet.actual_profit, UserBet.expected_profit, 0.0)
+    wins = case(
+        (bet_type == 'arbitrage', 1),
+        (UserBet.actual_profit > 0, 1),
+        else_=0,
+    )
+    losses = case(
+        (bet_type == 'arbitrage', 0),
+        (UserBet.actual_profit == None, 0),  # noqa: E711
+        (UserBet.actual_profit < 0, 1),
+        (and_(UserBet.actual_profit == 0, bet_type.notin_(SETTLED_TYPES)), 1),
+        else_=0,
+    )
+    query = (
+        select(
+            UserBet.user_id,
+            UserBet.bet_date.label("day"),
+            bet_type.label("bet_type"),
+            func.count(UserBet.id).label("bets"),
+            func.coalesce(func.sum(UserBet.total_stake), 0.0).label("stake"),
+            func.coalesce(func.sum(profit), 0.0).label("profit"),
+            func.sum(wins).label("wins"),
+            func.sum(losses).label("losses"),
+            func.sum(case((profit > 0, 1), else_=0)).label("positive"),
+            func.sum(case((profit < 0, 1), else_=0)).label("negative"),
+        )
+        .where(UserBet.bet_date != None)  # noqa: E711
+        .group_by(UserBet.user_id, UserBet.bet_date, bet_type)
+    )
+    table = UserDailyPnL.__table__
+    clear = delete(table)
+    if user_id is not None:
+        query = query.where(UserBet.user_id == user_id)
+        clear = clear.where(table.c.user_id == user_id)
+
+    rows = [dict(r._mapping) for r in db.execute(query)]
+    db.execute(clear)
+    if rows:
+        db.execute(sa_insert(table), rows)
+    return len(rows)
+
+
+# ===== Lecture =====
+
+def _empty() -> Dict[str, float]:
+    return {c: 0 for c in COUNTERS}
+
+
+def _filtered(query, user_id: int, start: Optional[date], end: Optional[date]):
+    query = query.filter(UserDailyPnL.user_id == user_id)
+    if start is not None:
+        query = query.filter(UserDailyPnL.day >= start)
+    if end is not None:
+        query = query.filter(UserDailyPnL.day <= end)
+    return query
+
+
+def totals_by_type(db: Session, user_id: int, start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, Dict[str, float]]:
+    """{bet_type: {bets, stake, profit, wins, losses, positive, negative}} sur [start, end]"""
+    columns = [func.sum(getattr(UserDailyPnL, c)) for c in COUNTERS]
+    query = _filtered(db.query(UserDailyPnL.bet_type, *columns), user_id, start, end).group_by(UserDailyPnL.bet_type)
+    result = {}
+    for row in query:
+        result[row[0]] = {c: (row[i + 1] or 0) for i, c in enumerate(COUNTERS)}
+    return result
+
+
+def totals(db: Session, user_id: int, start: Optional[date] = None, end: Optional[date] = None) -> Dict[str, float]:
+    """Compteurs cumulés tous types confondus sur [start, end]"""
+    columns = [func.sum(getattr(UserDailyPnL, c)) for c in COUNTERS]
+    row = _filtered(db.query(*columns), user_id, start, end).first()
+    return {c: ((row[i] if row else None) or 0) for i, c in enumerate(COUNTERS)}
+
+
+def merge(per_type: Dict[str, Dict[str, float]]) -> Dict[str, float]:
+    """Somme des compteurs de totals_by_type()"""
+    merged = _empty()
+    for counters in per_type.values():
+        for c in COUNTERS:
+            merged[c] += counters[c]
+    return merged
+
+
+def daily_rows(db: Session, user_id: int, start: date, end: date) -> List[UserDailyPnL]:
+    """Lignes d'agrégat (un jour x un type) sur [start, end], triées par jour"""
+    return _filtered(db.query(UserDailyPnL), user_id, start, end).order_by(UserDailyPnL.day).all()
+
+
+def win_rate(counters: Dict[str, float]) -> float:
+    settled = counters["wins"] + counters["losses"]
+    return (counters["wins"] / settled * 100) if settled > 0 else 0.0
+
+
+def main(argv: List[str]) -> None:
+    if not argv or argv[0] != "backfill":
+        print("Usage: python -m utils.pnl_aggregates backfill [user_id]")
+        return
+    user_id = int(argv[1]) if len(argv) > 1 else None
+    UserDailyPnL.__table__.create(engine, checkfirst=True)
+    db = SessionLocal()
+    try:
+        count = rebuild(db, user_id)
+        db.commit()
+        print(f"✅ user_daily_pnl rebuilt: {count} rows" + (f" (user {user_id})" if user_id else ""))
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
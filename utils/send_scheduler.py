@@ -0,0 +1,289 @@
+"""
+Ordonnanceur d'envoi Telegram partagé par tous les chemins d'alerte
+- Token bucket global (~30 msg/s, limite Bot API)
+- Token bucket par chat (~1 msg/s par conversation)
+- Files prioritaires: premium avant free, arbitrage > middle > good ev > parlays
+- TelegramRetryAfter: pause globale pendant retry_after puis renvoi
+- Métriques: profondeur de file, latence d'envoi (p50/p95/p99), retries
+
+Usage:
+    scheduler = SendScheduler(bot)
+    msg = await scheduler.send_message(chat_id, text, lane=LANE_ARBITRAGE, premium=True, parse_mode=ParseMode.HTML)
+"""
+import asyncio
+import itertools
+import logging
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from aiogram.exceptions import TelegramNetworkError, TelegramRetryAfter, TelegramServerError
+
+from utils.metrics import percentiles
+
+logger = logging.getLogger(__name__)
+
+# Lanes (plus petit = plus prioritaire)
+LANE_ARBITRAGE = 0
+LANE_MIDDLE = 1
+LANE_GOOD_EV = 2
+LANE_PARLAY = 3
+LANE_DEFAULT = 4
+
+LANE_NAMES = {
+    LANE_ARBITRAGE: "arbitrage",
+    LANE_MIDDLE: "middle",
+    LANE_GOOD_EV: "good_ev",
+    LANE_PARLAY: "parlay",
+    LANE_DEFAULT: "default",
+}
+
+# Limites Bot API
+GLOBAL_RATE = 30.0     # messages/seconde tous chats confondus
+PER_CHAT_RATE = 1.0    # messages/seconde dans un même chat
+MAX_RETRIES = 3
+_CHAT_BUCKET_IDLE_SECONDS = 60
+_LATENCY_SAMPLES = 2000
+
+
+class TokenBucket:
+    """Token bucket simple (boucle asyncio unique, pas de verrou nécessaire)"""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated", "paused_until")
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Secondes à attendre avant qu'un jeton soit disponible (0 = dispo)"""
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def pause(self, seconds: float) -> None:
+        """Bloque le bucket (flood control) et le vide"""
+        now = time.monotonic()
+        self.paused_until = max(self.paused_until, now + seconds)
+        self.tokens = 0.0
+        self.updated = max(now, self.paused_until)
+
+    async def acquire(self) -> None:
+        while True:
+            wait = self.wait_time(time.monotonic())
+            if wait <= 0:
+                self.tokens -= 1
+                return
+            await asyncio.sleep(wait)
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.paused_until
+
+
+class _SendJob:
+    __slots__ = ("chat_id", "text", "kwargs", "lane", "premium", "future", "enqueued_at", "attempts")
+
+    def __init__(self, chat_id, text, kwargs, lane, premium, future):
+        self.chat_id = chat_id
+        self.text = text
+        self.kwargs = kwargs
+        self.lane = lane
+        self.premium = premium
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class SendScheduler:
+    """File d'envoi prioritaire avec rate limiting global + par chat"""
+
+    def __init__(
+        self,
+        bot,
+        global_rate: float = GLOBAL_RATE,
+        per_chat_rate: float = PER_CHAT_RATE,
+        workers: int = 8,
+        max_retries: int = MAX_RETRIES,
+    ):
+        self.bot = bot
+        self.per_chat_rate = per_chat_rate
+        self.max_retries = max_retries
+        self.n_workers = workers
+
+        # Capacité 1: envoi lissé, pas de rafale qui dépasserait la fenêtre d'1s côté Telegram
+        self._global = TokenBucket(global_rate, capacity=1)
+        self._chats: Dict[Any, TokenBucket] = {}
+        self._queue: Optional[asyncio.PriorityQueue] = None
+        self._dispatch_lock: Optional[asyncio.Lock] = None
+        self._workers: list = []
+        self._seq = itertools.count()
+        self._last_chat_sweep = time.monotonic()
+
+        # Latences (enqueue -> envoyé) et durée de l'appel API seul, en ms
+        self._latencies = deque(maxlen=_LATENCY_SAMPLES)
+        self._api_times = deque(maxlen=_LATENCY_SAMPLES)
+        self.stats = {
+            "submitted": 0,
+            "sent": 0,
+            "failed": 0,
+            "retried": 0,
+            "retry_after": 0,
+            "max_queue_depth": 0,
+        }
+        self._sent_by_lane = {name: 0 for name in LANE_NAMES.values()}
+
+    # ---------- Cycle de vie ----------
+
+    def start(self) -> None:
+        """Démarre les workers sur la boucle courante (appelé automatiquement)"""
+        if self._workers:
+            return
+        self._queue = asyncio.PriorityQueue()
+        self._dispatch_lock = asyncio.Lock()
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"send-scheduler-{i}")
+            for i in range(self.n_workers)
+        ]
+        logger.info(f"📤 SendScheduler started ({self.n_workers} workers, {self._global.rate:.0f} msg/s)")
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    # ---------- API publique ----------
+
+    def submit(self, chat_id, text: str, lane: int = LANE_DEFAULT, premium: bool = False, **kwargs) -> asyncio.Future:
+        """
+        Met un message en file
+
+        Args:
+            chat_id: Destinataire
+            text: Texte du message
+            lane: LANE_* (priorité du type d'alerte)
+            premium: Les utilisateurs premium passent avant les free
+            **kwargs: Paramètres transmis à bot.send_message (parse_mode, reply_markup...)
+
+        Returns:
+            Future résolue avec le Message envoyé (ou l'exception finale)
+        """
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        job = _SendJob(chat_id, text, kwargs, lane, premium, future)
+        self._enqueue(job)
+        self.stats["submitted"] += 1
+        return future
+
+    async def send_message(self, chat_id, text: str, lane: int = LANE_DEFAULT, premium: bool = False, **kwargs):
+        """Équivalent de bot.send_message, en passant par la file"""
+        return await self.submit(chat_id, text, lane=lane, premium=premium, **kwargs)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot pour /health ou commandes admin"""
+        return {
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "workers": len(self._workers),
+            "chat_buckets": len(self._chats),
+            "global_paused_for": round(max(0.0, self._global.paused_until - time.monotonic()), 2),
+            **self.stats,
+            "sent_by_lane": dict(self._sent_by_lane),
+            "latency_ms": percentiles(self._latencies),
+            "api_ms": percentiles(self._api_times),
+        }
+
+    # ---------- Interne ----------
+
+    def _enqueue(self, job: _SendJob) -> None:
+        priority = (0 if job.premium else 1, job.lane)
+        self._queue.put_nowait((priority, next(self._seq), job))
+        depth = self._queue.qsize()
+        if depth > self.stats["max_queue_depth"]:
+            self.stats["max_queue_depth"] = depth
+
+    def _chat_bucket(self, chat_id) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            bucket = self._chats[chat_id] = TokenBucket(self.per_chat_rate, capacity=1)
+        now = time.monotonic()
+        if now - self._last_chat_sweep > _CHAT_BUCKET_IDLE_SECONDS:
+            self._last_chat_sweep = now
+            for cid in [c for c, b in self._chats.items() if c != chat_id and b.idle(now)]:
+                del self._chats[cid]
+        return bucket
+
+    async def _worker(self) -> None:
+        while True:
+            # Jeton global pris AVANT de dépiler: la priorité est évaluée au moment
+            # de l'envoi, et le verrou (FIFO) évite qu'un worker soit affamé
+            async with self._dispatch_lock:
+                await self._global.acquire()
+                _, _, job = await self._queue.get()
+            try:
+                await self._deliver(job)
+            except asyncio.CancelledError:
+                if not job.future.done():
+                    job.future.cancel()
+                raise
+            except Exception as e:
+                logger.error(f"SendScheduler worker error for chat {job.chat_id}: {e}")
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    async def _deliver(self, job: _SendJob) -> None:
+        if job.future.cancelled():
+            return
+        await self._chat_bucket(job.chat_id).acquire()
+
+        job.attempts += 1
+        started = time.monotonic()
+        try:
+            message = await self.bot.send_message(job.chat_id, job.text, **job.kwargs)
+        except TelegramRetryAfter as e:
+            self.stats["retry_after"] += 1
+            # Flood control = limite du bot entier: tout le monde attend
+            self._global.pause(e.retry_after)
+            logger.warning(f"⏳ Telegram flood control: pausing sends for {e.retry_after}s (chat {job.chat_id})")
+            self._retry_or_fail(job, e)
+            return
+        except (TelegramNetworkError, TelegramServerError) as e:
+            self._chat_bucket(job.chat_id).pause(min(2 ** job.attempts, 10))
+            self._retry_or_fail(job, e)
+            return
+        except Exception as e:
+            # Forbidden (bot bloqué), BadRequest...: pas de retry
+            self.stats["failed"] += 1
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+
+        done = time.monotonic()
+        self._api_times.append((done - started) * 1000)
+        self._latencies.append((done - job.enqueued_at) * 1000)
+        self.stats["sent"] += 1
+        self._sent_by_lane[LANE_NAMES.get(job.lane, "default")] += 1
+        if not job.future.done():
+            job.future.set_result(message)
+
+    def _retry_or_fail(self, job: _SendJob, error: Exception) -> None:
+        if job.attempts <= self.max_retries and not job.future.done():
+            self.stats["retried"] += 1
+            self._enqueue(job)
+            return
+        self.stats["failed"] += 1
+        logger.error(f"❌ Giving up sending to {job.chat_id} after {job.attempts} attempts: {error}")
+        if not job.future.done():
+            job.future.set_exception(error)
@@ -0,0 +1,403 @@
+"""
+Subscriber index for alert fan-out
+Keeps every user's alert filters precompiled in memory (tier, % ranges,
+casinos, sports, match-today-only) so the eligible recipients of a drop are
+computed with set intersections instead of looping over all User rows.
+
+Kept in sync with the DB through utils.user_prefs (records built at flush
+time, published only when the session commits), plus a periodic full
+reload to catch raw SQL updates.
+"""
+import heapq
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from typing import Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from core.tiers import TierManager, TierLevel
+from database import SessionLocal
+from models.user import User
+
+logger = logging.getLogger(__name__)
+
+# Full reload interval (seconds) - catches raw "UPDATE users" statements
+INDEX_MAX_AGE_SECONDS = 300
+
+# Partial matches between alert sport/league and the sport filter (e.g. "nba" → "basketball")
+SPORT_MAPPINGS = {
+    'nba': 'basketball', 'ncaa basketball': 'basketball', 'ncaab': 'basketball',
+    'nfl': 'football', 'ncaa football': 'football', 'ncaaf': 'football',
+    'nhl': 'hockey', 'ice hockey': 'hockey',
+    'mlb': 'baseball',
+    'mls': 'soccer', 'la liga': 'soccer', 'premier league': 'soccer', 'serie a': 'soccer', 'bundesliga': 'soccer', 'ligue 1': 'soccer',
+    'ufc': 'mma', 'mixed martial arts': 'mma',
+    'atp': 'tennis', 'wta': 'tennis',
+}
+
+
+# ===== Filter helpers (single source of truth for casino / sport semantics) =====
+
+def parse_filter_list(raw: Optional[str]) -> Optional[FrozenSet[str]]:
+    """
+    Parse a selected_casinos / selected_sports JSON column.
+    Returns None when the filter allows everything (null, empty list or unreadable).
+    """
+    if not raw:
+        return None
+    try:
+        selected = json.loads(raw)
+        if not selected:
+            return None
+        return frozenset(s.lower().strip() for s in selected)
+    except Exception as e:
+        logger.warning(f"⚠️ Filter parse error: {e}")
+        return None
+
+
+def sport_filter_keys(sport: str) -> Set[str]:
+    """Filter values that accept this alert sport/league (exact + mapped)"""
+    sport_lower = (sport or "").lower().strip()
+    keys = {sport_lower}
+    for key, mapped in SPORT_MAPPINGS.items():
+        if key in sport_lower:
+            keys.add(mapped)
+    return keys
+
+
+def casinos_allowed(selected: Optional[FrozenSet[str]], casinos: list) -> bool:
+    """Parsed casino filter (None = all) vs the casinos of an alert"""
+    if selected is None:
+        return True
+    if any(c.lower().strip() in selected for c in casinos if c):
+        return True
+    logger.debug(f"🚫 Casino filter blocked: casinos={casinos}, selected={sorted(selected)}")
+    return False
+
+
+def sports_allowed(selected: Optional[FrozenSet[str]], sport: str) -> bool:
+    """Parsed sport filter (None = all) vs the sport/league of an alert"""
+    if selected is None:
+        return True
+    if sport_filter_keys(sport) & selected:
+        return True
+    logger.debug(f"🚫 Sport filter blocked: sport={sport}, selected={sorted(selected)}")
+    return False
+
+
+def user_passes_casino_filter(user, casinos: list) -> bool:
+    """
+    Check if user's selected_casinos filter allows these casinos.
+    Returns True if user should receive alert, False if filtered out.
+    If user has no filter (null/empty), allow all casinos.
+    """
+    return casinos_allowed(parse_filter_list(user.selected_casinos), casinos)
+
+
+def user_passes_sport_filter(user, sport: str) -> bool:
+    """
+    Check if user's selected_sports filter allows this sport.
+    Returns True if user should receive alert, False if filtered out.
+    If user has no filter (null/empty), allow all sports.
+    """
+    return sports_allowed(parse_filter_list(user.selected_sports), sport)
+
+
+def core_tier_for_user(user) -> TierLevel:
+    """User's effective core tier (PREMIUM downgraded to FREE once the subscription expired)"""
+    try:
+        name = user.tier.name.lower()
+    except Exception:
+        return TierLevel.FREE
+    if name != 'premium':
+        return TierLevel.FREE
+    return TierLevel.PREMIUM if user.subscription_active else TierLevel.FREE
+
+
+def _naive(dt: Optional[datetime]) -> Optional[datetime]:
+    return dt.replace(tzinfo=None) if dt is not None else None
+
+
+def _match_date(commence_time_iso: Optional[str]) -> Optional[date]:
+    if not commence_time_iso:
+        return None
+    try:
+        return datetime.fromisoformat(commence_time_iso.replace('Z', '+00:00')).date()
+    except Exception:
+        return None  # If can't parse, let it through
+
+
+# ===== Index =====
+
+@dataclass
+class SubscriberRecord:
+    """Per-user snapshot of everything the fan-out needs"""
+    telegram_id: int
+    premium: bool = False
+    subscription_end: Optional[datetime] = None
+    active: bool = True
+    arb_range: Tuple[float, float] = (0.5, 100.0)
+    casinos: Optional[FrozenSet[str]] = None
+    sports: Optional[FrozenSet[str]] = None
+    match_today_only: bool = False
+    alerts_today: int = 0
+    last_alert_date: Optional[date] = None
+    last_alert_at: Optional[datetime] = None
+
+    @classmethod
+    def from_user(cls, user) -> "SubscriberRecord":
+        try:
+            premium = user.tier.name.lower() == 'premium'
+        except Exception:
+            premium = False
+        return cls(
+            telegram_id=user.telegram_id,
+            premium=premium,
+            subscription_end=_naive(user.subscription_end),
+            # NULL notifications_enabled counts as enabled
+            active=bool(user.is_active) and not user.is_banned and user.notifications_enabled is not False,
+            arb_range=(user.min_arb_percent or 0.5, user.max_arb_percent or 100.0),
+            casinos=parse_filter_list(user.selected_casinos),
+            sports=parse_filter_list(user.selected_sports),
+            match_today_only=bool(getattr(user, 'match_today_only', False)),
+            alerts_today=user.alerts_today or 0,
+            last_alert_date=user.last_alert_date,
+            last_alert_at=_naive(user.last_alert_at),
+        )
+
+    def premium_at(self, now: datetime) -> bool:
+        # Lifetime PREMIUM: no subscription_end → always active
+        return self.premium and (self.subscription_end is None or now < self.subscription_end)
+
+
+@dataclass
+class Eligibility:
+    """Recipients of one drop"""
+    immediate: List[Tuple[int, TierLevel]] = field(default_factory=list)
+    delayed: List[int] = field(default_factory=list)
+    candidates: int = 0
+    elapsed_ms: float = 0.0
+
+
+class SubscriberIndex:
+    """
+    In-memory subscriber index keyed by tier, casino and sport.
+
+    Set-based filters (tier gate, % range, casinos, sports, match today) are
+    resolved with set algebra; only the stateful per-user checks (daily limit,
+    FREE spacing and first-alert delay) run on the remaining candidates.
+    """
+
+    def __init__(self, max_age: float = INDEX_MAX_AGE_SECONDS):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._loaded_at: Optional[float] = None
+        self._reset()
+
+    def _reset(self):
+        self.records: Dict[int, SubscriberRecord] = {}
+        self._active: Set[int] = set()
+        self._premium: Set[int] = set()
+        self._premium_expiry: List[Tuple[datetime, int]] = []  # heap, lazily cleaned
+        self._by_arb_range: Dict[Tuple[float, float], Set[int]] = {}
+        self._casino_any: Set[int] = set()
+        self._by_casino: Dict[str, Set[int]] = {}
+        self._sport_any: Set[int] = set()
+        self._by_sport: Dict[str, Set[int]] = {}
+        self._today_only: Set[int] = set()
+
+    # ---------- Maintenance ----------
+
+    def load(self, users: Optional[Iterable] = None) -> int:
+        """(Re)build the whole index from User rows (or any user-like objects)"""
+        db = None
+        if users is None:
+            db = SessionLocal()
+            users = db.query(User).all()
+        try:
+            with self._lock:
+                self._reset()
+                for user in users:
+                    self._add(SubscriberRecord.from_user(user))
+                self._loaded_at = time.monotonic()
+                count = len(self.records)
+        finally:
+            if db is not None:
+                db.close()
+        logger.info(f"📇 Subscriber index loaded: {count} users")
+        return count
+
+    def mark_stale(self) -> None:
+        """Force a full reload on next use (after raw SQL updates on users)"""
+        with self._lock:
+            self._loaded_at = None
+
+    def ensure_fresh(self) -> None:
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_age:
+            self.load()
+
+    def upsert(self, user) -> None:
+        """Refresh one user from a User row"""
+        self.publish([SubscriberRecord.from_user(user)])
+
+    def publish(self, records: List[SubscriberRecord]) -> None:
+        """Replace users' records (committed ORM writes, see utils.user_prefs)"""
+        if self._loaded_at is None:
+            # Not loaded yet (or stale): the next full load picks them up
+            return
+        with self._lock:
+            for record in records:
+                self._remove(record.telegram_id)
+                self._add(record)
+
+    def remove(self, telegram_id: int) -> None:
+        with self._lock:
+            self._remove(telegram_id)
+
+    def _add(self, rec: SubscriberRecord) -> None:
+        tid = rec.telegram_id
+        self.records[tid] = rec
+        if rec.active:
+            self._active.add(tid)
+        if rec.premium:
+            self._premium.add(tid)
+            if rec.subscription_end is not None:
+                heapq.heappush(self._premium_expiry, (rec.subscription_end, tid))
+        self._by_arb_range.setdefault(rec.arb_range, set()).add(tid)
+        if rec.casinos is None:
+            self._casino_any.add(tid)
+        else:
+            for c in rec.casinos:
+                self._by_casino.setdefault(c, set()).add(tid)
+        if rec.sports is None:
+            self._sport_any.add(tid)
+        else:
+            for s in rec.sports:
+                self._by_sport.setdefault(s, set()).add(tid)
+        if rec.match_today_only:
+            self._today_only.add(tid)
+
+    def _remove(self, tid: int) -> None:
+        rec = self.records.pop(tid, None)
+        if rec is None:
+            return
+        self._active.discard(tid)
+        self._premium.discard(tid)  # expiry heap entry becomes stale, skipped on pop
+        bucket = self._by_arb_range.get(rec.arb_range)
+        if bucket is not None:
+            bucket.discard(tid)
+            if not bucket:
+                del self._by_arb_range[rec.arb_range]
+        self._casino_any.discard(tid)
+        for c in rec.casinos or ():
+            self._by_casino.get(c, set()).discard(tid)
+        self._sport_any.discard(tid)
+        for s in rec.sports or ():
+            self._by_sport.get(s, set()).discard(tid)
+        self._today_only.discard(tid)
+
+    def _expire_premiums(self, now: datetime) -> None:
+        """Move PREMIUM users whose subscription ended to the FREE side"""
+        heap = self._premium_expiry
+        while heap and heap[0][0] <= now:
+            end, tid = heapq.heappop(heap)
+            rec = self.records.get(tid)
+            if rec is not None and rec.premium and rec.subscription_end == end:
+                self._premium.discard(tid)
+
+    # ---------- Queries ----------
+
+    def eligible_for_arbitrage(
+        self,
+        arb_percentage: float,
+        casinos: List[str],
+        sport: str,
+        commence_time: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> Eligibility:
+        """
+        Recipients of an arbitrage drop, same rules as the legacy per-user loop:
+        tier gate, user % range, casino + sport filters, match today only,
+        daily alert limit, FREE spacing and FREE first-alert delay.
+        """
+        started = time.perf_counter()
+        now = now or datetime.now()
+        self.ensure_fresh()
+        result = Eligibility()
+
+        with self._lock:
+            self._expire_premiums(now)
+            premium = self._active & self._premium
+            free = self._active - premium
+
+            pool: Set[int] = set()
+            if TierManager.can_view_alert(TierLevel.PREMIUM, arb_percentage):
+                pool |= premium
+            if TierManager.can_view_alert(TierLevel.FREE, arb_percentage):
+                pool |= free
+
+            in_range: Set[int] = set()
+            for (lo, hi), ids in self._by_arb_range.items():
+                if lo <= arb_percentage <= hi:
+                    in_range |= ids
+            pool &= in_range
+
+            casino_keys = {c.lower().strip() for c in casinos if c}
+            if casino_keys and pool:
+                allowed = set(self._casino_any)
+                for c in casino_keys:
+                    allowed |= self._by_casino.get(c, set())
+                pool &= allowed
+
+            if pool:
+                allowed = set(self._sport_any)
+                for s in sport_filter_keys(sport):
+                    allowed |= self._by_sport.get(s, set())
+                pool &= allowed
+
+            match_day = _match_date(commence_time)
+            if match_day is not None and match_day != date.today():
+                pool -= self._today_only
+
+            result.candidates = len(pool)
+            records = [self.records[tid] for tid in pool]
+
+        today = date.today()
+        for rec in records:
+            tier = TierLevel.PREMIUM if rec.premium_at(now) else TierLevel.FREE
+            features = TierManager.get_features(tier)
+            # Daily alert limit
+            max_alerts = features.get('max_alerts_per_day', 5)
+            if rec.last_alert_date == today and rec.alerts_today >= max_alerts:
+                continue
+            if tier == TierLevel.FREE:
+                # Spacing between calls
+                min_spacing = features.get('min_spacing_minutes', 120)
+                if rec.last_alert_at and now - rec.last_alert_at < timedelta(minutes=min_spacing):
+                    continue
+                # Delay for FREE tier ONLY for first alert
+                if rec.last_alert_at is None and TierManager.get_alert_delay(tier) > 0:
+                    result.delayed.append(rec.telegram_id)
+                    continue
+            result.immediate.append((rec.telegram_id, tier))
+
+        result.elapsed_ms = (time.perf_counter() - started) * 1000
+        return result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "users": len(self.records),
+                "active": len(self._active),
+                "premium": len(self._premium),
+                "arb_ranges": len(self._by_arb_range),
+                "casinos": len(self._by_casino),
+                "sports": len(self._by_sport),
+            }
+
+
+# Shared instance used by the fan-out
+subscriber_index = SubscriberIndex()
+
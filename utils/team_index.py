@@ -0,0 +1,241 @@
+"""
+Index de noms d'équipes pour retrouver un match dans une liste d'événements Odds API
+- Normalisation: accents, ponctuation, préfixes de club (FC, CF, SSC...), alias
+  ("LA" -> "los angeles", "Man Utd" -> "manchester united", "PSG"...)
+- Lookup exact par paire normalisée (dict), sinon candidats par tokens puis
+  trigrammes, départagés par similarité (inclusion / couverture des tokens,
+  tokens proches par Dice trigrammes ou préfixe)
+- Un index par (sport_key, liste d'événements): odds_api renvoie la même liste
+  tant que son cache EVENTS_TTL / ODDS_TTL est valide, l'index est donc
+  reconstruit une seule fois par fetch
+
+Usage:
+    index = team_index_for(sport_key, events)
+    event = index.find(team1, team2)          # ou index.find_match("A vs B")
+"""
+import re
+import threading
+import unicodedata
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+# Score minimum (0..1) pour accepter un match: chaque équipe doit atteindre ce score
+MIN_TEAM_SCORE = 0.5
+
+# Séparateurs des chaînes "Équipe A vs Équipe B" (mêmes que extract_teams_from_match)
+MATCH_SEPARATORS = (' @ ', ' vs ', ' v ', ' - ', ' at ')
+
+# Noms complets (après normalisation) -> nom Odds API normalisé
+NAME_ALIASES = {
+    'psg': 'paris saint germain',
+    'barca': 'barcelona',
+    'inter': 'inter milan',
+    'spurs': 'tottenham hotspur',
+    'wolves': 'wolverhampton wanderers',
+    'unc': 'north carolina',
+}
+
+# Tokens -> forme longue
+TOKEN_ALIASES = {
+    'la': 'los angeles',
+    'ny': 'new york',
+    'utd': 'united',
+    'man': 'manchester',
+    'intl': 'internacional',
+    'atl': 'atletico',
+}
+
+# Préfixes / suffixes de club sans valeur discriminante
+STOP_TOKENS = frozenset({
+    'fc', 'cf', 'sc', 'afc', 'ac', 'as', 'cd', 'ssc', 'us', 'rcd', 'cr', 'sl', 'sk',
+    'fk', 'bk', 'if', 'sv', 'vfb', 'vfl', 'calcio', 'club', 'the', 'de', 'del', 'and',
+})
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_team(name: Optional[str]) -> str:
+    """Nom d'équipe normalisé ("Leeds United FC" -> "leeds united")"""
+    if not name:
+        return ''
+    text = unicodedata.normalize('NFKD', str(name)).encode('ascii', 'ignore').decode('ascii')
+    text = text.lower().replace('&', ' and ').replace("'", '')
+    text = _NON_ALNUM.sub(' ', text).strip()
+    text = NAME_ALIASES.get(text, text)
+    tokens = ' '.join(TOKEN_ALIASES.get(t, t) for t in text.split()).split()
+    kept = [t for t in tokens if t not in STOP_TOKENS]
+    # "Leeds United FC" -> "leeds united", mais "Paris FC" reste "paris fc"
+    # (sinon il se confond avec tout "Paris ...")
+    return ' '.join(kept if len(kept) > 1 else tokens)
+
+
+def split_match(match_str: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """ "Lakers @ Warriors" -> ("Lakers", "Warriors"), (None, None) si non reconnu"""
+    for sep in MATCH_SEPARATORS:
+        if match_str and sep in match_str:
+            parts = match_str.split(sep)
+            if len(parts) == 2:
+                return parts[0].strip(), parts[1].strip()
+    return None, None
+
+
+# Deux tokens sont considérés comme le même mot au-dessus de ce Dice trigrammes
+TOKEN_MATCH_SCORE = 0.6
+
+
+@lru_cache(maxsize=8192)
+def trigrams(text: str) -> FrozenSet[str]:
+    padded = f"  {text} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _dice(a: str, b: str) -> float:
+    ga, gb = trigrams(a), trigrams(b)
+    return 2.0 * len(ga & gb) / (len(ga) + len(gb))
+
+
+@lru_cache(maxsize=65536)
+def _token_score(token: str, other: str) -> float:
+    if token == other:
+        return 1.0
+    # Nom tronqué (OCR / notification): "qaraba" -> "qarabag"
+    if min(len(token), len(other)) >= 4 and (other.startswith(token) or token.startswith(other)):
+        return 0.9
+    score = _dice(token, other)
+    return score if score >= TOKEN_MATCH_SCORE else 0.0
+
+
+class _Team:
+    __slots__ = ("name", "padded", "tokens", "core", "grams")
+
+    def __init__(self, raw: Optional[str]):
+        self.name = normalize_team(raw)
+        self.padded = f" {self.name} "
+        self.tokens = frozenset(self.name.split())
+        # Tokens qui comptent pour la couverture ("paris fc" -> {"paris"})
+        self.core = (self.tokens - STOP_TOKENS) or self.tokens
+        self.grams = trigrams(self.name) if self.name else frozenset()
+
+
+@lru_cache(maxsize=8192)
+def _team(raw: Optional[str]) -> _Team:
+    return _Team(raw)
+
+
+def team_similarity(a: _Team, b: _Team) -> float:
+    """
+    1.0 identique, 0.9 suite de mots contenue dans l'autre ("lakers" / "los
+    angeles lakers"), sinon produit des couvertures de tokens des deux côtés:
+    la ville commune seule ("new york rangers" / "new york islanders") ou
+    "mississippi state" / "mississippi valley state" ne suffisent pas
+    """
+    if not a.name or not b.name:
+        return 0.0
+    if a.name == b.name:
+        return 1.0
+    if a.padded in b.padded or b.padded in a.padded:
+        return 0.9
+    cover_a = sum(max(_token_score(t, o) for o in b.core) for t in a.core) / len(a.core)
+    cover_b = sum(max(_token_score(t, o) for o in a.core) for t in b.core) / len(b.core)
+    return cover_a * cover_b
+
+
+class TeamIndex:
+    """Index d'une liste d'événements ({'home_team', 'away_team', ...})"""
+
+    def __init__(self, events: Sequence[Dict]):
+        self.events = list(events or [])
+        self._teams: List[Tuple[_Team, _Team]] = []
+        self._by_pair: Dict[FrozenSet[str], int] = {}
+        self._by_token: Dict[str, set] = defaultdict(set)
+        self._by_gram: Dict[str, set] = defaultdict(set)
+
+        for i, event in enumerate(self.events):
+            home, away = _team(event.get('home_team')), _team(event.get('away_team'))
+            self._teams.append((home, away))
+            self._by_pair.setdefault(frozenset((home.name, away.name)), i)
+            for team in (home, away):
+                for token in team.tokens:
+                    self._by_token[token].add(i)
+                for gram in team.grams:
+                    self._by_gram[gram].add(i)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def find(self, team1: Optional[str], team2: Optional[str], min_score: float = MIN_TEAM_SCORE) -> Optional[Dict]:
+        """Événement opposant team1 et team2 (ordre indifférent), None si aucun assez proche"""
+        q1, q2 = _team(team1), _team(team2)
+        if not q1.name or not q2.name:
+            return None
+
+        exact = self._by_pair.get(frozenset((q1.name, q2.name)))
+        if exact is not None:
+            return self.events[exact]
+
+        best, best_score, ambiguous = None, (min_score, 0.0), False
+        for i in self._candidates(q1, q2):
+            home, away = self._teams[i]
+            score = max(
+                # Le moins bon des deux côtés d'abord, puis le total (départage)
+                (min(s1, s2), s1 + s2)
+                for s1, s2 in (
+                    (team_similarity(q1, home), team_similarity(q2, away)),
+                    (team_similarity(q1, away), team_similarity(q2, home)),
+                )
+            )
+            if score[0] < min_score:
+                continue
+            if score > best_score:
+                best, best_score, ambiguous = i, score, False
+            elif score == best_score:
+                ambiguous = True
+        # Deux matchs aussi plausibles ("Duke vs UNC" avec UNC et NC State): aucun
+        if best is None or ambiguous:
+            return None
+        return self.events[best]
+
+    def find_match(self, match_str: Optional[str], min_score: float = MIN_TEAM_SCORE) -> Optional[Dict]:
+        """Comme find() à partir d'une chaîne "A vs B" / "A @ B" """
+        team1, team2 = split_match(match_str)
+        if not team1 or not team2:
+            return None
+        return self.find(team1, team2, min_score)
+
+    def _candidates(self, q1: _Team, q2: _Team) -> set:
+        """Événements touchés par chaque équipe: tokens communs, sinon trigrammes communs"""
+        result = None
+        for q in (q1, q2):
+            hits = set().union(*(self._by_token.get(t, ()) for t in q.tokens))
+            if not hits:
+                hits = set().union(*(self._by_gram.get(g, ()) for g in q.grams))
+            result = hits if result is None else result & hits
+            if not result:
+                return set()
+        return result
+
+
+# ===== Cache par sport =====
+
+_lock = threading.Lock()
+# key -> (liste d'événements indexée, index)
+_indexes: Dict[str, Tuple[list, TeamIndex]] = {}
+
+
+def team_index_for(key: str, events: Optional[List[Dict]]) -> TeamIndex:
+    """
+    Index de la liste d'événements d'un sport (ou sport + bookmaker)
+
+    Reconstruit uniquement quand la liste change, c'est-à-dire à chaque
+    nouveau fetch du client odds_api (même objet tant qu'il est en cache).
+    """
+    events = events or []
+    with _lock:
+        cached = _indexes.get(key)
+        if cached is not None and cached[0] is events:
+            return cached[1]
+    index = TeamIndex(events)
+    with _lock:
+        _indexes[key] = (events, index)
+    return index
@@ -0,0 +1,231 @@
+"""
+In-memory user preference snapshots
+One compact, read-only UserPrefs per user (tier, % ranges, casino / sport
+filters as frozensets, bankroll, rounding, language, alert toggles) so
+callbacks and alert fan-outs read settings without a DB round trip.
+
+- Bulk loaded at startup (column-only query, no ORM objects)
+- ORM writes: snapshots built at flush time (after_insert / after_update on
+  User) are published only when the session commits, dropped on rollback.
+  The subscriber index (utils.subscriber_index) is synced from the same
+  commit path, so a rolled-back change never reaches the fan-out
+- Raw "UPDATE users": call user_prefs.mark_stale(); a periodic full reload
+  catches anything else
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session, object_session
+
+from database import SessionLocal
+from models.user import TierLevel, User
+from utils.subscriber_index import (
+    SubscriberRecord,
+    casinos_allowed,
+    parse_filter_list,
+    sports_allowed,
+    subscriber_index,
+)
+
+logger = logging.getLogger(__name__)
+
+# Full reload interval (seconds) - catches raw "UPDATE users" statements
+PREFS_MAX_AGE_SECONDS = 300
+
+_PENDING_KEY = "user_prefs_pending"
+
+# Columns copied as-is into the snapshot
+_COLUMNS = (
+    'telegram_id', 'tier', 'subscription_end', 'is_active', 'is_banned',
+    'notifications_enabled', 'enable_good_odds', 'enable_middle', 'match_today_only',
+    'language', 'default_bankroll', 'default_risk_percentage', 'stake_rounding',
+    'rounding_mode', 'total_bets',
+    'min_arb_percent', 'max_arb_percent', 'min_middle_percent', 'max_middle_percent',
+    'min_good_ev_percent', 'max_good_ev_percent',
+)
+
+
+class UserPrefs:
+    """Read-only snapshot of one user's settings (same attribute names as User)"""
+
+    __slots__ = _COLUMNS + ('casinos', 'sports', 'casino_names')
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    @classmethod
+    def from_user(cls, user) -> "UserPrefs":
+        """From a User row or a column-only result row"""
+        # Raw column values: callers keep applying their own defaults
+        values = {name: getattr(user, name, None) for name in _COLUMNS}
+        # Filters: None = everything allowed (see utils.subscriber_index)
+        values['casinos'] = parse_filter_list(user.selected_casinos)
+        values['sports'] = parse_filter_list(user.selected_sports)
+        values['casino_names'] = _names(user.selected_casinos)
+        return cls(**values)
+
+    @property
+    def subscription_active(self) -> bool:
+        """Same rules as User.subscription_active"""
+        if self.tier == TierLevel.FREE:
+            return True
+        if not self.subscription_end:
+            # Lifetime PREMIUM
+            return self.tier == TierLevel.PREMIUM
+        return datetime.now() < self.subscription_end.replace(tzinfo=None)
+
+    @property
+    def receives_alerts(self) -> bool:
+        """Not banned and notifications on (NULL counts as off, like the SQL filters)"""
+        return self.is_banned is False and self.notifications_enabled is True
+
+    def percent_range(self, bet_type: str) -> Tuple[float, float]:
+        """User's min/max % for a bet type"""
+        if bet_type == 'arbitrage':
+            return self.min_arb_percent or 0.5, self.max_arb_percent or 100.0
+        if bet_type == 'middle':
+            return self.min_middle_percent or 0.5, self.max_middle_percent or 100.0
+        if bet_type == 'good_ev':
+            return self.min_good_ev_percent or 0.5, self.max_good_ev_percent or 100.0
+        return 0.5, 100.0
+
+    def passes_casino_filter(self, casinos: list) -> bool:
+        return casinos_allowed(self.casinos, casinos)
+
+    def passes_sport_filter(self, sport: str) -> bool:
+        return sports_allowed(self.sports, sport)
+
+    def __repr__(self) -> str:
+        return f"<UserPrefs(telegram_id={self.telegram_id}, tier={getattr(self.tier, 'value', self.tier)})>"
+
+
+def _names(raw: Optional[str]) -> Tuple[str, ...]:
+    """selected_casinos as stored (original case), () when not filtering"""
+    if parse_filter_list(raw) is None:
+        return ()
+    return tuple(str(c) for c in json.loads(raw))
+
+
+class UserPrefsCache:
+    """telegram_id -> UserPrefs, loaded in bulk, kept in sync on commit"""
+
+    def __init__(self, max_age: float = PREFS_MAX_AGE_SECONDS):
+        self.max_age = max_age
+        self._lock = threading.RLock()
+        self._prefs: Dict[int, UserPrefs] = {}
+        self._loaded_at: Optional[float] = None
+
+    def load(self) -> int:
+        """(Re)load every user in one column-only query"""
+        columns = [getattr(User, name) for name in _COLUMNS] + [User.selected_casinos, User.selected_sports]
+        db = SessionLocal()
+        try:
+            prefs = {row.telegram_id: UserPrefs.from_user(row) for row in db.execute(select(*columns))}
+        finally:
+            db.close()
+        with self._lock:
+            self._prefs = prefs
+            self._loaded_at = time.monotonic()
+        logger.info(f"⚙️ User prefs loaded: {len(prefs)} users")
+        return len(prefs)
+
+    def mark_stale(self) -> None:
+        """Force a full reload on next use (after raw SQL updates on users)"""
+        with self._lock:
+            self._loaded_at = None
+
+    def ensure_fresh(self) -> None:
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.max_age:
+            try:
+                self.load()
+            except Exception as e:
+                logger.warning(f"⚠️ User prefs reload failed: {e}")
+
+    def get(self, telegram_id: int) -> Optional[UserPrefs]:
+        """Snapshot of one user (DB read only on a cache miss), None if unknown"""
+        self.ensure_fresh()
+        prefs = self._prefs.get(telegram_id)
+        if prefs is not None:
+            return prefs
+        db = SessionLocal()
+        try:
+            user = db.query(User).filter(User.telegram_id == telegram_id).first()
+            if user is None:
+                return None
+            prefs = UserPrefs.from_user(user)
+        finally:
+            db.close()
+        self.publish([prefs])
+        return prefs
+
+    def all(self) -> List[UserPrefs]:
+        """Every snapshot (fan-out)"""
+        self.ensure_fresh()
+        return list(self._prefs.values())
+
+    def publish(self, prefs: List[UserPrefs]) -> None:
+        with self._lock:
+            for p in prefs:
+                self._prefs[p.telegram_id] = p
+
+    def remove(self, telegram_ids: List[int]) -> None:
+        with self._lock:
+            for tid in telegram_ids:
+                self._prefs.pop(tid, None)
+
+
+# Shared instance
+user_prefs = UserPrefsCache()
+
+
+# ===== ORM sync (published on commit) =====
+
+def _stage(target, snapshots: Optional[Tuple[UserPrefs, SubscriberRecord]]) -> None:
+    """snapshots: (prefs, subscriber record) to publish on commit, None = user deleted"""
+    session = object_session(target)
+    if session is None:
+        return
+    session.info.setdefault(_PENDING_KEY, {})[target.telegram_id] = snapshots
+
+
+def _on_user_saved(mapper, connection, target):
+    try:
+        _stage(target, (UserPrefs.from_user(target), SubscriberRecord.from_user(target)))
+    except Exception as e:
+        logger.warning(f"⚠️ User prefs snapshot failed: {e}")
+        user_prefs.mark_stale()
+        subscriber_index.mark_stale()
+
+
+def _on_user_deleted(mapper, connection, target):
+    _stage(target, None)
+
+
+def _on_commit(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    saved = [snapshots for snapshots in pending.values() if snapshots is not None]
+    deleted = [tid for tid, snapshots in pending.items() if snapshots is None]
+    user_prefs.publish([prefs for prefs, _ in saved])
+    user_prefs.remove(deleted)
+    subscriber_index.publish([record for _, record in saved])
+    for tid in deleted:
+        subscriber_index.remove(tid)
+
+
+def _on_rollback(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+event.listen(User, "after_insert", _on_user_saved)
+event.listen(User, "after_update", _on_user_saved)
+event.listen(User, "after_delete", _on_user_deleted)
+event.listen(Session, "after_commit", _on_commit)
+event.listen(Session, "after_rollback", _on_rollback)
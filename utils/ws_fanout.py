@@ -0,0 +1,299 @@
+"""
+Fan-out WebSocket du dashboard (nouveaux calls, confirmations)
+- Une file d'envoi bornée + une tâche d'écriture par socket: un client lent
+  ne retarde plus les autres, publish() ne fait que des put_nowait
+- JSON sérialisé une seule fois par message (et une fois par version allégée)
+- Client lent: file pleine -> le plus ancien message est jeté et le client passe
+  en mode allégé (calls sans payload) jusqu'à ce que sa file se vide; trop de
+  messages jetés ou envoi bloqué -> déconnexion (code 1013, le client se reconnecte)
+- Abonnements filtrés: types de pari, % minimum, user_id (query params à la
+  connexion ou message {"type": "subscribe", ...})
+
+Usage:
+    await manager.connect(websocket, dict(websocket.query_params))
+    manager.handle_text(websocket, await websocket.receive_text())
+    manager.publish(message, bet_type="arbitrage", percentage=2.4, lite=message_sans_payload)
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.metrics import percentiles
+
+logger = logging.getLogger(__name__)
+
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "32"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "10"))
+# Messages jetés (file pleine) avant de déconnecter le client
+WS_MAX_DROPS = int(os.getenv("WS_MAX_DROPS", "64"))
+WS_CLOSE_TRY_AGAIN = 1013
+_LATENCY_SAMPLES = 2000
+
+
+def _dumps(message: Dict) -> str:
+    # Même format que WebSocket.send_json de Starlette
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def _as_list(value) -> List[str]:
+    """ "arbitrage,middle" ou ["arbitrage", "middle"] -> liste"""
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [str(v).strip() for v in value if str(v).strip()]
+
+
+class Subscription:
+    """Filtres d'un client (vide = tout recevoir, comme avant)"""
+
+    __slots__ = ("bet_types", "min_percentage", "user_id", "lite")
+
+    def __init__(self, bet_types: Iterable[str] = (), min_percentage: float = 0.0,
+                 user_id: Optional[int] = None, lite: bool = False):
+        self.bet_types = frozenset(bet_types)
+        self.min_percentage = min_percentage
+        self.user_id = user_id
+        # Calls sans payload (client qui n'affiche que la liste)
+        self.lite = lite
+
+    @classmethod
+    def from_params(cls, params: Optional[Dict]) -> "Subscription":
+        """Query params ou message subscribe: betTypes, minPercentage, userId, lite"""
+        params = params or {}
+        try:
+            min_percentage = float(params.get("minPercentage") or 0)
+        except (TypeError, ValueError):
+            min_percentage = 0.0
+        try:
+            user_id = int(params["userId"]) if params.get("userId") not in (None, "") else None
+        except (TypeError, ValueError):
+            user_id = None
+        lite = str(params.get("lite", "")).lower() in ("1", "true", "yes")
+        return cls(_as_list(params.get("betTypes")), min_percentage, user_id, lite)
+
+    def accepts(self, bet_type: Optional[str], percentage: Optional[float], user_id: Optional[int]) -> bool:
+        if user_id is not None and self.user_id is not None and user_id != self.user_id:
+            return False
+        if bet_type is not None and self.bet_types and bet_type not in self.bet_types:
+            return False
+        if percentage is not None and percentage < self.min_percentage:
+            return False
+        return True
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "betTypes": sorted(self.bet_types),
+            "minPercentage": self.min_percentage,
+            "userId": self.user_id,
+            "lite": self.lite,
+        }
+
+
+class _Client:
+    __slots__ = ("ws", "queue", "task", "sub", "downgraded", "dropped", "closed")
+
+    def __init__(self, ws, sub: Subscription, queue_size: int):
+        self.ws = ws
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.task: Optional[asyncio.Task] = None
+        self.sub = sub
+        # Mode allégé forcé (client en retard)
+        self.downgraded = False
+        self.dropped = 0
+        self.closed = False
+
+
+class _Message:
+    """Texte JSON complet / allégé, sérialisé à la demande une seule fois"""
+
+    __slots__ = ("full", "lite", "_full_text", "_lite_text")
+
+    def __init__(self, full: Dict, lite: Optional[Dict]):
+        self.full = full
+        self.lite = lite
+        self._full_text = None
+        self._lite_text = None
+
+    def text(self, lite: bool) -> str:
+        if lite and self.lite is not None:
+            if self._lite_text is None:
+                self._lite_text = _dumps(self.lite)
+            return self._lite_text
+        if self._full_text is None:
+            self._full_text = _dumps(self.full)
+        return self._full_text
+
+
+class WebSocketFanout:
+    """Connexions WebSocket du dashboard avec files par client et abonnements"""
+
+    def __init__(self, queue_size: int = WS_QUEUE_SIZE, send_timeout: float = WS_SEND_TIMEOUT,
+                 max_drops: int = WS_MAX_DROPS):
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.max_drops = max_drops
+        self._clients: Dict[int, _Client] = {}
+        # ms: publish -> écrit sur la socket
+        self._latencies = deque(maxlen=_LATENCY_SAMPLES)
+        self.stats = {
+            "connected": 0,
+            "published": 0,
+            "queued": 0,
+            "filtered": 0,
+            "sent": 0,
+            "dropped": 0,
+            "downgraded": 0,
+            "disconnected_slow": 0,
+        }
+
+    # ---------- Connexions ----------
+
+    @property
+    def active_connections(self) -> List:
+        return [client.ws for client in self._clients.values()]
+
+    async def connect(self, websocket, params: Optional[Dict] = None, accept: bool = True) -> None:
+        """Accepte la socket et démarre sa tâche d'écriture"""
+        if accept:
+            await websocket.accept()
+        client = _Client(websocket, Subscription.from_params(params), self.queue_size)
+        client.task = asyncio.create_task(self._writer(client))
+        self._clients[id(websocket)] = client
+        self.stats["connected"] += 1
+        logger.info(f"🔌 WebSocket connected. Total: {len(self._clients)}")
+
+    def disconnect(self, websocket) -> None:
+        client = self._clients.pop(id(websocket), None)
+        if client is None:
+            return
+        client.closed = True
+        if client.task is not None and client.task is not asyncio.current_task():
+            client.task.cancel()
+        logger.info(f"🔌 WebSocket disconnected. Total: {len(self._clients)}")
+
+    def subscribe(self, websocket, params: Optional[Dict]) -> Optional[Subscription]:
+        client = self._clients.get(id(websocket))
+        if client is None:
+            return None
+        client.sub = Subscription.from_params(params)
+        return client.sub
+
+    def handle_text(self, websocket, data: str) -> None:
+        """Message reçu d'un client: "ping" ou {"type": "subscribe", ...}"""
+        client = self._clients.get(id(websocket))
+        if client is None:
+            return
+        if data == "ping":
+            self._push(client, _Message({"type": "pong"}, None))
+            return
+        try:
+            request = json.loads(data)
+        except ValueError:
+            return
+        if isinstance(request, dict) and request.get("type") == "subscribe":
+            sub = self.subscribe(websocket, request)
+            self._push(client, _Message({"type": "subscribed", "filters": sub.as_dict()}, None))
+
+    # ---------- Publication ----------
+
+    def publish(self, message: Dict, bet_type: Optional[str] = None, percentage: Optional[float] = None,
+                user_id: Optional[int] = None, lite: Optional[Dict] = None) -> int:
+        """
+        Met le message en file pour chaque client abonné (ne bloque jamais)
+
+        Args:
+            message: Message complet
+            bet_type / percentage / user_id: Critères comparés aux abonnements
+            lite: Version allégée (clients lite ou en retard), None = message complet
+
+        Returns:
+            Nombre de clients servis
+        """
+        self.stats["published"] += 1
+        msg = _Message(message, lite)
+        queued = 0
+        for client in list(self._clients.values()):
+            if not client.sub.accepts(bet_type, percentage, user_id):
+                self.stats["filtered"] += 1
+                continue
+            if self._push(client, msg):
+                queued += 1
+        self.stats["queued"] += queued
+        return queued
+
+    async def broadcast(self, message: Dict) -> int:
+        """Compatibilité ancienne API: publish() sans filtre"""
+        return self.publish(message)
+
+    def metrics(self) -> Dict[str, Any]:
+        """Snapshot pour /health ou commandes admin"""
+        depths = [client.queue.qsize() for client in self._clients.values()]
+        return {
+            "clients": len(self._clients),
+            "downgraded_clients": sum(1 for c in self._clients.values() if c.downgraded),
+            "max_client_queue": max(depths, default=0),
+            **self.stats,
+            "latency_ms": percentiles(self._latencies),
+        }
+
+    # ---------- Interne ----------
+
+    def _push(self, client: _Client, msg: _Message) -> bool:
+        item = (msg, time.monotonic())
+        try:
+            client.queue.put_nowait(item)
+            return True
+        except asyncio.QueueFull:
+            pass
+        # Client en retard: on jette le plus ancien et on passe en mode allégé
+        client.queue.get_nowait()
+        client.queue.put_nowait(item)
+        client.dropped += 1
+        self.stats["dropped"] += 1
+        if not client.downgraded:
+            client.downgraded = True
+            self.stats["downgraded"] += 1
+            logger.warning(f"⚠️ Slow WebSocket client downgraded to lite messages ({len(self._clients)} clients)")
+        if client.dropped >= self.max_drops:
+            self._drop_slow(client, "too many dropped messages")
+        return True
+
+    def _drop_slow(self, client: _Client, reason: str) -> None:
+        if client.closed:
+            return
+        self.stats["disconnected_slow"] += 1
+        logger.warning(f"⚠️ Slow WebSocket client disconnected ({reason})")
+        self.disconnect(client.ws)
+        asyncio.create_task(self._close(client.ws))
+
+    async def _close(self, websocket) -> None:
+        try:
+            await asyncio.wait_for(websocket.close(code=WS_CLOSE_TRY_AGAIN), self.send_timeout)
+        except Exception:
+            pass
+
+    async def _writer(self, client: _Client) -> None:
+        while True:
+            msg, queued_at = await client.queue.get()
+            text = msg.text(client.sub.lite or client.downgraded)
+            try:
+                await asyncio.wait_for(client.ws.send_text(text), self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except asyncio.TimeoutError:
+                self._drop_slow(client, f"send blocked > {self.send_timeout:.0f}s")
+                return
+            except Exception:
+                self.disconnect(client.ws)
+                return
+            self.stats["sent"] += 1
+            self._latencies.append((time.monotonic() - queued_at) * 1000)
+            # Rattrapé: retour aux messages complets
+            if client.downgraded and client.queue.empty():
+                client.downgraded = False
+                client.dropped = 0